@@ -7,7 +7,8 @@ import datetime
 
 from .models import (
     Account, Booking, SubTransaction, MemberAccount,
-    BusinessYear, YearClosingStep, ClosingAdjustment
+    BusinessYear, YearClosingStep, ClosingAdjustment,
+    BalanceSnapshot, AccountBalanceSnapshot
 )
 
 # -----------------------------------------------------------------------------
@@ -377,6 +378,25 @@ class ClosingAdjustmentAdmin(admin.ModelAdmin):
     is_completed_badge.short_description = 'Status'
 
 
+# -----------------------------------------------------------------------------
+# Saldenstände
+# -----------------------------------------------------------------------------
+class AccountBalanceSnapshotInline(admin.TabularInline):
+    model = AccountBalanceSnapshot
+    extra = 0
+    fields = ['account', 'debit_total', 'credit_total']
+    readonly_fields = fields
+    can_delete = False
+
+
+@admin.register(BalanceSnapshot)
+class BalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['cutoff', 'kind', 'business_year', 'is_valid', 'rebuilt_at']
+    list_filter = ['kind', 'is_valid']
+    readonly_fields = ['created_at', 'rebuilt_at']
+    inlines = [AccountBalanceSnapshotInline]
+
+
 # -----------------------------------------------------------------------------
 # Admin-Site Anpassungen
 # -----------------------------------------------------------------------------
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class BuchhaltungConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'buchhaltung'
+
+    def ready(self):
+        """Registriert die Signale für die Saldenstände"""
+        from . import signals  # noqa: F401
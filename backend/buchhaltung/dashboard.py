@@ -0,0 +1,100 @@
+# backend/buchhaltung/dashboard.py
+"""
+Aggregation für das Buchhaltungs-Dashboard.
+
+Einnahmen und Ausgaben je Monat und Buchungstyp kommen aus einer einzigen
+gruppierten Query über die Teilbuchungen. Das Ergebnis wird je Zeitraum im
+Django-Cache gehalten; jede Änderung an Buchungen oder Teilbuchungen erhöht die
+Cache-Version (signals.py), womit alle gecachten Zeiträume verfallen. Die Version
+liegt in der Datenbank (options.versions) und gilt damit für alle Prozesse.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import ExtractMonth
+
+from options import versions
+
+from .ledger import day_end, day_start
+from .models import SubTransaction
+
+MONTHS = ['Jan', 'Feb', 'Mär', 'Apr', 'Mai', 'Jun', 'Jul', 'Aug', 'Sep', 'Okt', 'Nov', 'Dez']
+
+# Buchungstypen, die als Einnahme zählen (alle anderen als Ausgabe)
+INCOME_TYPES = ('EINZEL', 'MITGLIEDSBEITRAG')
+
+CACHE_TIMEOUT = 300
+CACHE_VERSION_KEY = 'buchhaltung:dashboard:version'
+
+
+def _cache_version():
+    return versions.version(CACHE_VERSION_KEY)
+
+
+def invalidate_dashboard():
+    """Lässt alle gecachten Dashboard-Zusammenfassungen verfallen."""
+    versions.bump(CACHE_VERSION_KEY)
+
+
+def period_bounds(year=None, business_year=None):
+    """Start- und Enddatum des gewählten Zeitraums (None = alle Buchungen)."""
+    if business_year is not None:
+        return business_year.start_date, business_year.end_date
+    if year:
+        return datetime.date(year, 1, 1), datetime.date(year, 12, 31)
+    return None, None
+
+
+def compute_summary(start_date=None, end_date=None):
+    """Berechnet die Zusammenfassung ohne Cache (eine Query)."""
+    subtransactions = SubTransaction.objects.all()
+    if start_date:
+        subtransactions = subtransactions.filter(booking__datum__gte=day_start(start_date))
+    if end_date:
+        subtransactions = subtransactions.filter(booking__datum__lte=day_end(end_date))
+
+    rows = subtransactions.annotate(
+        month=ExtractMonth('booking__datum')
+    ).values('month', 'booking__typ').annotate(
+        total=Sum('betrag')
+    ).order_by()
+
+    monthly = {month: {'income': Decimal('0.00'), 'expense': Decimal('0.00')} for month in range(1, 13)}
+    by_type = {}
+    for row in rows:
+        amount = row['total'] or Decimal('0.00')
+        side = 'income' if row['booking__typ'] in INCOME_TYPES else 'expense'
+        monthly[row['month']][side] += amount
+        by_type[row['booking__typ']] = by_type.get(row['booking__typ'], Decimal('0.00')) + amount
+
+    income = sum((values['income'] for values in monthly.values()), Decimal('0.00'))
+    expense = sum((values['expense'] for values in monthly.values()), Decimal('0.00'))
+    return {
+        'total_income': income,
+        'total_expense': expense,
+        'balance': income - expense,
+        'monthly_data': [
+            {
+                'month': MONTHS[month - 1],
+                'month_number': month,
+                'income': monthly[month]['income'],
+                'expense': monthly[month]['expense'],
+            }
+            for month in range(1, 13)
+        ],
+        'by_type': by_type,
+        'period': {'start': start_date, 'end': end_date},
+    }
+
+
+def dashboard_summary(year=None, business_year=None):
+    """Zusammenfassung für das Dashboard, gecacht je Zeitraum."""
+    start_date, end_date = period_bounds(year=year, business_year=business_year)
+    key = f"buchhaltung:dashboard:{_cache_version()}:{start_date}:{end_date}"
+    summary = cache.get(key)
+    if summary is None:
+        summary = compute_summary(start_date, end_date)
+        cache.set(key, summary, CACHE_TIMEOUT)
+    return summary
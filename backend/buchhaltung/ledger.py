@@ -0,0 +1,254 @@
+# backend/buchhaltung/ledger.py
+"""
+Gemeinsame Kontenberechnung für Hauptbuch, GuV und Bilanz.
+
+Statt je Konto eigene Summen-Queries abzusetzen, werden Soll- und Habensummen
+aller Konten mit einer gruppierten Query je Seite ermittelt. Die Einzelbuchungen
+eines Zeitraums kommen aus einer einzigen, nach Datum sortierten Query und werden
+im Speicher auf die Konten verteilt. Die Anzahl der Queries bleibt damit
+unabhängig von der Größe des Kontenrahmens.
+
+Summen ohne Startdatum (Anfangsbestände, Bilanz) beginnen beim nächstgelegenen
+gültigen Saldenstand (BalanceSnapshot, siehe snapshots.py) und summieren nur die
+Buchungen danach.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import Account, AccountBalanceSnapshot, BalanceSnapshot, SubTransaction
+
+ZERO = Decimal('0.00')
+
+# Konten mit Saldo Soll - Haben (alle anderen: Haben - Soll)
+DEBIT_ACCOUNT_TYPES = ('AKTIV', 'AUFWAND')
+
+
+def day_start(day):
+    """Beginn eines Tages als zeitzonenbewusstes DateTime."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def day_end(day):
+    """Ende eines Tages als zeitzonenbewusstes DateTime."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.max))
+
+
+def active_subtransactions():
+    """Teilbuchungen, die in die Salden eingehen (weder storniert noch Storno-Buchung)."""
+    return SubTransaction.objects.filter(
+        booking__storniert_am__isnull=True,
+        booking__is_storno=False
+    )
+
+
+def account_balance(konto_typ, debit, credit):
+    """Saldo eines Kontos je nach Kontotyp."""
+    if konto_typ in DEBIT_ACCOUNT_TYPES:
+        return debit - credit
+    return credit - debit
+
+
+def grouped_totals(queryset):
+    """Soll- und Habensummen je Konto mit einer gruppierten Query je Seite."""
+    debits = dict(
+        queryset.values_list('soll_konto_id').annotate(total=Sum('betrag')).order_by()
+    )
+    credits = dict(
+        queryset.values_list('haben_konto_id').annotate(total=Sum('betrag')).order_by()
+    )
+    return {
+        account_id: (debits.get(account_id) or ZERO, credits.get(account_id) or ZERO)
+        for account_id in set(debits) | set(credits)
+    }
+
+
+def merge_totals(*parts):
+    """Addiert mehrere {account_id: (soll, haben)}-Dicts."""
+    merged = {}
+    for part in parts:
+        for account_id, (debit, credit) in part.items():
+            old_debit, old_credit = merged.get(account_id, (ZERO, ZERO))
+            merged[account_id] = (old_debit + debit, old_credit + credit)
+    return merged
+
+
+def nearest_snapshot(limit=None):
+    """Letzter gültiger Saldenstand mit Stichtag <= limit (ohne limit: der jüngste)."""
+    snapshots = BalanceSnapshot.objects.filter(is_valid=True)
+    if limit is not None:
+        snapshots = snapshots.filter(cutoff__lte=limit)
+    return snapshots.order_by('-cutoff').first()
+
+
+def snapshot_totals(snapshot):
+    """Gespeicherte Summen eines Saldenstands als {account_id: (soll, haben)}."""
+    return {
+        account_id: (debit, credit)
+        for account_id, debit, credit in AccountBalanceSnapshot.objects.filter(
+            snapshot=snapshot
+        ).values_list('account_id', 'debit_total', 'credit_total')
+    }
+
+
+class LedgerEngine:
+    """
+    Berechnet Salden und Kontenblätter für alle Konten auf einmal.
+
+    Jede Summenabfrage besteht aus zwei Queries (gruppiert nach Soll- bzw.
+    Haben-Konto) und ggf. zwei weiteren für den Saldenstand - unabhängig von der
+    Anzahl der Konten und der Länge der Buchungshistorie.
+    """
+
+    def __init__(self, accounts=None):
+        if accounts is None:
+            accounts = Account.objects.all()
+        self.accounts = list(accounts.order_by('kontonummer'))
+        self.accounts_by_id = {account.id: account for account in self.accounts}
+
+    def accounts_of_type(self, *konto_typen):
+        return [account for account in self.accounts if account.konto_typ in konto_typen]
+
+    def totals(self, start=None, end=None, before=None, use_snapshots=True):
+        """
+        Soll- und Habensummen je Konto als {account_id: (soll, haben)}.
+        start/end begrenzen inklusiv, before exklusiv (für Anfangsbestände).
+        Ohne start wird vom letzten gültigen Saldenstand aus weitergerechnet.
+        """
+        base = {}
+        if start is None and use_snapshots:
+            snapshot = nearest_snapshot(before if before is not None else end)
+            if snapshot:
+                base = snapshot_totals(snapshot)
+                start = snapshot.cutoff
+
+        queryset = active_subtransactions()
+        if start is not None:
+            queryset = queryset.filter(booking__datum__gte=start)
+        if end is not None:
+            queryset = queryset.filter(booking__datum__lte=end)
+        if before is not None:
+            queryset = queryset.filter(booking__datum__lt=before)
+        return merge_totals(base, grouped_totals(queryset))
+
+    def balances(self, start=None, end=None, before=None):
+        """Saldo je Konto ({account_id: Decimal}) für alle geladenen Konten."""
+        totals = self.totals(start=start, end=end, before=before)
+        return {
+            account.id: account_balance(account.konto_typ, *totals.get(account.id, (ZERO, ZERO)))
+            for account in self.accounts
+        }
+
+    def period_transactions(self, start, end):
+        """
+        Alle Teilbuchungen des Zeitraums mit einer sortierten Query, aufgeteilt auf
+        die Konten. Liefert {account_id: [Zeilen]} im Format des Hauptbuchs.
+        """
+        rows = active_subtransactions().filter(
+            booking__datum__gte=start,
+            booking__datum__lte=end
+        ).order_by('booking__datum', 'id').values_list(
+            'soll_konto_id', 'haben_konto_id', 'betrag',
+            'booking__datum', 'booking__buchungsnummer', 'booking__verwendungszweck',
+            'booking__is_storno', 'booking__storniert_am'
+        )
+
+        transactions = defaultdict(list)
+        for soll_id, haben_id, betrag, datum, buchungsnummer, verwendungszweck, is_storno, storniert_am in rows.iterator():
+            common = {
+                'date': datum,
+                'booking_no': buchungsnummer,
+                'description': verwendungszweck,
+                'is_storno': is_storno,
+                'is_storniert': storniert_am is not None
+            }
+            transactions[soll_id].append(dict(
+                common, debit=betrag, credit=0, counter_account=self._number(haben_id)
+            ))
+            transactions[haben_id].append(dict(
+                common, debit=0, credit=betrag, counter_account=self._number(soll_id)
+            ))
+        return transactions
+
+    def _number(self, account_id):
+        account = self.accounts_by_id.get(account_id)
+        return account.kontonummer if account else None
+
+    # --- Berichte --------------------------------------------------------
+
+    def main_book(self, start_date, end_date):
+        """Hauptbuch: Anfangsbestand, Buchungen, Umsätze und Endbestand je Konto."""
+        start_datetime = day_start(start_date)
+        end_datetime = day_end(end_date)
+
+        opening = self.balances(before=start_datetime)
+        transactions = self.period_transactions(start_datetime, end_datetime)
+
+        result = []
+        for account in self.accounts:
+            account_transactions = transactions.get(account.id, [])
+            period_debits = sum(Decimal(tx['debit']) for tx in account_transactions)
+            period_credits = sum(Decimal(tx['credit']) for tx in account_transactions)
+            opening_balance = opening[account.id]
+            closing_balance = opening_balance + account_balance(account.konto_typ, period_debits, period_credits)
+
+            result.append({
+                'account': {
+                    'id': account.id,
+                    'number': account.kontonummer,
+                    'name': account.name,
+                    'type': account.konto_typ,
+                    'category': account.category
+                },
+                'opening_balance': opening_balance,
+                'transactions': account_transactions,
+                'period_debits': float(period_debits),
+                'period_credits': float(period_credits),
+                'turnover': float(period_debits + period_credits),  # Umsatz
+                'closing_balance': closing_balance
+            })
+        return result
+
+    def profit_loss(self, start=None, end=None):
+        """
+        Erträge und Aufwendungen je Konto sowie deren Summen.
+        Liefert (income, expenses, total_income, total_expenses); die Listen enthalten
+        nur Konten mit Saldo ≠ 0.
+        """
+        balances = self.balances(start=start, end=end)
+        income = self._balance_rows(self.accounts_of_type('ERTRAG'), balances)
+        expenses = self._balance_rows(self.accounts_of_type('AUFWAND'), balances)
+        total_income = sum((balances[account.id] for account in self.accounts_of_type('ERTRAG')), ZERO)
+        total_expenses = sum((balances[account.id] for account in self.accounts_of_type('AUFWAND')), ZERO)
+        return income, expenses, total_income, total_expenses
+
+    def _balance_rows(self, accounts, balances, default_category=None):
+        return [
+            {
+                'id': account.id,
+                'number': account.kontonummer,
+                'name': account.name,
+                'category': account.category or default_category,
+                'balance': balances[account.id]
+            }
+            for account in accounts
+            if balances[account.id] != 0
+        ]
+
+    def balance_sheet(self, balance_date):
+        """
+        Bilanz zum Stichtag: Aktiva, Passiva (nach Kategorie sortiert) und das
+        vorläufige GuV-Ergebnis. Alle Salden aus einer Summenabfrage.
+        """
+        balances = self.balances(end=day_end(balance_date))
+
+        def sorted_rows(konto_typ):
+            rows = self._balance_rows(self.accounts_of_type(konto_typ), balances, default_category='Sonstiges')
+            return sorted(rows, key=lambda row: row['category'] + row['number'])
+
+        income_total = sum((balances[account.id] for account in self.accounts_of_type('ERTRAG')), ZERO)
+        expense_total = sum((balances[account.id] for account in self.accounts_of_type('AUFWAND')), ZERO)
+        return sorted_rows('AKTIV'), sorted_rows('PASSIV'), income_total - expense_total
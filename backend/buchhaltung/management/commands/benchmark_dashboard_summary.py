@@ -0,0 +1,116 @@
+# backend/buchhaltung/management/commands/benchmark_dashboard_summary.py
+"""
+Benchmark für die Dashboard-Zusammenfassung. Erzeugt mit dem Buchungs-Helfer aus
+create_test_bookings zusätzliche Testbuchungen über die letzten zwölf Monate und
+vergleicht die bisherige Berechnung (eine Query je Buchung) mit der gruppierten
+Aggregation - kalt und aus dem Cache. Testbuchungen und Kontosalden werden am
+Ende wiederhergestellt.
+"""
+import io
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from buchhaltung.dashboard import compute_summary, dashboard_summary, invalidate_dashboard
+from buchhaltung.management.commands.create_test_bookings import Command as TestBookingsCommand
+from buchhaltung.models import Account, Booking
+from buchhaltung.utils import STANDARD_KONTORAHMEN
+
+# Konten, die create_test_bookings bebucht (Bank + Erträge/Aufwände)
+TEST_ACCOUNTS = ['1200', '4000', '4010', '4020', '5100', '5130', '5120', '5020', '5480', '3210', '6900']
+EXPENSE_ACCOUNTS = ['5100', '5130', '5120', '5020', '5480', '3210', '6900']
+
+
+class Command(BaseCommand):
+    help = "Benchmark der Dashboard-Zusammenfassung (Queries und Laufzeit, mit und ohne Cache)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bookings', type=int, default=300, help='Anzahl zusätzlicher Testbuchungen (max. 900)')
+        parser.add_argument('--seed', type=int, default=None, help='Zufallsstartwert')
+        parser.add_argument('--keep', action='store_true', help='Testbuchungen nach dem Lauf nicht löschen')
+        parser.add_argument('--force', action='store_true', help='Auch mit DEBUG=False ausführen')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Benchmark legt Testdaten an - mit DEBUG=False nur mit --force ausführen")
+        if not 0 < options['bookings'] <= 900:
+            # generate_booking_number vergibt dreistellige Tagesnummern
+            raise CommandError("--bookings muss zwischen 1 und 900 liegen")
+
+        rng = random.Random(options['seed'])
+        created_accounts = self._ensure_accounts()
+        konten_dict = {konto.kontonummer: konto for konto in Account.objects.filter(kontonummer__in=TEST_ACCOUNTS)}
+        saldi_before = {konto.id: konto.saldo for konto in konten_dict.values()}
+        existing_ids = set(Booking.objects.values_list('id', flat=True))
+
+        self.stdout.write(f"🧪 Erzeuge {options['bookings']} Testbuchungen...")
+        helper = TestBookingsCommand(stdout=io.StringIO())
+        today = now().date()
+        for _ in range(options['bookings']):
+            konto = rng.choice(TEST_ACCOUNTS[1:])
+            helper.create_booking(
+                konto, "Benchmark-Buchung", Decimal(rng.randint(1000, 500000)) / 100, konten_dict,
+                today - timedelta(days=rng.randint(0, 364)), ausgabe=konto in EXPENSE_ACCOUNTS
+            )
+
+        try:
+            self._measure("Bisher (Schleife je Buchung)", self._legacy_summary)
+            self._measure("Gruppierte Query", compute_summary)
+            invalidate_dashboard()
+            self._measure("Service, kalter Cache", dashboard_summary)
+            self._measure("Service, warmer Cache", dashboard_summary)
+            self._measure("Service, Jahr " + str(today.year), lambda: dashboard_summary(year=today.year))
+
+            legacy = self._legacy_summary()
+            current = compute_summary()
+            if legacy['total_income'] != current['total_income'] or legacy['total_expense'] != current['total_expense']:
+                raise CommandError(f"❌ Summen weichen ab: bisher {legacy}, neu {current}")
+            self.stdout.write(self.style.SUCCESS("✅ Summen stimmen mit der bisherigen Berechnung überein"))
+        finally:
+            if not options['keep']:
+                Booking.objects.exclude(id__in=existing_ids).delete()
+                for konto in konten_dict.values():
+                    Account.objects.filter(id=konto.id).update(saldo=saldi_before[konto.id])
+                Account.objects.filter(id__in=created_accounts).delete()
+                invalidate_dashboard()
+                self.stdout.write("🧹 Testbuchungen entfernt")
+
+    def _ensure_accounts(self):
+        """Legt fehlende Konten aus dem Standard-Kontenrahmen an (werden danach wieder gelöscht)."""
+        created = []
+        for kontonummer, name, konto_typ, category, saldo in STANDARD_KONTORAHMEN:
+            if kontonummer not in TEST_ACCOUNTS:
+                continue
+            konto, was_created = Account.objects.get_or_create(
+                kontonummer=kontonummer,
+                defaults={'name': name, 'konto_typ': konto_typ, 'category': category, 'saldo': saldo}
+            )
+            if was_created:
+                created.append(konto.id)
+        return created
+
+    def _legacy_summary(self):
+        """Bisherige Berechnung: Summe der Teilbuchungen mit einer Query je Buchung."""
+        income = Decimal('0.00')
+        expense = Decimal('0.00')
+        for booking in Booking.objects.all():
+            amount = sum(sub.betrag for sub in booking.subtransactions.all())
+            if booking.typ in ['EINZEL', 'MITGLIEDSBEITRAG']:
+                income += amount
+            else:
+                expense += amount
+        return {'total_income': income, 'total_expense': expense}
+
+    def _measure(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+        self.stdout.write(f"   {label:<32} {len(queries.captured_queries):>5} Queries  {elapsed:>8.1f}ms")
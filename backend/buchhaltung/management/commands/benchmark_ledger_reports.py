@@ -0,0 +1,132 @@
+# backend/buchhaltung/management/commands/benchmark_ledger_reports.py
+"""
+Misst Queries und Laufzeit von Hauptbuch, GuV und Bilanz bei wachsendem
+Kontenrahmen. Legt dazu schrittweise Testkonten mit Buchungen an und ruft die
+drei Berichts-Views direkt auf. Die Anzahl der Queries muss über alle Stufen
+konstant bleiben. Testdaten werden am Ende wieder entfernt.
+"""
+import datetime
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from buchhaltung.models import Account, Booking, SubTransaction
+from buchhaltung.views_api import BalanceSheetAPIView, MainBookAPIView, ProfitLossAPIView
+
+KONTO_TYPEN = ['AKTIV', 'PASSIV', 'ERTRAG', 'AUFWAND']
+
+REPORTS = [
+    ('Hauptbuch', MainBookAPIView, '/api/buchhaltung/mainbook/'),
+    ('GuV', ProfitLossAPIView, '/api/buchhaltung/guv/'),
+    ('Bilanz', BalanceSheetAPIView, '/api/buchhaltung/bilanz/'),
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark der Buchhaltungsberichte (Queries bleiben bei wachsendem Kontenrahmen konstant)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--accounts',
+            default='25,100,400',
+            help='Kommagetrennte Stufen für die Anzahl der Testkonten'
+        )
+        parser.add_argument('--bookings-per-account', type=int, default=5, help='Buchungen je Testkonto')
+        parser.add_argument('--seed', type=int, default=None, help='Zufallsstartwert')
+        parser.add_argument('--keep', action='store_true', help='Testdaten nach dem Lauf nicht löschen')
+        parser.add_argument('--force', action='store_true', help='Auch mit DEBUG=False ausführen')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Benchmark legt Testdaten an - mit DEBUG=False nur mit --force ausführen")
+        try:
+            steps = sorted({int(value) for value in options['accounts'].split(',') if value.strip()})
+        except ValueError:
+            raise CommandError("--accounts erwartet kommagetrennte Zahlen, z.B. 25,100,400")
+
+        rng = random.Random(options['seed'])
+        tag = uuid.uuid4().hex[:6]
+        prefix = f"BM{tag}"
+        user = User(username='benchmark')
+        factory = APIRequestFactory()
+
+        query_counts = {name: set() for name, _, _ in REPORTS}
+        try:
+            accounts = []
+            booking_count = 0
+            for step in steps:
+                booking_count += self._grow(accounts, step, prefix, booking_count, rng, options)
+                self.stdout.write(f"📊 {Account.objects.count()} Konten, {SubTransaction.objects.count()} Teilbuchungen")
+                for name, view_class, url in REPORTS:
+                    request = factory.get(url)
+                    force_authenticate(request, user=user)
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = view_class.as_view()(request)
+                        elapsed = (time.perf_counter() - started) * 1000
+                    if response.status_code != 200:
+                        raise CommandError(f"{name} lieferte HTTP {response.status_code}")
+                    query_counts[name].add(len(queries.captured_queries))
+                    self.stdout.write(f"   {name:<10} {len(queries.captured_queries):>4} Queries  {elapsed:>8.1f}ms")
+        finally:
+            if not options['keep']:
+                Booking.objects.filter(buchungsnummer__startswith=prefix).delete()
+                Account.objects.filter(kontonummer__startswith=prefix).delete()
+                self.stdout.write("🧹 Testdaten entfernt")
+
+        flat = all(len(counts) == 1 for counts in query_counts.values())
+        if not flat:
+            raise CommandError(f"❌ Anzahl der Queries wächst mit dem Kontenrahmen: {query_counts}")
+        self.stdout.write(self.style.SUCCESS("✅ Anzahl der Queries ist unabhängig von der Anzahl der Konten"))
+
+    def _grow(self, accounts, target, prefix, booking_offset, rng, options):
+        """Ergänzt Testkonten bis zur Zielanzahl und bucht auf jedes neue Konto."""
+        new_accounts = Account.objects.bulk_create([
+            Account(
+                kontonummer=f"{prefix}{index:05d}",
+                name=f"Benchmark-Konto {index}",
+                konto_typ=KONTO_TYPEN[index % len(KONTO_TYPEN)],
+                category=f"Benchmark {index % 7}"
+            )
+            for index in range(len(accounts), target)
+        ])
+        if new_accounts and not new_accounts[0].pk:
+            # Backends ohne RETURNING liefern keine Primärschlüssel zurück
+            new_accounts = list(Account.objects.filter(kontonummer__in=[a.kontonummer for a in new_accounts]))
+        accounts.extend(new_accounts)
+        if not new_accounts or len(accounts) < 2:
+            return 0
+
+        now = timezone.now()
+        bookings = [
+            Booking(
+                buchungsnummer=f"{prefix}-{booking_offset + index:07d}",
+                verwendungszweck="Benchmark-Buchung",
+                datum=now - datetime.timedelta(days=rng.randint(0, 400), minutes=rng.randint(0, 1440))
+            )
+            for index in range(len(new_accounts) * options['bookings_per_account'])
+        ]
+        Booking.objects.bulk_create(bookings, batch_size=500)
+        bookings = Booking.objects.filter(buchungsnummer__in=[booking.buchungsnummer for booking in bookings])
+
+        subtransactions = []
+        for index, booking in enumerate(bookings):
+            soll_konto = new_accounts[index % len(new_accounts)]
+            haben_konto = rng.choice([account for account in accounts[:50] if account.pk != soll_konto.pk])
+            subtransactions.append(SubTransaction(
+                booking=booking,
+                betrag=Decimal(rng.randint(100, 100000)) / 100,
+                soll_konto=soll_konto,
+                haben_konto=haben_konto
+            ))
+        SubTransaction.objects.bulk_create(subtransactions, batch_size=500)
+        return len(subtransactions)
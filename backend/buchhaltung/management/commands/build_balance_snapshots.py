@@ -0,0 +1,74 @@
+# backend/buchhaltung/management/commands/build_balance_snapshots.py
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from buchhaltung.models import BalanceSnapshot, Booking, BusinessYear
+from buchhaltung.snapshots import (
+    create_snapshot, find_differences, month_cutoffs, rebuild_invalid, snapshot_business_year,
+)
+
+
+class Command(BaseCommand):
+    help = "Legt Saldenstände (Jahresabschlüsse, Monatsstände) an, berechnet oder prüft sie"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--monthly',
+            action='store_true',
+            help='Monatsstände bis zum laufenden Monat anlegen'
+        )
+        parser.add_argument(
+            '--since',
+            help='Erster Monat für --monthly (JJJJ-MM-TT, Standard: erste Buchung)'
+        )
+        parser.add_argument(
+            '--years',
+            action='store_true',
+            help='Stände für alle abgeschlossenen Geschäftsjahre anlegen'
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Alle bestehenden Stände neu berechnen'
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Gespeicherte Stände mit einer Neuberechnung vergleichen'
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            BalanceSnapshot.objects.update(is_valid=False)
+        rebuilt = rebuild_invalid()
+        if rebuilt:
+            self.stdout.write(f"♻️ {rebuilt} Saldenstände neu berechnet")
+
+        if options['years']:
+            for business_year in BusinessYear.objects.filter(status='CLOSED').order_by('start_date'):
+                snapshot_business_year(business_year)
+                self.stdout.write(f"📘 Jahresabschluss-Stand für {business_year.name}")
+
+        if options['monthly']:
+            since = parse_date(options['since']) if options['since'] else None
+            if options['since'] and not since:
+                raise CommandError("--since erwartet ein Datum im Format JJJJ-MM-TT")
+            if not since:
+                first = Booking.objects.order_by('datum').values_list('datum', flat=True).first()
+                since = timezone.localdate(first) if first else timezone.localdate()
+            cutoffs = month_cutoffs(since)
+            for cutoff in cutoffs:
+                create_snapshot(cutoff, kind='MONTH')
+            self.stdout.write(f"📅 {len(cutoffs)} Monatsstände angelegt bzw. aktualisiert")
+
+        if options['verify']:
+            differences = find_differences()
+            for snapshot, account_id, stored, expected in differences:
+                self.stdout.write(f"  ❌ {snapshot}: Konto {account_id} gespeichert {stored}, erwartet {expected}")
+            if differences:
+                raise CommandError(f"{len(differences)} Abweichungen in den Saldenständen")
+            self.stdout.write(self.style.SUCCESS("✅ Alle gültigen Saldenstände stimmen mit den Buchungen überein"))
+
+        valid = BalanceSnapshot.objects.filter(is_valid=True).count()
+        self.stdout.write(self.style.SUCCESS(f"✅ {valid} gültige Saldenstände"))
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('buchhaltung', '0002_remove_booking_foerderkredit_stand_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cutoff', models.DateTimeField(unique=True, verbose_name='Stichtag (exklusiv)')),
+                ('kind', models.CharField(choices=[('YEAR', 'Jahresabschluss'), ('MONTH', 'Monatsstand')], default='MONTH', max_length=10, verbose_name='Art')),
+                ('is_valid', models.BooleanField(default=True, verbose_name='Gültig')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('rebuilt_at', models.DateTimeField(blank=True, null=True, verbose_name='Zuletzt berechnet')),
+                ('business_year', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='balance_snapshots', to='buchhaltung.businessyear', verbose_name='Geschäftsjahr')),
+            ],
+            options={
+                'verbose_name': 'Saldenstand',
+                'verbose_name_plural': 'Saldenstände',
+                'ordering': ['-cutoff'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AccountBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('debit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Summe Soll')),
+                ('credit_total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14, verbose_name='Summe Haben')),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='buchhaltung.account')),
+                ('snapshot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='buchhaltung.balancesnapshot')),
+            ],
+            options={
+                'verbose_name': 'Kontenstand',
+                'verbose_name_plural': 'Kontenstände',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='balancesnapshot',
+            index=models.Index(fields=['is_valid', 'cutoff'], name='balance_snapshot_valid_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='accountbalancesnapshot',
+            constraint=models.UniqueConstraint(fields=('snapshot', 'account'), name='account_snapshot_uniq'),
+        ),
+    ]
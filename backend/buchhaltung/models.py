@@ -206,4 +206,57 @@ class ClosingAdjustment(models.Model):
         ordering = ['business_year', 'adjustment_type']
     
     def __str__(self):
-        return f"{self.name} ({self.get_adjustment_type_display()}) - {self.amount} €"
\ No newline at end of file
+        return f"{self.name} ({self.get_adjustment_type_display()}) - {self.amount} €"
+
+class BalanceSnapshot(models.Model):
+    """
+    Kumulierte Soll-/Habensummen aller Konten für Buchungen vor einem Stichtag.
+
+    Wird beim Jahresabschluss (und optional monatlich) angelegt. Hauptbuch und
+    Bilanz starten vom nächstgelegenen gültigen Stand und summieren nur noch die
+    Buchungen danach. Rückwirkende Buchungen und Stornos vor dem Stichtag setzen
+    is_valid zurück, der Stand wird nach dem Commit neu berechnet.
+    """
+    KIND_CHOICES = [
+        ('YEAR', 'Jahresabschluss'),
+        ('MONTH', 'Monatsstand'),
+    ]
+
+    cutoff = models.DateTimeField(unique=True, verbose_name="Stichtag (exklusiv)")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='MONTH', verbose_name="Art")
+    business_year = models.ForeignKey(
+        BusinessYear, null=True, blank=True, on_delete=models.SET_NULL,
+        related_name='balance_snapshots', verbose_name="Geschäftsjahr"
+    )
+    is_valid = models.BooleanField(default=True, verbose_name="Gültig")
+    created_at = models.DateTimeField(auto_now_add=True)
+    rebuilt_at = models.DateTimeField(null=True, blank=True, verbose_name="Zuletzt berechnet")
+
+    class Meta:
+        verbose_name = "Saldenstand"
+        verbose_name_plural = "Saldenstände"
+        ordering = ['-cutoff']
+        indexes = [
+            models.Index(fields=['is_valid', 'cutoff'], name='balance_snapshot_valid_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} vor {self.cutoff:%d.%m.%Y}"
+
+
+class AccountBalanceSnapshot(models.Model):
+    """Soll- und Habensumme eines Kontos innerhalb eines Saldenstands"""
+    snapshot = models.ForeignKey(BalanceSnapshot, on_delete=models.CASCADE, related_name='lines')
+    account = models.ForeignKey(Account, on_delete=models.CASCADE, related_name='balance_snapshots')
+    debit_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"), verbose_name="Summe Soll")
+    credit_total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0.00"), verbose_name="Summe Haben")
+
+    class Meta:
+        verbose_name = "Kontenstand"
+        verbose_name_plural = "Kontenstände"
+        constraints = [
+            models.UniqueConstraint(fields=['snapshot', 'account'], name='account_snapshot_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.account.kontonummer}: Soll {self.debit_total} / Haben {self.credit_total}"
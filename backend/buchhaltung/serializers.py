@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Booking, SubTransaction, Account, MemberAccount, BusinessYear, YearClosingStep, ClosingAdjustment
+from .utils import generate_booking_number
 from decimal import Decimal
 from django.db import transaction
 from django.utils.timezone import make_aware
@@ -92,29 +93,8 @@ class BookingSerializer(serializers.ModelSerializer):
         if validated_data.get('datum') and validated_data['datum'].tzinfo is None:
             validated_data['datum'] = make_aware(validated_data['datum'])
 
-        # Automatische Buchungsnummer
-        today_str = validated_data['datum'].strftime("%Y%m%d")
-        last = Booking.objects.filter(buchungsnummer__startswith=today_str).order_by('-buchungsnummer').first()
-        
-        if last and '-' in last.buchungsnummer:
-            # Extrahiere den numerischen Teil und ignoriere das "S" für Storno-Buchungen
-            parts = last.buchungsnummer.split('-')
-            if len(parts) > 1:
-                # Entferne alle nicht-numerischen Zeichen (wie 'S')
-                numeric_part = ''.join(c for c in parts[1] if c.isdigit())
-                
-                try:
-                    last_number = int(numeric_part)
-                    next_number = f"{last_number + 1:03d}"
-                except ValueError:
-                    # Falls aus irgendeinem Grund keine Zahl extrahiert werden kann
-                    next_number = "001"
-            else:
-                next_number = "001"
-        else:
-            next_number = "001"
-        
-        validated_data['buchungsnummer'] = f"{today_str}-{next_number}"
+        # Automatische Buchungsnummer (fortlaufend je Buchungstag)
+        validated_data['buchungsnummer'] = generate_booking_number(day=validated_data['datum'].date())
 
         with transaction.atomic():
             booking = Booking.objects.create(**validated_data)
@@ -168,6 +148,8 @@ class BookingSummarySerializer(serializers.Serializer):
     total_expense = serializers.DecimalField(max_digits=10, decimal_places=2)
     balance = serializers.DecimalField(max_digits=10, decimal_places=2)
     monthly_data = serializers.ListField()
+    by_type = serializers.DictField(child=serializers.DecimalField(max_digits=12, decimal_places=2))
+    period = serializers.DictField()
 
 class YearClosingStepSerializer(serializers.ModelSerializer):
     step_display = serializers.CharField(source='get_step_display', read_only=True)
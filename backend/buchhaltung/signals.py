@@ -0,0 +1,63 @@
+# backend/buchhaltung/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import snapshots
+from .dashboard import invalidate_dashboard
+from .models import Booking, SubTransaction
+
+
+# --- Saldenstände: rückwirkende Änderungen machen Stände ungültig ---------
+
+def _booking_datum(booking_id):
+    return Booking.objects.filter(pk=booking_id).values_list('datum', flat=True).first()
+
+
+@receiver(post_save, sender=SubTransaction)
+def subtransaction_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    snapshots.invalidate_from(_booking_datum(instance.booking_id))
+
+
+@receiver(post_delete, sender=SubTransaction)
+def subtransaction_deleted(sender, instance, **kwargs):
+    # Beim Löschen einer Buchung ist der Stand bereits über pre_delete invalidiert
+    snapshots.invalidate_from(_booking_datum(instance.booking_id))
+
+
+@receiver(pre_save, sender=Booking)
+def booking_pre_save(sender, instance, raw=False, **kwargs):
+    # Vorherigen Zustand merken: Datum, Storno-Kennzeichen
+    instance._snapshot_previous = None
+    if instance.pk and not raw:
+        instance._snapshot_previous = Booking.objects.filter(pk=instance.pk).values_list(
+            'datum', 'storniert_am', 'is_storno'
+        ).first()
+
+
+@receiver(post_save, sender=Booking)
+def booking_saved(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_snapshot_previous', None)
+    if created or raw or not previous:
+        return
+    if previous != (instance.datum, instance.storniert_am, instance.is_storno):
+        # Stornierung oder Umdatierung ändert alle Stände ab dem früheren Datum
+        snapshots.invalidate_from(min(previous[0], instance.datum))
+
+
+@receiver(pre_delete, sender=Booking)
+def booking_deleted(sender, instance, **kwargs):
+    snapshots.invalidate_from(instance.datum)
+
+
+# --- Dashboard-Cache -------------------------------------------------------
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+@receiver(post_save, sender=SubTransaction)
+@receiver(post_delete, sender=SubTransaction)
+def booking_data_changed(sender, **kwargs):
+    # Erst nach dem Commit, sonst könnte ein paralleler Request den alten Stand neu cachen
+    transaction.on_commit(invalidate_dashboard)
@@ -0,0 +1,116 @@
+# backend/buchhaltung/snapshots.py
+"""
+Saldenstände (BalanceSnapshot) für schnelle Anfangsbestände.
+
+Beim Jahresabschluss über BusinessYearViewSet.complete_closing wird ein Stand
+zum Ende des Geschäftsjahres gespeichert, Monatsstände legt der
+Management-Command build_balance_snapshots an. Buchungen, Änderungen und
+Stornos, die vor einem Stichtag liegen, machen die betroffenen Stände ungültig
+(signals.py); nach dem Commit werden sie neu berechnet.
+"""
+import datetime
+
+from django.db import transaction
+from django.utils import timezone
+
+from .ledger import active_subtransactions, day_start, grouped_totals
+from .models import AccountBalanceSnapshot, BalanceSnapshot
+
+
+def year_cutoff(business_year):
+    """Stichtag für ein Geschäftsjahr: Beginn des Tages nach dem Jahresende."""
+    return day_start(business_year.end_date + datetime.timedelta(days=1))
+
+
+def month_cutoffs(since, until=None):
+    """Monatsanfänge (als Stichtage) von since bis einschließlich des laufenden Monats."""
+    until = until or timezone.localdate()
+    day = since.replace(day=1)
+    if day < since:
+        day = (day + datetime.timedelta(days=32)).replace(day=1)
+    cutoffs = []
+    while day <= until:
+        cutoffs.append(day_start(day))
+        day = (day + datetime.timedelta(days=32)).replace(day=1)
+    return cutoffs
+
+
+def _write_lines(snapshot):
+    """Berechnet die Kontensummen eines Stands aus allen Buchungen vor dem Stichtag."""
+    totals = grouped_totals(active_subtransactions().filter(booking__datum__lt=snapshot.cutoff))
+    with transaction.atomic():
+        AccountBalanceSnapshot.objects.filter(snapshot=snapshot).delete()
+        AccountBalanceSnapshot.objects.bulk_create([
+            AccountBalanceSnapshot(
+                snapshot=snapshot, account_id=account_id,
+                debit_total=debit, credit_total=credit
+            )
+            for account_id, (debit, credit) in totals.items()
+        ], batch_size=500)
+        snapshot.is_valid = True
+        snapshot.rebuilt_at = timezone.now()
+        snapshot.save(update_fields=['is_valid', 'rebuilt_at'])
+    return snapshot
+
+
+def create_snapshot(cutoff, kind='MONTH', business_year=None):
+    """
+    Legt einen Saldenstand an (oder berechnet einen bestehenden neu).
+    Ein Monatsstand am selben Stichtag wird dabei zum Jahresabschluss-Stand.
+    """
+    with transaction.atomic():
+        snapshot, created = BalanceSnapshot.objects.select_for_update().get_or_create(
+            cutoff=cutoff,
+            defaults={'kind': kind, 'business_year': business_year}
+        )
+        if not created and kind == 'YEAR':
+            snapshot.kind = 'YEAR'
+            snapshot.business_year = business_year
+            snapshot.save(update_fields=['kind', 'business_year'])
+        return _write_lines(snapshot)
+
+
+def snapshot_business_year(business_year):
+    """Saldenstand zum Jahresabschluss (BusinessYearViewSet.complete_closing)."""
+    return create_snapshot(year_cutoff(business_year), kind='YEAR', business_year=business_year)
+
+
+def invalidate_from(datum):
+    """
+    Markiert alle Stände, deren Stichtag nach datum liegt, als ungültig und plant
+    die Neuberechnung nach dem Commit ein. Gibt die Anzahl der Stände zurück.
+    """
+    if datum is None:
+        return 0
+    invalidated = BalanceSnapshot.objects.filter(cutoff__gt=datum, is_valid=True).update(is_valid=False)
+    if invalidated:
+        print(f"♻️ {invalidated} Saldenstände ab {datum:%d.%m.%Y} ungültig - werden neu berechnet")
+        transaction.on_commit(rebuild_invalid)
+    return invalidated
+
+
+def rebuild_invalid():
+    """Berechnet alle ungültigen Saldenstände neu."""
+    rebuilt = 0
+    for snapshot in BalanceSnapshot.objects.filter(is_valid=False).order_by('cutoff'):
+        _write_lines(snapshot)
+        rebuilt += 1
+    return rebuilt
+
+
+def find_differences():
+    """
+    Vergleicht alle gültigen Stände mit einer Neuberechnung aus den Buchungen.
+    Liefert je Abweichung (Stand, Konto, gespeichert, erwartet).
+    """
+    differences = []
+    for snapshot in BalanceSnapshot.objects.filter(is_valid=True).order_by('cutoff'):
+        expected = grouped_totals(active_subtransactions().filter(booking__datum__lt=snapshot.cutoff))
+        stored = {
+            account_id: (debit, credit)
+            for account_id, debit, credit in snapshot.lines.values_list('account_id', 'debit_total', 'credit_total')
+        }
+        for account_id in set(expected) | set(stored):
+            if expected.get(account_id) != stored.get(account_id):
+                differences.append((snapshot, account_id, stored.get(account_id), expected.get(account_id)))
+    return differences
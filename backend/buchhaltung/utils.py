@@ -1,22 +1,33 @@
 from decimal import Decimal
 from django.utils.timezone import now
-from django.db.models import Max
+from options.sequences import highest_suffix, reserve
 from .models import Booking  # Sicherstellen, dass Booking importiert ist
 
 # -----------------------------------------------------------------------------
 # View zur Erstellung vom Buchungs Nummern
 # -----------------------------------------------------------------------------
 
-def generate_booking_number(is_multiple=False):
-    today_str = now().strftime("%Y%m%d")
-    last_booking = Booking.objects.filter(buchungsnummer__startswith=today_str).aggregate(Max("buchungsnummer"))
+def reserve_booking_numbers(count=1, day=None):
+    """
+    Reserviert count fortlaufende Buchungsnummern "JJJJMMTT-NNN" für den Tag
+    (Standard: heute) über den zentralen Nummernkreis.
+    """
+    day = day or now().date()
+    day_str = day.strftime("%Y%m%d")
 
-    if last_booking["buchungsnummer__max"]:
-        last_number = int(last_booking["buchungsnummer__max"].split("-")[1])
-    else:
-        last_number = 0
+    def existing():
+        # Höchste bereits vergebene Tagesnummer (Storno- und Mehrfach-Suffixe ignorieren)
+        return highest_suffix(
+            Booking.objects.filter(buchungsnummer__startswith=f"{day_str}-").values_list("buchungsnummer", flat=True),
+            f"{day_str}-"
+        )
 
-    buchungsnummer = f"{today_str}-{last_number + 1:03d}"
+    values = reserve("buchhaltung.booking", count, day=day, initial=existing)
+    return [f"{day_str}-{value:03d}" for value in values]
+
+
+def generate_booking_number(is_multiple=False, day=None):
+    buchungsnummer = reserve_booking_numbers(day=day)[0]
 
     # Falls es eine Mehrfachbuchung ist, hänge "-M" an
     if is_multiple:
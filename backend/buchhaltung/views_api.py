@@ -12,13 +12,14 @@ from .serializers import (
     AccountSerializer
 )
 from .models import Account, Booking, SubTransaction, Member
-from .utils import STANDARD_KONTORAHMEN
+from .utils import STANDARD_KONTORAHMEN, generate_booking_number
+from .ledger import LedgerEngine
+from .snapshots import snapshot_business_year
 from django.utils.timezone import now
 from decimal import Decimal
 from django.db import transaction
 from django.utils import timezone
 from django.utils.dateparse import parse_date
-from django.db.models import Sum
 import datetime
 
 # 🔁 1. ViewSet für Buchungen mit Delete-Rollback
@@ -75,26 +76,7 @@ class BookingViewSet(viewsets.ModelViewSet):
 
             with transaction.atomic():
                 # Neue fortlaufende Buchungsnummer für Storno erzeugen
-                today_str = timezone.now().strftime("%Y%m%d")
-                last = Booking.objects.filter(buchungsnummer__startswith=today_str).order_by('-buchungsnummer').first()
-                
-                if last and '-' in last.buchungsnummer:
-                    try:
-                        # Extrahiere den numerischen Teil und ignoriere das "S" für Storno-Buchungen
-                        parts = last.buchungsnummer.split('-')
-                        if len(parts) > 1:
-                            # Entferne alle nicht-numerischen Zeichen
-                            numeric_part = ''.join(c for c in parts[1] if c.isdigit())
-                            last_number = int(numeric_part)
-                            next_number = f"{last_number + 1:03d}"
-                        else:
-                            next_number = "001"
-                    except (ValueError, IndexError):
-                        next_number = "001"
-                else:
-                    next_number = "001"
-                
-                storno_nr = f"{today_str}-{next_number}"
+                storno_nr = generate_booking_number()
                 
                 storno_booking = Booking.objects.create(
                     buchungsnummer=storno_nr,
@@ -105,7 +87,6 @@ class BookingViewSet(viewsets.ModelViewSet):
                     mitglied=original.mitglied,
                     mitgliedsname=original.mitgliedsname,
                     kontostand_snapshot=original.kontostand_snapshot,
-                    foerderkredit_stand=original.foerderkredit_stand,
                     original_buchung=original  # Link zur Original-Buchung setzen
                 )
 
@@ -231,7 +212,22 @@ class AccountImportAPIView(APIView):
 # 📊 6. Dashboard-Daten
 class BookingDashboardAPIView(APIView):
     def get(self, request):
-        summary = get_dashboard_summary()
+        # Optionaler Zeitraum: ?year=2025 oder ?business_year=<id>
+        year = request.query_params.get('year')
+        business_year_id = request.query_params.get('business_year')
+        business_year = None
+        
+        if year:
+            try:
+                year = int(year)
+            except ValueError:
+                return Response({'error': 'Ungültiges Jahr'}, status=status.HTTP_400_BAD_REQUEST)
+        if business_year_id:
+            business_year = BusinessYear.objects.filter(pk=business_year_id).first() if business_year_id.isdigit() else None
+            if business_year is None:
+                return Response({'error': 'Geschäftsjahr nicht gefunden'}, status=status.HTTP_404_NOT_FOUND)
+        
+        summary = get_dashboard_summary(year=year, business_year=business_year)
         return Response(BookingSummarySerializer(summary).data)
 
 
@@ -268,118 +264,8 @@ class MainBookAPIView(APIView):
             # String zu Date-Objekt konvertieren
             end_date = parse_date(end_date_param)
         
-        # DateTime-Objekte mit Zeitzone für Vergleiche erstellen
-        start_datetime = timezone.make_aware(
-            datetime.datetime.combine(start_date, datetime.time.min)
-        )
-        end_datetime = timezone.make_aware(
-            datetime.datetime.combine(end_date, datetime.time.max)
-        )
-        
-        # Alle Konten holen
-        accounts = Account.objects.all().order_by('kontonummer')
-        
-        # Ergebnis vorbereiten
-        result = []
-        
-        for account in accounts:
-            # SCHRITT 1: Anfangsbestand berechnen - alle Buchungen VOR dem Startdatum
-            opening_debits = SubTransaction.objects.filter(
-                soll_konto=account,
-                booking__datum__lt=start_datetime,
-                booking__storniert_am__isnull=True,  # Nicht stornierte Buchungen
-                booking__is_storno=False              # Keine Storno-Buchungen
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            opening_credits = SubTransaction.objects.filter(
-                haben_konto=account, 
-                booking__datum__lt=start_datetime,
-                booking__storniert_am__isnull=True,  # Nicht stornierte Buchungen
-                booking__is_storno=False              # Keine Storno-Buchungen
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            # Anfangsbestand je nach Kontotyp berechnen
-            if account.konto_typ in ['AKTIV', 'AUFWAND']:
-                opening_balance = opening_debits - opening_credits
-            else:
-                opening_balance = opening_credits - opening_debits
-                
-            # SCHRITT 2: Alle relevanten Buchungen im Zeitraum
-            transactions = []
-            
-            # SOLL-Buchungen im Zeitraum
-            debit_txs = SubTransaction.objects.filter(
-                soll_konto=account,
-                booking__datum__gte=start_datetime,
-                booking__datum__lte=end_datetime,
-                booking__storniert_am__isnull=True,  # Nicht stornierte Buchungen
-                booking__is_storno=False              # Keine Storno-Buchungen
-            ).select_related('booking', 'haben_konto')
-            
-            for tx in debit_txs:
-                transactions.append({
-                    'date': tx.booking.datum,
-                    'booking_no': tx.booking.buchungsnummer,
-                    'description': tx.booking.verwendungszweck,
-                    'debit': tx.betrag,
-                    'credit': 0,
-                    'counter_account': tx.haben_konto.kontonummer,
-                    'is_storno': tx.booking.is_storno,
-                    'is_storniert': tx.booking.storniert_am is not None
-                })
-                
-            # HABEN-Buchungen im Zeitraum
-            credit_txs = SubTransaction.objects.filter(
-                haben_konto=account,
-                booking__datum__gte=start_datetime,
-                booking__datum__lte=end_datetime,
-                booking__storniert_am__isnull=True,  # Nicht stornierte Buchungen
-                booking__is_storno=False              # Keine Storno-Buchungen
-            ).select_related('booking', 'soll_konto')
-            
-            for tx in credit_txs:
-                transactions.append({
-                    'date': tx.booking.datum,
-                    'booking_no': tx.booking.buchungsnummer,
-                    'description': tx.booking.verwendungszweck,
-                    'debit': 0, 
-                    'credit': tx.betrag,
-                    'counter_account': tx.soll_konto.kontonummer,
-                    'is_storno': tx.booking.is_storno,
-                    'is_storniert': tx.booking.storniert_am is not None
-                })
-                
-            # Nach Datum sortieren
-            transactions.sort(key=lambda x: x['date'])
-            
-            # SCHRITT 3: Summen für den Zeitraum berechnen
-            period_debits = sum(float(tx['debit']) for tx in transactions)
-            period_credits = sum(float(tx['credit']) for tx in transactions)
-            
-            # SCHRITT 4: Endbestand berechnen
-            if account.konto_typ in ['AKTIV', 'AUFWAND']:
-                closing_balance = opening_balance + Decimal(str(period_debits - period_credits))
-            else:
-                closing_balance = opening_balance + Decimal(str(period_credits - period_debits))
-                
-            # SCHRITT 5: Ins Ergebnis einfügen
-            result.append({
-                'account': {
-                    'id': account.id,
-                    'number': account.kontonummer,
-                    'name': account.name,
-                    'type': account.konto_typ,
-                    'category': account.category
-                },
-                'opening_balance': opening_balance,
-                'transactions': transactions,
-                'period_debits': period_debits,
-                'period_credits': period_credits,
-                'turnover': period_debits + period_credits,  # Umsatz
-                'closing_balance': closing_balance
-            })
-            
-        return Response(result)
+        # Anfangsbestände, Buchungen und Endbestände aller Konten in konstant vielen Queries
+        return Response(LedgerEngine().main_book(start_date, end_date))
     
 class ProfitLossAPIView(APIView):
     def get(self, request):
@@ -406,17 +292,17 @@ class ProfitLossAPIView(APIView):
             datetime.datetime.combine(end_date, datetime.time.max)
         )
         
-        # Ertragskonten holen
-        income_accounts = Account.objects.filter(konto_typ='ERTRAG')
-        expense_accounts = Account.objects.filter(konto_typ='AUFWAND')
+        # Salden aller Ertrags- und Aufwandskonten mit einer Summenabfrage je Seite
+        engine = LedgerEngine(Account.objects.filter(konto_typ__in=['ERTRAG', 'AUFWAND']))
+        income, expenses, total_income, total_expenses = engine.profit_loss(start_datetime, end_datetime)
         
         result = {
             'period': {
                 'start': start_date,
                 'end': end_date,
             },
-            'income': [],
-            'expenses': [],
+            'income': income,
+            'expenses': expenses,
             'summary': {
                 'total_income': 0,
                 'total_expenses': 0,
@@ -424,58 +310,6 @@ class ProfitLossAPIView(APIView):
             }
         }
         
-        # Erträge berechnen
-        total_income = 0
-        for account in income_accounts:
-            # Salden für den Zeitraum berechnen - KORRIGIERT:
-            # 1. Nur Buchungen, die NICHT storniert wurden
-            # 2. Storno-Buchungen werden berücksichtigt, um die ursprünglichen zu neutralisieren
-            
-            # Normale Buchungen (nicht storniert)
-            debit_sum = SubTransaction.objects.filter(
-                soll_konto=account,
-                booking__datum__gte=start_datetime,
-                booking__datum__lte=end_datetime,
-                booking__storniert_am__isnull=True,  # Nicht storniert
-                booking__is_storno=False  # Keine Storno-Buchungen
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            credit_sum = SubTransaction.objects.filter(
-                haben_konto=account,
-                booking__datum__gte=start_datetime,
-                booking__datum__lte=end_datetime,
-                booking__storniert_am__isnull=True,  # Nicht storniert
-                booking__is_storno=False  # Keine Storno-Buchungen
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            # Bei Ertragskonten ist der Saldo: Haben - Soll
-            balance = credit_sum - debit_sum
-            total_income += balance
-        
-        # Aufwendungen berechnen
-        total_expenses = 0
-        for account in expense_accounts:
-            # Gleiche Filterlogik wie oben
-            debit_sum = SubTransaction.objects.filter(
-                soll_konto=account,
-                booking__datum__gte=start_datetime,
-                booking__datum__lte=end_datetime,
-                booking__storniert_am__isnull=True,  # Nicht storniert
-                booking__is_storno=False  # Keine Storno-Buchungen
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            credit_sum = SubTransaction.objects.filter(
-                haben_konto=account,
-                booking__datum__gte=start_datetime,
-                booking__datum__lte=end_datetime,
-                booking__storniert_am__isnull=True,  # Nicht storniert
-                booking__is_storno=False  # Keine Storno-Buchungen
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            # Bei Aufwandskonten ist der Saldo: Soll - Haben
-            balance = debit_sum - credit_sum
-            total_expenses += balance
-        
         # Nach Kategorien gruppieren
         result['income'] = self._group_by_category(result['income'])
         result['expenses'] = self._group_by_category(result['expenses'])
@@ -520,19 +354,13 @@ class BalanceSheetAPIView(APIView):
         else:
             balance_date = parse_date(balance_date_param)
         
-        # DateTime-Objekt mit Zeitzone für Vergleiche erstellen
-        balance_datetime = timezone.make_aware(
-            datetime.datetime.combine(balance_date, datetime.time.max)
-        )
-        
-        # Konten nach Typen holen
-        aktiva_accounts = Account.objects.filter(konto_typ='AKTIV').order_by('kontonummer')
-        passiva_accounts = Account.objects.filter(konto_typ='PASSIV').order_by('kontonummer')
+        # Alle Salden zum Stichtag aus einer Summenabfrage je Seite
+        assets, liabilities, profit_loss = LedgerEngine().balance_sheet(balance_date)
         
         result = {
             'balance_date': balance_date,
-            'assets': self._get_account_balances(aktiva_accounts, balance_datetime),
-            'liabilities': self._get_account_balances(passiva_accounts, balance_datetime),
+            'assets': assets,
+            'liabilities': liabilities,
             'summary': {
                 'total_assets': 0,
                 'total_liabilities': 0,
@@ -544,50 +372,6 @@ class BalanceSheetAPIView(APIView):
         total_assets = sum(account['balance'] for account in result['assets'])
         total_liabilities = sum(account['balance'] for account in result['liabilities'])
         
-        # GuV-Ergebnis berechnen (Jahresüberschuss/-fehlbetrag)
-        income_accounts = Account.objects.filter(konto_typ='ERTRAG')
-        expense_accounts = Account.objects.filter(konto_typ='AUFWAND')
-        
-        # Erträge und Aufwendungen berechnen (nur für nicht stornierte Buchungen)
-        income_total = 0
-        for account in income_accounts:
-            debit_sum = SubTransaction.objects.filter(
-                soll_konto=account,
-                booking__datum__lte=balance_datetime,
-                booking__storniert_am__isnull=True,
-                booking__is_storno=False
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            credit_sum = SubTransaction.objects.filter(
-                haben_konto=account,
-                booking__datum__lte=balance_datetime,
-                booking__storniert_am__isnull=True,
-                booking__is_storno=False
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            income_total += credit_sum - debit_sum
-        
-        expense_total = 0
-        for account in expense_accounts:
-            debit_sum = SubTransaction.objects.filter(
-                soll_konto=account,
-                booking__datum__lte=balance_datetime,
-                booking__storniert_am__isnull=True,
-                booking__is_storno=False
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            credit_sum = SubTransaction.objects.filter(
-                haben_konto=account,
-                booking__datum__lte=balance_datetime,
-                booking__storniert_am__isnull=True,
-                booking__is_storno=False
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            expense_total += debit_sum - credit_sum
-            
-        # GuV-Ergebnis
-        profit_loss = income_total - expense_total
-        
         # Das Ergebnis gehört zu den Passiva als Eigenkapital
         # (Jahresüberschuss bei Gewinn, Jahresfehlbetrag bei Verlust)
         if profit_loss != 0:
@@ -608,46 +392,6 @@ class BalanceSheetAPIView(APIView):
         
         return Response(result)
     
-    def _get_account_balances(self, accounts, balance_date):
-        """Konten mit Salden zum Stichtag berechnen"""
-        result = []
-        
-        for account in accounts:
-            # Buchungen bis zum Stichtag berücksichtigen, 
-            # aber nur aktive (nicht stornierte)
-            debit_sum = SubTransaction.objects.filter(
-                soll_konto=account,
-                booking__datum__lte=balance_date,
-                booking__storniert_am__isnull=True,
-                booking__is_storno=False
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            credit_sum = SubTransaction.objects.filter(
-                haben_konto=account,
-                booking__datum__lte=balance_date,
-                booking__storniert_am__isnull=True,
-                booking__is_storno=False
-            ).aggregate(Sum('betrag'))['betrag__sum'] or 0
-            
-            # Saldo berechnen je nach Kontotyp
-            if account.konto_typ == 'AKTIV':
-                balance = debit_sum - credit_sum
-            else:  # PASSIV
-                balance = credit_sum - debit_sum
-                
-            # Nur Konten mit Saldo ≠ 0 anzeigen
-            if balance != 0:
-                result.append({
-                    'id': account.id,
-                    'number': account.kontonummer,
-                    'name': account.name,
-                    'category': account.category or 'Sonstiges',
-                    'balance': balance
-                })
-                
-        # Nach Kategorie gruppieren
-        return sorted(result, key=lambda x: x['category'] + x['number'])
-    
 # Zusätzliche Imports hinzufügen
 from .models import BusinessYear, YearClosingStep, ClosingAdjustment
 from .serializers import (
@@ -720,11 +464,15 @@ class BusinessYearViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Geschäftsjahr als abgeschlossen markieren
-        business_year.status = 'CLOSED'
-        business_year.closed_at = timezone.now()
-        business_year.closing_notes = closing_notes
-        business_year.save()
+        with transaction.atomic():
+            # Geschäftsjahr als abgeschlossen markieren
+            business_year.status = 'CLOSED'
+            business_year.closed_at = timezone.now()
+            business_year.closing_notes = closing_notes
+            business_year.save()
+            
+            # Saldenstand zum Jahresende - Anfangsbestände späterer Berichte starten hier
+            snapshot_business_year(business_year)
         
         # TODO: Hier könnte man den Jahresabschluss-Bericht generieren
         
@@ -111,6 +111,12 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Schreibsperre schon beim Start einer Transaktion - parallele Ausgaben
+            # warten aufeinander statt mit "database is locked" abzubrechen
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     },
     'joomla': {
         'ENGINE': os.getenv('JOOMLA_DB_ENGINE', 'django.db.backends.mysql'),
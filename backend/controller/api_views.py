@@ -4,12 +4,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.utils import timezone
 from django.db import transaction
+from django.utils.dateparse import parse_datetime
 from rooms.models import Room
 from .models import (
     ControlUnit, ControlSchedule, ControlParameter,
-    ControlStatus, ControlCommand, PLCConfiguration
+    ControlStatus, ControlCommand, PLCConfiguration, ControlMeasurement,
+    ControlScheduleImage
 )
 from .serializers import (
     ControlUnitSerializer, ControlUnitDetailSerializer,
@@ -18,7 +19,9 @@ from .serializers import (
     RoomControlOverviewSerializer, SendCommandSerializer,
     PLCConfigSerializer, LEDControlSerializer
 )
-from .plc_interface import get_plc_interface
+from .command_queue import command_status, enqueue_command, queue_status, retry_command
+from .schedule_compiler import compile_schedules, upload_schedule
+from .status_poller import latest_sample_at, poll_once, poller_metrics
 
 
 class ControlUnitViewSet(viewsets.ModelViewSet):
@@ -40,79 +43,29 @@ class ControlUnitViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def toggle_led(self, request, pk=None):
-        """LED Start/Stopp umschalten"""
+        """LED Start/Stopp umschalten (über die Befehlswarteschlange)"""
         control_unit = self.get_object()
         serializer = LEDControlSerializer(data=request.data)
         
         if serializer.is_valid():
             new_status = serializer.validated_data['status']
             
-            # Command erstellen
-            command = ControlCommand.objects.create(
-                control_unit=control_unit,
-                command_type='set_led',
-                payload={'status': new_status}
-            )
+            # Ersetzt noch nicht gesendete LED-Befehle - nur der letzte Zustand zählt
+            command = enqueue_command(control_unit, 'set_led', {'status': new_status})
             
-            # An SPS senden
-            try:
-                plc = get_plc_interface(control_unit)
-                success = plc.set_led_status(new_status)
-                
-                if success:
-                    # Status aktualisieren oder erstellen
-                    status_obj, created = ControlStatus.objects.get_or_create(
-                        control_unit=control_unit,
-                        defaults={
-                            'led_status': new_status,
-                            'output_q0_status': new_status,
-                            'is_online': True
-                        }
-                    )
-                    
-                    if not created:
-                        status_obj.led_status = new_status
-                        status_obj.output_q0_status = new_status  # Q0 ist mit LED verknüpft
-                        status_obj.is_online = True
-                        status_obj.save()
-                    
-                    command.status = 'confirmed'
-                    command.confirmed_at = timezone.now()
-                    
-                    # Control Unit neu laden für aktuelle Daten
-                    control_unit.refresh_from_db()
-                    
-                    # Vollständige Unit-Daten zurückgeben
-                    unit_data = ControlUnitSerializer(control_unit).data
-                    
-                else:
-                    command.status = 'failed'
-                    command.error_message = 'SPS hat den Befehl nicht akzeptiert'
-                
-                command.save()
-                
-                return Response({
-                    'success': success,
-                    'led_status': new_status,
-                    'command_id': str(command.id),
-                    'unit': unit_data  # Vollständige Unit-Daten inkl. current_status
-                }, status=status.HTTP_200_OK if success else status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
-            except Exception as e:
-                command.status = 'failed'
-                command.error_message = str(e)
-                command.save()
-                
-                return Response({
-                    'success': False,
-                    'error': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            return Response({
+                'success': True,
+                'queued': True,
+                'led_status': new_status,
+                'command_id': str(command.id),
+                'command': command_status(command)
+            }, status=status.HTTP_202_ACCEPTED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=True, methods=['post'])
     def save_to_plc(self, request, pk=None):
-        """Speichert die aktuelle Konfiguration in der SPS"""
+        """Speichert die aktuelle Konfiguration in der SPS (über die Befehlswarteschlange)"""
         control_unit = self.get_object()
         
         # Prüfung ob alle notwendigen Daten vorhanden sind
@@ -133,85 +86,115 @@ class ControlUnitViewSet(viewsets.ModelViewSet):
         for param in control_unit.parameters.all():
             config_data['parameters'][param.key] = param.get_typed_value()
         
-        # Command erstellen
-        command = ControlCommand.objects.create(
-            control_unit=control_unit,
-            command_type='save_config',
-            payload=config_data
-        )
+        command = enqueue_command(control_unit, 'save_config', config_data)
         
-        try:
-            plc = get_plc_interface(control_unit)
-            
-            # Zuerst authentifizieren
-            plc.ensure_authenticated()
-            
-            # Konfiguration speichern
-            success = plc.send_command(command)
-            
-            if success:
-                control_unit.last_sync = timezone.now()
-                control_unit.save(update_fields=['last_sync'])
-                
-                return Response({
-                    'success': True,
-                    'message': 'Konfiguration erfolgreich in SPS gespeichert',
-                    'last_sync': control_unit.last_sync
-                })
-            else:
-                return Response({
-                    'success': False,
-                    'error': 'Fehler beim Speichern in der SPS'
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-                
-        except Exception as e:
-            command.status = 'failed'
-            command.error_message = str(e)
-            command.save()
-            
+        return Response({
+            'success': True,
+            'queued': True,
+            'message': 'Konfiguration zur Übertragung an die SPS eingereiht',
+            'command_id': str(command.id),
+            'command': command_status(command)
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'])
+    def schedule_program(self, request, pk=None):
+        """
+        Vorschau des Wochenprogramms: kompilierte Tabelle und die Variablen,
+        die ein Upload gegenüber dem zuletzt geladenen Stand schreiben würde
+        """
+        control_unit = self.get_object()
+        report = upload_schedule(control_unit, dry_run=True)
+        image = ControlScheduleImage.objects.filter(control_unit=control_unit).first()
+        report['last_upload'] = {
+            'version': image.version if image else None,
+            'uploaded_at': image.uploaded_at if image else None,
+        }
+        return Response(report)
+    
+    @action(detail=True, methods=['post'])
+    def upload_schedule(self, request, pk=None):
+        """Lädt das Wochenprogramm in die SPS (?dry_run=1: nur simulieren)"""
+        control_unit = self.get_object()
+        
+        if request.query_params.get('dry_run') in ('1', 'true'):
+            return Response(upload_schedule(control_unit, dry_run=True))
+        
+        if not control_unit.plc_address:
             return Response({
-                'success': False,
-                'error': str(e)
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+                'error': 'Keine SPS-Adresse konfiguriert'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        compiled = compile_schedules(control_unit.schedules.all())
+        if not compiled.valid:
+            return Response({
+                'error': 'Zeitpläne widersprechen sich',
+                'errors': compiled.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        command = enqueue_command(control_unit, 'upload_schedule', {'version': compiled.version})
+        
+        return Response({
+            'success': True,
+            'queued': True,
+            'message': 'Wochenprogramm zur Übertragung an die SPS eingereiht',
+            'command_id': str(command.id),
+            'command': command_status(command)
+        }, status=status.HTTP_202_ACCEPTED)
     
     @action(detail=True, methods=['get'])
     def sync_status(self, request, pk=None):
-        """Synchronisiert den Status mit der SPS"""
+        """
+        Fragt die SPS sofort ab (sonst übernimmt das der Status-Poller) und gibt
+        den Status zurück - geschrieben wird nur, was sich geändert hat
+        """
         control_unit = self.get_object()
         
         try:
-            plc = get_plc_interface(control_unit)
-            plc.ensure_authenticated()
-            
-            # LED/Output Status lesen
-            output_status = plc.get_output_q0_status()
-            
-            # Status aktualisieren
-            status_obj, created = ControlStatus.objects.get_or_create(
-                control_unit=control_unit
-            )
-            
-            if output_status is not None:
-                status_obj.led_status = output_status
-                status_obj.output_q0_status = output_status
-                status_obj.is_online = True
-                status_obj.error_message = None
-            else:
-                status_obj.is_online = False
-                status_obj.error_message = 'Keine Antwort von SPS'
-            
-            status_obj.save()
-            
-            return Response(ControlStatusSerializer(status_obj).data)
-            
+            # Messwert nur bei Änderung bzw. fälligem Heartbeat - wie im Poller
+            poll_once(control_unit.pk, last_sample_at=latest_sample_at(control_unit.pk))
         except Exception as e:
             return Response({
                 'error': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        
+        status_obj = ControlStatus.objects.get(control_unit=control_unit)
+        return Response(ControlStatusSerializer(status_obj).data)
+    
+    @action(detail=True, methods=['get'])
+    def measurements(self, request, pk=None):
+        """Messwert-Zeitreihe der Einheit (?since=ISO-Zeitpunkt, ?limit=, Standard 500)"""
+        control_unit = self.get_object()
+        queryset = ControlMeasurement.objects.filter(control_unit=control_unit)
+        
+        since = request.query_params.get('since')
+        if since:
+            since_dt = parse_datetime(since)
+            if since_dt is None:
+                return Response(
+                    {'error': 'Ungültiger Zeitpunkt für since'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(recorded_at__gt=since_dt)
+        
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 500)), 5000))
+        except ValueError:
+            limit = 500
+        
+        # Neueste zuerst laden, chronologisch ausgeben
+        rows = list(queryset.order_by('-recorded_at').values_list(
+            'recorded_at', 'current_value', 'secondary_value', 'output_q0'
+        )[:limit])
+        rows.reverse()
+        return Response({
+            'control_unit': str(control_unit.id),
+            'fields': ['recorded_at', 'current_value', 'secondary_value', 'output_q0'],
+            'rows': rows,
+        })
     
     @action(detail=True, methods=['post'])
     def send_to_plc(self, request, pk=None):
-        """Sendet die aktuelle Konfiguration an die SPS"""
+        """Reiht einen Befehl mit der aktuellen Konfiguration für die SPS ein"""
         control_unit = self.get_object()
         serializer = SendCommandSerializer(data=request.data)
         
@@ -227,38 +210,15 @@ class ControlUnitViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Command erstellen
-            command = ControlCommand.objects.create(
-                control_unit=control_unit,
-                command_type=command_type,
-                payload={
-                    'unit_config': ControlUnitSerializer(control_unit).data,
-                    'parameters': parameters
-                }
-            )
+            command = enqueue_command(control_unit, command_type, {
+                'unit_config': ControlUnitSerializer(control_unit).data,
+                'parameters': parameters
+            })
             
-            # An SPS senden
-            try:
-                plc = get_plc_interface(control_unit)
-                result = plc.send_command(command)
-                
-                command.status = 'sent' if result else 'failed'
-                command.sent_at = timezone.now()
-                command.save()
-                
-                return Response(
-                    ControlCommandSerializer(command).data,
-                    status=status.HTTP_201_CREATED
-                )
-            except Exception as e:
-                command.status = 'failed'
-                command.error_message = str(e)
-                command.save()
-                
-                return Response(
-                    {'error': str(e)},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR
-                )
+            return Response(
+                ControlCommandSerializer(command).data,
+                status=status.HTTP_202_ACCEPTED
+            )
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -306,7 +266,11 @@ class ControlScheduleViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def bulk_update(self, request):
-        """Aktualisiert mehrere Zeitpläne gleichzeitig"""
+        """
+        Gleicht die Zeitpläne einer Einheit mit der übergebenen Liste ab
+        (Schlüssel: Wochentag + Beginn) - nur geänderte Zeilen werden geschrieben.
+        Widersprechen sich die Zeitpläne, wird nichts gespeichert.
+        """
         control_unit_id = request.data.get('control_unit_id')
         schedules_data = request.data.get('schedules', [])
         
@@ -324,28 +288,61 @@ class ControlScheduleViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         
+        serializer = ControlScheduleSerializer(data=schedules_data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        fields = ['end_time', 'target_value', 'secondary_value', 'parameters', 'is_active']
+        defaults = {name: ControlSchedule._meta.get_field(name).get_default() for name in fields}
+        
         with transaction.atomic():
-            # Alte Zeitpläne löschen
-            control_unit.schedules.all().delete()
+            existing = {
+                (schedule.weekday, schedule.start_time): schedule
+                for schedule in control_unit.schedules.select_for_update()
+            }
+            seen = set()
+            to_create = []
+            to_update = []
             
-            # Neue erstellen
-            created_schedules = []
-            for schedule_data in schedules_data:
-                schedule_data['control_unit'] = control_unit.id
-                serializer = ControlScheduleSerializer(data=schedule_data)
-                
-                if serializer.is_valid():
-                    schedule = serializer.save()
-                    created_schedules.append(schedule)
-                else:
-                    transaction.set_rollback(True)
+            for data in serializer.validated_data:
+                key = (data['weekday'], data['start_time'])
+                if key in seen:
                     return Response(
-                        serializer.errors,
+                        {'error': f"Zeitplan doppelt: {ControlSchedule.WEEKDAY_CHOICES[key[0]][1]} {key[1]:%H:%M}"},
                         status=status.HTTP_400_BAD_REQUEST
                     )
+                seen.add(key)
+                values = {name: data.get(name, defaults[name]) for name in fields}
+                
+                schedule = existing.get(key)
+                if schedule is None:
+                    to_create.append(ControlSchedule(
+                        control_unit=control_unit, weekday=key[0], start_time=key[1], **values
+                    ))
+                elif any(getattr(schedule, name) != value for name, value in values.items()):
+                    for name, value in values.items():
+                        setattr(schedule, name, value)
+                    to_update.append(schedule)
+            
+            removed = [schedule.pk for key, schedule in existing.items() if key not in seen]
+            if removed:
+                ControlSchedule.objects.filter(pk__in=removed).delete()
+            if to_update:
+                ControlSchedule.objects.bulk_update(to_update, fields)
+            if to_create:
+                ControlSchedule.objects.bulk_create(to_create)
+            
+            schedules = list(control_unit.schedules.all())
+            compiled = compile_schedules(schedules)
+            if not compiled.valid:
+                transaction.set_rollback(True)
+                return Response({
+                    'error': 'Zeitpläne widersprechen sich',
+                    'errors': compiled.errors
+                }, status=status.HTTP_400_BAD_REQUEST)
             
             return Response(
-                ControlScheduleSerializer(created_schedules, many=True).data,
+                ControlScheduleSerializer(schedules, many=True).data,
                 status=status.HTTP_201_CREATED
             )
 
@@ -397,6 +394,11 @@ class ControlStatusViewSet(viewsets.ReadOnlyModelViewSet):
         }
         
         return Response(overview)
+    
+    @action(detail=False, methods=['get'])
+    def poller(self, request):
+        """Aktualität und Verzögerung des Status-Pollers je Steuerungseinheit"""
+        return Response(poller_metrics())
 
 
 class ControlCommandViewSet(viewsets.ReadOnlyModelViewSet):
@@ -417,6 +419,28 @@ class ControlCommandViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(status=status_filter)
         
         return queryset.order_by('-created_at')
+    
+    @action(detail=True, methods=['get'])
+    def status(self, request, pk=None):
+        """Stand eines Befehls in der Warteschlange (Polling der UI)"""
+        return Response(command_status(self.get_object()))
+    
+    @action(detail=True, methods=['post'])
+    def retry(self, request, pk=None):
+        """Plant einen fehlgeschlagenen Befehl erneut ein (als neuen Befehl)"""
+        command = self.get_object()
+        if command.status != 'failed':
+            return Response(
+                {'error': 'Nur fehlgeschlagene Befehle können wiederholt werden'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        new_command = retry_command(command)
+        return Response(command_status(new_command), status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=False, methods=['get'])
+    def queue(self, request):
+        """Übersicht über die Befehlswarteschlange (optional je Steuerungseinheit)"""
+        return Response(queue_status(request.query_params.get('control_unit')))
 
 
 class PLCConfigurationViewSet(viewsets.ModelViewSet):
@@ -1,8 +1,10 @@
 # backend/controller/apps.py
 
 from django.apps import AppConfig
+from django.conf import settings
 import atexit
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -17,4 +19,18 @@ class ControllerConfig(AppConfig):
         # Registriere Cleanup-Funktion für Server-Shutdown
         from .plc_interface import cleanup_keepalive_threads
         atexit.register(cleanup_keepalive_threads)
-        logger.info("Controller App bereit, Cleanup registriert")
\ No newline at end of file
+        logger.info("Controller App bereit, Cleanup registriert")
+        
+        # Hintergrund-Dienste nur im Webserver-Prozess
+        if os.environ.get('RUN_MAIN', None) != 'true':
+            return
+        
+        # Worker für die SPS-Befehlswarteschlange
+        if getattr(settings, 'PLC_COMMAND_WORKER', True):
+            from .command_queue import start_worker
+            start_worker()
+        
+        # Status-Poller (liest alle SPS zyklisch, schreibt nur Änderungen)
+        if getattr(settings, 'PLC_STATUS_POLLER', True):
+            from .status_poller import start_poller
+            start_poller()
\ No newline at end of file
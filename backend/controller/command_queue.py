@@ -0,0 +1,340 @@
+# backend/controller/command_queue.py
+"""
+Warteschlange für SPS-Befehle (ControlCommand).
+
+Die Views führen Befehle nicht mehr im Request aus, sondern reihen sie mit
+enqueue_command() ein und antworten sofort (202). Ein Hintergrund-Worker im
+Webserver-Prozess (bzw. der Management-Command process_plc_commands) arbeitet
+die Befehle je Steuerungseinheit streng in Reihenfolge ab - verschiedene
+Einheiten parallel, damit eine nicht erreichbare SPS die übrigen nicht aufhält.
+
+- Zusammenfassen: ein neuer Befehl ersetzt noch nicht begonnene Befehle
+  derselben Einheit, die er überschreibt (SUPERSEDES) - z.B. zählt beim
+  LED-Schalten nur der letzte Zustand. Ersetzte Befehle erhalten den Status
+  "superseded" und verweisen über superseded_by auf den neuen Befehl.
+- Wiederholen: schlägt ein Befehl fehl, bleibt er Kopf der Warteschlange und
+  wird mit exponentiellem Backoff erneut versucht, höchstens MAX_ATTEMPTS mal.
+  Danach "failed"; die folgenden Befehle der Einheit laufen weiter.
+- Erfolg: die SPS hat jeden Schreibzugriff bestätigt -> "confirmed".
+
+Die UI fragt den Stand über GET /controller/commands/<id>/status/ ab.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import ControlCommand, ControlStatus
+from .status_poller import mark_online
+
+MAX_ATTEMPTS = getattr(settings, 'PLC_COMMAND_MAX_ATTEMPTS', 5)
+BACKOFF_BASE_SECONDS = 2
+BACKOFF_MAX_SECONDS = 60
+# Befehle, die länger "in Bearbeitung" hängen (z.B. Absturz des Workers), werden neu eingeplant
+STALE_PROCESSING_SECONDS = 120
+WORKER_INTERVAL_SECONDS = getattr(settings, 'PLC_COMMAND_INTERVAL', 2)
+# Steuerungseinheiten, die gleichzeitig bedient werden
+WORKER_THREADS = getattr(settings, 'PLC_COMMAND_THREADS', 4)
+
+OPEN_STATUSES = ('pending', 'processing')
+FINAL_STATUSES = ('sent', 'confirmed', 'superseded', 'failed')
+
+# Befehlstyp -> ausstehende Befehlstypen, die er ersetzt. update_config kann
+# Teilmengen der Parameter enthalten und ersetzt deshalb nichts.
+SUPERSEDES = {
+    'set_led': ('set_led', 'set_output'),
+    'set_output': ('set_led', 'set_output'),
+    'save_config': ('save_config', 'update_config', 'upload_schedule'),
+    'upload_schedule': ('upload_schedule',),
+}
+
+
+# --- Einreihen -----------------------------------------------------------
+
+def enqueue_command(control_unit, command_type, payload):
+    """
+    Legt einen Befehl an und ersetzt dabei überholte, noch nicht begonnene
+    Befehle derselben Einheit. Der Worker startet nach dem Commit.
+    """
+    with transaction.atomic():
+        command = ControlCommand.objects.create(
+            control_unit=control_unit,
+            command_type=command_type,
+            payload=payload
+        )
+        superseded_types = SUPERSEDES.get(command_type)
+        if superseded_types:
+            ControlCommand.objects.filter(
+                control_unit=control_unit,
+                status='pending',
+                command_type__in=superseded_types
+            ).exclude(pk=command.pk).update(
+                status='superseded', superseded_by=command, updated_at=timezone.now()
+            )
+        transaction.on_commit(wake_worker)
+    return command
+
+
+def retry_command(command):
+    """Plant einen fehlgeschlagenen Befehl als neuen Befehl am Ende der Warteschlange ein."""
+    return enqueue_command(command.control_unit, command.command_type, command.payload)
+
+
+# --- Abarbeiten ----------------------------------------------------------
+
+def backoff_delay(attempts):
+    """Wartezeit nach dem n-ten Fehlversuch: 2s, 4s, 8s, ... höchstens 60s."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS))
+
+
+def _reset_stale(now):
+    ControlCommand.objects.filter(
+        status='processing',
+        updated_at__lt=now - timedelta(seconds=STALE_PROCESSING_SECONDS)
+    ).update(
+        status='pending',
+        error_message="Bearbeitung abgebrochen - erneut eingeplant",
+        updated_at=now
+    )
+
+
+def _head(control_unit_id):
+    """Ältester offener Befehl der Einheit (in Bearbeitung oder ausstehend)."""
+    return ControlCommand.objects.filter(
+        control_unit_id=control_unit_id, status__in=OPEN_STATUSES
+    ).select_related('control_unit').order_by('created_at', 'pk').first()
+
+
+def _claim(command_id):
+    """Übernimmt einen Befehl exklusiv (mehrere Worker-Prozesse sind möglich)."""
+    return ControlCommand.objects.filter(pk=command_id, status='pending').update(
+        status='processing', updated_at=timezone.now()
+    ) == 1
+
+
+def _apply_led_status(command):
+    """LED/Q0-Status nach bestätigtem Schalten übernehmen (beide hängen an api_output)."""
+    new_status = bool(command.payload.get('status', False))
+    ControlStatus.objects.update_or_create(
+        control_unit=command.control_unit,
+        defaults={'led_status': new_status, 'output_q0_status': new_status, 'is_online': True}
+    )
+
+
+def _process(command):
+    from .plc_interface import get_plc_interface
+
+    failures = command.retry_count + 1
+    try:
+        plc = get_plc_interface(command.control_unit)
+        success = plc.execute_command(command)
+        errors = dict(plc.batch_errors)
+    except Exception as e:
+        success, errors = False, {'exception': f"{type(e).__name__}: {e}"}
+
+    now = timezone.now()
+    if success:
+        ControlCommand.objects.filter(pk=command.pk).update(
+            status='confirmed', sent_at=now, confirmed_at=now, next_attempt_at=None,
+            error_message=None, plc_response=None, updated_at=now
+        )
+        if command.command_type in ('set_led', 'set_output'):
+            _apply_led_status(command)
+        mark_online(command.control_unit)
+        return 'confirmed'
+
+    error = '; '.join(f"{var}: {message}" for var, message in errors.items()) or 'SPS hat den Befehl nicht akzeptiert'
+    fields = {
+        'retry_count': failures,
+        'error_message': error,
+        'plc_response': {'errors': errors} if errors else None,
+        'sent_at': now,
+        'updated_at': now,
+    }
+    if failures >= MAX_ATTEMPTS:
+        ControlCommand.objects.filter(pk=command.pk).update(status='failed', next_attempt_at=None, **fields)
+        print(f"❌ SPS-Befehl {command.command_type} für {command.control_unit.name} endgültig fehlgeschlagen: {error}")
+        return 'failed'
+
+    ControlCommand.objects.filter(pk=command.pk).update(
+        status='pending', next_attempt_at=now + backoff_delay(failures), **fields
+    )
+    print(f"⚠️ SPS-Befehl {command.command_type} für {command.control_unit.name} fehlgeschlagen "
+          f"(Versuch {failures}/{MAX_ATTEMPTS}): {error}")
+    return 'retry'
+
+
+def drain_unit(control_unit_id):
+    """
+    Arbeitet die Befehle einer Einheit in Reihenfolge ab, bis die Warteschlange
+    leer ist oder der Kopf auf seinen nächsten Versuch wartet.
+    """
+    results = {'confirmed': 0, 'retry': 0, 'failed': 0}
+    try:
+        while True:
+            head = _head(control_unit_id)
+            if head is None or head.status != 'pending':
+                break
+            if head.next_attempt_at and head.next_attempt_at > timezone.now():
+                break
+            if not _claim(head.pk):
+                break
+            outcome = _process(head)
+            results[outcome] += 1
+            if outcome == 'retry':
+                break
+    finally:
+        close_old_connections()
+    return results
+
+
+def due_units(now=None):
+    """Einheiten, deren nächster ausstehender Befehl fällig ist."""
+    now = now or timezone.now()
+    busy = ControlCommand.objects.filter(status='processing').values('control_unit_id')
+    return list(
+        ControlCommand.objects.filter(status='pending').filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+        ).exclude(control_unit_id__in=busy).order_by().values_list('control_unit_id', flat=True).distinct()
+    )
+
+
+def process_due(threads=WORKER_THREADS):
+    """
+    Arbeitet alle fälligen Einheiten ab (je Einheit ein Thread, höchstens threads
+    gleichzeitig). Gibt ein Dict mit der Anzahl je Ergebnis zurück.
+    """
+    _reset_stale(timezone.now())
+    results = {'confirmed': 0, 'retry': 0, 'failed': 0}
+    unit_ids = due_units()
+    if not unit_ids:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(threads, len(unit_ids))),
+                            thread_name_prefix='plc-command') as executor:
+        for unit_results in executor.map(drain_unit, unit_ids):
+            for outcome, count in unit_results.items():
+                results[outcome] += count
+    return results
+
+
+def next_due_in(now=None):
+    """Sekunden bis zum nächsten geplanten Wiederholungsversuch (None, wenn keiner)."""
+    now = now or timezone.now()
+    next_attempt = ControlCommand.objects.filter(
+        status='pending', next_attempt_at__gt=now
+    ).aggregate(next=Min('next_attempt_at'))['next']
+    return (next_attempt - now).total_seconds() if next_attempt else None
+
+
+# --- Status --------------------------------------------------------------
+
+def command_status(command):
+    """Kompakter Stand eines Befehls für das Polling der UI."""
+    position = None
+    if command.status in OPEN_STATUSES:
+        position = ControlCommand.objects.filter(
+            control_unit_id=command.control_unit_id,
+            status__in=OPEN_STATUSES,
+            created_at__lt=command.created_at
+        ).count()
+    return {
+        'id': str(command.id),
+        'command_type': command.command_type,
+        'status': command.status,
+        'status_display': command.get_status_display(),
+        'done': command.status in FINAL_STATUSES,
+        'queue_position': position,
+        'retry_count': command.retry_count,
+        'max_attempts': MAX_ATTEMPTS,
+        'next_attempt_at': command.next_attempt_at.isoformat() if command.next_attempt_at else None,
+        'superseded_by': str(command.superseded_by_id) if command.superseded_by_id else None,
+        'error_message': command.error_message,
+        'created_at': command.created_at.isoformat(),
+        'sent_at': command.sent_at.isoformat() if command.sent_at else None,
+        'confirmed_at': command.confirmed_at.isoformat() if command.confirmed_at else None,
+    }
+
+
+def queue_status(control_unit_id=None):
+    """Übersicht: Anzahl je Status, ältester offener Befehl, Worker-Zustand."""
+    commands = ControlCommand.objects.all()
+    if control_unit_id:
+        commands = commands.filter(control_unit_id=control_unit_id)
+    counts = dict(commands.values_list('status').annotate(count=Count('id')).order_by())
+    oldest_open = commands.filter(status__in=OPEN_STATUSES).aggregate(oldest=Min('created_at'))['oldest']
+    return {
+        'counts': counts,
+        'oldest_open': oldest_open.isoformat() if oldest_open else None,
+        'oldest_open_age_seconds': (
+            (timezone.now() - oldest_open).total_seconds() if oldest_open else None
+        ),
+        'worker_running': _worker is not None and _worker.is_alive(),
+    }
+
+
+# --- Hintergrund-Worker --------------------------------------------------
+
+_worker = None
+_wake = threading.Event()
+
+
+def wake_worker():
+    """Weckt den Worker nach einem Commit, statt bis zum nächsten Intervall zu warten."""
+    _wake.set()
+
+
+class CommandQueueWorker(threading.Thread):
+    """Daemon-Thread im Webserver-Prozess, der die SPS-Befehle abarbeitet."""
+
+    def __init__(self, interval=WORKER_INTERVAL_SECONDS):
+        super().__init__(name='plc-command-queue', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        print("🚀 SPS-Befehls-Worker gestartet")
+        while not self._stopped.is_set():
+            timeout = self.interval
+            try:
+                close_old_connections()
+                process_due()
+                # Fällige Wiederholung früher als das Intervall - nicht länger warten
+                due_in = next_due_in()
+                if due_in is not None:
+                    timeout = min(timeout, due_in)
+            except Exception as e:
+                print(f"❌ Fehler im SPS-Befehls-Worker: {str(e)}")
+            finally:
+                close_old_connections()
+            _wake.wait(timeout)
+            _wake.clear()
+
+    def stop(self):
+        self._stopped.set()
+        _wake.set()
+
+
+def start_worker():
+    """Startet den Worker einmalig pro Prozess (aus ControllerConfig.ready)."""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return _worker
+    _worker = CommandQueueWorker()
+    _worker.start()
+    return _worker
+
+
+def run_forever(interval=WORKER_INTERVAL_SECONDS, threads=WORKER_THREADS):
+    """Endlosschleife für den Management-Command (eigener Worker-Prozess)."""
+    while True:
+        results = process_due(threads=threads)
+        if any(results.values()):
+            print(f"🔁 SPS-Befehle: {results}")
+        close_old_connections()
+        due_in = next_due_in()
+        _wake.wait(min(interval, due_in) if due_in is not None else interval)
+        _wake.clear()
@@ -0,0 +1,157 @@
+# backend/controller/management/commands/check_plc_batch.py
+"""
+Prüft die JSON-RPC Batch-Aufrufe des PLCJSONRPCInterface gegen die simulierte
+SPS (mock_plc.py), ohne Hardware und ohne Datenbank-Schreibzugriffe:
+
+- write_many / read_many / read_status kosten je genau einen HTTP-Request
+- Fehler einzelner Variablen werden ihrer Variable zugeordnet (batch_errors),
+  die übrigen Aufrufe des Batches bleiben erfolgreich
+- abgelaufener Token: ein Login, dann Wiederholung des ganzen Batches
+- die Konfiguration geht in einem Request zur SPS, ein geändertes
+  Wochenprogramm schreibt nur die geänderten Variablen
+- Batches über PLC_MAX_BATCH_SIZE werden auf mehrere Requests aufgeteilt
+"""
+from datetime import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from controller import plc_pool
+from controller.mock_plc import MockPLCServer
+from controller.models import ControlSchedule, ControlUnit
+from controller.plc_interface import (
+    PLCJSONRPCInterface, Q0_ADDRESS, STATUS_VARIABLES, config_variables
+)
+from controller.schedule_compiler import VERSION_VARIABLE, compile_schedules, push_image
+
+
+class Command(BaseCommand):
+    help = "Prüft die JSON-RPC Batch-Requests zur SPS gegen eine lokale Mock-SPS"
+
+    def handle(self, *args, **options):
+        self.failures = []
+        with MockPLCServer(variables={Q0_ADDRESS: True}) as server:
+            unit = ControlUnit(
+                name='Mock-SPS', plc_address=server.address,
+                plc_username=server.username, plc_password=server.password,
+            )
+            plc = PLCJSONRPCInterface(unit)
+            try:
+                self.check_write_read(server, plc)
+                self.check_errors(server, plc)
+                self.check_relogin(server, plc)
+                self.check_config(server, plc, unit)
+                self.check_chunking(server, plc)
+            finally:
+                plc_pool.pool.close_all()
+
+        if self.failures:
+            raise CommandError("Batch-Prüfung fehlgeschlagen:\n" + "\n".join(self.failures))
+        self.stdout.write(self.style.SUCCESS("Alle Batch-Prüfungen bestanden"))
+
+    def expect(self, label, condition, detail=''):
+        status = self.style.SUCCESS('OK ') if condition else self.style.ERROR('FEHLER')
+        self.stdout.write(f"  {status} {label}" + (f" ({detail})" if detail and not condition else ''))
+        if not condition:
+            self.failures.append(f"{label}: {detail}")
+
+    def requests_since(self, server, start):
+        return server.http_requests[start:]
+
+    def check_write_read(self, server, plc):
+        self.stdout.write("write_many / read_many")
+        plc.ensure_authenticated()
+        values = {f'"DB_Control".value_{index}': index for index in range(10)}
+
+        start = len(server.http_requests)
+        written = plc.write_many(values)
+        requests = self.requests_since(server, start)
+        self.expect("10 Writes in einem Request", len(requests) == 1 and len(requests[0]) == 10, requests)
+        self.expect("alle Writes erfolgreich", all(written.values()) and not plc.batch_errors, plc.batch_errors)
+        self.expect("Werte in der SPS", all(server.variables.get(var) == value for var, value in values.items()))
+
+        start = len(server.http_requests)
+        read = plc.read_many(values)
+        self.expect("10 Reads in einem Request", len(self.requests_since(server, start)) == 1)
+        self.expect("gelesene Werte", read == values, read)
+
+        server.variables[STATUS_VARIABLES['current_value']] = 21.5
+        start = len(server.http_requests)
+        status = plc.read_status()
+        self.expect("read_status in einem Request", len(self.requests_since(server, start)) == 1)
+        self.expect("read_status Werte", status['output_q0'] is True and status['current_value'] == 21.5, status)
+        self.expect("fehlender Messwert als None", status['secondary_value'] is None, status)
+
+    def check_errors(self, server, plc):
+        self.stdout.write("Fehler einzelner Aufrufe")
+        server.failing['"DB_Control".broken'] = 'Schreibschutz'
+        try:
+            written = plc.write_many({'"DB_Control".ok_a': 1, '"DB_Control".broken': 2, '"DB_Control".ok_b': 3})
+        finally:
+            server.failing.clear()
+        self.expect("fehlerhafte Variable False, übrige True",
+                    written == {'"DB_Control".ok_a': True, '"DB_Control".broken': False, '"DB_Control".ok_b': True},
+                    written)
+        self.expect("Fehlermeldung der Variable zugeordnet",
+                    list(plc.batch_errors) == ['"DB_Control".broken'] and 'Schreibschutz' in plc.batch_errors['"DB_Control".broken'],
+                    plc.batch_errors)
+
+        read = plc.read_many(['"DB_Control".ok_a', '"DB_Control".missing'])
+        self.expect("unbekannte Variable liest None",
+                    read == {'"DB_Control".ok_a': 1, '"DB_Control".missing': None}, read)
+
+    def check_relogin(self, server, plc):
+        self.stdout.write("Abgelaufener Token")
+        server.revoke_tokens()
+        start = len(server.http_requests)
+        written = plc.write_many({'"DB_Control".after_restart_a': 1, '"DB_Control".after_restart_b': 2})
+        methods = self.requests_since(server, start)
+        self.expect("Batch, Login, Wiederholung", [len(m) for m in methods] == [2, 1, 2] and methods[1] == ['Api.Login'],
+                    methods)
+        self.expect("Writes nach erneutem Login erfolgreich", all(written.values()), plc.batch_errors)
+
+    def check_config(self, server, plc, unit):
+        self.stdout.write("Konfiguration und Wochenprogramm")
+        parameters = {'target_temperature': 24.0, 'humidity_setpoint': 60, 'mode': 1}
+        expected = config_variables(parameters)
+
+        start = len(server.http_requests)
+        success = plc._send_config_update(unit, {'parameters': parameters})
+        requests = self.requests_since(server, start)
+        self.expect("Konfiguration erfolgreich", success, plc.batch_errors)
+        self.expect(f"{len(expected)} Variablen in einem Request", len(requests) == 1, [len(r) for r in requests])
+
+        schedules = [
+            ControlSchedule(control_unit=unit, weekday=weekday, start_time=time(6, 0), end_time=time(18, 30),
+                            target_value=24.0, secondary_value=60.0)
+            for weekday in range(7)
+        ]
+        compiled = compile_schedules(schedules)
+        start = len(server.http_requests)
+        result = push_image(plc, compiled)
+        requests = self.requests_since(server, start)
+        batches = -(-len(compiled.variables) // plc_pool.MAX_BATCH_SIZE)
+        self.expect("Wochenprogramm vollständig geladen", result['uploaded'] and result['full_upload'], result['failed'])
+        self.expect(f"Version lesen, {len(compiled.variables)} Variablen in {batches} Requests, Version setzen",
+                    len(requests) == batches + 2, [len(r) for r in requests])
+        self.expect("Version in der SPS", server.variables.get(VERSION_VARIABLE) == compiled.version)
+
+        schedules[2].target_value = 21.0
+        changed = compile_schedules(schedules)
+        start = len(server.http_requests)
+        result = push_image(plc, changed, compiled.variables, compiled.version)
+        requests = self.requests_since(server, start)
+        self.expect("Änderung: nur der geänderte Slot",
+                    not result['full_upload'] and list(result['changed']) == ['"DB_Schedule".slots[5].target'],
+                    list(result['changed']))
+        self.expect("Änderung: drei kleine Requests", [len(r) for r in requests] == [1, 1, 1], [len(r) for r in requests])
+
+    def check_chunking(self, server, plc):
+        self.stdout.write("Aufteilung großer Batches")
+        size = plc_pool.MAX_BATCH_SIZE
+        values = {f'"DB_Control".bulk_{index}': index for index in range(size * 2 + 1)}
+        start = len(server.http_requests)
+        written = plc.write_many(values)
+        requests = self.requests_since(server, start)
+        self.expect(f"{len(values)} Writes in 3 Requests", [len(r) for r in requests] == [size, size, 1],
+                    [len(r) for r in requests])
+        self.expect("alle Writes erfolgreich", all(written.values()), plc.batch_errors)
@@ -0,0 +1,154 @@
+# backend/controller/management/commands/check_schedule_compiler.py
+"""
+Prüft den Zeitplan-Compiler (schedule_compiler.py) gegen die SimulatedPLC,
+ohne SPS und ohne Datenbank:
+
+- überlappende Zeitpläne mit gleichen Werten werden zusammengeführt,
+  Sonntag über Mitternacht läuft in den Montag
+- Überlappungen mit unterschiedlichen Werten sind Konflikte
+- das geladene Programm liefert zu jeder Viertelstunde der Woche dieselben
+  Sollwerte wie die Zeitpläne selbst
+- eine Änderung schreibt nur die geänderten Variablen und die Version
+- unbekannter SPS-Stand (Version weicht ab) führt zum vollständigen Upload
+- bei einem Schreibfehler bleibt die Version unverändert
+"""
+from datetime import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from controller.models import ControlSchedule
+from controller.schedule_compiler import (
+    MINUTES_PER_DAY, MINUTES_PER_WEEK, VERSION_VARIABLE, SimulatedPLC, compile_schedules, push_image
+)
+
+
+def schedule(pk, weekday, start, end, target, secondary=None, **parameters):
+    return ControlSchedule(
+        pk=pk, weekday=weekday, start_time=time(*start), end_time=time(*end),
+        target_value=target, secondary_value=secondary, parameters=parameters,
+    )
+
+
+def expected_setpoint(schedules, minute):
+    """Sollwert direkt aus den Zeitplänen (Referenz für setpoint_at)"""
+    for item in schedules:
+        if not item.is_active:
+            continue
+        start = item.weekday * MINUTES_PER_DAY + item.start_time.hour * 60 + item.start_time.minute
+        length = ((item.end_time.hour - item.start_time.hour) * 60
+                  + item.end_time.minute - item.start_time.minute) % MINUTES_PER_DAY
+        if (minute - start) % MINUTES_PER_WEEK < length:
+            secondary = item.secondary_value if item.secondary_value is not None else 0.0
+            return {'target': item.target_value, 'secondary': secondary}
+    return None
+
+
+class Command(BaseCommand):
+    help = "Prüft das Kompilieren und den Upload der Zeitpläne gegen eine simulierte SPS"
+
+    def handle(self, *args, **options):
+        self.failures = []
+        self.check_merge()
+        self.check_conflicts()
+        self.check_evaluation()
+        self.check_diff_upload()
+
+        if self.failures:
+            raise CommandError("Zeitplan-Prüfung fehlgeschlagen:\n" + "\n".join(self.failures))
+        self.stdout.write(self.style.SUCCESS("Alle Zeitplan-Prüfungen bestanden"))
+
+    def expect(self, label, condition, detail=''):
+        status = self.style.SUCCESS('OK ') if condition else self.style.ERROR('FEHLER')
+        self.stdout.write(f"  {status} {label}" + (f" ({detail})" if detail and not condition else ''))
+        if not condition:
+            self.failures.append(f"{label}: {detail}")
+
+    def week(self):
+        schedules = [
+            schedule(weekday + 1, weekday, (6, 0), (18, 0), 21.0, 50.0)
+            for weekday in range(5)
+        ]
+        schedules += [
+            schedule(10, 5, (8, 0), (12, 0), 19.0),
+            schedule(11, 6, (22, 0), (6, 0), 17.5, mode=2),
+        ]
+        return schedules
+
+    def check_merge(self):
+        self.stdout.write("Zusammenführen")
+        compiled = compile_schedules([
+            schedule(1, 0, (6, 0), (12, 0), 21.0),
+            schedule(2, 0, (10, 0), (18, 0), 21.0),
+            schedule(3, 6, (23, 0), (1, 0), 18.0),
+        ])
+        slots = [(entry['start'], entry['active']) for entry in compiled.timetable]
+        self.expect("gültig", compiled.valid, compiled.errors)
+        self.expect("gleiche Werte zu einem Eintrag 06:00-18:00",
+                    slots[:3] == [(0, True), (60, False), (360, True)] and slots[3] == (1080, False), slots)
+        self.expect("Sonntag 23:00 läuft bis Montag 01:00",
+                    slots[-1] == (6 * MINUTES_PER_DAY + 23 * 60, True), slots)
+
+    def check_conflicts(self):
+        self.stdout.write("Konflikte")
+        compiled = compile_schedules([
+            schedule(1, 2, (6, 0), (12, 0), 21.0),
+            schedule(2, 2, (11, 0), (14, 0), 19.0),
+            schedule(3, 2, (20, 0), (20, 0), 19.0),
+            schedule(4, 3, (6, 0), (8, 0), 19.0, **{'bad key': 1}),
+        ])
+        types = sorted(error['type'] for error in compiled.errors)
+        conflict = next((error for error in compiled.errors if error['type'] == 'conflict'), {})
+        self.expect("Konflikt, leerer Zeitplan, ungültiger Parameter",
+                    types == ['conflict', 'empty', 'parameter'], compiled.errors)
+        self.expect("Konflikt Mittwoch 11:00-12:00 zwischen 1 und 2",
+                    conflict.get('schedules') == [1, 2]
+                    and (conflict.get('start'), conflict.get('end')) == (2 * MINUTES_PER_DAY + 660, 2 * MINUTES_PER_DAY + 720),
+                    conflict)
+        self.expect("kein Abbild bei Fehlern", not compiled.variables and compiled.version is None)
+
+    def check_evaluation(self):
+        self.stdout.write("Auswertung in der SPS")
+        schedules = self.week()
+        compiled = compile_schedules(schedules)
+        plc = SimulatedPLC()
+        result = push_image(plc, compiled)
+        self.expect("vollständiger Upload", result['uploaded'] and result['full_upload'], result['failed'])
+
+        mismatches = [
+            minute for minute in range(0, MINUTES_PER_WEEK, 15)
+            if plc.setpoint_at(minute) != expected_setpoint(schedules, minute)
+        ]
+        self.expect("alle Viertelstunden der Woche stimmen", not mismatches, mismatches[:5])
+
+    def check_diff_upload(self):
+        self.stdout.write("Diff-Upload")
+        schedules = self.week()
+        compiled = compile_schedules(schedules)
+        plc = SimulatedPLC()
+        push_image(plc, compiled)
+
+        unchanged = compile_schedules(schedules)
+        plc.requests.clear()
+        result = push_image(plc, unchanged, compiled.variables, compiled.version)
+        self.expect("unverändert: nur die Version lesen",
+                    not result['changed'] and plc.requests == [('read', [VERSION_VARIABLE])], plc.requests)
+
+        schedules[2].target_value = 22.5
+        changed = compile_schedules(schedules)
+        plc.requests.clear()
+        result = push_image(plc, changed, compiled.variables, compiled.version)
+        writes = [names for kind, names in plc.requests if kind == 'write']
+        self.expect("Änderung: ein Slot, danach die Version",
+                    writes == [['"DB_Schedule".slots[5].target'], [VERSION_VARIABLE]], writes)
+
+        plc.variables[VERSION_VARIABLE] = 0
+        result = push_image(plc, changed, changed.variables, changed.version)
+        self.expect("abweichende Version: vollständiger Upload",
+                    result['full_upload'] and len(result['changed']) == len(changed.variables), len(result['changed']))
+
+        schedules[0].target_value = 20.0
+        failing = compile_schedules(schedules)
+        plc.failing = {'"DB_Schedule".slots[1].target'}
+        result = push_image(plc, failing, changed.variables, changed.version)
+        self.expect("Schreibfehler: nicht geladen, Version bleibt",
+                    not result['uploaded'] and plc.variables[VERSION_VARIABLE] == changed.version, result['failed'])
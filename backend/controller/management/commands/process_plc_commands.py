@@ -0,0 +1,54 @@
+# backend/controller/management/commands/process_plc_commands.py
+from django.core.management.base import BaseCommand
+
+from controller.command_queue import WORKER_INTERVAL_SECONDS, WORKER_THREADS, process_due, queue_status, run_forever
+
+
+class Command(BaseCommand):
+    help = "Arbeitet die Warteschlange der SPS-Befehle (ControlCommand) ab"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Dauerhaft laufen (eigener Worker-Prozess statt Thread im Webserver)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=WORKER_INTERVAL_SECONDS,
+            help='Wartezeit zwischen zwei Durchläufen in Sekunden (mit --loop)'
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=WORKER_THREADS,
+            help='Steuerungseinheiten, die gleichzeitig bedient werden'
+        )
+        parser.add_argument('--status', action='store_true', help='Nur den Status der Warteschlange ausgeben')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self._print_status()
+            return
+
+        if options['loop']:
+            self.stdout.write(f"🚀 SPS-Befehls-Worker läuft (Intervall {options['interval']}s) - Abbruch mit Strg+C")
+            run_forever(interval=options['interval'], threads=options['threads'])
+            return
+
+        results = process_due(threads=options['threads'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {results['confirmed']} bestätigt, {results['retry']} neu eingeplant, "
+            f"{results['failed']} fehlgeschlagen"
+        ))
+
+    def _print_status(self):
+        status = queue_status()
+        summary = ', '.join(f"{name}: {count}" for name, count in sorted(status['counts'].items())) or 'keine Befehle'
+        self.stdout.write(f"📋 Befehle: {summary}")
+        if status['oldest_open']:
+            self.stdout.write(
+                f"⏳ Ältester offener Befehl: {status['oldest_open']} "
+                f"({status['oldest_open_age_seconds']:.0f}s)"
+            )
@@ -0,0 +1,39 @@
+# backend/controller/management/commands/run_mock_plc.py
+"""
+Startet die simulierte SPS (mock_plc.py) als lokalen JSON-RPC Server.
+Eine Steuerungseinheit mit plc_address = "http://127.0.0.1:<port>" spricht
+dann ohne Hardware mit ihr - inklusive Batch-Requests.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+from controller.mock_plc import MockPLCServer
+
+
+class Command(BaseCommand):
+    help = "Startet einen lokalen JSON-RPC Server, der die S7-1200 Web-API simuliert"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8443)
+        parser.add_argument('--username', default='sash')
+        parser.add_argument('--password', default='Janus72728')
+        parser.add_argument('--strict', action='store_true',
+                            help='Schreiben nur auf bereits bekannte Variablen zulassen')
+
+    def handle(self, *args, **options):
+        server = MockPLCServer(
+            host=options['host'], port=options['port'],
+            username=options['username'], password=options['password'],
+            strict=options['strict'],
+        ).start()
+        self.stdout.write(self.style.SUCCESS(f"Mock-SPS läuft auf {server.address}/api/jsonrpc (Strg+C beendet)"))
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.stdout.write(f"Mock-SPS beendet ({len(server.http_requests)} Requests)")
@@ -0,0 +1,36 @@
+# backend/controller/management/commands/run_status_poller.py
+from django.core.management.base import BaseCommand
+
+from controller import status_poller
+from controller.status_poller import (
+    POLL_INTERVAL, StatusPoller, latest_sample_at, poll_once, pollable_units
+)
+
+
+class Command(BaseCommand):
+    help = "Fragt den Status aller SPS zyklisch ab und speichert nur Änderungen"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=POLL_INTERVAL,
+            help='Abfrageintervall je Steuerungseinheit in Sekunden'
+        )
+        parser.add_argument('--once', action='store_true', help='Alle Einheiten einmal abfragen und beenden')
+
+    def handle(self, *args, **options):
+        if options['once']:
+            for unit_id in pollable_units():
+                result = poll_once(unit_id, last_sample_at=latest_sample_at(unit_id))
+                state = 'online' if result['online'] else 'offline'
+                changed = ', '.join(result['changed']) or 'keine Änderung'
+                self.stdout.write(f"{unit_id}: {state} ({changed})")
+            return
+
+        self.stdout.write("Status-Poller läuft - Abbruch mit Strg+C")
+        poller = status_poller._poller = StatusPoller(interval=options['interval'])
+        try:
+            poller.run()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('controller', '0006_plcconfiguration_controlcommand_plc_response_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controlcommand',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, help_text='Nächster Versuch nach Fehler', null=True),
+        ),
+        migrations.AddField(
+            model_name='controlcommand',
+            name='superseded_by',
+            field=models.ForeignKey(blank=True, help_text='Neuerer Befehl, der diesen ersetzt hat', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='controller.controlcommand'),
+        ),
+        migrations.AddField(
+            model_name='controlcommand',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AlterField(
+            model_name='controlcommand',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('sent', 'Gesendet'), ('confirmed', 'Bestätigt'), ('superseded', 'Ersetzt'), ('failed', 'Fehlgeschlagen')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='controlcommand',
+            index=models.Index(fields=['control_unit', 'status', 'created_at'], name='controlcmd_queue_idx'),
+        ),
+    ]
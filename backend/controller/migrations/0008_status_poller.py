@@ -0,0 +1,35 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('controller', '0007_command_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controlstatus',
+            name='last_polled_at',
+            field=models.DateTimeField(blank=True, help_text='Letzte Abfrage der SPS', null=True),
+        ),
+        migrations.CreateModel(
+            name='ControlMeasurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField()),
+                ('current_value', models.FloatField(blank=True, null=True)),
+                ('secondary_value', models.FloatField(blank=True, null=True)),
+                ('output_q0', models.BooleanField(blank=True, null=True)),
+                ('control_unit', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='measurement_series', to='controller.controlunit')),
+            ],
+            options={
+                'verbose_name': 'Messwert',
+                'verbose_name_plural': 'Messwerte',
+                'indexes': [models.Index(fields=['control_unit', 'recorded_at'], name='controlmeas_unit_time_idx'), models.Index(fields=['recorded_at'], name='controlmeas_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('controller', '0008_status_poller'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ControlScheduleImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(blank=True, help_text='Prüfsumme des vollständig geladenen Programms', null=True)),
+                ('variables', models.JSONField(blank=True, default=dict)),
+                ('timetable', models.JSONField(blank=True, default=list, help_text='Wochentabelle der letzten Übertragung')),
+                ('uploaded_at', models.DateTimeField(blank=True, null=True)),
+                ('control_unit', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_image', to='controller.controlunit')),
+            ],
+            options={
+                'verbose_name': 'Wochenprogramm',
+                'verbose_name_plural': 'Wochenprogramme',
+            },
+        ),
+    ]
@@ -0,0 +1,178 @@
+# backend/controller/mock_plc.py
+"""
+Lokaler JSON-RPC Server, der die Web-API der S7-1200 nachbildet.
+
+Zum Testen ohne Hardware (Management-Commands run_mock_plc und check_plc_batch):
+Api.Login/Logout/Ping sowie PlcProgram.Read/Write auf einem Variablen-Speicher,
+einzeln oder als JSON-RPC Batch-Array. Jeder HTTP-Request wird in
+http_requests protokolliert (Liste der Methoden), damit sich prüfen lässt, wie
+viele Round-Trips ein Ablauf kostet.
+
+Die Steuerungseinheit zeigt mit plc_address = "http://127.0.0.1:<port>" auf den
+Server (get_api_url hängt /api/jsonrpc an).
+"""
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .plc_pool import UNAUTHORIZED
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+# Variable bzw. Adresse existiert nicht (Fehlercode der S7-1200)
+ADDRESS_NOT_FOUND = 2104
+
+
+class MockPLCServer:
+    """Simulierte SPS; als Kontextmanager startet und stoppt sie den HTTP-Server."""
+
+    def __init__(self, host='127.0.0.1', port=0, username='sash', password='Janus72728',
+                 variables=None, strict=False, runtime_timeout='PT30M'):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        # Variablenname oder numerische ID (als String) -> Wert
+        self.variables = dict(variables or {})
+        # strict: Schreiben nur auf bekannte Variablen (sonst ADDRESS_NOT_FOUND)
+        self.strict = strict
+        self.runtime_timeout = runtime_timeout
+        # Variable -> Fehlermeldung (simulierter Schreibfehler)
+        self.failing = {}
+        self.tokens = set()
+        self.http_requests = []
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                response = server.handle(body, self.headers.get('X-Auth-Token'))
+                data = json.dumps(response).encode() if response is not None else b''
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='mock-plc', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def revoke_tokens(self):
+        """Alle Sitzungen ungültig machen (z.B. SPS-Neustart)."""
+        with self._lock:
+            self.tokens.clear()
+
+    # --- JSON-RPC ------------------------------------------------------------
+
+    def handle(self, body, token=None):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return self._error(None, PARSE_ERROR, 'Parse error')
+
+        if isinstance(payload, list):
+            with self._lock:
+                self.http_requests.append([entry.get('method') for entry in payload if isinstance(entry, dict)])
+            if not payload:
+                return self._error(None, INVALID_REQUEST, 'Invalid Request')
+            responses = [self._call(entry, token) for entry in payload]
+            # Notifications (ohne id) bekommen keine Antwort
+            return [response for response in responses if response is not None] or None
+
+        with self._lock:
+            self.http_requests.append([payload.get('method')] if isinstance(payload, dict) else [])
+        return self._call(payload, token)
+
+    def _call(self, request, token):
+        if not isinstance(request, dict) or request.get('jsonrpc') != '2.0' or 'method' not in request:
+            return self._error(None, INVALID_REQUEST, 'Invalid Request')
+        request_id = request.get('id')
+        method = request['method']
+        params = request.get('params') or {}
+
+        if method == 'Api.Login':
+            if params.get('user') != self.username or params.get('password') != self.password:
+                return self._error(request_id, UNAUTHORIZED, 'Login failed')
+            new_token = uuid.uuid4().hex
+            with self._lock:
+                self.tokens.add(new_token)
+            return self._result(request_id, {'token': new_token, 'runtime_timeout': self.runtime_timeout})
+
+        if token not in self.tokens:
+            return self._error(request_id, UNAUTHORIZED, 'Unauthorized')
+
+        if method == 'Api.Ping':
+            return self._result(request_id, uuid.uuid4().hex)
+        if method == 'Api.Logout':
+            with self._lock:
+                self.tokens.discard(token)
+            return self._result(request_id, True)
+        if method == 'PlcProgram.Read':
+            return self._read(request_id, params)
+        if method == 'PlcProgram.Write':
+            return self._write(request_id, params)
+        return self._error(request_id, METHOD_NOT_FOUND, 'Method not found')
+
+    def _read(self, request_id, params):
+        address = params.get('var', params.get('id'))
+        if address is None:
+            return self._error(request_id, INVALID_PARAMS, 'Invalid params')
+        address = str(address)
+        with self._lock:
+            if address not in self.variables:
+                return self._error(request_id, ADDRESS_NOT_FOUND, 'Address does not exist')
+            return self._result(request_id, self.variables[address])
+
+    def _write(self, request_id, params):
+        var_name = params.get('var')
+        if var_name is None or 'value' not in params:
+            return self._error(request_id, INVALID_PARAMS, 'Invalid params')
+        with self._lock:
+            if var_name in self.failing:
+                return self._error(request_id, ADDRESS_NOT_FOUND, self.failing[var_name])
+            if self.strict and var_name not in self.variables:
+                return self._error(request_id, ADDRESS_NOT_FOUND, 'Address does not exist')
+            self.variables[var_name] = params['value']
+        return self._result(request_id, True)
+
+    @staticmethod
+    def _result(request_id, result):
+        if request_id is None:
+            return None
+        return {'jsonrpc': '2.0', 'id': request_id, 'result': result}
+
+    @staticmethod
+    def _error(request_id, code, message):
+        return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': code, 'message': message}}
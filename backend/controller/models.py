@@ -108,6 +108,27 @@ class ControlSchedule(models.Model):
         return f"{self.control_unit.name} - {self.get_weekday_display()} {self.start_time}-{self.end_time}"
 
 
+class ControlScheduleImage(models.Model):
+    """
+    Zuletzt in die SPS geladenes Wochenprogramm einer Einheit (schedule_compiler.py).
+    variables enthält das Abbild {SPS-Variable: Wert} - Grundlage für den Diff
+    beim nächsten Upload.
+    """
+    
+    control_unit = models.OneToOneField(ControlUnit, on_delete=models.CASCADE, related_name='schedule_image')
+    version = models.BigIntegerField(null=True, blank=True, help_text="Prüfsumme des vollständig geladenen Programms")
+    variables = models.JSONField(default=dict, blank=True)
+    timetable = models.JSONField(default=list, blank=True, help_text="Wochentabelle der letzten Übertragung")
+    uploaded_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Wochenprogramm'
+        verbose_name_plural = 'Wochenprogramme'
+    
+    def __str__(self):
+        return f"Wochenprogramm {self.control_unit.name} (Version {self.version})"
+
+
 class ControlParameter(models.Model):
     """Konfigurationsparameter für Steuerungseinheiten"""
     
@@ -175,6 +196,10 @@ class ControlStatus(models.Model):
     # Zusätzliche Messwerte als JSON
     measurements = models.JSONField(default=dict, blank=True, null=True)
     
+    # Letzte erfolgreiche oder fehlgeschlagene Abfrage durch den Status-Poller
+    # (grob - wird ohne Wertänderung höchstens einmal je Minute geschrieben)
+    last_polled_at = models.DateTimeField(null=True, blank=True, help_text="Letzte Abfrage der SPS")
+    
     class Meta:
         verbose_name = 'Status'
         verbose_name_plural = 'Status'
@@ -183,13 +208,39 @@ class ControlStatus(models.Model):
         return f"Status: {self.control_unit.name}"
 
 
+class ControlMeasurement(models.Model):
+    """
+    Zeitreihe der Messwerte einer Steuerungseinheit (status_poller.py).
+    Eine Zeile nur bei Änderung oder als Lebenszeichen - schmal gehalten.
+    """
+    
+    control_unit = models.ForeignKey(ControlUnit, on_delete=models.CASCADE, related_name='measurement_series')
+    recorded_at = models.DateTimeField()
+    current_value = models.FloatField(null=True, blank=True)
+    secondary_value = models.FloatField(null=True, blank=True)
+    output_q0 = models.BooleanField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Messwert'
+        verbose_name_plural = 'Messwerte'
+        indexes = [
+            models.Index(fields=['control_unit', 'recorded_at'], name='controlmeas_unit_time_idx'),
+            models.Index(fields=['recorded_at'], name='controlmeas_time_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.control_unit.name} @ {self.recorded_at}: {self.current_value}"
+
+
 class ControlCommand(models.Model):
     """Befehle, die an die SPS gesendet werden"""
     
     COMMAND_STATUS_CHOICES = [
         ('pending', 'Ausstehend'),
+        ('processing', 'In Bearbeitung'),
         ('sent', 'Gesendet'),
         ('confirmed', 'Bestätigt'),
+        ('superseded', 'Ersetzt'),
         ('failed', 'Fehlgeschlagen'),
     ]
     
@@ -210,10 +261,22 @@ class ControlCommand(models.Model):
     # NEU: Response tracking
     plc_response = models.JSONField(null=True, blank=True, help_text="SPS Antwort")
     
+    # Warteschlange (command_queue.py)
+    next_attempt_at = models.DateTimeField(null=True, blank=True, help_text="Nächster Versuch nach Fehler")
+    superseded_by = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+',
+        help_text="Neuerer Befehl, der diesen ersetzt hat"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Befehl'
         verbose_name_plural = 'Befehle'
+        indexes = [
+            # Offene Befehle je Steuerungseinheit in Reihenfolge
+            models.Index(fields=['control_unit', 'status', 'created_at'], name='controlcmd_queue_idx'),
+        ]
     
     def __str__(self):
         return f"Command {self.command_type} for {self.control_unit.name}"
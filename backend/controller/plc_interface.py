@@ -1,34 +1,72 @@
 # backend/controller/plc_interface.py
 
-import json
 import logging
-import requests
-import threading
 from typing import Dict, Any, Optional, Union
-from datetime import datetime, timedelta
+from datetime import timedelta
 from django.conf import settings
 from django.utils import timezone
 import urllib3
-import re
+
+from . import plc_pool
 
 # SSL-Warnungen deaktivieren für selbstsignierte Zertifikate
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
+CONTROL_DB = '"DB_Control"'
+
+# Ausgang Q0 (mit "DB_Control".api_output verknüpft)
+Q0_ADDRESS = "209"
+
+# Konfigurationswerte mit abweichendem Variablennamen (übrige: "DB_Control".<key>)
+CONFIG_VARIABLES = {
+    'target_temperature': f'{CONTROL_DB}.target_temp',
+    'humidity_setpoint': f'{CONTROL_DB}.humidity_sp',
+}
+
+# Beim Status-Sync in einem Batch gelesene Werte
+STATUS_VARIABLES = {
+    'output_q0': Q0_ADDRESS,
+    'current_value': f'{CONTROL_DB}.actual_value',
+    'secondary_value': f'{CONTROL_DB}.actual_secondary',
+}
+
+
+def config_variables(parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Konfigurationsparameter als {SPS-Variable: Wert}"""
+    return {
+        CONFIG_VARIABLES.get(key, f'{CONTROL_DB}.{key}'): value
+        for key, value in parameters.items()
+        if value is not None
+    }
+
+
+def _read_params(address) -> Dict[str, Any]:
+    """PlcProgram.Read über numerische ID (z.B. "209") oder Variablennamen"""
+    if isinstance(address, int) or str(address).isdigit():
+        return {"id": int(address)}
+    return {"var": address}
+
+
+def _read_value(result):
+    """Wert aus der Read-Antwort (je nach Firmware direkt oder als result/value)"""
+    if isinstance(result, dict):
+        return result.get("result", result.get("value"))
+    return result
+
 
 class PLCJSONRPCInterface:
-    """JSON-RPC Interface zur Kommunikation mit Siemens S7-1200 G2 Web API"""
-    
-    # Class-level storage für Keep-Alive Threads
-    _keepalive_threads = {}
+    """
+    JSON-RPC Interface zur Kommunikation mit Siemens S7-1200 G2 Web API.
+
+    Leichtgewichtig: Verbindung, Token und Keep-Alive gehören der gemeinsamen
+    PLCSession des Endpunkts aus dem Prozess-Pool (plc_pool.py). Ein Aufruf
+    kostet damit einen JSON-RPC Round-Trip über eine bestehende TLS-Verbindung.
+    """
     
     def __init__(self, control_unit=None):
         self.control_unit = control_unit
-        self.session = requests.Session()
-        self.session.verify = False  # SSL-Verifikation deaktivieren
-        self.request_id = 1
-        self._keepalive_stop = threading.Event()
         
         # Konfiguration
         if control_unit and control_unit.plc_address:
@@ -42,210 +80,38 @@ class PLCJSONRPCInterface:
             self.base_url = f"https://{config.default_plc_address}/api/jsonrpc"
             self.username = config.default_username
             self.password = config.default_password
-    
-    def __del__(self):
-        """Cleanup: Stop Keep-Alive Thread"""
-        self.stop_keepalive()
-    
-    def _get_next_id(self) -> int:
-        """Gibt die nächste Request-ID zurück"""
-        current_id = self.request_id
-        self.request_id += 1
-        return current_id
-    
-    def _make_request(self, method: str, params: Dict[str, Any] = None, use_auth: bool = True) -> Dict[str, Any]:
-        """Führt einen JSON-RPC Request aus"""
-        payload = {
-            "jsonrpc": "2.0",
-            "id": self._get_next_id(),
-            "method": method
-        }
         
-        if params:
-            payload["params"] = params
-        
-        headers = {
-            "Content-Type": "application/json"
-        }
-        
-        # Auth-Token hinzufügen wenn verfügbar
-        if use_auth and self.control_unit and self.control_unit.plc_auth_token:
-            headers["X-Auth-Token"] = self.control_unit.plc_auth_token
-        
-        try:
-            logger.debug(f"Request an {self.base_url}: {json.dumps(payload, indent=2)}")
-            
-            response = self.session.post(
-                self.base_url,
-                json=payload,
-                headers=headers,
-                timeout=10
-            )
-            
-            logger.debug(f"Response Status: {response.status_code}")
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            
-            if "error" in result:
-                logger.error(f"JSON-RPC Error: {result['error']}")
-                # Bei Authentication-Fehler Token löschen
-                if result['error'].get('code') == -32604:  # Unauthorized
-                    self._clear_token()
-                raise Exception(f"PLC Error: {result['error'].get('message', 'Unknown error')}")
-            
-            return result.get("result", {})
-            
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-            raise Exception(f"Kommunikationsfehler mit SPS: {str(e)}")
+        self.connection = plc_pool.pool.get(self.base_url, self.username, self.password, control_unit)
+        # Fehler des letzten write_many/read_many je Variable
+        self.batch_errors = {}
     
-    def _clear_token(self):
-        """Löscht den gespeicherten Token"""
-        if self.control_unit:
-            self.control_unit.plc_auth_token = None
-            self.control_unit.plc_token_expires = None
-            self.control_unit.save(update_fields=['plc_auth_token', 'plc_token_expires'])
-            self.stop_keepalive()
+    def _make_request(self, method: str, params: Dict[str, Any] = None, use_auth: bool = True) -> Dict[str, Any]:
+        """Führt einen JSON-RPC Request über die gemeinsame Sitzung aus"""
+        logger.debug(f"Request an {self.base_url}: {method} {params}")
+        return self.connection.call(method, params, use_auth=use_auth)
     
     def authenticate(self) -> str:
-        """Authentifiziert bei der SPS und gibt den Token zurück"""
-        # Stoppe alten Keep-Alive falls vorhanden
-        self.stop_keepalive()
-        
-        params = {
-            "user": self.username,
-            "password": self.password
-        }
-        
+        """Erzwingt eine neue Anmeldung bei der SPS und gibt den Token zurück"""
         try:
-            logger.info(f"Authentifiziere bei {self.base_url} mit Benutzer: {self.username}")
-            result = self._make_request("Api.Login", params, use_auth=False)
-            
-            logger.debug(f"Auth Response: {result}")
-            
-            if "token" in result:
-                token = result["token"]
-                
-                # runtime_timeout kann String, Int oder ISO 8601 Duration sein
-                runtime_timeout_raw = result.get("runtime_timeout", "PT30M")
-                
-                # ISO 8601 Duration Format behandeln (z.B. "PT30M" = 30 Minuten)
-                if isinstance(runtime_timeout_raw, str) and runtime_timeout_raw.startswith("PT"):
-                    match = re.match(r'PT(\d+)([HM])', runtime_timeout_raw)
-                    if match:
-                        value = int(match.group(1))
-                        unit = match.group(2)
-                        if unit == 'H':
-                            runtime_timeout = value * 60  # Stunden zu Minuten
-                        else:  # 'M'
-                            runtime_timeout = value
-                        logger.debug(f"Parsed ISO 8601 duration {runtime_timeout_raw} als {runtime_timeout} Minuten")
-                    else:
-                        logger.warning(f"Konnte ISO 8601 duration nicht parsen: {runtime_timeout_raw}, verwende Standard 30")
-                        runtime_timeout = 30
-                else:
-                    # Normale String/Int Konvertierung
-                    try:
-                        runtime_timeout = int(runtime_timeout_raw)
-                    except (ValueError, TypeError):
-                        logger.warning(f"Konnte runtime_timeout nicht parsen: {runtime_timeout_raw}, verwende Standard 30")
-                        runtime_timeout = 30
-                
-                # Token in Control Unit speichern
-                if self.control_unit:
-                    self.control_unit.plc_auth_token = token
-                    # Token-Ablauf ist runtime_timeout, aber Session läuft nach 2 Min Inaktivität ab!
-                    self.control_unit.plc_token_expires = timezone.now() + timedelta(minutes=runtime_timeout)
-                    self.control_unit.save(update_fields=['plc_auth_token', 'plc_token_expires'])
-                
-                logger.info(f"Erfolgreich authentifiziert. Token gültig für {runtime_timeout} Minuten")
-                
-                # Starte Keep-Alive Thread (Ping alle 90 Sekunden)
-                self.start_keepalive()
-                
-                return token
-            else:
-                raise Exception("Keine Token-Antwort von SPS")
-                
+            return self.connection.login()
         except Exception as e:
             logger.error(f"Authentifizierung fehlgeschlagen: {e}")
             raise
     
+    def ensure_authenticated(self):
+        """Stellt sicher, dass die Sitzung einen gültigen Token hat (Login nur bei Bedarf)"""
+        self.connection.ensure_token()
+    
     def start_keepalive(self):
-        """Startet den Keep-Alive Thread für die Session"""
-        if not self.control_unit or not self.control_unit.plc_auth_token:
-            return
-        
-        # Stoppe existierenden Thread falls vorhanden
-        self.stop_keepalive()
-        
-        # Erstelle neuen Thread
-        self._keepalive_stop.clear()
-        thread = threading.Thread(target=self._keepalive_worker, daemon=True)
-        thread.start()
-        
-        # Speichere Thread-Referenz
-        if self.control_unit:
-            PLCJSONRPCInterface._keepalive_threads[self.control_unit.id] = (thread, self._keepalive_stop)
-        
-        logger.info("Keep-Alive Thread gestartet")
+        """Keep-Alive übernimmt der Sitzungs-Pool"""
+        pass
     
     def stop_keepalive(self):
-        """Stoppt den Keep-Alive Thread"""
-        if self.control_unit and self.control_unit.id in PLCJSONRPCInterface._keepalive_threads:
-            thread, stop_event = PLCJSONRPCInterface._keepalive_threads[self.control_unit.id]
-            stop_event.set()
-            thread.join(timeout=2)
-            del PLCJSONRPCInterface._keepalive_threads[self.control_unit.id]
-            logger.info("Keep-Alive Thread gestoppt")
-        else:
-            self._keepalive_stop.set()
-    
-    def _keepalive_worker(self):
-        """Worker-Thread der regelmäßig Pings sendet"""
-        logger.info("Keep-Alive Worker gestartet")
-        
-        while not self._keepalive_stop.wait(90):  # Alle 90 Sekunden
-            try:
-                # Prüfe ob Token noch gültig
-                if not self.control_unit or not self.control_unit.plc_auth_token:
-                    logger.info("Kein Token vorhanden, beende Keep-Alive")
-                    break
-                
-                # Sende Ping
-                logger.debug("Sende Keep-Alive Ping")
-                self._make_request("Api.Ping")
-                logger.debug("Keep-Alive Ping erfolgreich")
-                
-            except Exception as e:
-                logger.error(f"Keep-Alive Ping fehlgeschlagen: {e}")
-                # Bei Fehler neu authentifizieren
-                try:
-                    self.authenticate()
-                except:
-                    logger.error("Re-Authentifizierung fehlgeschlagen, beende Keep-Alive")
-                    break
-        
-        logger.info("Keep-Alive Worker beendet")
-    
-    def ensure_authenticated(self):
-        """Stellt sicher, dass ein gültiger Token vorhanden ist"""
-        if not self.control_unit:
-            return
-        
-        # Prüfen ob Token vorhanden und gültig
-        if (not self.control_unit.plc_auth_token or 
-            not self.control_unit.plc_token_expires or
-            self.control_unit.plc_token_expires <= timezone.now()):
-            logger.info("Token abgelaufen oder nicht vorhanden. Neue Authentifizierung...")
-            self.authenticate()
+        """Keep-Alive übernimmt der Sitzungs-Pool"""
+        pass
     
     def write_output(self, var_name: str, value: Union[bool, int, float]) -> bool:
         """Schreibt einen Wert auf einen Ausgang"""
-        self.ensure_authenticated()
-        
         params = {
             "var": var_name,
             "value": value
@@ -253,6 +119,7 @@ class PLCJSONRPCInterface:
         
         try:
             logger.info(f"Schreibe {var_name} = {value}")
+            # Abgelaufene oder abgelehnte Token erneuert die Sitzung selbst
             result = self._make_request("PlcProgram.Write", params)
             logger.debug(f"Write Result: {result}")
             
@@ -262,22 +129,11 @@ class PLCJSONRPCInterface:
             
         except Exception as e:
             logger.error(f"Fehler beim Schreiben von {var_name}: {e}")
-            # Bei Auth-Fehler neu versuchen
-            if "unauthorized" in str(e).lower():
-                logger.info("Authentifizierung abgelaufen, versuche erneut...")
-                self.authenticate()
-                # Zweiter Versuch
-                try:
-                    result = self._make_request("PlcProgram.Write", params)
-                    return True
-                except Exception as e2:
-                    logger.error(f"Zweiter Versuch fehlgeschlagen: {e2}")
+            self.batch_errors = {var_name: str(e)}
             return False
     
     def read_output(self, address: str) -> Optional[Dict[str, Any]]:
         """Liest den Status eines Ausgangs"""
-        self.ensure_authenticated()
-        
         params = {
             "id": int(address) if isinstance(address, str) else address
         }
@@ -291,6 +147,57 @@ class PLCJSONRPCInterface:
             logger.error(f"Fehler beim Lesen von {address}: {e}")
             return None
     
+    def _batch(self, method: str, items: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Führt je Eintrag {Schlüssel: params} einen Aufruf aus - alle in einem
+        JSON-RPC Batch. Gibt {Schlüssel: Ergebnis} zurück, Fehler landen in batch_errors.
+        """
+        self.batch_errors = {}
+        if not items:
+            return {}
+        keys = list(items)
+        try:
+            results = self.connection.call_batch((method, items[key]) for key in keys)
+        except Exception as e:
+            logger.error(f"Batch {method} fehlgeschlagen: {e}")
+            self.batch_errors = {key: str(e) for key in keys}
+            return {}
+        values = {}
+        for key, result in zip(keys, results):
+            if isinstance(result, plc_pool.PLCError):
+                self.batch_errors[key] = str(result)
+            else:
+                values[key] = result
+        return values
+    
+    def write_many(self, values: Dict[str, Any]) -> Dict[str, bool]:
+        """
+        Schreibt mehrere Variablen in einem Request (JSON-RPC Batch).
+        Gibt {Variable: Erfolg} zurück; Fehlermeldungen je Variable in batch_errors.
+        """
+        logger.info(f"Schreibe {len(values)} Variablen per Batch")
+        written = self._batch("PlcProgram.Write", {
+            var_name: {"var": var_name, "value": value} for var_name, value in values.items()
+        })
+        return {var_name: var_name in written for var_name in values}
+    
+    def read_many(self, addresses) -> Dict[str, Any]:
+        """
+        Liest mehrere Variablen bzw. IDs in einem Request (JSON-RPC Batch).
+        Gibt {Adresse: Wert} zurück (None bei Fehler, Meldung in batch_errors).
+        """
+        addresses = list(addresses)
+        results = self._batch("PlcProgram.Read", {address: _read_params(address) for address in addresses})
+        return {
+            address: _read_value(results[address]) if address in results else None
+            for address in addresses
+        }
+    
+    def read_status(self) -> Dict[str, Any]:
+        """Liest Q0 und die Messwerte (STATUS_VARIABLES) in einem Request"""
+        values = self.read_many(STATUS_VARIABLES.values())
+        return {name: values[address] for name, address in STATUS_VARIABLES.items()}
+    
     def set_led_status(self, status: bool) -> bool:
         """Setzt den LED Start/Stopp Status"""
         return self.write_output('"DB_Control".api_output', status)
@@ -302,37 +209,51 @@ class PLCJSONRPCInterface:
     
     def get_output_q0_status(self) -> Optional[bool]:
         """Liest den Status von Ausgang Q0"""
-        result = self.read_output("209")  # ID für Q0
+        result = self.read_output(Q0_ADDRESS)
         if result:
             # Result kann verschiedene Formate haben
-            if isinstance(result, dict):
-                return result.get("result", result.get("value"))
-            elif isinstance(result, bool):
-                return result
+            if isinstance(result, (dict, bool)):
+                return _read_value(result)
         return None
     
+    def execute_command(self, command) -> bool:
+        """
+        Führt einen Befehl an der SPS aus, ohne ihn zu speichern (Status setzt
+        der Aufrufer, z.B. die Warteschlange). Fehler je Variable in batch_errors.
+        """
+        self.batch_errors = {}
+        control_unit = command.control_unit
+        command_type = command.command_type
+        payload = command.payload
+        
+        # Verschiedene Command-Types verarbeiten
+        if command_type == 'set_led':
+            return self.set_led_status(payload.get('status', False))
+        if command_type == 'set_output':
+            return self.set_output_q0(payload.get('status', False))
+        if command_type == 'update_config':
+            # Konfiguration an SPS senden
+            return self._send_config_update(control_unit, payload)
+        if command_type == 'save_config':
+            # Parameter, danach nur die geänderten Einträge des Wochenprogramms
+            return self._send_config_update(control_unit, payload) and self._upload_schedule(control_unit)
+        if command_type == 'upload_schedule':
+            return self._upload_schedule(control_unit)
+        logger.warning(f"Unbekannter Command-Type: {command_type}")
+        return False
+    
     def send_command(self, command) -> bool:
-        """Sendet einen Befehl an die SPS"""
+        """Sendet einen Befehl synchron an die SPS und speichert das Ergebnis am Befehl"""
         try:
             control_unit = command.control_unit
-            command_type = command.command_type
-            payload = command.payload
-            
-            # Verschiedene Command-Types verarbeiten
-            if command_type == 'set_led':
-                success = self.set_led_status(payload.get('status', False))
-            elif command_type == 'set_output':
-                success = self.set_output_q0(payload.get('status', False))
-            elif command_type == 'update_config':
-                # Konfiguration an SPS senden
-                success = self._send_config_update(control_unit, payload)
-            else:
-                logger.warning(f"Unbekannter Command-Type: {command_type}")
-                success = False
+            success = self.execute_command(command)
             
             # Command-Status aktualisieren
             command.status = 'sent' if success else 'failed'
             command.sent_at = timezone.now()
+            if self.batch_errors:
+                command.plc_response = {'errors': self.batch_errors}
+                command.error_message = '; '.join(f"{var}: {error}" for var, error in self.batch_errors.items())
             command.save()
             
             # Status synchronisieren
@@ -349,55 +270,45 @@ class PLCJSONRPCInterface:
             return False
     
     def _send_config_update(self, control_unit, config_data) -> bool:
-        """Sendet eine Konfigurationsaktualisierung an die SPS"""
-        try:
-            # Beispiel: Schreibe verschiedene Parameter
-            if 'target_temperature' in config_data:
-                self.write_output('"DB_Control".target_temp', config_data['target_temperature'])
-            
-            if 'humidity_setpoint' in config_data:
-                self.write_output('"DB_Control".humidity_sp', config_data['humidity_setpoint'])
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"Config-Update fehlgeschlagen: {e}")
-            return False
+        """
+        Sendet die Parameter an die SPS - alle Variablen in einem Batch-Request.
+        Erfolgreich nur, wenn jede Variable geschrieben wurde.
+        """
+        values = config_variables(config_data.get('parameters', config_data))
+        
+        results = self.write_many(values)
+        if self.batch_errors:
+            logger.error(f"Config-Update unvollständig: {self.batch_errors}")
+        return all(results.values())
+    
+    def _upload_schedule(self, control_unit) -> bool:
+        """Kompiliert die Zeitpläne und schreibt nur die Änderungen des Wochenprogramms"""
+        from .schedule_compiler import upload_schedule
+        report = upload_schedule(control_unit, plc=self)
+        if report['errors']:
+            self.batch_errors = {'schedule': '; '.join(error['message'] for error in report['errors'])}
+        elif report['failed']:
+            self.batch_errors = report['failed']
+        logger.info(
+            f"Wochenprogramm {control_unit.name}: {len(report['changed'])} Variablen geändert, "
+            f"{'vollständig' if report['full_upload'] else 'Diff'}"
+        )
+        return report['uploaded']
     
     def _sync_status(self, control_unit):
-        """Synchronisiert den Status mit der SPS"""
+        """Markiert die Einheit nach erfolgreichem Befehl als online (nur geänderte Werte)"""
+        from .status_poller import mark_online
         try:
-            # Status-Objekt aktualisieren oder erstellen
-            from .models import ControlStatus
-            status, created = ControlStatus.objects.get_or_create(control_unit=control_unit)
-            
-            # Vorerst nur Online-Status setzen
-            status.is_online = True
-            status.last_update = timezone.now()
-            status.error_message = None
-            status.save()
-            
-            # Control Unit Status aktualisieren
-            control_unit.status = 'active'
-            control_unit.last_sync = timezone.now()
-            control_unit.save(update_fields=['status', 'last_sync'])
-            
+            mark_online(control_unit)
         except Exception as e:
             logger.error(f"Status-Sync fehlgeschlagen: {e}")
-            if hasattr(control_unit, 'current_status'):
-                control_unit.current_status.is_online = False
-                control_unit.current_status.error_message = str(e)
-                control_unit.current_status.save()
 
 
 # Cleanup-Funktion für Server-Shutdown
 def cleanup_keepalive_threads():
-    """Stoppt alle Keep-Alive Threads beim Server-Shutdown"""
-    logger.info(f"Stoppe {len(PLCJSONRPCInterface._keepalive_threads)} Keep-Alive Threads")
-    for unit_id, (thread, stop_event) in list(PLCJSONRPCInterface._keepalive_threads.items()):
-        stop_event.set()
-        thread.join(timeout=2)
-    PLCJSONRPCInterface._keepalive_threads.clear()
+    """Meldet alle SPS-Sitzungen des Prozesses ab und stoppt den Keep-Alive beim Server-Shutdown"""
+    closed = plc_pool.pool.close_all()
+    logger.info(f"{closed} SPS-Sitzungen geschlossen")
 
 
 # Mock Interface bleibt unverändert
@@ -412,6 +323,8 @@ class MockPLCInterface:
             'temperature': 22.5,
             'humidity': 65.0
         }
+        self._mock_variables = {}
+        self.batch_errors = {}
     
     def authenticate(self) -> str:
         """Mock-Authentifizierung"""
@@ -466,6 +379,40 @@ class MockPLCInterface:
         """Mock: Q0-Status lesen"""
         return self._mock_states['output_q0']
     
+    def write_many(self, values: Dict[str, Any]) -> Dict[str, bool]:
+        """Mock: mehrere Variablen schreiben"""
+        self.batch_errors = {}
+        self._mock_variables.update(values)
+        logger.info(f"Mock: {len(values)} Variablen geschrieben")
+        return {var_name: True for var_name in values}
+    
+    def read_many(self, addresses) -> Dict[str, Any]:
+        """Mock: mehrere Variablen lesen"""
+        self.batch_errors = {}
+        mock_values = {
+            Q0_ADDRESS: self._mock_states['output_q0'],
+            STATUS_VARIABLES['current_value']: self._mock_states['temperature'],
+            STATUS_VARIABLES['secondary_value']: self._mock_states['humidity'],
+        }
+        mock_values.update(self._mock_variables)
+        return {address: mock_values.get(address) for address in addresses}
+    
+    def read_status(self) -> Dict[str, Any]:
+        """Mock: Q0 und Messwerte lesen"""
+        values = self.read_many(STATUS_VARIABLES.values())
+        return {name: values[address] for name, address in STATUS_VARIABLES.items()}
+    
+    def execute_command(self, command) -> bool:
+        """Mock: Befehl ausführen"""
+        self.batch_errors = {}
+        logger.info(f"Mock: Befehl {command.command_type} ausgeführt")
+        if command.command_type in ('set_led', 'set_output'):
+            return self.set_led_status(command.payload.get('status', False))
+        if command.command_type in ('save_config', 'upload_schedule'):
+            from .schedule_compiler import upload_schedule
+            return upload_schedule(command.control_unit, plc=self)['uploaded']
+        return True
+    
     def send_command(self, command) -> bool:
         """Mock: Befehl senden"""
         logger.info(f"Mock: Befehl {command.command_type} empfangen")
@@ -0,0 +1,336 @@
+# backend/controller/plc_pool.py
+"""
+Prozessweiter Pool authentifizierter JSON-RPC Sitzungen zu den S7-1200 SPSen.
+
+Pro SPS-Endpunkt (API-URL + Benutzer) gibt es genau eine PLCSession:
+
+- ein requests.Session mit Keep-Alive - die TLS-Verbindung wird über alle
+  API-Aufrufe hinweg wiederverwendet statt je Aufruf neu aufgebaut
+- der Auth-Token liegt im Speicher; Api.Login nur beim ersten Aufruf, nach
+  Ablauf oder wenn die SPS den Token ablehnt (dann einmal neu anmelden und den
+  Aufruf wiederholen)
+- call_batch() packt mehrere Aufrufe als JSON-RPC Batch-Array in einen
+  HTTP-Request und ordnet Ergebnisse und Fehler je Aufruf wieder zu
+- ein Pool-Thread hält aktive Sitzungen per Api.Ping am Leben (die SPS beendet
+  Sitzungen nach ~2 Minuten Inaktivität) und schließt Sitzungen, die länger
+  als IDLE_TIMEOUT nicht benutzt wurden
+
+Mehrere Worker-Prozesse: Verbindungen gehören immer dem Prozess, der sie
+geöffnet hat (nach einem fork werden geerbte Sitzungen verworfen). Den Token
+teilen sich die Prozesse über ControlUnit.plc_auth_token - ein Prozess
+übernimmt einen noch gültigen Token aus der Datenbank statt sich erneut
+anzumelden. In die Datenbank geschrieben wird nur nach einem Login.
+"""
+import itertools
+import logging
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+REQUEST_TIMEOUT = getattr(settings, 'PLC_REQUEST_TIMEOUT', 10)
+# Api.Ping nach ... Sekunden ohne Aufruf (SPS-Sitzung läuft nach 2 Min ab)
+KEEPALIVE_INTERVAL = getattr(settings, 'PLC_KEEPALIVE_INTERVAL', 90)
+# Sitzungen ohne Aufruf seit ... Sekunden werden abgemeldet und geschlossen
+IDLE_TIMEOUT = getattr(settings, 'PLC_SESSION_IDLE_TIMEOUT', 30 * 60)
+# Token so viele Sekunden vor Ablauf erneuern
+TOKEN_MARGIN = 30
+# Höchstens so viele Aufrufe je Batch-Request
+MAX_BATCH_SIZE = getattr(settings, 'PLC_MAX_BATCH_SIZE', 50)
+
+UNAUTHORIZED = -32604
+DEFAULT_RUNTIME_TIMEOUT = 30
+
+
+class PLCError(Exception):
+    """Fehlerantwort der SPS (JSON-RPC error) bzw. Kommunikationsfehler."""
+
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def parse_runtime_timeout(raw):
+    """runtime_timeout aus Api.Login in Minuten (String, Int oder ISO 8601 Duration wie "PT30M")."""
+    if isinstance(raw, str) and raw.startswith("PT"):
+        match = re.match(r'PT(\d+)([HM])', raw)
+        if match:
+            value = int(match.group(1))
+            return value * 60 if match.group(2) == 'H' else value
+        logger.warning(f"Konnte ISO 8601 duration nicht parsen: {raw}, verwende Standard {DEFAULT_RUNTIME_TIMEOUT}")
+        return DEFAULT_RUNTIME_TIMEOUT
+    try:
+        return int(raw)
+    except (ValueError, TypeError):
+        logger.warning(f"Konnte runtime_timeout nicht parsen: {raw}, verwende Standard {DEFAULT_RUNTIME_TIMEOUT}")
+        return DEFAULT_RUNTIME_TIMEOUT
+
+
+class PLCSession:
+    """Eine authentifizierte Keep-Alive-Verbindung zu einem SPS-Endpunkt."""
+
+    def __init__(self, base_url, username, password, control_unit_id=None):
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.control_unit_id = control_unit_id
+        self.token = None
+        self.token_expires = None
+        self.last_used = time.monotonic()
+        self.last_request = self.last_used
+        self._ids = itertools.count(1)
+        # Ein Aufruf gleichzeitig je SPS (die S7-1200 verarbeitet seriell)
+        self._lock = threading.RLock()
+
+        self.http = requests.Session()
+        self.http.verify = False  # Selbstsignierte Zertifikate der SPS
+        self.http.headers['Content-Type'] = 'application/json'
+        self.http.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.http.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+
+    # --- Token ---------------------------------------------------------------
+
+    def token_valid(self):
+        return bool(self.token) and self.token_expires is not None and (
+            self.token_expires - timedelta(seconds=TOKEN_MARGIN) > timezone.now()
+        )
+
+    def adopt_token(self, token, expires):
+        """Token eines anderen Prozesses übernehmen (aus ControlUnit), falls noch gültig."""
+        with self._lock:
+            if token and not self.token_valid() and expires and expires > timezone.now():
+                self.token, self.token_expires = token, expires
+
+    def login(self):
+        """Api.Login - speichert den Token im Speicher und (einmalig) an der ControlUnit."""
+        with self._lock:
+            logger.info(f"Authentifiziere bei {self.base_url} mit Benutzer: {self.username}")
+            result = self._post("Api.Login", {"user": self.username, "password": self.password})
+            if "token" not in result:
+                raise PLCError("Keine Token-Antwort von SPS")
+            minutes = parse_runtime_timeout(result.get("runtime_timeout", "PT30M"))
+            self.token = result["token"]
+            self.token_expires = timezone.now() + timedelta(minutes=minutes)
+            self._store_token()
+            logger.info(f"Erfolgreich authentifiziert. Token gültig für {minutes} Minuten")
+            return self.token
+
+    def ensure_token(self):
+        with self._lock:
+            if not self.token_valid():
+                self.login()
+            return self.token
+
+    def clear_token(self):
+        with self._lock:
+            self.token = self.token_expires = None
+
+    def _store_token(self):
+        if self.control_unit_id is None:
+            return
+        from .models import ControlUnit
+        # update() statt save() - überschreibt keine anderen Felder der Unit
+        ControlUnit.objects.filter(pk=self.control_unit_id).update(
+            plc_auth_token=self.token, plc_token_expires=self.token_expires
+        )
+
+    # --- Aufrufe -------------------------------------------------------------
+
+    def _request(self, method, params=None):
+        request = {"jsonrpc": "2.0", "id": next(self._ids), "method": method}
+        if params:
+            request["params"] = params
+        return request
+
+    def _send(self, payload, token=None):
+        headers = {"X-Auth-Token": token} if token else None
+        try:
+            response = self.http.post(self.base_url, json=payload, headers=headers, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.error(f"Request an {self.base_url} fehlgeschlagen: {e}")
+            raise PLCError(f"Kommunikationsfehler mit SPS: {e}")
+        self.last_request = time.monotonic()
+        return data
+
+    @staticmethod
+    def _error(error):
+        logger.error(f"JSON-RPC Error: {error}")
+        return PLCError(f"PLC Error: {error.get('message', 'Unknown error')}", error.get('code'))
+
+    def _post(self, method, params=None, token=None):
+        result = self._send(self._request(method, params), token)
+        if "error" in result:
+            raise self._error(result["error"])
+        return result.get("result", {})
+
+    def _post_batch(self, calls, token):
+        """Ein HTTP-Request mit allen Aufrufen; Antworten werden über die id zugeordnet."""
+        batch = [self._request(method, params) for method, params in calls]
+        data = self._send(batch, token)
+        if isinstance(data, dict):
+            # Fehler für den ganzen Batch (z.B. ungültiger Token, Parse error)
+            error = self._error(data.get("error") or {"message": "Ungültige Batch-Antwort"})
+            if error.code != UNAUTHORIZED:
+                raise error
+            return [error] * len(calls)
+
+        responses = {entry.get("id"): entry for entry in data if isinstance(entry, dict)}
+        results = []
+        for request in batch:
+            entry = responses.get(request["id"])
+            if entry is None:
+                results.append(PLCError(f"Keine Antwort der SPS auf {request['method']}"))
+            elif "error" in entry:
+                results.append(self._error(entry["error"]))
+            else:
+                results.append(entry.get("result", {}))
+        return results
+
+    def call(self, method, params=None, use_auth=True):
+        """
+        Ein JSON-RPC Aufruf. Lehnt die SPS den Token ab, wird einmal neu
+        angemeldet und der Aufruf wiederholt.
+        """
+        with self._lock:
+            self.last_used = time.monotonic()
+            if not use_auth:
+                return self._post(method, params)
+            token = self.ensure_token()
+            try:
+                return self._post(method, params, token)
+            except PLCError as e:
+                if e.code != UNAUTHORIZED:
+                    raise
+                logger.info("Token von SPS abgelehnt, melde neu an...")
+                self.clear_token()
+                return self._post(method, params, self.login())
+
+    def call_batch(self, calls):
+        """
+        Mehrere Aufrufe [(method, params), ...] als JSON-RPC Batch (ein HTTP-Request
+        je MAX_BATCH_SIZE Aufrufe). Gibt je Aufruf das Ergebnis oder einen PLCError
+        zurück, in derselben Reihenfolge. Kommunikationsfehler lösen PLCError aus.
+        """
+        calls = list(calls)
+        with self._lock:
+            self.last_used = time.monotonic()
+            results = []
+            for start in range(0, len(calls), MAX_BATCH_SIZE):
+                chunk = calls[start:start + MAX_BATCH_SIZE]
+                chunk_results = self._post_batch(chunk, self.ensure_token())
+                if any(isinstance(result, PLCError) and result.code == UNAUTHORIZED for result in chunk_results):
+                    # Schreiben und Lesen sind idempotent - ganzen Batch wiederholen
+                    logger.info("Token von SPS abgelehnt, melde neu an...")
+                    self.clear_token()
+                    chunk_results = self._post_batch(chunk, self.login())
+                results.extend(chunk_results)
+            return results
+
+    def ping(self):
+        with self._lock:
+            if self.token_valid():
+                self._post("Api.Ping", token=self.token)
+
+    def close(self):
+        with self._lock:
+            if self.token_valid():
+                try:
+                    self._post("Api.Logout", token=self.token)
+                except PLCError:
+                    pass
+            self.clear_token()
+            self.http.close()
+
+
+class PLCSessionPool:
+    """Hält je SPS-Endpunkt eine PLCSession im aktuellen Prozess."""
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _check_process(self):
+        # Nach fork (z.B. gunicorn --preload): geerbte Sockets und Threads nicht weiterverwenden
+        if self._pid != os.getpid():
+            self._sessions = {}
+            self._lock = threading.Lock()
+            self._stop = threading.Event()
+            self._thread = None
+            self._pid = os.getpid()
+
+    def get(self, base_url, username, password, control_unit=None):
+        self._check_process()
+        key = (base_url, username)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None or session.password != password:
+                if session is not None:
+                    session.close()
+                session = PLCSession(base_url, username, password, getattr(control_unit, 'pk', None))
+                self._sessions[key] = session
+            self._ensure_thread()
+        if control_unit is not None:
+            session.adopt_token(control_unit.plc_auth_token, control_unit.plc_token_expires)
+        return session
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._maintain, name='plc-session-pool', daemon=True)
+            self._thread.start()
+
+    def _maintain(self):
+        """Keep-Alive für aktive Sitzungen, Schließen untätiger Sitzungen."""
+        check_interval = max(1, min(KEEPALIVE_INTERVAL, IDLE_TIMEOUT) // 3)
+        while not self._stop.wait(check_interval):
+            now = time.monotonic()
+            for key, session in list(self._sessions.items()):
+                if now - session.last_used > IDLE_TIMEOUT:
+                    with self._lock:
+                        if self._sessions.get(key) is session:
+                            del self._sessions[key]
+                    logger.info(f"Schließe untätige SPS-Sitzung {session.base_url}")
+                    session.close()
+                elif now - session.last_request > KEEPALIVE_INTERVAL:
+                    try:
+                        session.ping()
+                    except PLCError as e:
+                        # Nächster Aufruf meldet sich neu an
+                        logger.warning(f"Keep-Alive Ping an {session.base_url} fehlgeschlagen: {e}")
+                        session.clear_token()
+            with self._lock:
+                if not self._sessions:
+                    self._thread = None
+                    return
+
+    def close_all(self):
+        """Alle Sitzungen abmelden und schließen (Server-Shutdown)."""
+        self._stop.set()
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            session.close()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+        return len(sessions)
+
+
+pool = PLCSessionPool()
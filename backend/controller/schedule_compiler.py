@@ -0,0 +1,316 @@
+# backend/controller/schedule_compiler.py
+"""
+Übersetzt die Zeitpläne (ControlSchedule) einer Einheit in ein kompaktes
+Wochenprogramm, das die SPS selbstständig abarbeitet.
+
+Kompilieren:
+- jeder aktive Zeitplan wird zu Intervallen in Minuten ab Montag 00:00
+  (Ende vor Beginn = über Mitternacht, Sonntag läuft in den Montag über)
+- überlappende Zeitpläne mit gleichen Werten werden zusammengeführt, mit
+  unterschiedlichen Werten als Konflikt gemeldet (kein Upload)
+- das Ergebnis ist eine lückenlose Wochentabelle ab Minute 0: jeder Eintrag
+  gilt von start bis zum start des nächsten, Lücken sind inaktive Einträge
+
+Abbild in der SPS ("DB_Schedule"): slots[i].start/active/target/secondary
+(+ numerische JSON-Parameter als slots[i].<key>), count und version.
+
+Upload: das Abbild wird mit dem zuletzt geladenen (ControlScheduleImage)
+verglichen und nur geänderte Variablen per Batch geschrieben. version (eine
+Prüfsumme) wird erst danach gesetzt - stimmt sie in der SPS nicht mit dem
+gespeicherten Stand überein (Neustart, fremde Änderung), wird alles geschrieben.
+
+Trockenlauf: SimulatedPLC hält das Abbild im Speicher und wertet es wie das
+SPS-Programm aus (setpoint_at) - für Vorschau und check_schedule_compiler.
+"""
+import json
+import re
+import zlib
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ControlSchedule, ControlScheduleImage
+
+SCHEDULE_DB = '"DB_Schedule"'
+MAX_SCHEDULE_SLOTS = getattr(settings, 'PLC_MAX_SCHEDULE_SLOTS', 64)
+COUNT_VARIABLE = f'{SCHEDULE_DB}.count'
+VERSION_VARIABLE = f'{SCHEDULE_DB}.version'
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = dict(ControlSchedule.WEEKDAY_CHOICES)
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# JSON-Parameter werden Teil des Variablennamens
+PARAMETER_KEY = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+RESERVED_KEYS = ('start', 'active', 'target', 'secondary')
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def format_minute(minute):
+    """Minute der Woche als (Wochentag, "HH:MM")"""
+    day, rest = divmod(minute % MINUTES_PER_WEEK, MINUTES_PER_DAY)
+    return day, f"{rest // 60:02d}:{rest % 60:02d}"
+
+
+def slot_variable(index, name):
+    return f'{SCHEDULE_DB}.slots[{index}].{name}'
+
+
+class CompiledSchedule:
+    """Ergebnis des Kompilierens: Wochentabelle, Fehler und das SPS-Abbild."""
+
+    def __init__(self, timetable, errors):
+        self.timetable = timetable
+        self.errors = errors
+        self.variables = image_variables(timetable) if not errors else {}
+        self.version = image_version(self.variables) if not errors else None
+
+    @property
+    def valid(self):
+        return not self.errors
+
+    def as_dict(self):
+        return {
+            'valid': self.valid,
+            'errors': self.errors,
+            'version': self.version,
+            'slot_count': len(self.timetable),
+            'timetable': self.timetable,
+        }
+
+
+def _schedule_key(schedule, errors):
+    """Werte eines Zeitplans (gleiche Werte dürfen sich überlappen)."""
+    parameters = {}
+    for key, value in (schedule.parameters or {}).items():
+        if not PARAMETER_KEY.match(str(key)) or key in RESERVED_KEYS:
+            errors.append({'type': 'parameter', 'schedules': [schedule.pk],
+                           'message': f"Ungültiger Parametername '{key}'"})
+        elif isinstance(value, bool):
+            parameters[key] = value
+        elif isinstance(value, (int, float)):
+            parameters[key] = float(value)
+        else:
+            errors.append({'type': 'parameter', 'schedules': [schedule.pk],
+                           'message': f"Parameter '{key}' ist nicht numerisch"})
+    secondary = float(schedule.secondary_value) if schedule.secondary_value is not None else None
+    return (float(schedule.target_value), secondary, tuple(sorted(parameters.items())))
+
+
+def _intervals(schedule, errors):
+    """[(start, ende)] in Minuten der Woche; über das Wochenende hinaus wird geteilt."""
+    start = schedule.weekday * MINUTES_PER_DAY + _minutes(schedule.start_time)
+    length = (_minutes(schedule.end_time) - _minutes(schedule.start_time)) % MINUTES_PER_DAY
+    if length == 0:
+        errors.append({'type': 'empty', 'schedules': [schedule.pk],
+                       'message': f"Beginn und Ende gleich ({schedule.start_time:%H:%M})"})
+        return []
+    end = start + length
+    if end <= MINUTES_PER_WEEK:
+        return [(start, end)]
+    return [(start, MINUTES_PER_WEEK), (0, end - MINUTES_PER_WEEK)]
+
+
+def compile_schedules(schedules):
+    """Aktive Zeitpläne -> CompiledSchedule (lückenlose Wochentabelle)."""
+    errors = []
+    intervals = []
+    for schedule in schedules:
+        if not schedule.is_active:
+            continue
+        key = _schedule_key(schedule, errors)
+        for start, end in _intervals(schedule, errors):
+            intervals.append((start, end, key, schedule.pk))
+
+    points = sorted({0, MINUTES_PER_WEEK} | {start for start, *_ in intervals} | {end for _, end, *_ in intervals})
+    segments = []
+    for start, end in zip(points, points[1:]):
+        covering = [(key, pk) for a, b, key, pk in intervals if a <= start and b >= end]
+        keys = {key for key, _ in covering}
+        ids = sorted({pk for _, pk in covering if pk is not None})
+        if len(keys) > 1:
+            previous = errors[-1] if errors else None
+            if previous and previous.get('type') == 'conflict' and previous['end'] == start and previous['schedules'] == ids:
+                previous['end'] = end
+            else:
+                errors.append({'type': 'conflict', 'start': start, 'end': end, 'schedules': ids})
+            continue
+        key = next(iter(keys), None)
+        if segments and segments[-1]['key'] == key and segments[-1]['end'] == start:
+            segments[-1]['end'] = end
+            segments[-1]['schedules'] = sorted(set(segments[-1]['schedules']) | set(ids))
+        else:
+            segments.append({'start': start, 'end': end, 'key': key, 'schedules': ids})
+
+    for error in errors:
+        if error['type'] == 'conflict':
+            day, since = format_minute(error['start'])
+            _, until = format_minute(error['end'])
+            error['message'] = (
+                f"Überlappende Zeitpläne mit unterschiedlichen Werten ({WEEKDAYS[day]} {since}-{until})"
+            )
+
+    timetable = [_entry(segment) for segment in segments]
+    if len(timetable) > MAX_SCHEDULE_SLOTS:
+        errors.append({'type': 'capacity', 'schedules': [],
+                       'message': f"{len(timetable)} Einträge, die SPS fasst {MAX_SCHEDULE_SLOTS}"})
+    return CompiledSchedule(timetable, errors)
+
+
+def _entry(segment):
+    weekday, time_label = format_minute(segment['start'])
+    key = segment['key']
+    target, secondary, parameters = key if key is not None else (0.0, None, ())
+    return {
+        'start': segment['start'],
+        'weekday': weekday,
+        'time': time_label,
+        'active': key is not None,
+        'target': target,
+        'secondary': secondary if secondary is not None else 0.0,
+        'parameters': dict(parameters),
+        'schedules': segment['schedules'],
+    }
+
+
+def image_variables(timetable):
+    """Wochentabelle -> {SPS-Variable: Wert}. Jeder Slot erhält alle Parameter (Standard 0)."""
+    parameter_keys = sorted({key for entry in timetable for key in entry['parameters']})
+    values = {}
+    for index, entry in enumerate(timetable):
+        values[slot_variable(index, 'start')] = entry['start']
+        values[slot_variable(index, 'active')] = entry['active']
+        values[slot_variable(index, 'target')] = entry['target']
+        values[slot_variable(index, 'secondary')] = entry['secondary']
+        for key in parameter_keys:
+            values[slot_variable(index, key)] = entry['parameters'].get(key, 0.0)
+    values[COUNT_VARIABLE] = len(timetable)
+    return values
+
+
+def image_version(variables):
+    """Prüfsumme des Abbilds (passt in ein DInt der SPS)."""
+    return zlib.crc32(json.dumps(variables, sort_keys=True).encode()) & 0x7FFFFFFF
+
+
+def diff_image(previous, variables):
+    """Variablen, die sich gegenüber dem geladenen Abbild geändert haben."""
+    return {
+        name: value for name, value in variables.items()
+        if name not in previous or previous[name] != value or type(previous[name]) is not type(value)
+    }
+
+
+# --- Upload --------------------------------------------------------------
+
+def push_image(plc, compiled, previous=None, stored_version=None):
+    """
+    Schreibt die Änderungen des Abbilds in die SPS (plc: PLCJSONRPCInterface,
+    MockPLCInterface oder SimulatedPLC). Gibt ein Dict mit changed, failed,
+    full_upload und uploaded zurück.
+    """
+    previous = previous or {}
+    plc_version = plc.read_many([VERSION_VARIABLE]).get(VERSION_VARIABLE)
+    full_upload = stored_version is None or plc_version != stored_version
+    if full_upload:
+        # SPS-Stand unbekannt - nichts voraussetzen
+        previous = {}
+
+    changed = diff_image(previous, compiled.variables)
+    failed = {}
+    if changed:
+        results = plc.write_many(changed)
+        failed = {name: plc.batch_errors.get(name, 'Nicht geschrieben') for name, ok in results.items() if not ok}
+    if not failed and plc_version != compiled.version:
+        # Version zuletzt - erst dann gilt das Programm in der SPS als vollständig
+        if not plc.write_many({VERSION_VARIABLE: compiled.version}).get(VERSION_VARIABLE):
+            failed[VERSION_VARIABLE] = plc.batch_errors.get(VERSION_VARIABLE, 'Nicht geschrieben')
+
+    return {
+        'changed': changed,
+        'failed': failed,
+        'full_upload': full_upload,
+        'uploaded': not failed,
+    }
+
+
+def upload_schedule(control_unit, plc=None, dry_run=False, schedules=None):
+    """
+    Kompiliert die Zeitpläne der Einheit und lädt nur die Änderungen in die SPS.
+    dry_run: gegen eine SimulatedPLC mit dem gespeicherten Abbild, ohne zu speichern.
+    """
+    from .plc_interface import get_plc_interface
+
+    compiled = compile_schedules(control_unit.schedules.all() if schedules is None else schedules)
+    report = {**compiled.as_dict(), 'dry_run': dry_run, 'uploaded': False,
+              'changed': {}, 'failed': {}, 'full_upload': False}
+    if not compiled.valid:
+        return report
+
+    image = ControlScheduleImage.objects.filter(control_unit=control_unit).first()
+    previous = image.variables if image else {}
+    stored_version = image.version if image else None
+    if dry_run:
+        plc = SimulatedPLC(previous, version=stored_version)
+    elif plc is None:
+        plc = get_plc_interface(control_unit)
+
+    report.update(push_image(plc, compiled, previous, stored_version))
+    if dry_run:
+        return report
+
+    # Nicht geschriebene Variablen nicht speichern - sie gehen beim nächsten Upload erneut mit
+    stored = {name: value for name, value in compiled.variables.items() if name not in report['failed']}
+    defaults = {'variables': stored, 'version': compiled.version if report['uploaded'] else None}
+    if report['uploaded']:
+        defaults.update(timetable=compiled.timetable, uploaded_at=timezone.now())
+    ControlScheduleImage.objects.update_or_create(control_unit=control_unit, defaults=defaults)
+    return report
+
+
+class SimulatedPLC:
+    """
+    SPS im Speicher für Trockenläufe und Prüfungen: gleiche Batch-Schnittstelle
+    wie PLCJSONRPCInterface, dazu die Auswertung des Wochenprogramms.
+    """
+
+    def __init__(self, variables=None, version=None):
+        self.variables = dict(variables or {})
+        if version is not None:
+            self.variables[VERSION_VARIABLE] = version
+        # Variablen, deren Schreiben fehlschlägt (Fehlersimulation)
+        self.failing = set()
+        self.batch_errors = {}
+        self.requests = []
+
+    def write_many(self, values):
+        self.requests.append(('write', list(values)))
+        self.batch_errors = {name: 'Simulierter Schreibfehler' for name in values if name in self.failing}
+        for name, value in values.items():
+            if name not in self.failing:
+                self.variables[name] = value
+        return {name: name not in self.failing for name in values}
+
+    def read_many(self, addresses):
+        addresses = list(addresses)
+        self.requests.append(('read', addresses))
+        self.batch_errors = {}
+        return {address: self.variables.get(address) for address in addresses}
+
+    def setpoint_at(self, minute):
+        """Sollwerte zur Minute der Woche wie im SPS-Programm (None = kein aktiver Eintrag)."""
+        current = None
+        for index in range(self.variables.get(COUNT_VARIABLE, 0)):
+            start = self.variables.get(slot_variable(index, 'start'))
+            if start is None or start > minute % MINUTES_PER_WEEK:
+                break
+            current = index
+        if current is None or not self.variables.get(slot_variable(current, 'active')):
+            return None
+        return {
+            'target': self.variables.get(slot_variable(current, 'target')),
+            'secondary': self.variables.get(slot_variable(current, 'secondary')),
+        }
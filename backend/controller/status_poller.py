@@ -0,0 +1,349 @@
+# backend/controller/status_poller.py
+"""
+Status-Poller für die Steuerungseinheiten.
+
+Ein asyncio-Eventloop in einem Hintergrund-Thread führt je Steuerungseinheit
+(= SPS-Verbindung) eine eigene Poll-Schleife: alle POLL_INTERVAL Sekunden
+werden Q0 und die Messwerte (STATUS_VARIABLES) in einem JSON-RPC Batch über
+die gemeinsame PLCSession gelesen. Der blockierende Teil (HTTP, ORM) läuft
+per asyncio.to_thread, eine langsame SPS verzögert die anderen also nicht.
+
+Geschrieben wird nur bei Änderungen:
+- ControlStatus nur, wenn sich ein Wert, Online-Status oder Fehler ändert;
+  last_polled_at ohne Änderung höchstens alle FRESHNESS_WRITE_SECONDS
+- ControlMeasurement (Zeitreihe) bei geänderten Messwerten oder spätestens
+  alle SAMPLE_HEARTBEAT_SECONDS als Lebenszeichen
+
+Dashboards lesen den Status aus der Datenbank (GET /controller/status/) statt
+selbst die SPS abzufragen. Aktualität und Verzögerung je Einheit liefert
+poller_metrics() (GET /controller/status/poller/).
+"""
+import asyncio
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import ControlMeasurement, ControlStatus, ControlUnit
+
+POLL_INTERVAL = getattr(settings, 'PLC_POLL_INTERVAL', 10)
+# Wie oft die Liste der Einheiten neu gelesen wird (neue / gelöschte Einheiten)
+UNIT_REFRESH_SECONDS = 60
+FRESHNESS_WRITE_SECONDS = 60
+SAMPLE_HEARTBEAT_SECONDS = getattr(settings, 'PLC_SAMPLE_HEARTBEAT', 300)
+# Nachkommastellen, ab denen eine Messwertänderung zählt
+VALUE_PRECISION = getattr(settings, 'PLC_VALUE_PRECISION', 2)
+RETENTION_DAYS = getattr(settings, 'PLC_MEASUREMENT_RETENTION_DAYS', 90)
+PRUNE_INTERVAL_SECONDS = 3600
+
+MEASURED_FIELDS = ('current_value', 'secondary_value', 'output_q0_status')
+
+
+def _round(value):
+    if isinstance(value, bool) or value is None:
+        return value
+    try:
+        return round(float(value), VALUE_PRECISION)
+    except (TypeError, ValueError):
+        return None
+
+
+def pollable_units():
+    """IDs der Einheiten mit SPS-Adresse (außer in Wartung)."""
+    return list(
+        ControlUnit.objects.exclude(plc_address__isnull=True).exclude(plc_address='')
+        .exclude(status='maintenance').values_list('id', flat=True)
+    )
+
+
+def _status_values(values, errors):
+    """Gelesene Werte -> Felder des ControlStatus (None-Werte bleiben unverändert)."""
+    q0 = values.get('output_q0')
+    online = any(value is not None for value in values.values())
+    fields = {
+        'is_online': online,
+        'error_message': None if online else (next(iter(errors.values()), None) or 'Keine Antwort von SPS'),
+    }
+    if q0 is not None:
+        fields['output_q0_status'] = fields['led_status'] = bool(q0)
+    for name in ('current_value', 'secondary_value'):
+        value = _round(values.get(name))
+        if value is not None:
+            fields[name] = value
+    return fields
+
+
+def record_status(control_unit_id, values, errors=None, now=None, last_sample_at=None):
+    """
+    Übernimmt ein Abfrageergebnis. Schreibt ControlStatus nur bei Änderung
+    (bzw. die Aktualität grob) und hängt bei Bedarf einen Messwert an.
+    Gibt {'changed': [Felder], 'sampled': bool, 'online': bool} zurück.
+    """
+    now = now or timezone.now()
+    status = ControlStatus.objects.filter(control_unit_id=control_unit_id).first()
+    if status is None:
+        status = ControlStatus.objects.create(control_unit_id=control_unit_id)
+
+    fields = _status_values(values, errors or {})
+    changed = {name: value for name, value in fields.items() if getattr(status, name) != value}
+
+    freshness_due = status.last_polled_at is None or (
+        now - status.last_polled_at >= timedelta(seconds=FRESHNESS_WRITE_SECONDS)
+    )
+    if changed:
+        ControlStatus.objects.filter(pk=status.pk).update(last_update=now, last_polled_at=now, **changed)
+    elif freshness_due:
+        ControlStatus.objects.filter(pk=status.pk).update(last_polled_at=now)
+    if fields['is_online'] and (changed or freshness_due):
+        ControlUnit.objects.filter(pk=control_unit_id).update(last_sync=now)
+
+    sampled = False
+    if fields['is_online']:
+        measured_changed = any(name in changed for name in MEASURED_FIELDS)
+        heartbeat_due = last_sample_at is None or now - last_sample_at >= timedelta(seconds=SAMPLE_HEARTBEAT_SECONDS)
+        if measured_changed or heartbeat_due:
+            ControlMeasurement.objects.create(
+                control_unit_id=control_unit_id,
+                recorded_at=now,
+                current_value=fields.get('current_value', status.current_value),
+                secondary_value=fields.get('secondary_value', status.secondary_value),
+                output_q0=fields.get('output_q0_status'),
+            )
+            sampled = True
+
+    return {'changed': sorted(changed), 'sampled': sampled, 'online': fields['is_online']}
+
+
+def mark_online(control_unit):
+    """Nach einem bestätigten Befehl: online markieren, ohne unveränderte Zeilen zu schreiben."""
+    now = timezone.now()
+    updated = ControlStatus.objects.filter(control_unit=control_unit).exclude(
+        is_online=True, error_message__isnull=True
+    ).update(is_online=True, error_message=None, last_update=now)
+    if not updated:
+        ControlStatus.objects.get_or_create(control_unit=control_unit, defaults={'is_online': True})
+    ControlUnit.objects.filter(pk=control_unit.pk).update(status='active', last_sync=now)
+
+
+def latest_sample_at(control_unit_id):
+    """Zeitpunkt des letzten gespeicherten Messwerts (für Abfragen außerhalb des Pollers)."""
+    return ControlMeasurement.objects.filter(control_unit_id=control_unit_id).order_by(
+        '-recorded_at'
+    ).values_list('recorded_at', flat=True).first()
+
+
+def poll_once(control_unit_id, last_sample_at=None):
+    """Eine Abfrage einer Einheit: Batch-Read und änderungsbasiertes Speichern (blockierend)."""
+    from .plc_interface import get_plc_interface
+
+    control_unit = ControlUnit.objects.get(pk=control_unit_id)
+    plc = get_plc_interface(control_unit)
+    try:
+        values = plc.read_status()
+        errors = dict(plc.batch_errors)
+    except Exception as e:
+        values, errors = {}, {'exception': f"{type(e).__name__}: {e}"}
+    return record_status(control_unit_id, values, errors, last_sample_at=last_sample_at)
+
+
+def prune_measurements(retention_days=RETENTION_DAYS):
+    """Löscht Messwerte, die älter als die Aufbewahrungsdauer sind."""
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    deleted, _ = ControlMeasurement.objects.filter(recorded_at__lt=cutoff).delete()
+    return deleted
+
+
+# --- Poller --------------------------------------------------------------
+
+class StatusPoller:
+    """asyncio-Eventloop (eigener Thread) mit einer Poll-Schleife je Steuerungseinheit."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.metrics = {}
+        self.started_at = None
+        self._thread = None
+        self._loop = None
+        self._stop = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return self
+        self._thread = threading.Thread(target=self.run, name='plc-status-poller', daemon=True)
+        self._thread.start()
+        return self
+
+    def run(self):
+        """Blockiert bis stop() (Thread des Pollers oder Management-Command)."""
+        asyncio.run(self._main())
+
+    def stop(self):
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def _sleep(self, seconds):
+        """Wartet bis zu seconds Sekunden; True, wenn der Poller gestoppt wurde."""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=max(seconds, 0))
+        except asyncio.TimeoutError:
+            pass
+        return self._stop.is_set()
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        self.started_at = timezone.now()
+        print(f"🚀 SPS-Status-Poller gestartet (Intervall {self.interval}s)")
+        tasks = {}
+        last_prune = None
+        try:
+            while True:
+                try:
+                    unit_ids = set(await asyncio.to_thread(self._pollable_units))
+                except Exception as e:
+                    print(f"❌ Fehler beim Laden der Steuerungseinheiten: {str(e)}")
+                    unit_ids = set(tasks)
+                for unit_id in unit_ids - set(tasks):
+                    tasks[unit_id] = asyncio.create_task(self._poll_unit(unit_id), name=f"poll-{unit_id}")
+                for unit_id in set(tasks) - unit_ids:
+                    tasks.pop(unit_id).cancel()
+                    self.metrics.pop(unit_id, None)
+
+                if last_prune is None or time.monotonic() - last_prune >= PRUNE_INTERVAL_SECONDS:
+                    last_prune = time.monotonic()
+                    try:
+                        await asyncio.to_thread(self._prune)
+                    except Exception as e:
+                        print(f"❌ Fehler beim Aufräumen der Messwerte: {str(e)}")
+
+                if await self._sleep(UNIT_REFRESH_SECONDS):
+                    break
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            print("🛑 SPS-Status-Poller beendet")
+
+    @staticmethod
+    def _pollable_units():
+        try:
+            return pollable_units()
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _poll(unit_id, last_sample_at):
+        close_old_connections()
+        try:
+            return poll_once(unit_id, last_sample_at)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _prune():
+        try:
+            return prune_measurements()
+        finally:
+            close_old_connections()
+
+    async def _poll_unit(self, unit_id):
+        loop = asyncio.get_running_loop()
+        metrics = self.metrics.setdefault(unit_id, {
+            'polls': 0, 'failures': 0, 'consecutive_failures': 0, 'changes': 0, 'samples': 0,
+            'last_poll_at': None, 'last_success_at': None, 'last_change_at': None,
+            'last_sample_at': None, 'last_lag_ms': None, 'last_duration_ms': None,
+            'max_lag_ms': 0, 'last_error': None,
+        })
+        scheduled = loop.time()
+        while True:
+            if await self._sleep(scheduled - loop.time()):
+                return
+            started = loop.time()
+            try:
+                result = await asyncio.to_thread(self._poll, unit_id, metrics['last_sample_at'])
+                error = None if result['online'] else 'SPS nicht erreichbar'
+            except Exception as e:
+                result, error = None, f"{type(e).__name__}: {e}"
+
+            now = timezone.now()
+            lag_ms = round((started - scheduled) * 1000)
+            metrics['polls'] += 1
+            metrics['last_poll_at'] = now
+            metrics['last_lag_ms'] = lag_ms
+            metrics['max_lag_ms'] = max(metrics['max_lag_ms'], lag_ms)
+            metrics['last_duration_ms'] = round((loop.time() - started) * 1000)
+            if error is None:
+                metrics['consecutive_failures'] = 0
+                metrics['last_success_at'] = now
+                metrics['last_error'] = None
+            else:
+                metrics['failures'] += 1
+                metrics['consecutive_failures'] += 1
+                metrics['last_error'] = error
+            if result and result['changed']:
+                metrics['changes'] += 1
+                metrics['last_change_at'] = now
+            if result and result['sampled']:
+                metrics['samples'] += 1
+                metrics['last_sample_at'] = now
+
+            # Nächster Termin im festen Raster; nach einer Überschreitung nicht nachholen
+            scheduled = max(scheduled + self.interval, loop.time())
+
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+
+def poller_metrics():
+    """
+    Aktualität je Einheit aus der Datenbank (gilt für alle Prozesse) und - falls
+    der Poller in diesem Prozess läuft - Verzögerung und Zähler der Poll-Schleifen.
+    """
+    now = timezone.now()
+    running = _poller is not None and _poller.is_running()
+    live = _poller.metrics if running else {}
+    units = []
+    statuses = ControlStatus.objects.select_related('control_unit').filter(control_unit_id__in=pollable_units())
+    for status in statuses:
+        entry = {
+            'control_unit': str(status.control_unit_id),
+            'name': status.control_unit.name,
+            'is_online': status.is_online,
+            'last_polled_at': _iso(status.last_polled_at),
+            'age_seconds': round((now - status.last_polled_at).total_seconds(), 1) if status.last_polled_at else None,
+            'last_change_at': _iso(status.last_update),
+            'stale': status.last_polled_at is None or (
+                now - status.last_polled_at > timedelta(seconds=POLL_INTERVAL * 3 + FRESHNESS_WRITE_SECONDS)
+            ),
+        }
+        metrics = live.get(status.control_unit_id)
+        if metrics:
+            entry['poller'] = {
+                key: _iso(value) if key.endswith('_at') else value for key, value in metrics.items()
+            }
+        units.append(entry)
+    return {
+        'running': running,
+        'interval_seconds': POLL_INTERVAL,
+        'started_at': _iso(_poller.started_at) if running else None,
+        'units': units,
+    }
+
+
+_poller = None
+
+
+def start_poller(interval=POLL_INTERVAL):
+    """Startet den Poller einmalig pro Prozess (aus ControllerConfig.ready)."""
+    global _poller
+    if _poller is not None and _poller.is_running():
+        return _poller
+    _poller = StatusPoller(interval=interval).start()
+    return _poller
@@ -1,8 +1,15 @@
 from django.contrib import admin
-from .models import Member
+from .models import Member, MemberSyncEvent
 
 @admin.register(Member)
 class MemberAdmin(admin.ModelAdmin):
     list_display = ("first_name", "last_name", "email", "created_at")
     search_fields = ("first_name", "last_name", "email")
     list_filter = ("created_at",)
+
+
+@admin.register(MemberSyncEvent)
+class MemberSyncEventAdmin(admin.ModelAdmin):
+    list_display = ("member", "target", "status", "attempts", "next_attempt_at", "processed_at")
+    list_filter = ("target", "status")
+    search_fields = ("member__first_name", "member__last_name", "last_error")
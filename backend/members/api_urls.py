@@ -10,7 +10,8 @@ from .api_views import (
     delete_unifi_user_api, reactivate_unifi_user_api,
     check_unifi_status_api, debug_member_creation,
     create_nfc_session_api, get_nfc_token_api, assign_nfc_card_api,
-    update_member_balance_api
+    update_member_balance_api,
+    member_sync_status_api, retry_member_sync_api, sync_outbox_status_api
 )
 
 # REST API Router für CRUD-Operationen
@@ -72,6 +73,17 @@ urlpatterns = [
          update_member_balance_api, 
          name='update_member_balance'),
     
+    # Synchronisations-Outbox (Joomla, WordPress, UniFi)
+    path('api/members/sync/status/', 
+         sync_outbox_status_api, 
+         name='sync_outbox_status'),
+    path('api/members/<int:member_id>/sync/status/', 
+         member_sync_status_api, 
+         name='member_sync_status'),
+    path('api/members/<int:member_id>/sync/retry/', 
+         retry_member_sync_api, 
+         name='retry_member_sync'),
+    
     # Router für Standard CRUD-Operationen einbinden
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
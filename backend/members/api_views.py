@@ -21,6 +21,7 @@ from django.db.models import Q
 from . import models
 from .models import Member
 from .serializers import MemberSerializer
+from .sync_outbox import enqueue_member_sync, member_sync_status, outbox_status, retry_failed
 import requests
 from dotenv import load_dotenv
 from django.conf import settings
@@ -159,7 +160,16 @@ class MemberViewSet(viewsets.ModelViewSet):
             print(f"❌ Fehler beim Aktualisieren eines Mitglieds: {str(e)}")
             # Exception weiterleiten, um Standardverhalten beizubehalten
             raise
-        
+
+    def perform_update(self, serializer):
+        """
+        Speichert das Mitglied und plant die Synchronisation (Joomla, UniFi) in derselben
+        Transaktion ein - der Worker überträgt die Änderung im Hintergrund.
+        """
+        with transaction.atomic():
+            member = serializer.save()
+            enqueue_member_sync(member)
+
     def list(self, request, *args, **kwargs):
         # Für normale Liste mit Pagination
         if not request.query_params.get('search'):
@@ -555,6 +565,8 @@ def delete_joomla_user(member):
 # Konfiguration aus Umgebungsvariablen oder settings.py auslesen
 UNIFI_ACCESS_HOST = os.getenv("UNIFI_ACCESS_HOST")
 UNIFI_ACCESS_TOKEN = os.getenv("UNIFI_ACCESS_TOKEN")
+# Ohne Timeout blockiert ein nicht erreichbarer Türcontroller den Request bzw. den Sync-Worker
+UNIFI_ACCESS_TIMEOUT = float(os.getenv("UNIFI_ACCESS_TIMEOUT", "10"))
 
 def check_unifi_user_status(member, unifi_id=None):
     """
@@ -588,7 +600,7 @@ def check_unifi_user_status(member, unifi_id=None):
     }
     
     try:
-        response = requests.get(url, headers=headers, verify=False)
+        response = requests.get(url, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         print(f"📥 API-Antwort Status: {response.status_code}")
         
         if response.status_code == 200:
@@ -636,7 +648,7 @@ def create_unifi_user(member):
     }
     
     try:
-        response = requests.post(url, json=data, headers=headers, verify=False)
+        response = requests.post(url, json=data, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         if response.status_code in (200, 201):
             result = response.json()
             if result.get("code") == "SUCCESS":
@@ -687,7 +699,7 @@ def update_unifi_user(member, unifi_id=None):
     }
     
     try:
-        response = requests.put(url, json=data, headers=headers, verify=False)
+        response = requests.put(url, json=data, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         if response.status_code in (200, 204):
             print(f"✅ UniFi-Benutzer aktualisiert: {member.first_name} {member.last_name} mit ID {unifi_id}")
             return True
@@ -732,7 +744,7 @@ def reactivate_unifi_user(member, unifi_id=None):
     }
     
     try:
-        response = requests.put(url, json=data, headers=headers, verify=False)
+        response = requests.put(url, json=data, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         if response.status_code in (200, 204):
             print(f"✅ UniFi-Benutzer mit ID {unifi_id} wurde reaktiviert.")
             return True
@@ -778,7 +790,7 @@ def delete_unifi_user(member, unifi_id=None):
     }
     
     try:
-        response = requests.put(url, json=data, headers=headers, verify=False)
+        response = requests.put(url, json=data, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         if response.status_code in (200, 204):
             # WICHTIGE ÄNDERUNG: Die UniFi-ID nicht mehr aus den Notizen entfernen!
             # Stattdessen einen Deaktivierungsvermerk hinzufügen
@@ -1248,7 +1260,7 @@ def create_nfc_session_api(request, member_id):
     }
     
     try:
-        response = requests.post(url, json=data, headers=headers, verify=False)
+        response = requests.post(url, json=data, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         
         if response.status_code in (200, 201):
             result = response.json()
@@ -1302,7 +1314,7 @@ def get_nfc_token_api(request, member_id, session_id):
     }
     
     try:
-        response = requests.get(url, headers=headers, verify=False)
+        response = requests.get(url, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         
         if response.status_code == 200:
             result = response.json()
@@ -1375,7 +1387,7 @@ def assign_nfc_card_api(request, member_id):
     }
     
     try:
-        response = requests.put(url, json=data, headers=headers, verify=False)
+        response = requests.put(url, json=data, headers=headers, verify=False, timeout=UNIFI_ACCESS_TIMEOUT)
         
         if response.status_code in (200, 204):
             result = response.json() if response.content else {}
@@ -1461,21 +1473,19 @@ def update_member_balance_api(request, member_id):
             "shortage": abs(new_balance)
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Kontostand aktualisieren
-    member.kontostand = new_balance
-    member.save(update_fields=['kontostand'])
-    
-    # Optional: Transaktion in den Notizen vermerken
-    if distribution_id:
-        transaction_note = f"\nCannabis-Ausgabe #{distribution_id}: -{amount:.2f}€ (Neuer Stand: {new_balance:.2f}€)"
-        member.notes = (member.notes or "") + transaction_note
-        member.save(update_fields=['notes'])
-    
-    # Joomla-Kontostand synchronisieren
-    try:
-        sync_joomla_user(member)
-    except Exception as e:
-        print(f"⚠️ Joomla-Sync fehlgeschlagen: {str(e)}")
+    with transaction.atomic():
+        # Kontostand aktualisieren
+        member.kontostand = new_balance
+        member.save(update_fields=['kontostand'])
+        
+        # Optional: Transaktion in den Notizen vermerken
+        if distribution_id:
+            transaction_note = f"\nCannabis-Ausgabe #{distribution_id}: -{amount:.2f}€ (Neuer Stand: {new_balance:.2f}€)"
+            member.notes = (member.notes or "") + transaction_note
+            member.save(update_fields=['notes'])
+        
+        # Joomla-Kontostand über die Outbox synchronisieren (im Hintergrund)
+        enqueue_member_sync(member, targets=['joomla'])
     
     return Response({
         "success": True,
@@ -1484,4 +1494,57 @@ def update_member_balance_api(request, member_id):
         "transaction_amount": amount,
         "transaction_type": transaction_type,
         "message": f"Kontostand erfolgreich aktualisiert"
-    })
\ No newline at end of file
+    })
+
+# ============================================================================
+# 🔁 SYNCHRONISATIONS-OUTBOX
+# ============================================================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def member_sync_status_api(request, member_id):
+    """
+    Liefert den Synchronisationsstatus eines Mitglieds (letztes Ereignis je Ziel)
+    """
+    member = get_object_or_404(Member, id=member_id)
+    return Response({
+        "member_id": member.id,
+        "targets": member_sync_status(member.id)
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@team_member_required
+def retry_member_sync_api(request, member_id):
+    """
+    Plant die Synchronisation eines Mitglieds erneut ein: fehlgeschlagene Ereignisse
+    werden zurückgesetzt, optional wird für die angegebenen Ziele neu eingereiht.
+    """
+    member = get_object_or_404(Member, id=member_id)
+    targets = request.data.get('targets')
+    if targets and not all(target in dict(models.MemberSyncEvent.TARGET_CHOICES) for target in targets):
+        return Response(
+            {"error": "Ungültiges Synchronisationsziel"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    requeued = retry_failed(member_id=member.id)
+    with transaction.atomic():
+        created = enqueue_member_sync(member, targets=targets)
+
+    return Response({
+        "success": True,
+        "requeued": requeued,
+        "created": created,
+        "targets": member_sync_status(member.id)
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sync_outbox_status_api(request):
+    """
+    Übersicht über die Outbox: offene, erledigte und fehlgeschlagene Ereignisse je Ziel
+    """
+    return Response(outbox_status())
@@ -1,6 +1,19 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class MembersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'members'
+
+    def ready(self):
+        """Startet den Outbox-Worker für die Mitglieder-Synchronisation (nur im Webserver-Prozess)"""
+        if os.environ.get('RUN_MAIN', None) != 'true':
+            return
+        if not getattr(settings, 'MEMBER_SYNC_WORKER', True):
+            return
+
+        from .sync_outbox import start_worker
+        start_worker()
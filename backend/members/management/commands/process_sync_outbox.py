@@ -0,0 +1,60 @@
+# backend/members/management/commands/process_sync_outbox.py
+from django.core.management.base import BaseCommand
+
+from members.sync_outbox import WORKER_INTERVAL_SECONDS, outbox_status, process_due, retry_failed, run_forever
+
+
+class Command(BaseCommand):
+    help = "Arbeitet die Outbox der Mitglieder-Synchronisation (Joomla, WordPress, UniFi) ab"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Dauerhaft laufen (eigener Worker-Prozess statt Thread im Webserver)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=WORKER_INTERVAL_SECONDS,
+            help='Wartezeit zwischen zwei Durchläufen in Sekunden (mit --loop)'
+        )
+        parser.add_argument('--batch-size', type=int, default=50, help='Ereignisse pro Durchlauf')
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help='Fehlgeschlagene Ereignisse vor dem Durchlauf erneut einplanen'
+        )
+        parser.add_argument('--status', action='store_true', help='Nur den Status der Outbox ausgeben')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            self._print_status()
+            return
+
+        if options['retry_failed']:
+            requeued = retry_failed()
+            self.stdout.write(f"🔁 {requeued} fehlgeschlagene Ereignisse erneut eingeplant")
+
+        if options['loop']:
+            self.stdout.write(f"🚀 Outbox-Worker läuft (Intervall {options['interval']}s) - Abbruch mit Strg+C")
+            run_forever(interval=options['interval'], batch_size=options['batch_size'])
+            return
+
+        results = process_due(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {results['done']} erledigt, {results['skipped']} übersprungen, "
+            f"{results['retry']} neu eingeplant, {results['failed']} fehlgeschlagen"
+        ))
+
+    def _print_status(self):
+        status = outbox_status()
+        self.stdout.write(f"🔌 Konfigurierte Ziele: {', '.join(status['configured_targets']) or '-'}")
+        for target, counts in status['targets'].items():
+            summary = ', '.join(f"{name}: {count}" for name, count in sorted(counts.items())) or 'keine Ereignisse'
+            self.stdout.write(f"  {target}: {summary}")
+        if status['oldest_pending']:
+            self.stdout.write(
+                f"⏳ Ältestes offenes Ereignis: {status['oldest_pending']} "
+                f"({status['oldest_pending_age_seconds']:.0f}s)"
+            )
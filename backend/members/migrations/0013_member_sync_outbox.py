@@ -0,0 +1,36 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0012_remove_member_unifi_user_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberSyncEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target', models.CharField(choices=[('joomla', 'Joomla'), ('wordpress', 'WordPress'), ('unifi', 'UniFi Access')], max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('done', 'Erledigt'), ('skipped', 'Übersprungen'), ('failed', 'Fehlgeschlagen')], default='pending', max_length=20)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sync_events', to='members.member')),
+            ],
+            options={
+                'verbose_name': 'Synchronisationsereignis',
+                'verbose_name_plural': 'Synchronisationsereignisse',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='member_sync_due_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('member', 'target'), name='member_sync_pending_uniq')],
+            },
+        ),
+    ]
@@ -77,4 +77,57 @@ class Member(models.Model):
             
         if self.age < 21:
             return "18+"
-        return "21+"
\ No newline at end of file
+        return "21+"
+
+class MemberSyncEvent(models.Model):
+    """
+    Transaktionaler Outbox-Eintrag für die Synchronisation eines Mitglieds mit
+    externen Systemen (Joomla, WordPress, UniFi Access).
+
+    Wird in derselben Transaktion wie die Mitgliedsänderung geschrieben und von
+    einem Hintergrund-Worker abgearbeitet (members/sync_outbox.py). Pro Mitglied
+    und Ziel existiert höchstens ein offenes Ereignis - der Worker liest beim
+    Abarbeiten immer den aktuellen Stand des Mitglieds.
+    """
+    TARGET_CHOICES = [
+        ('joomla', 'Joomla'),
+        ('wordpress', 'WordPress'),
+        ('unifi', 'UniFi Access'),
+    ]
+
+    STATUS_CHOICES = [
+        ('pending', 'Ausstehend'),
+        ('processing', 'In Bearbeitung'),
+        ('done', 'Erledigt'),
+        ('skipped', 'Übersprungen'),
+        ('failed', 'Fehlgeschlagen'),
+    ]
+
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='sync_events')
+    target = models.CharField(max_length=20, choices=TARGET_CHOICES)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Synchronisationsereignis"
+        verbose_name_plural = "Synchronisationsereignisse"
+        constraints = [
+            # Deduplizierung: nur ein offenes Ereignis je Mitglied und Ziel
+            models.UniqueConstraint(
+                fields=['member', 'target'],
+                condition=models.Q(status='pending'),
+                name='member_sync_pending_uniq'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='member_sync_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_target_display()}-Sync für Mitglied {self.member_id} ({self.get_status_display()})"
@@ -0,0 +1,323 @@
+# backend/members/sync_outbox.py
+"""
+Transaktionale Outbox für die Synchronisation von Mitgliedern mit Joomla,
+WordPress und UniFi Access.
+
+Statt die externen Systeme direkt im Request aufzurufen, schreibt der Aufrufer
+mit enqueue_member_sync() einen MemberSyncEvent - innerhalb derselben Transaktion
+wie die Mitgliedsänderung. Ein Hintergrund-Worker (bzw. der Management-Command
+process_sync_outbox) arbeitet die fälligen Ereignisse ab, mit exponentiellem
+Backoff bei Fehlern und höchstens einem offenen Ereignis je Mitglied und Ziel.
+Die Antwortzeit an der Ausgabe hängt damit nicht mehr von der CMS-Datenbank
+oder dem Türcontroller ab.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import MemberSyncEvent
+
+# Standardziele bei Änderungen an Stammdaten oder Kontostand
+DEFAULT_TARGETS = ('joomla', 'unifi')
+
+MAX_ATTEMPTS = getattr(settings, 'MEMBER_SYNC_MAX_ATTEMPTS', 8)
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# Ereignisse, die länger "in Bearbeitung" hängen (z.B. Absturz des Workers), werden neu eingeplant
+STALE_PROCESSING_SECONDS = 600
+WORKER_INTERVAL_SECONDS = getattr(settings, 'MEMBER_SYNC_INTERVAL', 5)
+
+
+class SkipSync(Exception):
+    """Ziel für dieses Mitglied nicht anwendbar (z.B. keine UniFi-ID) - kein erneuter Versuch."""
+
+
+# --- Ziele ---------------------------------------------------------------
+
+def _joomla_configured():
+    return bool(settings.DATABASES.get('joomla', {}).get('NAME'))
+
+
+def _wordpress_configured():
+    return bool(settings.DATABASES.get('wordpress', {}).get('NAME'))
+
+
+def _unifi_configured():
+    from .api_views import UNIFI_ACCESS_HOST, UNIFI_ACCESS_TOKEN
+    return bool(UNIFI_ACCESS_HOST and UNIFI_ACCESS_TOKEN)
+
+
+def _sync_joomla(member):
+    from .api_views import sync_joomla_user
+    user_id = sync_joomla_user(member)
+    return f"Joomla-ID {user_id}"
+
+
+def _sync_wordpress(member):
+    from .wordpress_service import create_wordpress_user
+    result = create_wordpress_user(member)
+    return f"WP-ID {result['id']}" if result else "WordPress-Benutzer vorhanden"
+
+
+def _sync_unifi(member):
+    from .api_views import extract_unifi_id, update_unifi_user
+    unifi_id = extract_unifi_id(member)
+    if not unifi_id:
+        raise SkipSync("Keine UniFi-ID hinterlegt")
+    if not update_unifi_user(member, unifi_id=unifi_id):
+        raise RuntimeError(f"UniFi-Aktualisierung für {unifi_id} fehlgeschlagen")
+    return f"UniFi-ID {unifi_id}"
+
+
+TARGETS = {
+    'joomla': (_joomla_configured, _sync_joomla),
+    'wordpress': (_wordpress_configured, _sync_wordpress),
+    'unifi': (_unifi_configured, _sync_unifi),
+}
+
+
+def configured_targets(targets=None):
+    """Filtert die Ziele auf die in dieser Installation konfigurierten Systeme."""
+    return [target for target in (targets or DEFAULT_TARGETS) if TARGETS[target][0]()]
+
+
+# --- Einreihen -----------------------------------------------------------
+
+def enqueue_member_sync(member, targets=None):
+    """
+    Plant die Synchronisation eines Mitglieds ein. Innerhalb einer laufenden
+    Transaktion aufrufen - wird diese zurückgerollt, entfällt auch das Ereignis.
+    Gibt die Anzahl neu angelegter Ereignisse zurück (bereits offene zählen nicht).
+    """
+    member_id = getattr(member, 'pk', member)
+    created = 0
+    for target in configured_targets(targets):
+        try:
+            with transaction.atomic():
+                _, was_created = MemberSyncEvent.objects.get_or_create(
+                    member_id=member_id,
+                    target=target,
+                    status='pending'
+                )
+        except IntegrityError:
+            # Paralleler Aufrufer hat das offene Ereignis gerade angelegt
+            was_created = False
+        created += was_created
+    if created:
+        transaction.on_commit(wake_worker)
+    return created
+
+
+def _requeue(event, **fields):
+    """
+    Setzt ein Ereignis zurück auf "ausstehend". Existiert für Mitglied und Ziel
+    bereits ein neueres offenes Ereignis, wird dieses als Ersatz behalten.
+    """
+    try:
+        with transaction.atomic():
+            MemberSyncEvent.objects.filter(pk=event.pk).update(status='pending', **fields)
+        return True
+    except IntegrityError:
+        MemberSyncEvent.objects.filter(pk=event.pk).update(
+            status='skipped',
+            last_error=fields.get('last_error', event.last_error),
+            processed_at=timezone.now()
+        )
+        return False
+
+
+def retry_failed(member_id=None, target=None):
+    """Plant fehlgeschlagene Ereignisse erneut ein (Status-API / Management-Command)."""
+    failed = MemberSyncEvent.objects.filter(status='failed')
+    if member_id:
+        failed = failed.filter(member_id=member_id)
+    if target:
+        failed = failed.filter(target=target)
+    requeued = sum(_requeue(event, attempts=0, next_attempt_at=None) for event in failed)
+    if requeued:
+        wake_worker()
+    return requeued
+
+
+# --- Abarbeiten ----------------------------------------------------------
+
+def backoff_delay(attempts):
+    """Wartezeit nach dem n-ten Fehlversuch: 30s, 60s, 120s, ... höchstens 1h."""
+    return timedelta(seconds=min(BACKOFF_BASE_SECONDS * 2 ** max(attempts - 1, 0), BACKOFF_MAX_SECONDS))
+
+
+def _reset_stale(now):
+    stale = MemberSyncEvent.objects.filter(
+        status='processing',
+        updated_at__lt=now - timedelta(seconds=STALE_PROCESSING_SECONDS)
+    )
+    for event in stale:
+        _requeue(event, last_error="Bearbeitung abgebrochen - erneut eingeplant")
+
+
+def _claim(event_id, now):
+    """Übernimmt ein Ereignis exklusiv (mehrere Worker-Prozesse sind möglich)."""
+    return MemberSyncEvent.objects.filter(pk=event_id, status='pending').update(
+        status='processing', updated_at=now
+    ) == 1
+
+
+def _process(event):
+    handler = TARGETS[event.target][1]
+    attempts = event.attempts + 1
+    try:
+        result = handler(event.member)
+    except SkipSync as e:
+        MemberSyncEvent.objects.filter(pk=event.pk).update(
+            status='skipped', attempts=attempts, last_error=str(e), processed_at=timezone.now()
+        )
+        return 'skipped'
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        if attempts >= MAX_ATTEMPTS:
+            MemberSyncEvent.objects.filter(pk=event.pk).update(
+                status='failed', attempts=attempts, last_error=error, processed_at=timezone.now()
+            )
+            print(f"❌ {event.get_target_display()}-Sync für Mitglied {event.member_id} endgültig fehlgeschlagen: {error}")
+            return 'failed'
+        _requeue(
+            event,
+            attempts=attempts,
+            last_error=error,
+            next_attempt_at=timezone.now() + backoff_delay(attempts)
+        )
+        print(f"⚠️ {event.get_target_display()}-Sync für Mitglied {event.member_id} fehlgeschlagen "
+              f"(Versuch {attempts}/{MAX_ATTEMPTS}): {error}")
+        return 'retry'
+
+    MemberSyncEvent.objects.filter(pk=event.pk).update(
+        status='done', attempts=attempts, last_error='', processed_at=timezone.now()
+    )
+    print(f"✅ {event.get_target_display()}-Sync für Mitglied {event.member_id}: {result}")
+    return 'done'
+
+
+def process_due(batch_size=50):
+    """
+    Arbeitet alle fälligen Ereignisse ab (älteste zuerst).
+    Gibt ein Dict mit der Anzahl je Ergebnis zurück.
+    """
+    now = timezone.now()
+    _reset_stale(now)
+    due_ids = list(
+        MemberSyncEvent.objects.filter(status='pending').filter(
+            Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+        ).order_by('created_at').values_list('id', flat=True)[:batch_size]
+    )
+    results = {'done': 0, 'skipped': 0, 'retry': 0, 'failed': 0}
+    for event_id in due_ids:
+        if not _claim(event_id, now):
+            continue
+        event = MemberSyncEvent.objects.select_related('member').get(pk=event_id)
+        results[_process(event)] += 1
+    return results
+
+
+# --- Status --------------------------------------------------------------
+
+def outbox_status():
+    """Übersicht über die Outbox: Anzahl je Ziel und Status, ältestes offenes Ereignis."""
+    counts = {target: {} for target in TARGETS}
+    rows = MemberSyncEvent.objects.values('target', 'status').annotate(count=Count('id')).order_by()
+    for row in rows:
+        counts.setdefault(row['target'], {})[row['status']] = row['count']
+
+    oldest_pending = MemberSyncEvent.objects.filter(status='pending').aggregate(
+        oldest=Min('created_at')
+    )['oldest']
+    return {
+        'targets': counts,
+        'configured_targets': configured_targets(list(TARGETS)),
+        'oldest_pending': oldest_pending.isoformat() if oldest_pending else None,
+        'oldest_pending_age_seconds': (
+            (timezone.now() - oldest_pending).total_seconds() if oldest_pending else None
+        ),
+        'worker_running': _worker is not None and _worker.is_alive(),
+    }
+
+
+def member_sync_status(member_id):
+    """Letztes Ereignis je Ziel für ein Mitglied."""
+    status = {}
+    events = MemberSyncEvent.objects.filter(member_id=member_id).order_by('target', '-created_at')
+    for event in events:
+        if event.target in status:
+            continue
+        status[event.target] = {
+            'id': event.id,
+            'status': event.status,
+            'status_display': event.get_status_display(),
+            'attempts': event.attempts,
+            'last_error': event.last_error,
+            'next_attempt_at': event.next_attempt_at.isoformat() if event.next_attempt_at else None,
+            'created_at': event.created_at.isoformat(),
+            'processed_at': event.processed_at.isoformat() if event.processed_at else None,
+        }
+    return status
+
+
+# --- Hintergrund-Worker --------------------------------------------------
+
+_worker = None
+_wake = threading.Event()
+
+
+def wake_worker():
+    """Weckt den Worker nach einem Commit, statt bis zum nächsten Intervall zu warten."""
+    _wake.set()
+
+
+class SyncOutboxWorker(threading.Thread):
+    """Daemon-Thread im Webserver-Prozess, der die Outbox periodisch abarbeitet."""
+
+    def __init__(self, interval=WORKER_INTERVAL_SECONDS):
+        super().__init__(name='member-sync-outbox', daemon=True)
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        print("🚀 Mitglieder-Sync-Worker gestartet")
+        while not self._stopped.is_set():
+            try:
+                close_old_connections()
+                process_due()
+            except Exception as e:
+                print(f"❌ Fehler im Mitglieder-Sync-Worker: {str(e)}")
+            finally:
+                close_old_connections()
+            _wake.wait(self.interval)
+            _wake.clear()
+
+    def stop(self):
+        self._stopped.set()
+        _wake.set()
+
+
+def start_worker():
+    """Startet den Worker einmalig pro Prozess (aus MembersConfig.ready)."""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return _worker
+    _worker = SyncOutboxWorker()
+    _worker.start()
+    return _worker
+
+
+def run_forever(interval=WORKER_INTERVAL_SECONDS, batch_size=50):
+    """Endlosschleife für den Management-Command (eigener Worker-Prozess)."""
+    while True:
+        results = process_due(batch_size=batch_size)
+        if any(results.values()):
+            print(f"🔁 Outbox: {results}")
+        close_old_connections()
+        time.sleep(interval)
@@ -1,8 +1,23 @@
 # options/admin.py
 from django.contrib import admin
-from .models import Option
+from .models import Option, SequenceCounter, VersionCounter
 
 @admin.register(Option)
 class OptionAdmin(admin.ModelAdmin):
     list_display = ("key", "value", "description")
     search_fields = ("key", "description")
+
+
+@admin.register(SequenceCounter)
+class SequenceCounterAdmin(admin.ModelAdmin):
+    list_display = ("prefix", "day", "last_value", "updated_at")
+    list_filter = ("day",)
+    search_fields = ("prefix",)
+    readonly_fields = ("prefix", "day", "last_value", "updated_at")
+
+
+@admin.register(VersionCounter)
+class VersionCounterAdmin(admin.ModelAdmin):
+    list_display = ("name", "version", "updated_at")
+    search_fields = ("name",)
+    readonly_fields = ("name", "version", "updated_at")
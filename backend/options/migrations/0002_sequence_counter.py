@@ -0,0 +1,28 @@
+# Generated by Django 5.2 on 2026-10-18 10:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('options', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SequenceCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=100)),
+                ('day', models.DateField()),
+                ('last_value', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Nummernkreis',
+                'verbose_name_plural': 'Nummernkreise',
+                'constraints': [models.UniqueConstraint(fields=('prefix', 'day'), name='sequence_counter_prefix_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('options', '0002_sequence_counter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versionszähler',
+                'verbose_name_plural': 'Versionszähler',
+            },
+        ),
+    ]
@@ -7,3 +7,43 @@ class Option(models.Model):
 
     def __str__(self):
         return self.key
+
+
+class SequenceCounter(models.Model):
+    """
+    Tageszähler für fortlaufende Nummern (Chargen- und Buchungsnummern).
+    Je Präfix und Tag gibt es genau eine Zeile; Werte werden ausschließlich über
+    options.sequences vergeben.
+    """
+    prefix = models.CharField(max_length=100)
+    day = models.DateField()
+    last_value = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['prefix', 'day'], name='sequence_counter_prefix_day_uniq')
+        ]
+        verbose_name = "Nummernkreis"
+        verbose_name_plural = "Nummernkreise"
+
+    def __str__(self):
+        return f"{self.prefix} {self.day}: {self.last_value}"
+
+
+class VersionCounter(models.Model):
+    """
+    Versionszähler für Caches, die jeder Prozess selbst hält (ETags, gecachte
+    Zähler). Je Name gibt es genau eine Zeile; Werte werden ausschließlich über
+    options.versions erhöht.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Versionszähler"
+        verbose_name_plural = "Versionszähler"
+
+    def __str__(self):
+        return f"{self.name}: {self.version}"
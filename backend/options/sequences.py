@@ -0,0 +1,112 @@
+# backend/options/sequences.py
+"""
+Zentrale Vergabe fortlaufender Nummern (Chargen-, Einheiten- und Buchungsnummern).
+
+Statt vor jedem Insert die heutigen Zeilen zu zählen (count() + 1), führt
+SequenceCounter je Präfix und Tag einen Zähler, der atomar per UPDATE erhöht
+wird. Parallele Anfragen erhalten dadurch nie dieselbe Nummer, und mit
+reserve(..., count=n) wird ein ganzer Block von n Nummern in einem Schritt
+reserviert (z.B. alle Einheiten einer Verpackung).
+
+Beim ersten Zugriff auf einen Präfix und Tag wird der Zähler aus den bereits
+vergebenen Nummern initialisiert (initial), damit Bestandsdaten vom selben Tag
+nicht doppelt vergeben werden.
+"""
+import sqlite3
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SequenceCounter
+
+
+def _supports_update_returning():
+    """UPDATE ... RETURNING: PostgreSQL und SQLite ab 3.35 (MySQL/MariaDB nicht)."""
+    if connection.vendor == 'postgresql':
+        return True
+    return connection.vendor == 'sqlite' and sqlite3.sqlite_version_info >= (3, 35)
+
+
+def _increment(prefix, day, count):
+    """Erhöht einen bestehenden Zähler um count; liefert den neuen Stand oder None."""
+    if _supports_update_returning():
+        # Erhöhen und Lesen in einem Roundtrip
+        with connection.cursor() as cursor:
+            qn = connection.ops.quote_name
+            cursor.execute(
+                f"UPDATE {qn(SequenceCounter._meta.db_table)} "
+                f"SET {qn('last_value')} = {qn('last_value')} + %s, {qn('updated_at')} = %s "
+                f"WHERE {qn('prefix')} = %s AND {qn('day')} = %s RETURNING {qn('last_value')}",
+                [
+                    count,
+                    connection.ops.adapt_datetimefield_value(timezone.now()),
+                    prefix,
+                    connection.ops.adapt_datefield_value(day),
+                ]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    # Die Zeilensperre des UPDATE hält bis zum Ende der Transaktion
+    with transaction.atomic():
+        counters = SequenceCounter.objects.filter(prefix=prefix, day=day)
+        if not counters.update(last_value=F('last_value') + count, updated_at=timezone.now()):
+            return None
+        return counters.values_list('last_value', flat=True).get()
+
+
+def reserve(prefix, count=1, day=None, initial=None):
+    """
+    Reserviert count aufeinanderfolgende Werte für Präfix und Tag (Standard: heute)
+    und liefert sie als range. initial() gibt den höchsten bereits vergebenen Wert
+    zurück und wird nur beim Anlegen des Tageszählers aufgerufen.
+    """
+    if count < 1:
+        raise ValueError("count muss mindestens 1 sein")
+    day = day or timezone.now().date()
+
+    last_value = _increment(prefix, day, count)
+    if last_value is None:
+        last_value = (initial() if initial else 0) + count
+        try:
+            with transaction.atomic():
+                SequenceCounter.objects.create(prefix=prefix, day=day, last_value=last_value)
+        except IntegrityError:
+            # Paralleler Aufrufer hat den Tageszähler gerade angelegt
+            last_value = _increment(prefix, day, count)
+    return range(last_value - count + 1, last_value + 1)
+
+
+def highest_suffix(values, stem):
+    """Höchste laufende Nummer unter den Werten, die mit stem beginnen (0 falls keine)."""
+    highest = 0
+    for value in values:
+        digits = ''.join(c for c in value[len(stem):].split(':')[0].split('-')[0] if c.isdigit())
+        if digits:
+            highest = max(highest, int(digits))
+    return highest
+
+
+def reserve_batch_numbers(model, prefix, count, field='batch_number'):
+    """
+    Reserviert count Chargennummern im Format "<prefix>:TT:MM:JJJJ:NNNN".
+    Der Zähler ist je Modell getrennt, da sich manche Modelle ein Präfix teilen
+    (z.B. MotherPlantBatch und MotherPlant).
+    """
+    now = timezone.now()
+    stem = f"{prefix}:{now.strftime('%d:%m:%Y')}:"
+
+    def existing():
+        return highest_suffix(
+            model.objects.filter(**{f"{field}__startswith": stem}).values_list(field, flat=True),
+            stem
+        )
+
+    values = reserve(f"{model._meta.label_lower}:{prefix}", count, day=now.date(), initial=existing)
+    return [f"{stem}{value:04d}" for value in values]
+
+
+def next_batch_number(model, prefix, field='batch_number'):
+    """Eine einzelne Chargennummer (siehe reserve_batch_numbers)."""
+    return reserve_batch_numbers(model, prefix, 1, field=field)[0]
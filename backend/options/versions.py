@@ -0,0 +1,67 @@
+# backend/options/versions.py
+"""
+Versionszähler in der Datenbank für Caches, die jeder Prozess selbst hält.
+
+Ohne CACHES-Einstellung ist der Django-Cache ein LocMemCache je Prozess. Ein
+Versionszähler dort sieht nur die Änderungen des eigenen Prozesses - andere
+Worker oder Management-Commands (z.B. rebuild_strain_index) liefern weiter
+alte Stände aus. Die Versionen liegen deshalb in VersionCounter: bump() ist ein
+UPDATE, current() ein SELECT für alle angefragten Namen. Gecachte Werte tragen
+die Version im Schlüssel und verfallen damit in allen Prozessen gleichzeitig.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import VersionCounter
+
+
+def _create(name, increment=False):
+    """Legt einen Zähler an; existiert er inzwischen, wird er bei increment erhöht."""
+    try:
+        with transaction.atomic():
+            VersionCounter.objects.create(name=name)
+    except IntegrityError:
+        # Paralleler Aufrufer hat den Zähler gerade angelegt
+        if increment:
+            VersionCounter.objects.filter(name=name).update(
+                version=F('version') + 1, updated_at=timezone.now()
+            )
+
+
+def bump(*names):
+    """Neue Version für alle Namen (ein UPDATE; fehlende Zähler werden angelegt)."""
+    names = set(names)
+    updated = VersionCounter.objects.filter(name__in=names).update(
+        version=F('version') + 1, updated_at=timezone.now()
+    )
+    if updated < len(names):
+        existing = set(VersionCounter.objects.filter(name__in=names).values_list('name', flat=True))
+        for name in names - existing:
+            _create(name, increment=True)
+
+
+def current(names):
+    """{Name: (Version, Änderungszeitpunkt)} in einer Query; fehlende Zähler werden angelegt."""
+    names = list(names)
+
+    def load():
+        return {
+            name: (version, updated_at)
+            for name, version, updated_at in VersionCounter.objects.filter(name__in=names).values_list(
+                'name', 'version', 'updated_at'
+            )
+        }
+
+    result = load()
+    missing = [name for name in names if name not in result]
+    if missing:
+        for name in missing:
+            _create(name)
+        result = load()
+    return result
+
+
+def version(name):
+    """Aktuelle Version eines Zählers."""
+    return current([name])[name][0]
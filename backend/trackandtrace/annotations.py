@@ -0,0 +1,183 @@
+# backend/trackandtrace/annotations.py
+"""
+Queryset-Annotationen für die Chargen-Listen.
+
+Die abgeleiteten Felder der Serializer (Pflanzen- und Stecklingszahlen,
+Bewertungen, erste aktive Pflanze, ...) fragten bisher je Zeile eigene Queries
+ab. Die with_*-Funktionen hängen diese Werte als korrelierte Subqueries an das
+Queryset der Liste (Präfix "annotated_"), laden die Fremdschlüssel-Ketten per
+select_related und Bilder bzw. Bewertungen per prefetch_related.
+
+Die Serializer lesen die Werte über annotated(obj, name, fallback). Fehlt die
+Annotation (z.B. nach create oder für Objekte aus anderen Views), wird wie
+bisher einzeln abgefragt.
+
+Subqueries statt Count über Joins, weil die Listen teils mit distinct()
+filtern und mehrere Joins die Zeilen vervielfachen würden.
+"""
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import (
+    BloomingCuttingPlant, Cutting, CuttingBatch, FloweringPlant, MotherPlant, MotherPlantRating
+)
+
+ANNOTATION_PREFIX = 'annotated_'
+
+_MISSING = object()
+
+# Kette von der Ernte bis zum Samen (für source_strain)
+HARVEST_SOURCE_RELATED = (
+    'flowering_batch__seed_purchase',
+    'blooming_cutting_batch__cutting_batch__mother_batch__seed_purchase',
+)
+
+# Mitglieder und Raum, die alle Chargen-Serializer verschachtelt ausgeben
+BATCH_MEMBER_RELATED = ('member', 'room')
+DESTROYABLE_MEMBER_RELATED = BATCH_MEMBER_RELATED + ('destroyed_by',)
+
+RATING_PREFETCH = ('ratings__rated_by', 'ratings__cutting_batch')
+
+
+def annotated(obj, name, fallback):
+    """Annotierter Wert der Liste, sonst fallback() (Einzelabfrage)."""
+    value = getattr(obj, ANNOTATION_PREFIX + name, _MISSING)
+    return fallback() if value is _MISSING else value
+
+
+def annotate_fields(queryset, **expressions):
+    """Hängt die Ausdrücke mit ANNOTATION_PREFIX an das Queryset."""
+    return queryset.annotate(**{
+        ANNOTATION_PREFIX + name: expression for name, expression in expressions.items()
+    })
+
+
+def _grouped(model, fk, **filters):
+    return model.objects.filter(**{fk: OuterRef('pk')}, **filters).order_by().values(fk)
+
+
+def child_count(model, fk='batch', **filters):
+    """Anzahl der Kind-Zeilen je Charge als Subquery (0 statt NULL)."""
+    rows = _grouped(model, fk, **filters).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def child_sum(model, field, fk='batch', **filters):
+    """Summe eines Feldes der Kind-Zeilen je Charge als Subquery (0 statt NULL)."""
+    rows = _grouped(model, fk, **filters).annotate(total=Sum(field)).values('total')
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def plant_average_rating():
+    """Durchschnittliche Gesamtbewertung einer Mutterpflanze als Subquery."""
+    rows = _grouped(MotherPlantRating, 'mother_plant').annotate(
+        average=Avg(MotherPlantRating.overall_score_expression())
+    ).values('average')
+    return Subquery(rows)
+
+
+def _with_images(queryset):
+    return queryset.prefetch_related('images__uploaded_by')
+
+
+def with_image_count(queryset):
+    """Anzahl der Bilder je Charge als Subquery (Listen ohne Bilder-Prefetch)."""
+    relation = queryset.model._meta.get_field('images')
+    return annotate_fields(queryset, image_count=child_count(relation.related_model, relation.field.name))
+
+
+def _plant_counts(plant_model):
+    return {
+        'active_plants_count': child_count(plant_model, is_destroyed=False),
+        'destroyed_plants_count': child_count(plant_model, is_destroyed=True),
+    }
+
+
+# --- Listen je Stufe ----------------------------------------------------------
+
+def with_seed_purchase_fields(queryset):
+    queryset = queryset.select_related(
+        *DESTROYABLE_MEMBER_RELATED, 'strain__member', 'strain__inventory'
+    ).prefetch_related('strain__images', 'strain__price_tiers')
+    return annotate_fields(
+        _with_images(queryset),
+        mother_plant_count=child_count(MotherPlant, 'batch__seed_purchase', is_destroyed=False),
+        flowering_plant_count=child_count(FloweringPlant, 'batch__seed_purchase', is_destroyed=False),
+    )
+
+
+def with_mother_plant_fields(queryset):
+    """Einzelne Mutterpflanzen inkl. Bewertungen (average_rating & Co. aus dem Prefetch)."""
+    return queryset.select_related('destroyed_by', 'premium_marked_by').prefetch_related(*RATING_PREFETCH)
+
+
+def with_mother_batch_fields(queryset):
+    active_plants = MotherPlant.objects.filter(batch=OuterRef('pk'), is_destroyed=False)
+    batch_rating = active_plants.annotate(
+        plant_average=plant_average_rating()
+    ).order_by().values('batch').annotate(average=Avg('plant_average')).values('average')
+    return annotate_fields(
+        _with_images(queryset.select_related(*BATCH_MEMBER_RELATED, 'seed_purchase')),
+        **_plant_counts(MotherPlant),
+        converted_to_cuttings_count=child_sum(CuttingBatch, 'quantity', 'mother_batch'),
+        premium_plants_count=child_count(MotherPlant, is_destroyed=False, is_premium_mother=True),
+        average_batch_rating=Subquery(batch_rating),
+        first_plant_id=Subquery(active_plants.order_by('pk').values('pk')[:1]),
+    )
+
+
+def with_flowering_batch_fields(queryset):
+    return annotate_fields(
+        _with_images(queryset.select_related(*BATCH_MEMBER_RELATED, 'seed_purchase')),
+        **_plant_counts(FloweringPlant),
+    )
+
+
+def with_cutting_batch_fields(queryset):
+    return annotate_fields(
+        _with_images(queryset.select_related(*BATCH_MEMBER_RELATED, 'mother_batch__seed_purchase')),
+        active_cuttings_count=child_count(Cutting, is_destroyed=False),
+        destroyed_cuttings_count=child_count(Cutting, is_destroyed=True),
+    )
+
+
+def with_blooming_cutting_batch_fields(queryset):
+    return annotate_fields(
+        _with_images(queryset.select_related(
+            *BATCH_MEMBER_RELATED, 'cutting_batch__mother_batch__seed_purchase'
+        )),
+        **_plant_counts(BloomingCuttingPlant),
+    )
+
+
+def with_harvest_batch_fields(queryset):
+    return _with_images(queryset.select_related(*DESTROYABLE_MEMBER_RELATED, *HARVEST_SOURCE_RELATED))
+
+
+def with_drying_batch_fields(queryset):
+    return _with_images(queryset.select_related(
+        *DESTROYABLE_MEMBER_RELATED,
+        *(f'harvest_batch__{related}' for related in HARVEST_SOURCE_RELATED)
+    ))
+
+
+def with_processing_batch_fields(queryset):
+    return _with_images(queryset.select_related(
+        *DESTROYABLE_MEMBER_RELATED,
+        *(f'drying_batch__harvest_batch__{related}' for related in HARVEST_SOURCE_RELATED)
+    ))
+
+
+def with_lab_testing_batch_fields(queryset):
+    return _with_images(queryset.select_related(
+        *DESTROYABLE_MEMBER_RELATED,
+        *(f'processing_batch__drying_batch__harvest_batch__{related}' for related in HARVEST_SOURCE_RELATED)
+    ))
+
+
+def with_packaging_batch_fields(queryset):
+    return _with_images(queryset.select_related(
+        *DESTROYABLE_MEMBER_RELATED,
+        *(f'lab_testing_batch__processing_batch__drying_batch__harvest_batch__{related}'
+          for related in HARVEST_SOURCE_RELATED)
+    ))
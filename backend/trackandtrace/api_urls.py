@@ -10,6 +10,7 @@ from .api_views import (
     CuttingBatchImageViewSet, BloomingCuttingBatchImageViewSet, FloweringPlantBatchImageViewSet,
     HarvestBatchViewSet, HarvestBatchImageViewSet, DryingBatchImageViewSet, ProcessingBatchImageViewSet,
     LabTestingBatchImageViewSet, PackagingBatchImageViewSet, MotherPlantRatingViewSet,
+    conditional_metrics, lineage_graph_view, media_upload, recall_destroy, recall_report,
     validate_distribution_limits
 )
 
@@ -45,6 +46,11 @@ urlpatterns = [
     path('distributions/validate_distribution_limits/', 
          validate_distribution_limits, 
          name='validate_distribution_limits'),
+    path('lineage/<str:node_type>/<uuid:node_id>/', lineage_graph_view, name='lineage_graph'),
+    path('recall/<str:source_type>/<uuid:source_id>/', recall_report, name='recall_report'),
+    path('recall/<str:source_type>/<uuid:source_id>/destroy/', recall_destroy, name='recall_destroy'),
+    path('uploads/<uuid:upload_id>/', media_upload, name='media_upload'),
+    path('conditional-metrics/', conditional_metrics, name='conditional_metrics'),
     
     # Router URLs
     path('', include(router.urls)),
@@ -1,13 +1,18 @@
+import uuid
 from datetime import timedelta
 from collections import defaultdict
-from django.db import models
-from django.db.models import Q, Sum
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import transaction
+from django.db.models import Prefetch, Q, Sum
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import pagination, status, viewsets, serializers
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.reverse import reverse
 from rest_framework.response import Response
+from members.sync_outbox import enqueue_member_sync
 from wawi.models import CannabisStrain
 from .models import (
     BloomingCuttingBatch, BloomingCuttingPlant, Cutting, CuttingBatch, DryingBatch,
@@ -16,6 +21,7 @@ from .models import (
     SeedPurchaseImage, MotherPlantBatchImage, CuttingBatchImage, BloomingCuttingBatchImage, 
     FloweringPlantBatchImage, HarvestBatchImage, DryingBatchImage, ProcessingBatchImage, 
     LabTestingBatchImage, SeedPurchase, PackagingBatchImage, MotherPlantRating,
+    StrainAvailabilityIndex, PRODUCT_TYPE_CHOICES,
 )
 from .serializers import (
     BloomingCuttingBatchSerializer, BloomingCuttingPlantSerializer, CuttingBatchSerializer,
@@ -28,6 +34,18 @@ from .serializers import (
     HarvestBatchImageSerializer, DryingBatchImageSerializer, ProcessingBatchImageSerializer, 
     LabTestingBatchImageSerializer, PackagingBatchImageSerializer, MotherPlantRatingSerializer,
 )
+from .consumption_ledger import member_history, member_totals
+from .conversions import (
+    ConversionError, create_cuttings, cuttings_to_blooming, parse_quantity, seed_to_flowering_plants,
+    seed_to_mother_plants
+)
+from . import annotations, conditional, lineage_graph, media, stats, uploads
+from .conditional import LIFECYCLE, STRAIN_CARDS, conditional_get
+from .limits import DistributionLimitEngine
+from .listing import KeysetPaginationMixin, SlimListMixin
+from .lineage import LAB_LINEAGE_RELATED, PACKAGING_LINEAGE_RELATED, UNKNOWN_STRAIN, resolve_lineage
+from .recall import Recall, RecallError
+from .stats import LifecycleCountsMixin, invalidate_counts
 
 class StandardResultsSetPagination(pagination.PageNumberPagination):
     page_size = 10
@@ -64,17 +82,22 @@ class StandardResultsSetPagination(pagination.PageNumberPagination):
         # Kein page_size-Parameter, verwende Standard
         return self.page_size
 
+
+class LifecyclePagination(KeysetPaginationMixin, StandardResultsSetPagination):
+    """Seitennummern wie bisher, mit ?cursor= Keyset-Pagination über (created_at, id)."""
+
+
 class StrainCardPagination(pagination.PageNumberPagination):
     """Pagination speziell für StrainCards"""
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 50
 
-class SeedPurchaseViewSet(viewsets.ModelViewSet):
+class SeedPurchaseViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = SeedPurchase.objects.all().order_by('-created_at')
     serializer_class = SeedPurchaseSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = SeedPurchase.objects.all().order_by('-created_at')
@@ -96,77 +119,28 @@ class SeedPurchaseViewSet(viewsets.ModelViewSet):
         if destroyed is not None:
             is_destroyed = destroyed.lower() == 'true'
             queryset = queryset.filter(is_destroyed=is_destroyed)
-            
-        # Berechne Anzahl für aktive und vernichtete Samen
-        active_count = queryset.filter(is_destroyed=False).count()
-        destroyed_count = queryset.filter(is_destroyed=True).count()
-        
-        # Berechne Anzahl für verschiedene Kategorien
-        active_seed_count = queryset.filter(is_destroyed=False, remaining_quantity__gt=0).count()
-        mother_converted_count = queryset.filter(is_destroyed=False).exclude(mother_batches=None).count()
-        flowering_converted_count = queryset.filter(is_destroyed=False).exclude(flowering_batches=None).count()
-        
-        self.counts = {
-            'active_count': active_count,
-            'destroyed_count': destroyed_count,
-            'active_seed_count': active_seed_count,
-            'mother_converted_count': mother_converted_count,
-            'flowering_converted_count': flowering_converted_count
-        }
         
-        return queryset
+        return annotations.with_seed_purchase_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0,
-            'active_seed_count': 0,
-            'mother_converted_count': 0,
-            'flowering_converted_count': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        return stats.seed_list_counts(queryset)
     
     @action(detail=True, methods=['post'])
     def convert_to_mother(self, request, pk=None):
         seed = self.get_object()
-        quantity = int(request.data.get('quantity', 1))
+        try:
+            quantity = parse_quantity(request.data.get('quantity', 1))
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         notes = request.data.get('notes', '')
         member_id = request.data.get('member_id', None)
         room_id = request.data.get('room_id', None)
         
-        if quantity > seed.remaining_quantity:
-            return Response(
-                {"error": "Nicht genügend Samen verfügbar"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            
-        # Erstelle einen Batch für die Mutterpflanzen
-        batch_kwargs = {
-            'seed_purchase': seed,
-            'quantity': quantity,
-            'notes': notes
-        }
-        
-        # Hinzufügen von optionalen Feldern
-        if member_id:
-            batch_kwargs['member_id'] = member_id
-        if room_id:
-            batch_kwargs['room_id'] = room_id
-            
-        batch = MotherPlantBatch.objects.create(**batch_kwargs)
-        
-        # Erstelle für jede Mutterpflanze einen eigenen Eintrag im Batch mit eindeutiger Chargenummer
-        for _ in range(quantity):
-            # Die batch_number wird automatisch in der save-Methode generiert
-            MotherPlant.objects.create(
-                batch=batch,
-                notes=notes
-            )
-            
-        # Aktualisiere die verfügbaren Samen
-        seed.remaining_quantity -= quantity
-        seed.save()
+        # Batch und alle Einzelpflanzen in einer Transaktion (bulk_create)
+        try:
+            batch = seed_to_mother_plants(seed, quantity, notes, member_id, room_id)
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             "message": f"{quantity} Mutterpflanzen wurden erstellt",
@@ -176,43 +150,19 @@ class SeedPurchaseViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def convert_to_flower(self, request, pk=None):
         seed = self.get_object()
-        quantity = int(request.data.get('quantity', 1))
+        try:
+            quantity = parse_quantity(request.data.get('quantity', 1))
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         notes = request.data.get('notes', '')
         member_id = request.data.get('member_id', None)
         room_id = request.data.get('room_id', None)
         
-        if quantity > seed.remaining_quantity:
-            return Response(
-                {"error": "Nicht genügend Samen verfügbar"}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            
-        # Erstelle einen Batch für die Blühpflanzen
-        batch_kwargs = {
-            'seed_purchase': seed,
-            'quantity': quantity,
-            'notes': notes
-        }
-        
-        # Hinzufügen von optionalen Feldern
-        if member_id:
-            batch_kwargs['member_id'] = member_id
-        if room_id:
-            batch_kwargs['room_id'] = room_id
-            
-        batch = FloweringPlantBatch.objects.create(**batch_kwargs)
-        
-        # Erstelle für jede Blühpflanze einen eigenen Eintrag im Batch mit eindeutiger Chargenummer
-        for _ in range(quantity):
-            # Die batch_number wird automatisch in der save-Methode generiert
-            FloweringPlant.objects.create(
-                batch=batch,
-                notes=notes
-            )
-            
-        # Aktualisiere die verfügbaren Samen
-        seed.remaining_quantity -= quantity
-        seed.save()
+        # Batch und alle Einzelpflanzen in einer Transaktion (bulk_create)
+        try:
+            batch = seed_to_flowering_plants(seed, quantity, notes, member_id, room_id)
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             "message": f"{quantity} Blühpflanzen wurden erstellt",
@@ -288,52 +238,9 @@ class SeedPurchaseViewSet(viewsets.ModelViewSet):
         })
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
-        # Aktive Samen
-        active_seeds = SeedPurchase.objects.filter(is_destroyed=False)
-        active_seed_count = active_seeds.filter(remaining_quantity__gt=0).count()
-        total_active_quantity = active_seeds.aggregate(total=models.Sum('remaining_quantity'))['total'] or 0
-        
-        # Vernichtete Samen
-        destroyed_seeds = SeedPurchase.objects.filter(is_destroyed=True)
-        destroyed_count = destroyed_seeds.count()
-        
-        # Korrigierte Berechnung der tatsächlich vernichteten Samenmenge
-        total_destroyed_quantity = 0
-        for seed in destroyed_seeds:
-            if seed.original_seed and seed.original_seed.id != seed.id:
-                # Bei teilweiser Vernichtung: Direkt die Menge verwenden
-                total_destroyed_quantity += seed.quantity
-            else:
-                # Bei vollständiger Vernichtung: Nur die wirklich vernichteten Samen zählen
-                # Berechne, wie viele Samen zu Pflanzen konvertiert wurden
-                converted_to_plants = 0
-                for mother_batch in seed.mother_batches.all():
-                    converted_to_plants += mother_batch.quantity
-                for flowering_batch in seed.flowering_batches.all():
-                    converted_to_plants += flowering_batch.quantity
-                    
-                # Nur die tatsächlich vernichteten Samen zählen
-                actually_destroyed = seed.quantity - converted_to_plants
-                total_destroyed_quantity += actually_destroyed
-        
-        # Batches und Pflanzen zählen
-        mother_batch_count = MotherPlantBatch.objects.count()
-        flowering_batch_count = FloweringPlantBatch.objects.count()
-        
-        mother_plant_count = MotherPlant.objects.filter(is_destroyed=False).count()
-        flowering_plant_count = FloweringPlant.objects.filter(is_destroyed=False).count()
-        
-        return Response({
-            'active_seed_count': active_seed_count,
-            'total_active_seeds_quantity': total_active_quantity,
-            'mother_batch_count': mother_batch_count,
-            'mother_plant_count': mother_plant_count,
-            'flowering_batch_count': flowering_batch_count,
-            'flowering_plant_count': flowering_plant_count,
-            'destroyed_count': destroyed_count,
-            'total_destroyed_seeds_quantity': total_destroyed_quantity
-        })
+        return Response(self.cached_counts('counts', stats.seed_counts, params=()))
     
     @action(detail=False, methods=['get'])
     def strain_options(self, request):
@@ -355,11 +262,11 @@ class SeedPurchaseViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
 
-class MotherPlantBatchViewSet(viewsets.ModelViewSet):
+class MotherPlantBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = MotherPlantBatch.objects.all().order_by('-created_at')
     serializer_class = MotherPlantBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = MotherPlantBatch.objects.all().order_by('-created_at')
@@ -387,36 +294,19 @@ class MotherPlantBatchViewSet(viewsets.ModelViewSet):
         # Filter für Batches mit vernichteten Pflanzen
         if has_destroyed == 'true':
             queryset = queryset.filter(plants__is_destroyed=True).distinct()
-            
-        # Berechne Anzahl für aktive und vernichtete Pflanzen
-        active_plants = 0
-        destroyed_plants = 0
-        
-        for batch in queryset:
-            active_plants += batch.plants.filter(is_destroyed=False).count()
-            destroyed_plants += batch.plants.filter(is_destroyed=True).count()
         
-        self.counts = {
-            'active_count': active_plants,
-            'destroyed_count': destroyed_plants
-        }
-        
-        return queryset
+        return annotations.with_mother_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        # Pflanzen aller gefilterten Chargen
+        return stats.list_tab_counts(MotherPlant, queryset, stats.MOTHER_PLANT_TABS)
     
     @action(detail=True, methods=['get'])
     def plants(self, request, pk=None):
         batch = self.get_object()
         destroyed = request.query_params.get('destroyed', None)
         
-        plants = batch.plants.all()
+        plants = annotations.with_mother_plant_fields(batch.plants.all())
         if destroyed is not None:
             is_destroyed = destroyed.lower() == 'true'
             plants = plants.filter(is_destroyed=is_destroyed)
@@ -448,124 +338,68 @@ class MotherPlantBatchViewSet(viewsets.ModelViewSet):
             destroy_reason=reason,
             destroyed_at=timezone.now()
         )
+        # QuerySet.update löst keine Signale aus
+        transaction.on_commit(invalidate_counts)
         
         return Response({
             "message": f"{len(plant_ids)} Mutterpflanzen wurden als vernichtet markiert"
         })
 
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
         """
         Gibt die Anzahl der Batches und Pflanzen je nach Typ zurück.
         """
         count_type = self.request.query_params.get('type', None)
+        counts = self.cached_counts('counts', stats.mother_counts, params=())
         
-        if count_type == 'active':
-            # Zählung für aktive Pflanzen
-            batches_count = MotherPlantBatch.objects.filter(
-                plants__is_destroyed=False
-            ).distinct().count()
-            plants_count = MotherPlant.objects.filter(is_destroyed=False).count()
-            
-            return Response({
-                "batches_count": batches_count,
-                "plants_count": plants_count
-            })
-            
-        elif count_type == 'destroyed':
-            # Zählung für vernichtete Pflanzen
-            batches_count = MotherPlantBatch.objects.filter(
-                plants__is_destroyed=True
-            ).distinct().count()
-            plants_count = MotherPlant.objects.filter(is_destroyed=True).count()
-            
+        if count_type in ('active', 'destroyed'):
             return Response({
-                "batches_count": batches_count,
-                "plants_count": plants_count
+                "batches_count": counts[f'{count_type}_batches_count'],
+                "plants_count": counts[f'{count_type}_plants_count']
             })
             
         elif count_type == 'cutting':
             # Zählung für Stecklinge
-            batch_count = CuttingBatch.objects.filter(mother_batch__isnull=False).count()
-            cutting_count = 0
-            for batch in CuttingBatch.objects.filter(mother_batch__isnull=False):
-                cutting_count += batch.cuttings.filter(is_destroyed=False).count()
-                
-            return Response({
-                "batch_count": batch_count,
-                "cutting_count": cutting_count
-            })
-        
-        else:
-            # Wenn kein Typ angegeben ist, gib alle Zahlen zurück
-            active_batches = MotherPlantBatch.objects.filter(
-                plants__is_destroyed=False
-            ).distinct().count()
-            active_plants = MotherPlant.objects.filter(is_destroyed=False).count()
-            
-            destroyed_batches = MotherPlantBatch.objects.filter(
-                plants__is_destroyed=True
-            ).distinct().count()
-            destroyed_plants = MotherPlant.objects.filter(is_destroyed=True).count()
-            
-            cutting_batches = CuttingBatch.objects.filter(mother_batch__isnull=False).count()
-            cutting_count = 0
-            for batch in CuttingBatch.objects.filter(mother_batch__isnull=False):
-                cutting_count += batch.cuttings.filter(is_destroyed=False).count()
-            
             return Response({
-                "active_batches_count": active_batches,
-                "active_plants_count": active_plants,
-                "destroyed_batches_count": destroyed_batches,
-                "destroyed_plants_count": destroyed_plants,
-                "cutting_batch_count": cutting_batches,
-                "cutting_count": cutting_count
+                "batch_count": counts['cutting_batch_count'],
+                "cutting_count": counts['cutting_count']
             })
         
+        # Wenn kein Typ angegeben ist, gib alle Zahlen zurück
+        return Response(counts)
+    
     @action(detail=True, methods=['post'])
     def create_cuttings(self, request, pk=None):
         """
         Erstellt Stecklinge von einer Mutterpflanzen-Charge.
         """
         mother_batch = self.get_object()
-        quantity = int(request.data.get('quantity', 1))
+        try:
+            quantity = parse_quantity(request.data.get('quantity', 1))
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         notes = request.data.get('notes', '')
         member_id = request.data.get('member_id', None)
         room_id = request.data.get('room_id', None)
         
-        # Erstelle einen Batch für die Stecklinge
-        batch_kwargs = {
-            'mother_batch': mother_batch,
-            'quantity': quantity,
-            'notes': notes
-        }
-        
-        # Hinzufügen von optionalen Feldern
-        if member_id:
-            batch_kwargs['member_id'] = member_id
-        if room_id:
-            batch_kwargs['room_id'] = room_id
-            
-        batch = CuttingBatch.objects.create(**batch_kwargs)
-        
-        # Erstelle für jeden Steckling einen eigenen Eintrag im Batch mit eindeutiger Chargenummer
-        for _ in range(quantity):
-            # Die batch_number wird automatisch in der save-Methode generiert
-            Cutting.objects.create(
-                batch=batch,
-                notes=notes
-            )
+        # Batch und alle Stecklinge in einer Transaktion (bulk_create)
+        try:
+            batch = create_cuttings(mother_batch, quantity, notes, member_id, room_id)
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             "message": f"{quantity} Stecklinge wurden erstellt",
             "batch": CuttingBatchSerializer(batch).data
         })
 
-class FloweringPlantBatchViewSet(viewsets.ModelViewSet):
+class FloweringPlantBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = FloweringPlantBatch.objects.all().order_by('-created_at')
     serializer_class = FloweringPlantBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = FloweringPlantBatch.objects.all().order_by('-created_at')
@@ -605,44 +439,12 @@ class FloweringPlantBatchViewSet(viewsets.ModelViewSet):
                 plants__is_destroyed=True,
                 plants__destroy_reason__icontains="Zur Ernte konvertiert"
             ).distinct()
-            
-        # Berechne Anzahl für aktive, vernichtete und geerntete Pflanzen
-        active_plants = 0
-        destroyed_plants = 0
-        harvested_plants = 0
-        
-        for batch in queryset:
-            active_plants += batch.plants.filter(is_destroyed=False).count()
-            
-            # Zähle vernichtete Pflanzen (nicht zu Ernte überführt)
-            destroyed_plants += batch.plants.filter(
-                is_destroyed=True
-            ).exclude(
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            ).count()
-            
-            # Zähle zu Ernte überführte Pflanzen
-            harvested_plants += batch.plants.filter(
-                is_destroyed=True,
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            ).count()
-        
-        self.counts = {
-            'active_count': active_plants,
-            'destroyed_count': destroyed_plants,
-            'harvested_count': harvested_plants
-        }
         
-        return queryset
+        return annotations.with_flowering_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0,
-            'harvested_count': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        # Pflanzen aller gefilterten Chargen; vernichtet = nicht zur Ernte überführt
+        return stats.list_tab_counts(FloweringPlant, queryset, stats.PLANT_TABS)
     
     @action(detail=True, methods=['get'])
     def plants(self, request, pk=None):
@@ -703,101 +505,38 @@ class FloweringPlantBatchViewSet(viewsets.ModelViewSet):
             destroy_reason=reason,
             destroyed_at=timezone.now()
         )
+        # QuerySet.update löst keine Signale aus
+        transaction.on_commit(invalidate_counts)
         
         return Response({
             "message": f"{len(plant_ids)} Blühpflanzen wurden als vernichtet markiert"
         })
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
         """
         Gibt die Anzahl der Batches und Pflanzen je nach Typ zurück.
         """
         count_type = self.request.query_params.get('type', None)
+        counts = self.cached_counts('counts', lambda: stats.plant_counts(FloweringPlant), params=())
         
-        if count_type == 'active':
-            # Zählung für aktive Pflanzen
-            batches_count = FloweringPlantBatch.objects.filter(
-                plants__is_destroyed=False
-            ).distinct().count()
-            plants_count = FloweringPlant.objects.filter(is_destroyed=False).count()
-            
-            return Response({
-                "batches_count": batches_count,
-                "plants_count": plants_count
-            })
-            
-        elif count_type == 'destroyed':
-            # Zählung für vernichtete Pflanzen (ohne zu Ernte überführte)
-            destroyed_plants = FloweringPlant.objects.filter(
-                is_destroyed=True
-            ).exclude(
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            batches_count = FloweringPlantBatch.objects.filter(
-                plants__in=destroyed_plants
-            ).distinct().count()
-            plants_count = destroyed_plants.count()
-            
+        if count_type in ('active', 'destroyed'):
+            # Vernichtete ohne zu Ernte überführte Pflanzen
             return Response({
-                "batches_count": batches_count,
-                "plants_count": plants_count
+                "batches_count": counts[f'{count_type}_batches_count'],
+                "plants_count": counts[f'{count_type}_plants_count']
             })
             
         elif count_type == 'harvested':
-            # Zählung für zu Ernte überführte Pflanzen
-            harvested_plants = FloweringPlant.objects.filter(
-                is_destroyed=True,
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            batches_count = FloweringPlantBatch.objects.filter(
-                plants__in=harvested_plants
-            ).distinct().count()
-            plants_count = harvested_plants.count()
-            
             return Response({
-                "batches_count": batches_count,
-                "harvested_plants_count": plants_count
+                "batches_count": counts['harvested_batches_count'],
+                "harvested_plants_count": counts['harvested_plants_count']
             })
         
-        else:
-            # Wenn kein Typ angegeben ist, gib alle Zahlen zurück
-            active_plants = FloweringPlant.objects.filter(is_destroyed=False)
-            
-            destroyed_plants = FloweringPlant.objects.filter(
-                is_destroyed=True
-            ).exclude(
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            harvested_plants = FloweringPlant.objects.filter(
-                is_destroyed=True,
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            active_batches = FloweringPlantBatch.objects.filter(
-                plants__in=active_plants
-            ).distinct().count()
-            
-            destroyed_batches = FloweringPlantBatch.objects.filter(
-                plants__in=destroyed_plants
-            ).distinct().count()
-            
-            harvested_batches = FloweringPlantBatch.objects.filter(
-                plants__in=harvested_plants
-            ).distinct().count()
-            
-            return Response({
-                "active_batches_count": active_batches,
-                "active_plants_count": active_plants.count(),
-                "destroyed_batches_count": destroyed_batches,
-                "destroyed_plants_count": destroyed_plants.count(),
-                "harvested_batches_count": harvested_batches,
-                "harvested_plants_count": harvested_plants.count()
-            })
-            
+        # Wenn kein Typ angegeben ist, gib alle Zahlen zurück
+        return Response(counts)
+    
     @action(detail=True, methods=['post'])
     def convert_to_harvest(self, request, pk=None):
         """
@@ -857,11 +596,11 @@ class FloweringPlantBatchViewSet(viewsets.ModelViewSet):
             "harvest": HarvestBatchSerializer(harvest).data
         })
 
-class CuttingBatchViewSet(viewsets.ModelViewSet):
+class CuttingBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = CuttingBatch.objects.all().order_by('-created_at')
     serializer_class = CuttingBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = CuttingBatch.objects.all().order_by('-created_at')
@@ -900,29 +639,14 @@ class CuttingBatchViewSet(viewsets.ModelViewSet):
         if has_converted == 'true':
             converted_query = Q(is_destroyed=True, destroy_reason__icontains="Zu Blühpflanze konvertiert")
             queryset = queryset.filter(cuttings__in=Cutting.objects.filter(converted_query)).distinct()
-            
-        # Berechne Anzahl für aktive und vernichtete Stecklinge
-        active_cuttings = 0
-        destroyed_cuttings = 0
-        
-        for batch in queryset:
-            active_cuttings += batch.cuttings.filter(is_destroyed=False).count()
-            destroyed_cuttings += batch.cuttings.filter(is_destroyed=True).count()
-        
-        self.counts = {
-            'active_count': active_cuttings,
-            'destroyed_count': destroyed_cuttings
-        }
         
-        return queryset
+        return annotations.with_cutting_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0
+    def get_list_counts(self, queryset):
+        return stats.list_tab_counts(Cutting, queryset, {
+            'active': stats.CUTTING_TABS['active'],
+            'destroyed': stats.CUTTING_TABS['destroyed']
         })
-        return response
     
     @action(detail=True, methods=['get'])
     def cuttings(self, request, pk=None):
@@ -990,62 +714,42 @@ class CuttingBatchViewSet(viewsets.ModelViewSet):
             destroy_data['destroyed_by_id'] = destroyed_by_id
             
         Cutting.objects.filter(id__in=cutting_ids, batch=batch).update(**destroy_data)
+        # QuerySet.update löst keine Signale aus
+        transaction.on_commit(invalidate_counts)
         
         return Response({
             "message": f"{len(cutting_ids)} Stecklinge wurden als vernichtet markiert"
         })
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
         """
         Gibt die Anzahl der Batches und Stecklinge je nach Typ zurück.
         """
         count_type = self.request.query_params.get('type', None)
+        counts = self.cached_counts('counts', stats.cutting_counts, params=())
         
         if count_type == 'all':
             # Alle Zähler auf einmal zurückgeben
-            active_batches = CuttingBatch.objects.filter(
-                cuttings__is_destroyed=False
-            ).distinct().count()
-            active_count = Cutting.objects.filter(is_destroyed=False).count()
-            
-            destroyed_batches = CuttingBatch.objects.filter(
-                cuttings__is_destroyed=True
-            ).distinct().count()
-            destroyed_count = Cutting.objects.filter(is_destroyed=True).count()
-            
-            # Zu Blühpflanzen konvertierte Stecklinge zählen
-            converted_query = Q(is_destroyed=True, destroy_reason__icontains="Zu Blühpflanze konvertiert")
-            converted_batches = CuttingBatch.objects.filter(
-                cuttings__in=Cutting.objects.filter(converted_query)
-            ).distinct().count()
-            converted_count = Cutting.objects.filter(converted_query).count()
-            
-            return Response({
-                "active_batches_count": active_batches,
-                "active_count": active_count,
-                "destroyed_batches_count": destroyed_batches,
-                "destroyed_count": destroyed_count,
-                "converted_batches_count": converted_batches,
-                "converted_count": converted_count
-            })
+            return Response(counts)
         
         # Standardverhalten: nur aktive/vernichtete Zähler zurückgeben
-        active_count = Cutting.objects.filter(is_destroyed=False).count()
-        destroyed_count = Cutting.objects.filter(is_destroyed=True).count()
-        
         return Response({
-            "active_count": active_count,
-            "destroyed_count": destroyed_count
+            "active_count": counts['active_count'],
+            "destroyed_count": counts['destroyed_count']
         })
-        
+    
     @action(detail=True, methods=['post'])
     def convert_to_blooming(self, request, pk=None):
         """
         Konvertiert Stecklinge zu Blühpflanzen aus Stecklingen.
         """
         cutting_batch = self.get_object()
-        quantity = int(request.data.get('quantity', 1))
+        try:
+            quantity = parse_quantity(request.data.get('quantity', 1))
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         notes = request.data.get('notes', '')
         member_id = request.data.get('member_id', None)
         room_id = request.data.get('room_id', None)
@@ -1085,49 +789,17 @@ class CuttingBatchViewSet(viewsets.ModelViewSet):
             
             cuttings_to_use = active_cuttings
         
-        # Erstelle einen Batch für die Blühpflanzen aus Stecklingen
-        batch_kwargs = {
-            'cutting_batch': cutting_batch,
-            'quantity': quantity,
-            'notes': notes
-        }
-        
-        # Hinzufügen von optionalen Feldern
-        if member_id:
-            batch_kwargs['member_id'] = member_id
-        if room_id:
-            batch_kwargs['room_id'] = room_id
-            
         try:
-            batch = BloomingCuttingBatch.objects.create(**batch_kwargs)
-            
-            # Erstelle für jede Blühpflanze einen eigenen Eintrag im Batch mit eindeutiger Chargenummer
-            for _ in range(quantity):
-                # Die batch_number wird automatisch in der save-Methode generiert
-                BloomingCuttingPlant.objects.create(
-                    batch=batch,
-                    notes=notes
-                )
-            
-            # Markiere die verwendeten Stecklinge als vernichtet und konvertiert
-            cuttings_to_mark = cuttings_to_use[:quantity]
-            conversion_time = timezone.now()
-            
-            for cutting in cuttings_to_mark:
-                cutting.is_destroyed = True
-                cutting.destroy_reason = f"Zu Blühpflanze konvertiert (Charge: {batch.batch_number})"
-                cutting.destroyed_at = conversion_time
-                cutting.destroyed_by_id = member_id
-                cutting.converted_to = batch.id  # Speichern der Ziel-Batch-ID
-                cutting.converted_at = conversion_time
-                cutting.converted_by_id = member_id
-                cutting.save()
+            # Batch, Blühpflanzen (bulk_create) und verbrauchte Stecklinge in einer Transaktion
+            batch = cuttings_to_blooming(cutting_batch, cuttings_to_use, quantity, notes, member_id, room_id)
                 
             return Response({
                 "message": f"{quantity} Blühpflanzen wurden aus Stecklingen erstellt",
                 "batch": BloomingCuttingBatchSerializer(batch).data
             })
         
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {"error": f"Fehler bei der Konvertierung: {str(e)}"},
@@ -1142,6 +814,9 @@ class MotherPlantViewSet(viewsets.ModelViewSet):
     serializer_class = MotherPlantSerializer
     permission_classes = [IsAuthenticated]
     
+    def get_queryset(self):
+        return annotations.with_mother_plant_fields(MotherPlant.objects.all().order_by('created_at'))
+    
     @action(detail=True, methods=['post'])
     def create_cuttings(self, request, pk=None):
         """
@@ -1150,39 +825,23 @@ class MotherPlantViewSet(viewsets.ModelViewSet):
         plant = self.get_object()
         batch = plant.batch  # Hole den Batch der Mutterpflanze
         
-        quantity = int(request.data.get('quantity', 1))
+        try:
+            quantity = parse_quantity(request.data.get('quantity', 1))
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         notes = request.data.get('notes', '')
         member_id = request.data.get('member_id', None)
         room_id = request.data.get('room_id', None)
         
-        # Erstelle einen neuen Batch für die Stecklinge
-        batch_kwargs = {
-            'mother_batch': batch,
-            'quantity': quantity,
-            'notes': notes
-        }
-        
-        # Hinzufügen von optionalen Feldern
-        if member_id:
-            batch_kwargs['member_id'] = member_id
-        if room_id:
-            batch_kwargs['room_id'] = room_id
-        
         # In den Notes die Ursprungspflanze vermerken
         plant_notes = f"Erstellt von Mutterpflanze {plant.batch_number} (ID: {plant.id})"
-        if notes:
-            batch_kwargs['notes'] = f"{notes} - {plant_notes}"
-        else:
-            batch_kwargs['notes'] = plant_notes
-            
-        cutting_batch = CuttingBatch.objects.create(**batch_kwargs)
+        notes = f"{notes} - {plant_notes}" if notes else plant_notes
         
-        # Erstelle für jeden Steckling einen eigenen Eintrag mit eindeutiger Nummer
-        for _ in range(quantity):
-            Cutting.objects.create(
-                batch=cutting_batch,
-                notes=batch_kwargs['notes']
-            )
+        # Batch und alle Stecklinge in einer Transaktion (bulk_create)
+        try:
+            cutting_batch = create_cuttings(batch, quantity, notes, member_id, room_id)
+        except ConversionError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         return Response({
             "message": f"{quantity} Stecklinge wurden von Mutterpflanze {plant.batch_number} erstellt",
@@ -1221,11 +880,11 @@ class MotherPlantViewSet(viewsets.ModelViewSet):
         serializer = MotherPlantRatingSerializer(ratings, many=True)
         return Response(serializer.data)
 
-class BloomingCuttingBatchViewSet(viewsets.ModelViewSet):
+class BloomingCuttingBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = BloomingCuttingBatch.objects.all().order_by('-created_at')
     serializer_class = BloomingCuttingBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = BloomingCuttingBatch.objects.all().order_by('-created_at')
@@ -1264,44 +923,12 @@ class BloomingCuttingBatchViewSet(viewsets.ModelViewSet):
                 plants__is_destroyed=True,
                 plants__destroy_reason__icontains="Zur Ernte konvertiert"
             ).distinct()
-            
-        # Berechne Anzahl für aktive, vernichtete und geerntete Pflanzen
-        active_plants = 0
-        destroyed_plants = 0
-        harvested_plants = 0
-        
-        for batch in queryset:
-            active_plants += batch.plants.filter(is_destroyed=False).count()
-            
-            # Zähle vernichtete Pflanzen (nicht zu Ernte überführt)
-            destroyed_plants += batch.plants.filter(
-                is_destroyed=True
-            ).exclude(
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            ).count()
-            
-            # Zähle zu Ernte überführte Pflanzen
-            harvested_plants += batch.plants.filter(
-                is_destroyed=True,
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            ).count()
-        
-        self.counts = {
-            'active_count': active_plants,
-            'destroyed_count': destroyed_plants,
-            'harvested_count': harvested_plants
-        }
         
-        return queryset
+        return annotations.with_blooming_cutting_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0,
-            'harvested_count': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        # Pflanzen aller gefilterten Chargen; vernichtet = nicht zur Ernte überführt
+        return stats.list_tab_counts(BloomingCuttingPlant, queryset, stats.PLANT_TABS)
     
     @action(detail=True, methods=['get'])
     def plants(self, request, pk=None):
@@ -1374,101 +1001,38 @@ class BloomingCuttingBatchViewSet(viewsets.ModelViewSet):
             destroy_data['destroyed_by_id'] = destroyed_by_id
         
         BloomingCuttingPlant.objects.filter(id__in=plant_ids, batch=batch).update(**destroy_data)
+        # QuerySet.update löst keine Signale aus
+        transaction.on_commit(invalidate_counts)
         
         return Response({
             "message": f"{len(plant_ids)} Blühpflanzen wurden als vernichtet markiert"
         })
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
         """
         Gibt die Anzahl der Batches und Pflanzen je nach Typ zurück.
         """
         count_type = self.request.query_params.get('type', None)
+        counts = self.cached_counts('counts', lambda: stats.plant_counts(BloomingCuttingPlant), params=())
         
-        if count_type == 'active':
-            # Zählung für aktive Pflanzen
-            batches_count = BloomingCuttingBatch.objects.filter(
-                plants__is_destroyed=False
-            ).distinct().count()
-            plants_count = BloomingCuttingPlant.objects.filter(is_destroyed=False).count()
-            
-            return Response({
-                "batches_count": batches_count,
-                "plants_count": plants_count
-            })
-            
-        elif count_type == 'destroyed':
-            # Zählung für vernichtete Pflanzen (ohne zu Ernte überführte)
-            destroyed_plants = BloomingCuttingPlant.objects.filter(
-                is_destroyed=True
-            ).exclude(
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            batches_count = BloomingCuttingBatch.objects.filter(
-                plants__in=destroyed_plants
-            ).distinct().count()
-            plants_count = destroyed_plants.count()
-            
+        if count_type in ('active', 'destroyed'):
+            # Vernichtete ohne zu Ernte überführte Pflanzen
             return Response({
-                "batches_count": batches_count,
-                "plants_count": plants_count
+                "batches_count": counts[f'{count_type}_batches_count'],
+                "plants_count": counts[f'{count_type}_plants_count']
             })
             
         elif count_type == 'harvested':
-            # Zählung für zu Ernte überführte Pflanzen
-            harvested_plants = BloomingCuttingPlant.objects.filter(
-                is_destroyed=True,
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            batches_count = BloomingCuttingBatch.objects.filter(
-                plants__in=harvested_plants
-            ).distinct().count()
-            plants_count = harvested_plants.count()
-            
             return Response({
-                "batches_count": batches_count,
-                "harvested_plants_count": plants_count
+                "batches_count": counts['harvested_batches_count'],
+                "harvested_plants_count": counts['harvested_plants_count']
             })
         
-        else:
-            # Wenn kein Typ angegeben ist, gib alle Zahlen zurück
-            active_plants = BloomingCuttingPlant.objects.filter(is_destroyed=False)
-            
-            destroyed_plants = BloomingCuttingPlant.objects.filter(
-                is_destroyed=True
-            ).exclude(
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            harvested_plants = BloomingCuttingPlant.objects.filter(
-                is_destroyed=True,
-                destroy_reason__icontains="Zur Ernte konvertiert"
-            )
-            
-            active_batches = BloomingCuttingBatch.objects.filter(
-                plants__in=active_plants
-            ).distinct().count()
-            
-            destroyed_batches = BloomingCuttingBatch.objects.filter(
-                plants__in=destroyed_plants
-            ).distinct().count()
-            
-            harvested_batches = BloomingCuttingBatch.objects.filter(
-                plants__in=harvested_plants
-            ).distinct().count()
-            
-            return Response({
-                "active_batches_count": active_batches,
-                "active_plants_count": active_plants.count(),
-                "destroyed_batches_count": destroyed_batches,
-                "destroyed_plants_count": destroyed_plants.count(),
-                "harvested_batches_count": harvested_batches,
-                "harvested_plants_count": harvested_plants.count()
-            })
-
+        # Wenn kein Typ angegeben ist, gib alle Zahlen zurück
+        return Response(counts)
+    
     @action(detail=True, methods=['post'])
     def convert_to_harvest(self, request, pk=None):
         """
@@ -1528,11 +1092,11 @@ class BloomingCuttingBatchViewSet(viewsets.ModelViewSet):
             "harvest": HarvestBatchSerializer(harvest).data
         })
 
-class HarvestBatchViewSet(viewsets.ModelViewSet):
+class HarvestBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = HarvestBatch.objects.all().order_by('-created_at')
     serializer_class = HarvestBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = HarvestBatch.objects.all().order_by('-created_at')
@@ -1570,68 +1134,19 @@ class HarvestBatchViewSet(viewsets.ModelViewSet):
         elif destroyed is not None:
             is_destroyed = destroyed.lower() == 'true'
             queryset = queryset.filter(is_destroyed=is_destroyed)
-            
-        # Berechne Anzahl und Gewicht für alle Status-Typen
-        active_harvests = HarvestBatch.objects.filter(is_destroyed=False, converted_to_drying=False)
-        dried_harvests = HarvestBatch.objects.filter(converted_to_drying=True)
-        destroyed_harvests = HarvestBatch.objects.filter(is_destroyed=True)
-        
-        active_count = active_harvests.count()
-        dried_count = dried_harvests.count()
-        destroyed_count = destroyed_harvests.count()
-        
-        total_active_weight = active_harvests.aggregate(total=models.Sum('weight'))['total'] or 0
-        total_dried_weight = dried_harvests.aggregate(total=models.Sum('weight'))['total'] or 0
-        total_destroyed_weight = destroyed_harvests.aggregate(total=models.Sum('weight'))['total'] or 0
-        
-        self.counts = {
-            'active_count': active_count,
-            'dried_count': dried_count,
-            'destroyed_count': destroyed_count,
-            'total_active_weight': total_active_weight,
-            'total_dried_weight': total_dried_weight,
-            'total_destroyed_weight': total_destroyed_weight
-        }
         
-        return queryset
+        return annotations.with_harvest_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'dried_count': 0,
-            'destroyed_count': 0,
-            'total_active_weight': 0,
-            'total_dried_weight': 0,
-            'total_destroyed_weight': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        # Die Tabs zeigen unabhängig vom Filter alle Ernten
+        return stats.harvest_counts(HarvestBatch.objects.all())
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
-        # Filtere nach verschiedenen Status
-        active_harvests = HarvestBatch.objects.filter(is_destroyed=False, converted_to_drying=False)
-        dried_harvests = HarvestBatch.objects.filter(converted_to_drying=True)
-        destroyed_harvests = HarvestBatch.objects.filter(is_destroyed=True)
-        
-        # Zähle Datensätze
-        active_count = active_harvests.count()
-        dried_count = dried_harvests.count()
-        destroyed_count = destroyed_harvests.count()
-        
-        # Berechne Gesamtgewichte
-        total_active_weight = active_harvests.aggregate(total=models.Sum('weight'))['total'] or 0
-        total_dried_weight = dried_harvests.aggregate(total=models.Sum('weight'))['total'] or 0
-        total_destroyed_weight = destroyed_harvests.aggregate(total=models.Sum('weight'))['total'] or 0
-        
-        return Response({
-            'active_count': active_count,
-            'dried_count': dried_count,
-            'destroyed_count': destroyed_count,
-            'total_active_weight': float(total_active_weight),
-            'total_dried_weight': float(total_dried_weight),
-            'total_destroyed_weight': float(total_destroyed_weight)
-        })
+        return Response(self.cached_counts(
+            'counts', lambda: stats.harvest_counts(HarvestBatch.objects.all()), params=()
+        ))
     
     @action(detail=True, methods=['post'])
     def destroy_harvest(self, request, pk=None):
@@ -1735,11 +1250,11 @@ class HarvestBatchViewSet(viewsets.ModelViewSet):
             "drying": DryingBatchSerializer(drying).data
         })
     
-class DryingBatchViewSet(viewsets.ModelViewSet):
+class DryingBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = DryingBatch.objects.all().order_by('-created_at')
     serializer_class = DryingBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = DryingBatch.objects.all().order_by('-created_at')
@@ -1762,61 +1277,18 @@ class DryingBatchViewSet(viewsets.ModelViewSet):
         if destroyed is not None:
             is_destroyed = destroyed.lower() == 'true'
             queryset = queryset.filter(is_destroyed=is_destroyed)
-            
-        # Berechne Anzahl für aktive und vernichtete Trocknungen
-        active_count = queryset.filter(is_destroyed=False).count()
-        destroyed_count = queryset.filter(is_destroyed=True).count()
-        
-        # Berechne Gesamtgewicht für aktive und vernichtete Trocknungen
-        total_active_initial_weight = queryset.filter(is_destroyed=False).aggregate(total=models.Sum('initial_weight'))['total'] or 0
-        total_active_final_weight = queryset.filter(is_destroyed=False).aggregate(total=models.Sum('final_weight'))['total'] or 0
-        total_destroyed_initial_weight = queryset.filter(is_destroyed=True).aggregate(total=models.Sum('initial_weight'))['total'] or 0
-        total_destroyed_final_weight = queryset.filter(is_destroyed=True).aggregate(total=models.Sum('final_weight'))['total'] or 0
-        
-        self.counts = {
-            'active_count': active_count,
-            'destroyed_count': destroyed_count,
-            'total_active_initial_weight': total_active_initial_weight,
-            'total_active_final_weight': total_active_final_weight,
-            'total_destroyed_initial_weight': total_destroyed_initial_weight,
-            'total_destroyed_final_weight': total_destroyed_final_weight
-        }
         
-        return queryset
+        return annotations.with_drying_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0,
-            'total_active_initial_weight': 0,
-            'total_active_final_weight': 0,
-            'total_destroyed_initial_weight': 0,
-            'total_destroyed_final_weight': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        return stats.drying_counts(queryset)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
-        active_batches = DryingBatch.objects.filter(is_destroyed=False)
-        destroyed_batches = DryingBatch.objects.filter(is_destroyed=True)
-        
-        active_count = active_batches.count()
-        destroyed_count = destroyed_batches.count()
-        
-        total_active_initial_weight = active_batches.aggregate(total=models.Sum('initial_weight'))['total'] or 0
-        total_active_final_weight = active_batches.aggregate(total=models.Sum('final_weight'))['total'] or 0
-        total_destroyed_initial_weight = destroyed_batches.aggregate(total=models.Sum('initial_weight'))['total'] or 0
-        total_destroyed_final_weight = destroyed_batches.aggregate(total=models.Sum('final_weight'))['total'] or 0
-        
-        return Response({
-            'active_count': active_count,
-            'destroyed_count': destroyed_count,
-            'total_active_initial_weight': float(total_active_initial_weight),
-            'total_active_final_weight': float(total_active_final_weight),
-            'total_destroyed_initial_weight': float(total_destroyed_initial_weight),
-            'total_destroyed_final_weight': float(total_destroyed_final_weight)
-        })
+        return Response(self.cached_counts(
+            'counts', lambda: stats.drying_counts(DryingBatch.objects.all()), params=()
+        ))
     
     @action(detail=True, methods=['post'])
     def destroy_drying(self, request, pk=None):
@@ -1915,11 +1387,11 @@ class DryingBatchViewSet(viewsets.ModelViewSet):
             "processing": ProcessingBatchSerializer(processing).data
         })
     
-class ProcessingBatchViewSet(viewsets.ModelViewSet):
+class ProcessingBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = ProcessingBatch.objects.all().order_by('-created_at')
     serializer_class = ProcessingBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = ProcessingBatch.objects.all().order_by('-created_at')
@@ -1948,84 +1420,18 @@ class ProcessingBatchViewSet(viewsets.ModelViewSet):
         if destroyed is not None:
             is_destroyed = destroyed.lower() == 'true'
             queryset = queryset.filter(is_destroyed=is_destroyed)
-            
-        # Berechne Anzahl für aktive und vernichtete Verarbeitungen
-        active_count = queryset.filter(is_destroyed=False).count()
-        destroyed_count = queryset.filter(is_destroyed=True).count()
-        
-        # Berechne Gesamtgewicht für aktive und vernichtete Verarbeitungen
-        total_active_input_weight = queryset.filter(is_destroyed=False).aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_active_output_weight = queryset.filter(is_destroyed=False).aggregate(total=models.Sum('output_weight'))['total'] or 0
-        total_destroyed_input_weight = queryset.filter(is_destroyed=True).aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_destroyed_output_weight = queryset.filter(is_destroyed=True).aggregate(total=models.Sum('output_weight'))['total'] or 0
-        
-        # Berechne Anzahl und Gewicht nach Produkt-Typ
-        marijuana_count = queryset.filter(is_destroyed=False, product_type='marijuana').count()
-        hashish_count = queryset.filter(is_destroyed=False, product_type='hashish').count()
-        marijuana_weight = queryset.filter(is_destroyed=False, product_type='marijuana').aggregate(total=models.Sum('output_weight'))['total'] or 0
-        hashish_weight = queryset.filter(is_destroyed=False, product_type='hashish').aggregate(total=models.Sum('output_weight'))['total'] or 0
-        
-        self.counts = {
-            'active_count': active_count,
-            'destroyed_count': destroyed_count,
-            'total_active_input_weight': total_active_input_weight,
-            'total_active_output_weight': total_active_output_weight,
-            'total_destroyed_input_weight': total_destroyed_input_weight,
-            'total_destroyed_output_weight': total_destroyed_output_weight,
-            'marijuana_count': marijuana_count,
-            'hashish_count': hashish_count,
-            'marijuana_weight': marijuana_weight,
-            'hashish_weight': hashish_weight
-        }
         
-        return queryset
+        return annotations.with_processing_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0,
-            'total_active_input_weight': 0,
-            'total_active_output_weight': 0,
-            'total_destroyed_input_weight': 0,
-            'total_destroyed_output_weight': 0,
-            'marijuana_count': 0,
-            'hashish_count': 0,
-            'marijuana_weight': 0,
-            'hashish_weight': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        return stats.processing_counts(queryset)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
-        active_batches = ProcessingBatch.objects.filter(is_destroyed=False)
-        destroyed_batches = ProcessingBatch.objects.filter(is_destroyed=True)
-        
-        active_count = active_batches.count()
-        destroyed_count = destroyed_batches.count()
-        
-        total_active_input_weight = active_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_active_output_weight = active_batches.aggregate(total=models.Sum('output_weight'))['total'] or 0
-        total_destroyed_input_weight = destroyed_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_destroyed_output_weight = destroyed_batches.aggregate(total=models.Sum('output_weight'))['total'] or 0
-        
-        marijuana_count = active_batches.filter(product_type='marijuana').count()
-        hashish_count = active_batches.filter(product_type='hashish').count()
-        marijuana_weight = active_batches.filter(product_type='marijuana').aggregate(total=models.Sum('output_weight'))['total'] or 0
-        hashish_weight = active_batches.filter(product_type='hashish').aggregate(total=models.Sum('output_weight'))['total'] or 0
-        
-        return Response({
-            'active_count': active_count,
-            'destroyed_count': destroyed_count,
-            'total_active_input_weight': float(total_active_input_weight),
-            'total_active_output_weight': float(total_active_output_weight),
-            'total_destroyed_input_weight': float(total_destroyed_input_weight),
-            'total_destroyed_output_weight': float(total_destroyed_output_weight),
-            'marijuana_count': marijuana_count,
-            'hashish_count': hashish_count,
-            'marijuana_weight': float(marijuana_weight),
-            'hashish_weight': float(hashish_weight)
-        })
+        return Response(self.cached_counts(
+            'counts', lambda: stats.processing_counts(ProcessingBatch.objects.all()), params=()
+        ))
     
     @action(detail=True, methods=['post'])
     def destroy_processing(self, request, pk=None):
@@ -2140,11 +1546,11 @@ class ProcessingBatchViewSet(viewsets.ModelViewSet):
             "lab_testing": serializer.data
         })
     
-class LabTestingBatchViewSet(viewsets.ModelViewSet):
+class LabTestingBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = LabTestingBatch.objects.all().order_by('-created_at')
     serializer_class = LabTestingBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = LabTestingBatch.objects.all().order_by('-created_at')
@@ -2186,101 +1592,18 @@ class LabTestingBatchViewSet(viewsets.ModelViewSet):
         if converted is not None:
             is_converted = converted.lower() == 'true'
             queryset = queryset.filter(converted_to_packaging=is_converted)
-            
-        # Berechne Anzahl für aktive und freigegebe Labortests
-        pending_count = queryset.filter(is_destroyed=False, status='pending').count()
-        passed_count = queryset.filter(is_destroyed=False, status='passed').count()
-        failed_count = queryset.filter(is_destroyed=False, status='failed').count()
-        destroyed_count = queryset.filter(is_destroyed=True).count()
-        
-        # Berechne Gesamtgewicht
-        total_pending_weight = queryset.filter(is_destroyed=False, status='pending').aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_passed_weight = queryset.filter(is_destroyed=False, status='passed').aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_failed_weight = queryset.filter(is_destroyed=False, status='failed').aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_destroyed_weight = queryset.filter(is_destroyed=True).aggregate(total=models.Sum('input_weight'))['total'] or 0
-        
-        # Berechne Anzahl und Gewicht nach Produkt-Typ
-        marijuana_count = queryset.filter(is_destroyed=False, processing_batch__product_type='marijuana').count()
-        hashish_count = queryset.filter(is_destroyed=False, processing_batch__product_type='hashish').count()
-        marijuana_weight = queryset.filter(is_destroyed=False, processing_batch__product_type='marijuana').aggregate(total=models.Sum('input_weight'))['total'] or 0
-        hashish_weight = queryset.filter(is_destroyed=False, processing_batch__product_type='hashish').aggregate(total=models.Sum('input_weight'))['total'] or 0
-        
-        self.counts = {
-            'pending_count': pending_count,
-            'passed_count': passed_count,
-            'failed_count': failed_count,
-            'destroyed_count': destroyed_count,
-            'total_pending_weight': total_pending_weight,
-            'total_passed_weight': total_passed_weight,
-            'total_failed_weight': total_failed_weight,
-            'total_destroyed_weight': total_destroyed_weight,
-            'marijuana_count': marijuana_count,
-            'hashish_count': hashish_count,
-            'marijuana_weight': marijuana_weight,
-            'hashish_weight': hashish_weight
-        }
         
-        return queryset
+        return annotations.with_lab_testing_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'pending_count': 0,
-            'passed_count': 0,
-            'failed_count': 0,
-            'destroyed_count': 0,
-            'total_pending_weight': 0,
-            'total_passed_weight': 0,
-            'total_failed_weight': 0,
-            'total_destroyed_weight': 0,
-            'marijuana_count': 0,
-            'hashish_count': 0,
-            'marijuana_weight': 0,
-            'hashish_weight': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        return stats.lab_testing_counts(queryset)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
-        pending_batches = LabTestingBatch.objects.filter(is_destroyed=False, status='pending')
-        passed_batches = LabTestingBatch.objects.filter(is_destroyed=False, status='passed')
-        failed_batches = LabTestingBatch.objects.filter(is_destroyed=False, status='failed')
-        destroyed_batches = LabTestingBatch.objects.filter(is_destroyed=True)
-        
-        pending_count = pending_batches.count()
-        passed_count = passed_batches.count()
-        failed_count = failed_batches.count()
-        destroyed_count = destroyed_batches.count()
-        
-        total_pending_weight = pending_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_passed_weight = passed_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_failed_weight = failed_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        total_destroyed_weight = destroyed_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        
-        # Nach Produkttyp
-        marijuana_batches = LabTestingBatch.objects.filter(is_destroyed=False, processing_batch__product_type='marijuana')
-        hashish_batches = LabTestingBatch.objects.filter(is_destroyed=False, processing_batch__product_type='hashish')
-        
-        marijuana_count = marijuana_batches.count()
-        hashish_count = hashish_batches.count()
-        
-        marijuana_weight = marijuana_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        hashish_weight = hashish_batches.aggregate(total=models.Sum('input_weight'))['total'] or 0
-        
-        return Response({
-            'pending_count': pending_count,
-            'passed_count': passed_count,
-            'failed_count': failed_count,
-            'destroyed_count': destroyed_count,
-            'total_pending_weight': float(total_pending_weight),
-            'total_passed_weight': float(total_passed_weight),
-            'total_failed_weight': float(total_failed_weight),
-            'total_destroyed_weight': float(total_destroyed_weight),
-            'marijuana_count': marijuana_count,
-            'hashish_count': hashish_count,
-            'marijuana_weight': float(marijuana_weight),
-            'hashish_weight': float(hashish_weight)
-        })
+        return Response(self.cached_counts(
+            'counts', lambda: stats.lab_testing_counts(LabTestingBatch.objects.all()), params=()
+        ))
     
     @action(detail=True, methods=['post'])
     def destroy_labtesting(self, request, pk=None):
@@ -2447,6 +1770,11 @@ class LabTestingBatchViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Herkunftsdaten (Sorte, Ernte, THC, Produkttyp) einmal auflösen und auf alle Verpackungen stempeln
+        lineage = resolve_lineage(
+            LabTestingBatch.objects.select_related(*LAB_LINEAGE_RELATED).get(pk=lab_batch.pk)
+        )
+        
         # Gemeinsame Felder für alle Verpackungen
         member_id = request.data.get('member_id')
         room_id = request.data.get('room_id')
@@ -2529,6 +1857,7 @@ class LabTestingBatchViewSet(viewsets.ModelViewSet):
                     # 🆕 KWARGS FÜR VERPACKUNG MIT PREIS VORBEREITEN:
                     packaging_kwargs = {
                         'lab_testing_batch': lab_batch,
+                        **lineage,
                         'total_weight': total_line_weight,
                         'unit_count': unit_count,
                         'unit_weight': unit_weight,
@@ -2574,6 +1903,7 @@ class LabTestingBatchViewSet(viewsets.ModelViewSet):
             if auto_destroy_remainder and remaining_weight > 0:
                 remainder_kwargs = {
                     'lab_testing_batch': lab_batch,
+                    **lineage,
                     'total_weight': remaining_weight,
                     'unit_count': 1,
                     'unit_weight': remaining_weight,
@@ -2654,6 +1984,7 @@ class LabTestingBatchViewSet(viewsets.ModelViewSet):
             # 🆕 KWARGS FÜR EINZELVERPACKUNG MIT PREIS VORBEREITEN:
             packaging_kwargs = {
                 'lab_testing_batch': lab_batch,
+                **lineage,
                 'total_weight': total_weight,
                 'unit_count': unit_count,
                 'unit_weight': unit_weight,
@@ -2678,6 +2009,7 @@ class LabTestingBatchViewSet(viewsets.ModelViewSet):
             if auto_destroy_remainder and remaining_weight > 0:
                 remainder_kwargs = {
                     'lab_testing_batch': lab_batch,
+                    **lineage,
                     'total_weight': remaining_weight,
                     'unit_count': 1,
                     'unit_weight': remaining_weight,
@@ -2715,11 +2047,11 @@ class LabTestingBatchViewSet(viewsets.ModelViewSet):
             
             return Response(response_data)
 
-class PackagingBatchViewSet(viewsets.ModelViewSet):
+class PackagingBatchViewSet(SlimListMixin, LifecycleCountsMixin, viewsets.ModelViewSet):
     queryset = PackagingBatch.objects.all().order_by('-created_at')
     serializer_class = PackagingBatchSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = LifecyclePagination
     
     def get_queryset(self):
         queryset = PackagingBatch.objects.all().order_by('-created_at')
@@ -2748,122 +2080,18 @@ class PackagingBatchViewSet(viewsets.ModelViewSet):
         if destroyed is not None:
             is_destroyed = destroyed.lower() == 'true'
             queryset = queryset.filter(is_destroyed=is_destroyed)
-            
-        # Berechne Anzahl für aktive und vernichtete Verpackungen
-        active_count = queryset.filter(is_destroyed=False).count()
-        destroyed_count = queryset.filter(is_destroyed=True).count()
-        
-        # Berechne Gesamtgewicht und Einheiten
-        total_active_weight = queryset.filter(is_destroyed=False).aggregate(total=models.Sum('total_weight'))['total'] or 0
-        total_active_units = queryset.filter(is_destroyed=False).aggregate(total=models.Sum('unit_count'))['total'] or 0
-        total_destroyed_weight = queryset.filter(is_destroyed=True).aggregate(total=models.Sum('total_weight'))['total'] or 0
-        total_destroyed_units = queryset.filter(is_destroyed=True).aggregate(total=models.Sum('unit_count'))['total'] or 0
-        
-        # Berechne Anzahl und Gewicht nach Produkt-Typ
-        marijuana_count = queryset.filter(is_destroyed=False, lab_testing_batch__processing_batch__product_type='marijuana').count()
-        hashish_count = queryset.filter(is_destroyed=False, lab_testing_batch__processing_batch__product_type='hashish').count()
-        
-        marijuana_weight = queryset.filter(
-            is_destroyed=False, 
-            lab_testing_batch__processing_batch__product_type='marijuana'
-        ).aggregate(total=models.Sum('total_weight'))['total'] or 0
-        
-        hashish_weight = queryset.filter(
-            is_destroyed=False, 
-            lab_testing_batch__processing_batch__product_type='hashish'
-        ).aggregate(total=models.Sum('total_weight'))['total'] or 0
-        
-        marijuana_units = queryset.filter(
-            is_destroyed=False, 
-            lab_testing_batch__processing_batch__product_type='marijuana'
-        ).aggregate(total=models.Sum('unit_count'))['total'] or 0
-        
-        hashish_units = queryset.filter(
-            is_destroyed=False, 
-            lab_testing_batch__processing_batch__product_type='hashish'
-        ).aggregate(total=models.Sum('unit_count'))['total'] or 0
-        
-        self.counts = {
-            'active_count': active_count,
-            'destroyed_count': destroyed_count,
-            'total_active_weight': total_active_weight,
-            'total_active_units': total_active_units,
-            'total_destroyed_weight': total_destroyed_weight,
-            'total_destroyed_units': total_destroyed_units,
-            'marijuana_count': marijuana_count,
-            'hashish_count': hashish_count,
-            'marijuana_weight': marijuana_weight,
-            'hashish_weight': hashish_weight,
-            'marijuana_units': marijuana_units,
-            'hashish_units': hashish_units
-        }
         
-        return queryset
+        return annotations.with_packaging_batch_fields(queryset)
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        response.data['counts'] = getattr(self, 'counts', {
-            'active_count': 0,
-            'destroyed_count': 0,
-            'total_active_weight': 0,
-            'total_active_units': 0,
-            'total_destroyed_weight': 0,
-            'total_destroyed_units': 0,
-            'marijuana_count': 0,
-            'hashish_count': 0,
-            'marijuana_weight': 0,
-            'hashish_weight': 0,
-            'marijuana_units': 0,
-            'hashish_units': 0
-        })
-        return response
+    def get_list_counts(self, queryset):
+        return stats.packaging_counts(queryset)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(LIFECYCLE)
     def counts(self, request):
-        active_batches = PackagingBatch.objects.filter(is_destroyed=False)
-        destroyed_batches = PackagingBatch.objects.filter(is_destroyed=True)
-        
-        active_count = active_batches.count()
-        destroyed_count = destroyed_batches.count()
-        
-        total_active_weight = active_batches.aggregate(total=models.Sum('total_weight'))['total'] or 0
-        total_active_units = active_batches.aggregate(total=models.Sum('unit_count'))['total'] or 0
-        total_destroyed_weight = destroyed_batches.aggregate(total=models.Sum('total_weight'))['total'] or 0
-        total_destroyed_units = destroyed_batches.aggregate(total=models.Sum('unit_count'))['total'] or 0
-        
-        # Nach Produkttyp
-        marijuana_batches = PackagingBatch.objects.filter(
-            is_destroyed=False, 
-            lab_testing_batch__processing_batch__product_type='marijuana'
-        )
-        hashish_batches = PackagingBatch.objects.filter(
-            is_destroyed=False, 
-            lab_testing_batch__processing_batch__product_type='hashish'
-        )
-        
-        marijuana_count = marijuana_batches.count()
-        hashish_count = hashish_batches.count()
-        
-        marijuana_weight = marijuana_batches.aggregate(total=models.Sum('total_weight'))['total'] or 0
-        hashish_weight = hashish_batches.aggregate(total=models.Sum('total_weight'))['total'] or 0
-        
-        marijuana_units = marijuana_batches.aggregate(total=models.Sum('unit_count'))['total'] or 0
-        hashish_units = hashish_batches.aggregate(total=models.Sum('unit_count'))['total'] or 0
-        
-        return Response({
-            'active_count': active_count,
-            'destroyed_count': destroyed_count,
-            'total_active_weight': float(total_active_weight),
-            'total_active_units': total_active_units,
-            'total_destroyed_weight': float(total_destroyed_weight),
-            'total_destroyed_units': total_destroyed_units,
-            'marijuana_count': marijuana_count,
-            'hashish_count': hashish_count,
-            'marijuana_weight': float(marijuana_weight),
-            'hashish_weight': float(hashish_weight),
-            'marijuana_units': marijuana_units,
-            'hashish_units': hashish_units
-        })
+        return Response(self.cached_counts(
+            'counts', lambda: stats.packaging_counts(PackagingBatch.objects.all()), params=()
+        ))
     
     @action(detail=True, methods=['post'])
     def destroy_packaging(self, request, pk=None):
@@ -2923,52 +2151,47 @@ class StrainCardViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         """
-        Da source_strain eine Property ist, müssen wir die Aggregation in Python machen
+        Basis-Query auf den materialisierten Sorten-Verfügbarkeitsindex
+        (eine Zeile pro Verpackungs-Batch und Gewicht, siehe strain_index.py)
         """
-        # Basis-Query: Nur verfügbare Units mit allen nötigen Relations
-        base_queryset = PackagingUnit.objects.filter(
-            is_destroyed=False
-        ).exclude(
-            distributions__isnull=False
-        ).select_related(
-            'batch',
-            'batch__lab_testing_batch',
-            'batch__lab_testing_batch__processing_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase__strain',
-        )
+        base_queryset = StrainAvailabilityIndex.objects.filter(unit_count__gt=0)
         
         # Empfänger-basierte THC-Filterung
+        base_queryset = self._apply_recipient_filter(base_queryset)
+        
+        # Backend-Filter anwenden
+        base_queryset = self._apply_backend_filters(base_queryset)
+        
+        return base_queryset
+    
+    def _apply_recipient_filter(self, queryset):
+        """U21-Mitglieder (Altersklasse 18+) erhalten nur Produkte mit max. 10% THC"""
         recipient_id = self.request.query_params.get('recipient_id')
         if recipient_id:
             try:
                 from members.models import Member
                 recipient = Member.objects.get(id=recipient_id)
                 if hasattr(recipient, 'age_class') and recipient.age_class == "18+":
-                    base_queryset = base_queryset.filter(
-                        Q(batch__lab_testing_batch__thc_content__lte=10.0) | 
-                        Q(batch__lab_testing_batch__thc_content__isnull=True)
+                    queryset = queryset.filter(
+                        Q(thc_content__lte=10.0) | 
+                        Q(thc_content__isnull=True)
                     )
             except Member.DoesNotExist:
                 pass
-        
-        # Backend-Filter anwenden (alles außer strain_name)
-        base_queryset = self._apply_backend_filters(base_queryset)
-        
-        return base_queryset
+        return queryset
     
     def _apply_backend_filters(self, queryset):
         """Backend-Filter die in SQL funktionieren"""
         
+        # Sorten-Filter (exakter Name wie auf der Karte)
+        strain_name = self.request.query_params.get('strain_name', '').strip()
+        if strain_name:
+            queryset = queryset.filter(strain_name=strain_name)
+        
         # Produkttyp-Filter
         product_type = self.request.query_params.get('product_type')
         if product_type:
-            queryset = queryset.filter(
-                batch__lab_testing_batch__processing_batch__product_type=product_type
-            )
+            queryset = queryset.filter(product_type=product_type)
         
         # Gewichts-Filter
         weight = self.request.query_params.get('weight')
@@ -2983,294 +2206,200 @@ class StrainCardViewSet(viewsets.ReadOnlyModelViewSet):
         min_thc = self.request.query_params.get('min_thc')
         if min_thc:
             try:
-                queryset = queryset.filter(
-                    batch__lab_testing_batch__thc_content__gte=float(min_thc)
-                )
+                queryset = queryset.filter(thc_content__gte=float(min_thc))
             except (ValueError, TypeError):
                 pass
                 
         max_thc = self.request.query_params.get('max_thc')
         if max_thc:
             try:
-                queryset = queryset.filter(
-                    batch__lab_testing_batch__thc_content__lte=float(max_thc)
-                )
+                queryset = queryset.filter(thc_content__lte=float(max_thc))
             except (ValueError, TypeError):
                 pass
         
-        # Such-Filter für Batch-Nummer
+        # Such-Filter für Batch-Nummer (Verpackung oder einzelne Einheit)
         search = self.request.query_params.get('search')
         if search:
             queryset = queryset.filter(
-                Q(batch__batch_number__icontains=search) |
-                Q(batch_number__icontains=search)
+                Q(packaging_batch__batch_number__icontains=search) |
+                Q(packaging_batch_id__in=PackagingUnit.objects.filter(
+                    batch_number__icontains=search
+                ).values('batch_id'))
             )
         
         return queryset
     
-    def _extract_strain_name(self, unit):
+    def _build_strain_cards(self, index_rows):
         """
-        Extrahiert Strain-Namen wie in PackagingUnitViewSet.distinct_strains()
+        🎯 Baut die StrainCards aus den Indexzeilen: THC-Bereich bei mehreren
+        Cannabis-Chargen + PREISE. Die Zeilen müssen nach Sorte gruppierbar sein.
         """
-        name = None
-        try:
-            name = unit.batch.lab_testing_batch.processing_batch.drying_batch.harvest_batch.flowering_batch.seed_purchase.strain.name
-        except Exception:
-            pass
-        if not name:
-            try:
-                name = unit.batch.flowering_batch.seed_purchase.strain.name
-            except Exception:
-                pass
-        if not name:
-            try:
-                name = unit.batch.seed_purchase.strain.name
-            except Exception:
-                pass
-        if not name:
-            name = getattr(unit.batch, "source_strain", None) or getattr(unit, "source_strain", None)
-        if not name:
-            name = getattr(unit, "strain_name", None)
+        strain_groups = defaultdict(list)
+        for row in index_rows:
+            strain_groups[row.strain_name].append(row)
         
-        return name if name and name != "Unbekannt" else "Unbekannte Sorte"
-    
-    def _get_cannabis_batch_id(self, unit):
-        """🔧 NEU: Ermittelt die echte Cannabis-Charge-ID"""
-        try:
-            # Versuche über harvest_batch (die echte Cannabis-Charge)
-            if (unit.batch and 
-                unit.batch.lab_testing_batch and 
-                unit.batch.lab_testing_batch.processing_batch and
-                unit.batch.lab_testing_batch.processing_batch.drying_batch and
-                unit.batch.lab_testing_batch.processing_batch.drying_batch.harvest_batch):
-                harvest_batch = unit.batch.lab_testing_batch.processing_batch.drying_batch.harvest_batch
-                return f"harvest_{harvest_batch.id}"
-        except Exception:
-            pass
-        
-        # Fallback: processing_batch
-        try:
-            if (unit.batch and 
-                unit.batch.lab_testing_batch and 
-                unit.batch.lab_testing_batch.processing_batch):
-                processing_batch = unit.batch.lab_testing_batch.processing_batch
-                return f"processing_{processing_batch.id}"
-        except Exception:
-            pass
-        
-        # Notfall-Fallback
-        return f"packaging_{unit.batch.id}" if unit.batch else None
-    
-    def _group_units_to_strain_cards(self, units):
-        """
-        🎯 ERWEITERTE LOGIK: THC-Bereich bei mehreren Cannabis-Chargen + PREISE
-        """
-        strain_filter = self.request.query_params.get('strain_name', '').strip()
-        
-        # Gruppierung nach Sorte
-        strain_groups = defaultdict(lambda: {
-            'units': [],
-            'available_weights': set(),
-            'weight_counts': defaultdict(int),
-            'thc_values_by_batch': defaultdict(list),
-            'cannabis_batches': set(),
-            # 🆕 NEUE PREIS-STRUKTUREN
-            'price_ranges': defaultdict(list),  # Preise pro Gewicht
-            'min_price': float('inf'),
-            'max_price': 0
-        })
-        
-        for unit in units:
-            strain_name = self._extract_strain_name(unit)
-            
-            if strain_filter and strain_name != strain_filter:
-                continue
-            
-            weight = float(unit.weight) if unit.weight else 0
-            
-            strain_data = strain_groups[strain_name]
-            strain_data['units'].append(unit)
-            strain_data['available_weights'].add(weight)
-            strain_data['weight_counts'][weight] += 1
-            
-            # 🆕 PREISE SAMMELN
-            if unit.unit_price:
-                price = float(unit.unit_price)
-                strain_data['price_ranges'][weight].append(price)
-                strain_data['min_price'] = min(strain_data['min_price'], price)
-                strain_data['max_price'] = max(strain_data['max_price'], price)
+        strain_cards = []
+        for strain_name, rows in strain_groups.items():
+            # Neueste Einheiten zuerst (wie bisher über PackagingUnit.Meta.ordering)
+            rows.sort(key=lambda r: r.newest_unit_at or timezone.now(), reverse=True)
+            
+            weight_counts = defaultdict(int)
+            price_ranges = defaultdict(list)
+            thc_sums_by_batch = defaultdict(lambda: [0.0, 0])
+            cannabis_batches = []
+            available_units = []
+            price_per_gram = None
             
-            # Cannabis-Charge-ID ermitteln
-            cannabis_batch_id = self._get_cannabis_batch_id(unit)
-            if cannabis_batch_id:
-                strain_data['cannabis_batches'].add(cannabis_batch_id)
+            for row in rows:
+                weight = float(row.weight)
+                weight_counts[weight] += row.unit_count
                 
-                # THC-Werte pro Cannabis-Charge sammeln
-                if (unit.batch and 
-                    unit.batch.lab_testing_batch and 
-                    unit.batch.lab_testing_batch.thc_content):
-                    thc_value = float(unit.batch.lab_testing_batch.thc_content)
-                    strain_data['thc_values_by_batch'][cannabis_batch_id].append(thc_value)
-        
-        # Konvertiere zu StrainCard-Format
-        strain_cards = []
-        for strain_name, data in strain_groups.items():
-            if not data['units']:
-                continue
+                if row.cannabis_batch_id and row.cannabis_batch_id not in cannabis_batches:
+                    cannabis_batches.append(row.cannabis_batch_id)
+                
+                # THC-Werte pro Cannabis-Charge (gewichtet nach Einheiten)
+                if row.thc_content:
+                    thc_sum = thc_sums_by_batch[row.cannabis_batch_id]
+                    thc_sum[0] += float(row.thc_content) * row.unit_count
+                    thc_sum[1] += row.unit_count
+                
+                if row.min_price is not None:
+                    price_ranges[weight].extend([float(row.min_price), float(row.max_price)])
+                
+                for unit in row.units:
+                    unit_price = unit.get('unit_price')
+                    if price_per_gram is None and unit_price and weight:
+                        price_per_gram = unit_price / weight
+                    available_units.append({
+                        'id': unit['id'],
+                        'batch_number': unit['batch_number'],
+                        'weight': weight,
+                        'packaging_batch_id': row.packaging_batch_id,
+                        'cannabis_batch_id': row.cannabis_batch_id,
+                        'unit_price': unit_price,
+                        'price_display': f"{unit_price:.2f} €" if unit_price else None
+                    })
             
-            first_unit = data['units'][0]
+            if not available_units:
+                continue
             
-            # Produkttyp ermitteln
-            product_type = 'unknown'
-            product_type_display = 'Unbekannt'
-            if (first_unit.batch and 
-                first_unit.batch.lab_testing_batch and 
-                first_unit.batch.lab_testing_batch.processing_batch):
-                processing_batch = first_unit.batch.lab_testing_batch.processing_batch
-                product_type = processing_batch.product_type
-                product_type_display = processing_batch.get_product_type_display()
+            first_row = rows[0]
+            product_type = first_row.product_type or 'unknown'
+            product_type_display = dict(PRODUCT_TYPE_CHOICES).get(first_row.product_type, 'Unbekannt')
             
-            # THC-BEREICH BERECHNEN (bestehender Code)
+            # THC-BEREICH BERECHNEN
             thc_display = "k.A."
-            if data['thc_values_by_batch']:
-                all_thc_values = set()
-                for cannabis_batch_id, thc_list in data['thc_values_by_batch'].items():
-                    if thc_list:
-                        avg_thc_for_batch = sum(thc_list) / len(thc_list)
-                        all_thc_values.add(round(avg_thc_for_batch, 1))
-                
-                if len(all_thc_values) == 1:
-                    thc_display = f"{list(all_thc_values)[0]}"
-                elif len(all_thc_values) > 1:
-                    min_thc = min(all_thc_values)
-                    max_thc = max(all_thc_values)
-                    thc_display = f"{min_thc} - {max_thc}"
+            all_thc_values = {
+                round(thc_sum / count, 1)
+                for thc_sum, count in thc_sums_by_batch.values() if count
+            }
+            if len(all_thc_values) == 1:
+                thc_display = f"{list(all_thc_values)[0]}"
+            elif len(all_thc_values) > 1:
+                thc_display = f"{min(all_thc_values)} - {max(all_thc_values)}"
             
-            # 🆕 PREIS-INFORMATIONEN BERECHNEN
+            # PREIS-INFORMATIONEN BERECHNEN
+            all_prices = [price for prices in price_ranges.values() for price in prices]
             price_info = {
-                'has_prices': data['min_price'] != float('inf'),
-                'min_price': data['min_price'] if data['min_price'] != float('inf') else None,
-                'max_price': data['max_price'] if data['max_price'] > 0 else None,
+                'has_prices': bool(all_prices),
+                'min_price': min(all_prices) if all_prices else None,
+                'max_price': max(all_prices) if all_prices else None,
                 'price_by_weight': {}
             }
             
-            # Preis pro Gewicht berechnen
-            for weight, prices in data['price_ranges'].items():
-                if prices:
-                    min_price_for_weight = min(prices)
-                    max_price_for_weight = max(prices)
-                    if min_price_for_weight == max_price_for_weight:
-                        price_info['price_by_weight'][weight] = {
-                            'price': min_price_for_weight,
-                            'display': f"{min_price_for_weight:.2f} €"
-                        }
-                    else:
-                        price_info['price_by_weight'][weight] = {
-                            'min': min_price_for_weight,
-                            'max': max_price_for_weight,
-                            'display': f"{min_price_for_weight:.2f} - {max_price_for_weight:.2f} €"
-                        }
-            
-            # Preis pro Gramm berechnen (vom ersten Unit mit Preis)
-            price_per_gram = None
-            for unit in data['units']:
-                if unit.unit_price and unit.weight:
-                    price_per_gram = float(unit.unit_price) / float(unit.weight)
-                    break
+            for weight, prices in price_ranges.items():
+                min_price_for_weight = min(prices)
+                max_price_for_weight = max(prices)
+                if min_price_for_weight == max_price_for_weight:
+                    price_info['price_by_weight'][weight] = {
+                        'price': min_price_for_weight,
+                        'display': f"{min_price_for_weight:.2f} €"
+                    }
+                else:
+                    price_info['price_by_weight'][weight] = {
+                        'min': min_price_for_weight,
+                        'max': max_price_for_weight,
+                        'display': f"{min_price_for_weight:.2f} - {max_price_for_weight:.2f} €"
+                    }
             
             # Gewichts-Optionen mit Preisen
+            available_weights = sorted(weight_counts)
             size_options = []
-            for weight in sorted(data['available_weights']):
-                count = data['weight_counts'][weight]
+            for weight in available_weights:
                 price_display = ""
                 if weight in price_info['price_by_weight']:
                     price_display = f" • {price_info['price_by_weight'][weight]['display']}"
-                size_options.append(f"{weight}g ({count}x){price_display}")
+                size_options.append(f"{weight}g ({weight_counts[weight]}x){price_display}")
             
-            # Available units mit Preisen
-            available_units = []
-            for unit in data['units']:
-                unit_data = {
-                    'id': str(unit.id),
-                    'batch_number': unit.batch_number,
-                    'weight': float(unit.weight) if unit.weight else 0,
-                    'packaging_batch_id': unit.batch.id if unit.batch else None,
-                    'cannabis_batch_id': self._get_cannabis_batch_id(unit),
-                    # 🆕 PREIS HINZUFÜGEN
-                    'unit_price': float(unit.unit_price) if unit.unit_price else None,
-                    'price_display': f"{float(unit.unit_price):.2f} €" if unit.unit_price else None
-                }
-                available_units.append(unit_data)
-            
-            cannabis_batch_count = len(data['cannabis_batches'])
+            first_unit = available_units[0]
+            lowest_weight_price = price_info['price_by_weight'].get(available_weights[0])
             
-            # StrainCard mit Preisinformationen
-            strain_card = {
+            strain_cards.append({
                 'id': f"strain_{strain_name.replace(' ', '_')}",
                 'strain_name': strain_name,
                 'product_type': product_type,
                 'product_type_display': product_type_display,
-                'total_unit_count': len(data['units']),
+                'total_unit_count': len(available_units),
                 'avg_thc_content': thc_display,
                 'size_options': size_options,
-                'available_weights': sorted(data['available_weights']),
-                'batch_count': cannabis_batch_count,
-                'cannabis_batches': list(data['cannabis_batches']),
+                'available_weights': available_weights,
+                'batch_count': len(cannabis_batches),
+                'cannabis_batches': cannabis_batches,
                 'available_units': available_units,
-                # 🆕 PREIS-INFORMATIONEN
                 'price_info': price_info,
                 'price_per_gram': f"{price_per_gram:.2f}" if price_per_gram else None,
-                'price_display': price_info['price_by_weight'][sorted(data['available_weights'])[0]]['display'] if price_info['has_prices'] and data['available_weights'] else None,
+                'price_display': lowest_weight_price['display'] if lowest_weight_price else None,
                 'first_unit': {
-                    'id': str(first_unit.id),
-                    'batch_number': first_unit.batch_number,
-                    'weight': float(first_unit.weight) if first_unit.weight else 0,
-                    'unit_price': float(first_unit.unit_price) if first_unit.unit_price else None
+                    'id': first_unit['id'],
+                    'batch_number': first_unit['batch_number'],
+                    'weight': first_unit['weight'],
+                    'unit_price': first_unit['unit_price']
                 }
-            }
-            
-            strain_cards.append(strain_card)
+            })
         
         strain_cards.sort(key=lambda x: x['strain_name'])
         return strain_cards
     
+    @conditional_get(STRAIN_CARDS)
     def list(self, request, *args, **kwargs):
-        """Custom List Response mit manueller Pagination"""
-        # Hole alle Units (mit Filtern)
-        units_queryset = self.get_queryset()
-        
-        print(f"🔍 StrainCard: {units_queryset.count()} verfügbare Units gefunden")
-        
-        # Konvertiere zu StrainCards (in Python, da source_strain Property ist)
-        all_strain_cards = self._group_units_to_strain_cards(units_queryset)
-        
-        print(f"🌿 StrainCard: {len(all_strain_cards)} Strain-Karten erstellt")
+        """
+        List Response mit SQL-Pagination über die Sortennamen des Index.
+        Nur die Indexzeilen der aktuellen Seite werden geladen.
+        """
+        index_queryset = self.get_queryset()
         
-        # 🔧 DEBUG: Zeige erste Karte für Diagnose
-        if all_strain_cards:
-            first_card = all_strain_cards[0]
-            print(f"🔍 Erste Karte: {first_card['strain_name']}")
-            print(f"   - Gewichte: {first_card['available_weights']}")
-            print(f"   - Units: {first_card['total_unit_count']}")
-            print(f"   - Cannabis-Chargen: {first_card['batch_count']}")
-            print(f"   - Chargen-IDs: {first_card['cannabis_batches']}")
-            print(f"   - Available Units: {len(first_card['available_units'])}")
+        try:
+            page_size = int(request.query_params.get('page_size', self.pagination_class.page_size))
+        except (ValueError, TypeError):
+            page_size = self.pagination_class.page_size
+        page_size = max(1, min(page_size, self.pagination_class.max_page_size))
         
-        # Manuelle Pagination
-        page_size = int(request.query_params.get('page_size', 12))
-        page_number = int(request.query_params.get('page', 1))
+        try:
+            page_number = max(1, int(request.query_params.get('page', 1)))
+        except (ValueError, TypeError):
+            page_number = 1
         
         start_index = (page_number - 1) * page_size
         end_index = start_index + page_size
         
-        paginated_cards = all_strain_cards[start_index:end_index]
+        # Eine Zeile pro Sorte, sortiert nach Name
+        strain_names = index_queryset.values_list(
+            'strain_name', flat=True
+        ).distinct().order_by('strain_name')
+        
+        total_count = strain_names.count()
+        page_strain_names = list(strain_names[start_index:end_index])
+        
+        paginated_cards = self._build_strain_cards(
+            index_queryset.filter(strain_name__in=page_strain_names)
+        )
         
         # Response im DRF-Pagination-Format
-        has_next = end_index < len(all_strain_cards)
+        has_next = end_index < total_count
         has_previous = page_number > 1
         
         response_data = {
-            'count': len(all_strain_cards),
+            'count': total_count,
             'next': f"?page={page_number + 1}&page_size={page_size}" if has_next else None,
             'previous': f"?page={page_number - 1}&page_size={page_size}" if has_previous else None,
             'results': paginated_cards
@@ -3279,33 +2408,15 @@ class StrainCardViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(response_data)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(STRAIN_CARDS)
     def filter_options(self, request):
-        """Lade verfügbare Filter-Optionen"""
+        """Lade verfügbare Filter-Optionen direkt aus dem Sorten-Index"""
         
-        # Basis-Query ohne Strain-Filter
-        base_queryset = PackagingUnit.objects.filter(
-            is_destroyed=False
-        ).exclude(
-            distributions__isnull=False
-        ).select_related(
-            'batch__lab_testing_batch__processing_batch'
+        # Basis-Query ohne weitere Filter, nur Empfänger-Regel
+        base_queryset = self._apply_recipient_filter(
+            StrainAvailabilityIndex.objects.filter(unit_count__gt=0)
         )
         
-        # Empfänger-Filter anwenden
-        recipient_id = request.query_params.get('recipient_id')
-        if recipient_id:
-            try:
-                from members.models import Member
-                recipient = Member.objects.get(id=recipient_id)
-                if hasattr(recipient, 'age_class') and recipient.age_class == "18+":
-                    base_queryset = base_queryset.filter(
-                        Q(batch__lab_testing_batch__thc_content__lte=10.0) | 
-                        Q(batch__lab_testing_batch__thc_content__isnull=True)
-                    )
-            except Member.DoesNotExist:
-                pass
-        
-        # Verfügbare Gewichte (SQL-Abfrage möglich)
         available_weights = base_queryset.values_list(
             'weight', flat=True
         ).distinct().order_by('weight')
@@ -3315,38 +2426,32 @@ class StrainCardViewSet(viewsets.ReadOnlyModelViewSet):
             for weight in available_weights if weight is not None
         ]
         
-        # Verfügbare Sorten (PYTHON-basiert, da source_strain Property ist)
-        available_strains = set()
-        
-        # Nehme eine begrenzte Anzahl Units für Performance
-        sample_units = base_queryset[:500]  # Limitiere für Performance
-        
-        for unit in sample_units:
-            strain_name = self._extract_strain_name(unit)
-            if strain_name and strain_name != 'Unbekannte Sorte':
-                available_strains.add(strain_name)
+        available_strains = base_queryset.exclude(
+            strain_name=UNKNOWN_STRAIN
+        ).values_list('strain_name', flat=True).distinct().order_by('strain_name')
         
         strain_options = [
             {'name': strain} 
-            for strain in sorted(available_strains)
+            for strain in available_strains
         ]
         
-        print(f"🔍 Filter-Optionen: {len(weight_options)} Gewichte, {len(strain_options)} Sorten")
+        total_available_units = base_queryset.aggregate(
+            total=Sum('unit_count')
+        )['total'] or 0
         
         return Response({
             'weight_options': weight_options,
             'strain_options': strain_options,
-            'total_available_units': base_queryset.count()
+            'total_available_units': total_available_units
         })
     
     @action(detail=False, methods=['get'])
     def available_units_for_strain(self, request):
         """
-        🎯 KORRIGIERTER ENDPOINT: Alle verfügbaren Units einer bestimmten Sorte
-        Ermöglicht das Abrufen aller Units einer Sorte über alle Batches hinweg
+        🎯 Alle verfügbaren Units einer bestimmten Sorte über alle Batches hinweg.
+        Die Unit-IDs kommen aus dem Sorten-Index, die Units werden in einer Query geladen.
         """
         strain_name = request.query_params.get('strain_name')
-        weight = request.query_params.get('weight')
         
         if not strain_name:
             return Response(
@@ -3354,58 +2459,39 @@ class StrainCardViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Alle verfügbaren Units der Sorte
-        units = self.get_queryset()
+        # get_queryset() berücksichtigt strain_name, weight und alle weiteren Filter
+        index_rows = list(self.get_queryset())
         
-        # Filtere nach Strain-Namen (in Python, da Property)
-        matching_units = []
-        cannabis_batches = set()
+        unit_ids = [unit['id'] for row in index_rows for unit in row.units]
+        cannabis_batches = {row.cannabis_batch_id for row in index_rows if row.cannabis_batch_id}
         
-        for unit in units:
-            unit_strain_name = self._extract_strain_name(unit)
-            if unit_strain_name == strain_name:
-                # Optional: Auch nach Gewicht filtern
-                if weight:
-                    try:
-                        weight_value = float(weight)
-                        if float(unit.weight) == weight_value:
-                            matching_units.append(unit)
-                            # Cannabis-Charge tracken
-                            cannabis_batch_id = self._get_cannabis_batch_id(unit)
-                            if cannabis_batch_id:
-                                cannabis_batches.add(cannabis_batch_id)
-                    except (ValueError, TypeError):
-                        pass
-                else:
-                    matching_units.append(unit)
-                    # Cannabis-Charge tracken
-                    cannabis_batch_id = self._get_cannabis_batch_id(unit)
-                    if cannabis_batch_id:
-                        cannabis_batches.add(cannabis_batch_id)
+        units = PackagingUnit.objects.filter(
+            id__in=unit_ids
+        ).select_related(
+            'batch',
+            *[f'batch__{related}' for related in PACKAGING_LINEAGE_RELATED]
+        )
         
         # Gruppiere nach Gewicht für bessere Übersicht
         weight_groups = defaultdict(list)
-        for unit in matching_units:
+        for unit in units:
             weight_key = float(unit.weight) if unit.weight else 0
             weight_groups[weight_key].append(unit)
         
         response_data = {
             'strain_name': strain_name,
-            'total_units': len(matching_units),
-            'cannabis_batch_count': len(cannabis_batches),  # 🔧 NEU: Cannabis-Chargen-Anzahl
-            'cannabis_batches': list(cannabis_batches),     # 🔧 NEU: Liste der Cannabis-Chargen
+            'total_units': len(unit_ids),
+            'cannabis_batch_count': len(cannabis_batches),
+            'cannabis_batches': list(cannabis_batches),
             'weight_groups': {}
         }
         
-        # 🔧 KORREKTUR: Alle Units zurückgeben (keine Limitierung!)
         for weight, units_list in weight_groups.items():
             response_data['weight_groups'][f"{weight}g"] = {
                 'count': len(units_list),
-                'units': PackagingUnitSerializer(units_list, many=True).data  # 🔧 ALLE Units!
+                'units': PackagingUnitSerializer(units_list, many=True).data
             }
         
-        print(f"🎯 Units für Sorte '{strain_name}': {len(matching_units)} gefunden, {len(weight_groups)} Gewichtsgruppen, {len(cannabis_batches)} Cannabis-Chargen")
-        
         return Response(response_data)
     
     @action(detail=False, methods=['get'])
@@ -3414,7 +2500,10 @@ class StrainCardViewSet(viewsets.ReadOnlyModelViewSet):
         🔍 Liefert die komplette Track & Trace Historie für eine Cannabis-Charge
         
         Query Parameters:
-        - cannabis_batch_id: ID der Cannabis-Charge (format: harvest_123)
+        - cannabis_batch_id: ID der Cannabis-Charge (<typ>_<uuid>, z.B. harvest_…, lab_testing_… oder seed_purchase_…)
+        
+        Herkunft und Verbleib kommen aus dem Herkunfts-Graph (lineage_graph) - inkl.
+        Mutterpflanzen-/Stecklings-Zweig und mit gleicher Query-Anzahl für jede Tiefe.
         """
         cannabis_batch_id = request.query_params.get('cannabis_batch_id')
         
@@ -3424,178 +2513,39 @@ class StrainCardViewSet(viewsets.ReadOnlyModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        # Parse cannabis_batch_id (z.B. "lab_testing_4ed01949-f03b-4ef3-b74b-bcbb1ff8a2c7") -
+        # Typen enthalten Unterstriche, UUIDs nicht
+        batch_type, _, batch_id = cannabis_batch_id.rpartition('_')
+        if batch_type not in lineage_graph.NODE_TYPES or batch_type in lineage_graph.UNIT_TYPES:
+            return Response(
+                {"error": f"Unbekannter Chargen-Typ '{batch_type}'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         try:
-            # Parse cannabis_batch_id (z.B. "harvest_4ed01949-f03b-4ef3-b74b-bcbb1ff8a2c7")
-            batch_type, batch_id = cannabis_batch_id.split('_', 1)
-            
-            if batch_type != 'harvest':
-                return Response(
-                    {"error": "Nur harvest batches werden derzeit unterstützt"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Importiere Models
-            from trackandtrace.models import HarvestBatch
-            
-            # Lade HarvestBatch mit ALLEN verknüpften Objekten (das ist der Schlüssel!)
-            harvest = HarvestBatch.objects.prefetch_related(
-                'flowering_batch__seed_purchase',
-                'drying_batches',
-                'drying_batches__processing_batches',
-                'drying_batches__processing_batches__lab_testing_batches',
-                'drying_batches__processing_batches__lab_testing_batches__packaging_batches'
-            ).select_related(
-                'flowering_batch__seed_purchase__member',
-                'flowering_batch__seed_purchase__room',
-                'flowering_batch__member',
-                'flowering_batch__room',
-                'member',
-                'room'
-            ).get(id=batch_id)
-            
-            # Baue Timeline
-            timeline = []
-            
-            # 1. Sameneinkauf
-            if harvest.flowering_batch and harvest.flowering_batch.seed_purchase:
-                seed = harvest.flowering_batch.seed_purchase
-                timeline.append({
-                    'step': 1,
-                    'type': 'seed_purchase',
-                    'title': '🌱 Sameneinkauf',
-                    'batch_number': seed.batch_number,
-                    'date': seed.created_at.isoformat(),
-                    'data': {
-                        'strain_name': seed.strain_name,
-                        'quantity': seed.quantity,
-                        'member': str(seed.member) if seed.member else 'Unbekannt',
-                        'room': seed.room.name if seed.room else 'Nicht angegeben',
-                        'thc_range': f"{seed.thc_percentage_min or 'k.A.'} - {seed.thc_percentage_max or 'k.A.'}%",
-                        'cbd_range': f"{seed.cbd_percentage_min or 'k.A.'} - {seed.cbd_percentage_max or 'k.A.'}%"
-                    }
-                })
-            
-            # 2. Blühpflanzen
-            if harvest.flowering_batch:
-                flowering = harvest.flowering_batch
-                timeline.append({
-                    'step': 2,
-                    'type': 'flowering_plant',
-                    'title': '🌸 Blühpflanzen (direkt)',
-                    'batch_number': flowering.batch_number,
-                    'date': flowering.created_at.isoformat(),
-                    'data': {
-                        'quantity': flowering.quantity,
-                        'member': str(flowering.member) if flowering.member else 'Unbekannt',
-                        'room': flowering.room.name if flowering.room else 'Nicht angegeben'
-                    }
-                })
-            
-            # 3. Ernte
-            timeline.append({
-                'step': 3,
-                'type': 'harvest',
-                'title': '🌾 Ernte',
-                'batch_number': harvest.batch_number,
-                'date': harvest.created_at.isoformat(),
-                'data': {
-                    'weight': f"{harvest.weight}g",
-                    'member': str(harvest.member) if harvest.member else 'Unbekannt',
-                    'room': harvest.room.name if harvest.room else 'Nicht angegeben',
-                    'status': harvest.status
-                }
-            })
-            
-            # 4. Trocknungen (kann mehrere geben)
-            for drying in harvest.drying_batches.all():
-                timeline.append({
-                    'step': len(timeline) + 1,
-                    'type': 'drying',
-                    'title': '🍂 Trocknung',
-                    'batch_number': drying.batch_number,
-                    'date': drying.created_at.isoformat(),
-                    'data': {
-                        'initial_weight': f"{drying.initial_weight}g",
-                        'final_weight': f"{drying.final_weight}g",
-                        'weight_loss': f"{drying.weight_loss}g ({drying.weight_loss_percentage:.1f}%)",
-                        'member': str(drying.member) if drying.member else 'Unbekannt',
-                        'room': drying.room.name if drying.room else 'Nicht angegeben'
-                    }
-                })
-                
-                # 5. Verarbeitungen
-                for processing in drying.processing_batches.all():
-                    timeline.append({
-                        'step': len(timeline) + 1,
-                        'type': 'processing',
-                        'title': f"🏭 Verarbeitung zu {processing.get_product_type_display()}",
-                        'batch_number': processing.batch_number,
-                        'date': processing.created_at.isoformat(),
-                        'data': {
-                            'product_type': processing.get_product_type_display(),
-                            'input_weight': f"{processing.input_weight}g",
-                            'output_weight': f"{processing.output_weight}g",
-                            'yield': f"{processing.yield_percentage:.1f}%",
-                            'member': str(processing.member) if processing.member else 'Unbekannt',
-                            'room': processing.room.name if processing.room else 'Nicht angegeben'
-                        }
-                    })
-                    
-                    # 6. Laborkontrollen
-                    for lab_testing in processing.lab_testing_batches.all():
-                        timeline.append({
-                            'step': len(timeline) + 1,
-                            'type': 'lab_testing',
-                            'title': '🔬 Laborkontrolle',
-                            'batch_number': lab_testing.batch_number,
-                            'date': lab_testing.created_at.isoformat(),
-                            'data': {
-                                'status': lab_testing.get_status_display(),
-                                'thc_content': f"{lab_testing.thc_content}%" if lab_testing.thc_content else 'k.A.',
-                                'cbd_content': f"{lab_testing.cbd_content}%" if lab_testing.cbd_content else 'k.A.',
-                                'sample_weight': f"{lab_testing.sample_weight}g",
-                                'member': str(lab_testing.member) if lab_testing.member else 'Unbekannt',
-                                'room': lab_testing.room.name if lab_testing.room else 'Nicht angegeben'
-                            }
-                        })
-                        
-                        # 7. Verpackungen
-                        for packaging in lab_testing.packaging_batches.all():
-                            timeline.append({
-                                'step': len(timeline) + 1,
-                                'type': 'packaging',
-                                'title': '📦 Verpackung',
-                                'batch_number': packaging.batch_number,
-                                'date': packaging.created_at.isoformat(),
-                                'data': {
-                                    'total_weight': f"{packaging.total_weight}g",
-                                    'unit_count': packaging.unit_count,
-                                    'unit_weight': f"{packaging.unit_weight}g pro Einheit",
-                                    'member': str(packaging.member) if packaging.member else 'Unbekannt',
-                                    'room': packaging.room.name if packaging.room else 'Nicht angegeben'
-                                }
-                            })
-            
-            # Response
-            return Response({
-                'cannabis_batch_id': cannabis_batch_id,
-                'strain_name': harvest.source_strain,
-                'timeline': timeline,
-                'total_steps': len(timeline),
-                'complete_chain': any('packaging' in step['type'] for step in timeline)
-            })
-            
-        except HarvestBatch.DoesNotExist:
+            batch_id = uuid.UUID(batch_id)
+        except ValueError:
             return Response(
-                {"error": f"HarvestBatch mit ID {batch_id} nicht gefunden"},
-                status=status.HTTP_404_NOT_FOUND
+                {"error": f"Ungültige Chargen-ID '{batch_id}'"},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        except Exception as e:
-            print(f"❌ Fehler bei product_history: {str(e)}")
+        
+        graph = lineage_graph.build_lineage(batch_type, batch_id, include_units=False)
+        if graph is None:
             return Response(
-                {"error": "Fehler beim Laden der Produkthistorie"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": f"Charge {cannabis_batch_id} nicht gefunden"},
+                status=status.HTTP_404_NOT_FOUND
             )
+        
+        timeline = lineage_graph.timeline(graph)
+        seeds = [node['object'] for node in graph['nodes']
+                 if node['type'] == 'seed_purchase' and node['level'] <= 0]
+        return Response({
+            'cannabis_batch_id': cannabis_batch_id,
+            'strain_name': seeds[-1].strain_name if seeds else "Unbekannt",
+            'timeline': timeline,
+            'total_steps': len(timeline),
+            'complete_chain': any('packaging' in step['type'] for step in timeline)
+        })
 
 class PackagingUnitViewSet(viewsets.ModelViewSet):
     queryset = PackagingUnit.objects.all().order_by('-created_at')
@@ -3641,31 +2591,11 @@ class PackagingUnitViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def distinct_strains(self, request):
-        strains = set()
-        for unit in PackagingUnit.objects.all():
-            # Name extrahieren wie in der Tabelle
-            name = None
-            try:
-                name = unit.batch.lab_testing_batch.processing_batch.drying_batch.harvest_batch.flowering_batch.seed_purchase.strain.name
-            except Exception:
-                pass
-            if not name:
-                try:
-                    name = unit.batch.flowering_batch.seed_purchase.strain.name
-                except Exception:
-                    pass
-            if not name:
-                try:
-                    name = unit.batch.seed_purchase.strain.name
-                except Exception:
-                    pass
-            if not name:
-                name = getattr(unit.batch, "source_strain", None) or getattr(unit, "source_strain", None)
-            if not name:
-                name = getattr(unit, "strain_name", None)
-            if name and name != "Unbekannt":
-                strains.add(name)
-        return Response([{"name": n} for n in sorted(strains)])
+        # Sortenname ist auf der Einheit gestempelt (siehe lineage.py)
+        names = PackagingUnit.objects.exclude(
+            lineage_strain_name__in=['', UNKNOWN_STRAIN]
+        ).order_by('lineage_strain_name').values_list('lineage_strain_name', flat=True).distinct()
+        return Response([{"name": n} for n in names])
 
     @action(detail=False, methods=['get'])
     def get_units_for_strain_card(self, request):
@@ -3689,70 +2619,29 @@ class PackagingUnitViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Alle verfügbaren Units
-        units = PackagingUnit.objects.filter(
+        # Alle verfügbaren Units der Sorte (Index auf lineage_strain_name + weight)
+        matching_units = PackagingUnit.objects.filter(
             is_destroyed=False,
+            lineage_strain_name=strain_name,
             weight=weight_value
         ).exclude(
             distributions__isnull=False
         ).select_related(
             'batch',
-            'batch__lab_testing_batch',
-            'batch__lab_testing_batch__processing_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase__strain',
-        )
-        
-        # Filtere Units nach Strain-Namen (in Python)
-        matching_units = []
-        for unit in units:
-            unit_strain_name = self._extract_strain_name_for_unit(unit)
-            if unit_strain_name == strain_name:
-                matching_units.append(unit)
-        
-        # Limitiere für Performance
-        matching_units = matching_units[:10]
+            *[f'batch__{related}' for related in PACKAGING_LINEAGE_RELATED]
+        )[:10]  # Limitiere für Performance
         
         serializer = PackagingUnitSerializer(matching_units, many=True)
         return Response(serializer.data)
     
     def _extract_strain_name_for_unit(self, unit):
         """Hilfsfunktion für Strain-Name-Extraktion"""
-        name = None
-        try:
-            name = unit.batch.lab_testing_batch.processing_batch.drying_batch.harvest_batch.flowering_batch.seed_purchase.strain.name
-        except Exception:
-            pass
-        if not name:
-            try:
-                name = unit.batch.flowering_batch.seed_purchase.strain.name
-            except Exception:
-                pass
-        if not name:
-            try:
-                name = unit.batch.seed_purchase.strain.name
-            except Exception:
-                pass
-        if not name:
-            name = getattr(unit.batch, "source_strain", None) or getattr(unit, "source_strain", None)
-        if not name:
-            name = getattr(unit, "strain_name", None)
-        
-        return name if name and name != "Unbekannt" else "Unbekannte Sorte"
+        return unit.lineage_strain_name or UNKNOWN_STRAIN
 
     def get_queryset(self):
         queryset = PackagingUnit.objects.select_related(
             'batch',
-            'batch__lab_testing_batch',
-            'batch__lab_testing_batch__processing_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase',
-            'batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase__strain',
+            *[f'batch__{related}' for related in PACKAGING_LINEAGE_RELATED]
         ).all()
 
         weight = self.request.query_params.get('weight')
@@ -3767,14 +2656,14 @@ class PackagingUnitViewSet(viewsets.ModelViewSet):
         # Produkttyp-Filter
         product_type = self.request.query_params.get('product_type')
         if product_type:
-            queryset = queryset.filter(batch__lab_testing_batch__processing_batch__product_type=product_type)
+            queryset = queryset.filter(lineage_product_type=product_type)
 
         # THC-Filter
         min_thc = self.request.query_params.get('min_thc')
         if min_thc:
             try:
                 min_thc_value = float(min_thc)
-                queryset = queryset.filter(batch__lab_testing_batch__thc_content__gte=min_thc_value)
+                queryset = queryset.filter(lineage_thc_content__gte=min_thc_value)
             except (ValueError, TypeError):
                 pass
 
@@ -3782,45 +2671,21 @@ class PackagingUnitViewSet(viewsets.ModelViewSet):
         if max_thc:
             try:
                 max_thc_value = float(max_thc)
-                queryset = queryset.filter(batch__lab_testing_batch__thc_content__lte=max_thc_value)
+                queryset = queryset.filter(lineage_thc_content__lte=max_thc_value)
             except (ValueError, TypeError):
                 pass
 
-        # Strain-Filter (bestehende Logik beibehalten)
+        # Strain-Filter
         strain_name = self.request.query_params.get('strain_name')
         if strain_name:
-            pks = []
-            for unit in queryset:
-                name = None
-                try:
-                    name = unit.batch.lab_testing_batch.processing_batch.drying_batch.harvest_batch.flowering_batch.seed_purchase.strain.name
-                except Exception:
-                    pass
-                if not name:
-                    try:
-                        name = unit.batch.flowering_batch.seed_purchase.strain.name
-                    except Exception:
-                        pass
-                if not name:
-                    try:
-                        name = unit.batch.seed_purchase.strain.name
-                    except Exception:
-                        pass
-                if not name:
-                    name = getattr(unit.batch, "source_strain", None) or getattr(unit, "source_strain", None)
-                if not name:
-                    name = getattr(unit, "strain_name", None)
-                if name == strain_name:
-                    pks.append(unit.pk)
-            queryset = queryset.filter(pk__in=pks)
+            queryset = queryset.filter(lineage_strain_name=strain_name)
 
         # Suchfilter
         search = self.request.query_params.get('search')
         if search:
             queryset = queryset.filter(
                 Q(batch_number__icontains=search) |
-                Q(batch__source_strain__icontains=search) |
-                Q(batch__lab_testing_batch__processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase__strain__name__icontains=search)
+                Q(lineage_strain_name__icontains=search)
             )
 
         # Debug-Ausgabe für Entwicklung
@@ -3835,8 +2700,20 @@ class ProductDistributionViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     pagination_class = StandardResultsSetPagination
     
+    def _with_units(self, queryset):
+        """Lädt Mitglieder und Einheiten inkl. Herkunftskette für den Serializer vor."""
+        return queryset.select_related('distributor', 'recipient').prefetch_related(
+            Prefetch(
+                'packaging_units',
+                queryset=PackagingUnit.objects.select_related(
+                    'batch',
+                    *[f'batch__{related}' for related in PACKAGING_LINEAGE_RELATED]
+                )
+            )
+        )
+    
     def get_queryset(self):
-        queryset = ProductDistribution.objects.all().order_by('-distribution_date')
+        queryset = self._with_units(ProductDistribution.objects.all()).order_by('-distribution_date')
         
         # Filter nach Empfänger-Mitglied
         recipient_id = self.request.query_params.get('recipient_id', None)
@@ -3864,8 +2741,15 @@ class ProductDistributionViewSet(viewsets.ModelViewSet):
     
     def create(self, request, *args, **kwargs):
         """
-        Erweiterte create-Methode mit Limit-Validierung, Preisberechnung und Kontostand-Update
+        Erweiterte create-Methode mit Limit-Validierung, Preisberechnung und Kontostand-Update.
+        
+        Die Ausgabe läuft atomar: Mitglied und ausgewählte Einheiten werden gesperrt,
+        Verfügbarkeit und Limits innerhalb der Transaktion erneut geprüft. Parallel
+        arbeitende Ausgabestellen können so weder Einheiten doppelt ausgeben noch
+        Limits oder Kontostand gegenseitig überschreiben.
         """
+        from members.models import Member
+        
         recipient_id = request.data.get('recipient_id')
         packaging_unit_ids = request.data.get('packaging_unit_ids', [])
         
@@ -3875,147 +2759,91 @@ class ProductDistributionViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Empfänger laden
-        try:
-            from members.models import Member
-            recipient = Member.objects.get(id=recipient_id)
-        except Member.DoesNotExist:
-            return Response(
-                {"error": "Empfänger nicht gefunden"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
-        # Altersklasse bestimmen
-        age_class = recipient.age_class if hasattr(recipient, 'age_class') else "21+"
-        is_u21 = age_class == "18+"
-        
-        # Limits basierend auf Altersklasse
-        daily_limit = 25.0
-        monthly_limit = 30.0 if is_u21 else 50.0
-        max_thc_percentage = 10.0 if is_u21 else None
-        
-        # Aktuelles Datum
-        today = timezone.now().date()
-        month_start = today.replace(day=1)
-        
-        # Bisherige Ausgaben abrufen
-        daily_consumption = ProductDistribution.objects.filter(
-            recipient_id=recipient_id,
-            distribution_date__date=today
-        ).aggregate(
-            total_weight=Sum('packaging_units__weight')
-        )['total_weight'] or 0
-        
-        monthly_consumption = ProductDistribution.objects.filter(
-            recipient_id=recipient_id,
-            distribution_date__date__gte=month_start,
-            distribution_date__date__lte=today
-        ).aggregate(
-            total_weight=Sum('packaging_units__weight')
-        )['total_weight'] or 0
-        
-        # Gewicht der ausgewählten Einheiten berechnen und Preisberechnung
-        selected_weight = 0
-        total_price = 0
-        thc_violations = []
-        
-        for unit_id in packaging_unit_ids:
+        with transaction.atomic():
+            # Empfänger sperren - weitere Ausgaben an dieses Mitglied warten bis zum Commit
             try:
-                unit = PackagingUnit.objects.select_related(
-                    'batch__lab_testing_batch'
-                ).get(id=unit_id)
-                
-                unit_weight = float(unit.weight)
-                selected_weight += unit_weight
-                
-                # Preisberechnung
-                if unit.unit_price:
-                    total_price += float(unit.unit_price)
-                
-                # THC-Prüfung für U21
-                if is_u21 and unit.batch and unit.batch.lab_testing_batch:
-                    thc_content = unit.batch.lab_testing_batch.thc_content
-                    if thc_content and float(thc_content) > max_thc_percentage:
-                        thc_violations.append({
-                            'unit_id': str(unit_id),
-                            'unit_number': unit.batch_number,
-                            'thc_content': float(thc_content),
-                            'strain': unit.batch.source_strain
-                        })
-                        
-            except PackagingUnit.DoesNotExist:
-                continue
-        
-        # Neue Gesamtwerte berechnen
-        new_daily_total = float(daily_consumption) + selected_weight
-        new_monthly_total = float(monthly_consumption) + selected_weight
-        
-        # Validierung
-        errors = []
-        
-        if new_daily_total > daily_limit:
-            remaining = daily_limit - float(daily_consumption)
-            errors.append(f"Tageslimit überschritten! Noch verfügbar: {remaining:.2f}g")
+                recipient = Member.objects.select_for_update().get(id=recipient_id)
+            except Member.DoesNotExist:
+                return Response(
+                    {"error": "Empfänger nicht gefunden"},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             
-        if new_monthly_total > monthly_limit:
-            remaining = monthly_limit - float(monthly_consumption)
-            errors.append(f"Monatslimit überschritten! Noch verfügbar: {remaining:.2f}g")
+            # Ausgewählte Einheiten sperren und Verfügbarkeit erneut prüfen
+            engine = DistributionLimitEngine(recipient)
+            units = engine.load_units(packaging_unit_ids, lock=True)
+            already_distributed = set(
+                ProductDistribution.packaging_units.through.objects.filter(
+                    packagingunit_id__in=[unit.id for unit in units]
+                ).values_list('packagingunit_id', flat=True)
+            )
+            unavailable = [
+                unit for unit in units
+                if unit.is_destroyed or unit.id in already_distributed
+            ]
+            if unavailable:
+                return Response(
+                    {
+                        "error": "Ausgabe nicht möglich",
+                        "details": [
+                            f"Einheit {unit.batch_number} ist nicht mehr verfügbar"
+                            + (" (vernichtet)" if unit.is_destroyed else " (bereits ausgegeben)")
+                            for unit in unavailable
+                        ],
+                        "unavailable_unit_ids": [str(unit.id) for unit in unavailable]
+                    },
+                    status=status.HTTP_409_CONFLICT
+                )
             
-        if thc_violations:
-            errors.append("THC-Limit überschritten! Max. 10% THC für Mitglieder unter 21 Jahren.")
-        
-        if errors:
-            return Response(
-                {
-                    "error": "Ausgabe nicht möglich",
-                    "details": errors,
-                    "validation": {
-                        "recipient": {
-                            "id": str(recipient.id),
-                            "name": f"{recipient.first_name} {recipient.last_name}",
-                            "age_class": age_class
-                        },
-                        "violations": {
-                            "exceeds_daily_limit": new_daily_total > daily_limit,
-                            "exceeds_monthly_limit": new_monthly_total > monthly_limit,
-                            "thc_violations": thc_violations
-                        },
-                        "remaining": {
-                            "daily_remaining": daily_limit - new_daily_total,
-                            "monthly_remaining": monthly_limit - new_monthly_total
+            # Limits mit dem Verbrauch zum Zeitpunkt der Sperre prüfen
+            verdict = engine.evaluate(units=units)
+            total_price = verdict.total_price
+            
+            if not verdict.is_valid:
+                return Response(
+                    {
+                        "error": "Ausgabe nicht möglich",
+                        "details": verdict.errors,
+                        "validation": {
+                            "recipient": {
+                                "id": str(recipient.id),
+                                "name": f"{recipient.first_name} {recipient.last_name}",
+                                "age_class": engine.age_class
+                            },
+                            "violations": verdict.violations,
+                            "remaining": verdict.remaining
                         }
-                    }
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Kontostand vor der Transaktion speichern
-        balance_before = float(recipient.kontostand)
-        
-        # Erstelle die Distribution mit Preisinformationen
-        distribution_data = request.data.copy()
-        distribution_data['total_price'] = total_price
-        distribution_data['balance_before'] = balance_before
-        distribution_data['balance_after'] = balance_before - total_price
-        
-        # Serializer mit erweiterten Daten
-        serializer = self.get_serializer(data=distribution_data)
-        serializer.is_valid(raise_exception=True)
-        self.perform_create(serializer)
-        
-        # Kontostand aktualisieren
-        recipient.kontostand = balance_before - total_price
-        recipient.save(update_fields=['kontostand'])
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            # Kontostand vor der Transaktion speichern
+            balance_before = float(recipient.kontostand)
+            
+            # Erstelle die Distribution mit Preisinformationen
+            distribution_data = request.data.copy()
+            distribution_data['total_price'] = total_price
+            distribution_data['balance_before'] = balance_before
+            distribution_data['balance_after'] = balance_before - total_price
+            
+            # Serializer mit erweiterten Daten
+            serializer = self.get_serializer(data=distribution_data)
+            serializer.is_valid(raise_exception=True)
+            self.perform_create(serializer)
+            
+            # Kontostand aktualisieren
+            recipient.kontostand = balance_before - total_price
+            recipient.save(update_fields=['kontostand'])
+            
+            # Joomla-Sync über die Outbox - läuft nach dem Commit im Hintergrund
+            enqueue_member_sync(recipient, targets=['joomla'])
         
-        # Joomla-Sync
-        try:
-            from members.api_views import sync_joomla_user
-            sync_joomla_user(recipient)
-        except Exception as e:
-            print(f"⚠️ Joomla-Sync fehlgeschlagen: {str(e)}")
+        # Antwort mit vorgeladenen Einheiten serialisieren
+        distribution = self._with_units(ProductDistribution.objects.filter(pk=serializer.instance.pk)).get()
+        data = self.get_serializer(distribution).data
         
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        headers = self.get_success_headers(data)
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
     
     @action(detail=False, methods=['get'])
     def member_summary(self, request):
@@ -4036,14 +2864,17 @@ class ProductDistributionViewSet(viewsets.ModelViewSet):
         # Zeitliche Begrenzung (z.B. letzte 30 Tage für Details)
         thirty_days_ago = timezone.now() - timedelta(days=30)
         
+        # Empfangene Mengen aus dem Verbrauchsjournal statt über alle Ausgaben
+        received_totals = member_totals(member_id, since=timezone.localdate(thirty_days_ago))
+        
         # Zusammenfassungen erstellen
         summary = {
             'received': {
-                'total_count': received.count(),
-                'recent_count': received.filter(distribution_date__gte=thirty_days_ago).count(),
-                'total_weight': float(sum(dist.total_weight for dist in received)),
+                'total_count': received_totals['total_count'],
+                'recent_count': received_totals['recent_count'],
+                'total_weight': received_totals['total_weight'],
                 'recent_distributions': ProductDistributionSerializer(
-                    received.filter(distribution_date__gte=thirty_days_ago)[:10],
+                    self._with_units(received).filter(distribution_date__gte=thirty_days_ago)[:10],
                     many=True
                 ).data
             },
@@ -4082,71 +2913,43 @@ class ProductDistributionViewSet(viewsets.ModelViewSet):
             )
         
         # Zeiträume
-        today = timezone.now().date()
-        month_start = today.replace(day=1)
+        today = timezone.localdate()
         thirty_days_ago = today - timedelta(days=30)
         
         # Bestehende Abfragen
         received = ProductDistribution.objects.filter(recipient_id=member_id)
         distributed = ProductDistribution.objects.filter(distributor_id=member_id)
         
-        # Tages- und Monatsverbrauch
-        daily_consumption = received.filter(
-            distribution_date__date=today
-        ).aggregate(
-            total_weight=Sum('packaging_units__weight')
-        )['total_weight'] or 0
-        
-        monthly_consumption = received.filter(
-            distribution_date__date__gte=month_start,
-            distribution_date__date__lte=today
-        ).aggregate(
-            total_weight=Sum('packaging_units__weight')
-        )['total_weight'] or 0
-        
-        # Limits basierend auf Alter
-        age_class = member.age_class if hasattr(member, 'age_class') else "21+"
+        # Empfangene Mengen aus dem Verbrauchsjournal statt über alle Ausgaben
+        received_totals = member_totals(member.id, since=thirty_days_ago)
+        
+        # Tages- und Monatsverbrauch inkl. Limits nach Altersklasse
+        verdict = DistributionLimitEngine(member, today=today).evaluate()
         age = member.age if hasattr(member, 'age') else None
-        is_u21 = age_class == "18+"
-        daily_limit = 25.0
-        monthly_limit = 30.0 if is_u21 else 50.0
-        max_thc = 10.0 if is_u21 else None
         
         summary = {
             'member': {
                 'id': str(member.id),
                 'name': f"{member.first_name} {member.last_name}",
                 'age': age,
-                'age_class': age_class,
+                'age_class': verdict.engine.age_class,
                 'kontostand': float(member.kontostand),
                 'beitrag': float(member.beitrag),
                 'first_name': member.first_name,
                 'last_name': member.last_name,
                 'email': member.email
             },
-            'limits': {
-                'daily_limit': daily_limit,
-                'monthly_limit': monthly_limit,
-                'max_thc_percentage': max_thc
-            },
-            'consumption': {
-                'daily': {
-                    'consumed': float(daily_consumption),
-                    'remaining': daily_limit - float(daily_consumption),
-                    'percentage': (float(daily_consumption) / daily_limit * 100) if daily_limit > 0 else 0
-                },
-                'monthly': {
-                    'consumed': float(monthly_consumption),
-                    'remaining': monthly_limit - float(monthly_consumption),
-                    'percentage': (float(monthly_consumption) / monthly_limit * 100) if monthly_limit > 0 else 0
-                }
-            },
+            'limits': verdict.engine.limits,
+            'consumption': dict(
+                verdict.consumption_summary(),
+                history=member_history(member.id, days=30, today=today)
+            ),
             'received': {
-                'total_count': received.count(),
-                'recent_count': received.filter(distribution_date__gte=thirty_days_ago).count(),
-                'total_weight': float(sum(dist.total_weight for dist in received)),
+                'total_count': received_totals['total_count'],
+                'recent_count': received_totals['recent_count'],
+                'total_weight': received_totals['total_weight'],
                 'recent_distributions': ProductDistributionSerializer(
-                    received.filter(distribution_date__gte=thirty_days_ago)[:10],
+                    self._with_units(received).filter(distribution_date__date__gte=thirty_days_ago)[:10],
                     many=True
                 ).data
             },
@@ -4181,8 +2984,8 @@ class ProductDistributionViewSet(viewsets.ModelViewSet):
                 # Wenn U21, filtere Produkte mit >10% THC
                 if hasattr(recipient, 'age_class') and recipient.age_class == "18+":
                     units = units.filter(
-                        Q(batch__lab_testing_batch__thc_content__lte=10.0) | 
-                        Q(batch__lab_testing_batch__thc_content__isnull=True)
+                        Q(lineage_thc_content__lte=10.0) | 
+                        Q(lineage_thc_content__isnull=True)
                     )
             except Member.DoesNotExist:
                 pass
@@ -4190,12 +2993,154 @@ class ProductDistributionViewSet(viewsets.ModelViewSet):
         # Weitere bestehende Filter...
         product_type = request.query_params.get('product_type')
         if product_type:
-            units = units.filter(batch__lab_testing_batch__processing_batch__product_type=product_type)
+            units = units.filter(lineage_product_type=product_type)
             
         serializer = PackagingUnitSerializer(units, many=True)
         return Response(serializer.data)
 
 
+# Herkunfts-Graph (Rück- und Vorwärtsverfolgung)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def lineage_graph_view(request, node_type, node_id):
+    """
+    Herkunft und Verbleib einer Charge, Verpackungseinheit oder Ausgabe.
+    
+    Query Parameters:
+        - depth: maximale Tiefe je Richtung (Standard 12, höchstens 30)
+        - direction: up (nur Herkunft), down (nur Verbleib) oder leer für beide
+        - units: 0, um Verpackungseinheiten und Ausgaben auszulassen
+    """
+    try:
+        depth = int(request.query_params.get('depth', lineage_graph.DEFAULT_DEPTH))
+    except ValueError:
+        return Response({"error": "depth muss eine Zahl sein"}, status=status.HTTP_400_BAD_REQUEST)
+    direction = request.query_params.get('direction') or None
+    include_units = request.query_params.get('units', '1').lower() not in ('0', 'false', 'no')
+    
+    try:
+        graph = lineage_graph.build_lineage(node_type, node_id, depth, direction, include_units)
+    except lineage_graph.LineageError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    if graph is None:
+        return Response(
+            {"error": f"{node_type} mit ID {node_id} nicht gefunden"},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    return Response(lineage_graph.serialize_lineage(graph))
+
+
+# Rückruf-Analyse (betroffene Einheiten, Ausgaben und Mitglieder)
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def recall_report(request, source_type, source_id):
+    """
+    Rückruf-Bericht für alle Bestände unterhalb einer Charge.
+    
+    Query Parameters:
+        - export: csv oder json für den vollständigen Bericht mit allen Einheiten
+          (gestreamt); ohne export nur Kennzahlen und betroffene Mitglieder
+    """
+    try:
+        report = Recall(source_type, source_id)
+    except RecallError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ObjectDoesNotExist as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+    
+    export = request.query_params.get('export')
+    if not export:
+        return Response(report.summary())
+    if export not in ('csv', 'json'):
+        return Response({"error": "export muss csv oder json sein"}, status=status.HTTP_400_BAD_REQUEST)
+    
+    if export == 'csv':
+        response = StreamingHttpResponse(report.stream_csv(), content_type='text/csv; charset=utf-8')
+    else:
+        response = StreamingHttpResponse(report.stream_json(), content_type='application/json')
+    filename = f"rueckruf-{report.source.batch_number or report.source.pk}.{export}".replace(':', '-')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def recall_destroy(request, source_type, source_id):
+    """
+    Vernichtet alle noch vorrätigen Einheiten unterhalb einer Charge in einer Transaktion.
+    
+    Input:
+        - reason: Vernichtungsgrund (Pflicht)
+        - destroyed_by_id: verantwortliches Mitglied (Pflicht)
+    """
+    reason = request.data.get('reason', '')
+    destroyed_by_id = request.data.get('destroyed_by_id', None)
+    if not destroyed_by_id:
+        return Response(
+            {"error": "Ein verantwortliches Mitglied muss angegeben werden"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        report = Recall(source_type, source_id)
+        destroyed = report.destroy_units(reason, destroyed_by_id)
+    except RecallError as e:
+        return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    except ObjectDoesNotExist as e:
+        return Response({"error": str(e)}, status=status.HTTP_404_NOT_FOUND)
+    
+    return Response({
+        "message": f"🚫 {destroyed} Verpackungseinheiten aus {report.source.batch_number} wurden vernichtet",
+        "destroyed_count": destroyed,
+        "summary": report.summary()
+    })
+
+
+@api_view(['GET', 'PUT', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def media_upload(request, upload_id):
+    """
+    Teilstück-Upload für Bilder/Videos (gestartet über .../uploads/ am Bild-ViewSet).
+    
+    GET: Stand der Sitzung (offset = bereits empfangene Bytes, zum Fortsetzen)
+    PUT: Teilstück als Roh-Body (application/octet-stream) ab ?offset=N bzw.
+         Header Upload-Offset; optional X-Chunk-SHA256 zur Prüfung des Stücks
+    DELETE: Upload abbrechen und die Teildatei löschen
+    """
+    try:
+        upload = uploads.get_upload(upload_id)
+        if request.method == 'PUT':
+            offset = request.query_params.get('offset', request.headers.get('Upload-Offset'))
+            # Body blockweise vom Socket lesen - request.data würde alles puffern
+            uploads.write_chunk(
+                upload, offset, request.stream, request.META.get('CONTENT_LENGTH'),
+                request.headers.get('X-Chunk-SHA256', '')
+            )
+        elif request.method == 'DELETE':
+            uploads.abort(upload)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+    except uploads.UploadError as e:
+        # Stand mitsenden, damit der Client am richtigen Offset fortsetzen kann
+        data = uploads.describe(e.upload) if e.upload is not None else {}
+        data["error"] = str(e)
+        return Response(data, status=e.status_code)
+    
+    return Response(uploads.describe(upload))
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAuthenticated])
+def conditional_metrics(request):
+    """
+    Treffer (304) und Fehlschläge (neu berechnet) der bedingten GET-Endpunkte
+    je Endpunkt (siehe conditional.py). DELETE setzt die Zähler zurück.
+    """
+    if request.method == 'DELETE':
+        conditional.reset_metrics()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(conditional.metrics())
+
+
 # Cannabis-Limit Validierungs-API
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -4229,103 +3174,10 @@ def validate_distribution_limits(request):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Altersklasse bestimmen
-    age_class = recipient.age_class  # Nutzt die property aus dem Member Model
-    is_u21 = age_class == "18+"
-    
-    # Limits basierend auf Altersklasse
-    daily_limit = 25.0  # Beide Altersklassen haben 25g/Tag
-    monthly_limit = 30.0 if is_u21 else 50.0
-    max_thc_percentage = 10.0 if is_u21 else None
-    
-    # Aktuelles Datum für Berechnungen
-    today = timezone.now().date()
-    month_start = today.replace(day=1)
-    
-    # Bisherige Ausgaben heute abrufen
-    daily_consumption = ProductDistribution.objects.filter(
-        recipient_id=recipient_id,
-        distribution_date__date=today
-    ).aggregate(
-        total_weight=Sum('packaging_units__weight')
-    )['total_weight'] or 0
-    
-    # Bisherige Ausgaben diesen Monat abrufen
-    monthly_consumption = ProductDistribution.objects.filter(
-        recipient_id=recipient_id,
-        distribution_date__date__gte=month_start,
-        distribution_date__date__lte=today
-    ).aggregate(
-        total_weight=Sum('packaging_units__weight')
-    )['total_weight'] or 0
-    
-    # Gewicht der ausgewählten Einheiten berechnen
-    selected_weight = 0
-    thc_violations = []
-    
-    for unit_data in selected_units:
-        unit_id = unit_data.get('id')
-        try:
-            unit = PackagingUnit.objects.select_related(
-                'batch__lab_testing_batch'
-            ).get(id=unit_id)
-            
-            unit_weight = float(unit.weight)
-            selected_weight += unit_weight
-            
-            # THC-Prüfung für U21
-            if is_u21 and unit.batch and unit.batch.lab_testing_batch:
-                thc_content = unit.batch.lab_testing_batch.thc_content
-                if thc_content and float(thc_content) > max_thc_percentage:
-                    thc_violations.append({
-                        'unit_id': unit_id,
-                        'unit_number': unit.batch_number,
-                        'thc_content': float(thc_content),
-                        'strain': unit.batch.source_strain
-                    })
-                    
-        except PackagingUnit.DoesNotExist:
-            continue
-    
-    # Neue Gesamtwerte berechnen
-    new_daily_total = float(daily_consumption) + selected_weight
-    new_monthly_total = float(monthly_consumption) + selected_weight
-    
-    # Validierungsergebnis
-    validation_result = {
-        'recipient': {
-            'id': str(recipient.id),
-            'name': f"{recipient.first_name} {recipient.last_name}",
-            'age_class': age_class,
-            'age': recipient.age
-        },
-        'limits': {
-            'daily_limit': daily_limit,
-            'monthly_limit': monthly_limit,
-            'max_thc_percentage': max_thc_percentage
-        },
-        'consumption': {
-            'daily_consumed': float(daily_consumption),
-            'monthly_consumed': float(monthly_consumption),
-            'selected_weight': selected_weight,
-            'new_daily_total': new_daily_total,
-            'new_monthly_total': new_monthly_total
-        },
-        'remaining': {
-            'daily_remaining': daily_limit - new_daily_total,
-            'monthly_remaining': monthly_limit - new_monthly_total
-        },
-        'violations': {
-            'exceeds_daily_limit': new_daily_total > daily_limit,
-            'exceeds_monthly_limit': new_monthly_total > monthly_limit,
-            'thc_violations': thc_violations
-        },
-        'is_valid': (
-            new_daily_total <= daily_limit and 
-            new_monthly_total <= monthly_limit and 
-            len(thc_violations) == 0
-        )
-    }
+    # Limits, Verbrauch und ausgewählte Einheiten mit konstanter Query-Anzahl prüfen
+    unit_ids = [unit_data.get('id') for unit_data in selected_units if isinstance(unit_data, dict)]
+    verdict = DistributionLimitEngine(recipient).evaluate(unit_ids)
+    validation_result = verdict.as_dict()
     
     return Response(validation_result)
 
@@ -4335,16 +3187,57 @@ class BaseProductImageViewSet(viewsets.ModelViewSet):
     
     @action(detail=True, methods=['post'])
     def regenerate_thumbnail(self, request, pk=None):
-        """Thumbnail neu generieren"""
+        """Thumbnail & Renditions im Hintergrund neu generieren"""
         image = self.get_object()
-        if image.image:
-            image.make_thumbnail()
-            image.save()
-            return Response({'message': 'Thumbnail wurde neu generiert'})
+        if image.image or image.video:
+            media.requeue(image)
+            return Response(
+                {'message': 'Thumbnail wird neu generiert', 'processing_status': media.PENDING},
+                status=status.HTTP_202_ACCEPTED
+            )
         return Response(
             {'error': 'Kein Bild vorhanden'}, 
             status=status.HTTP_400_BAD_REQUEST
         )
+    
+    @action(detail=False, methods=['post'], url_path='uploads', parser_classes=[JSONParser, FormParser])
+    def start_upload(self, request):
+        """
+        Startet einen Upload in Teilstücken (große Videos, instabile Verbindungen).
+        
+        Input: filename, size (Bytes), checksum (SHA-256 hex, optional)
+        Danach die Teilstücke per PUT an upload_url senden und mit uploads/commit abschließen.
+        """
+        try:
+            upload = uploads.start(
+                self.get_serializer_class().Meta.model,
+                request.data.get('filename'),
+                request.data.get('size'),
+                request.data.get('checksum', '')
+            )
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response({
+            **uploads.describe(upload),
+            'upload_url': reverse('media_upload', args=[upload.id], request=request)
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=False, methods=['post'], url_path='uploads/commit', parser_classes=[JSONParser, FormParser])
+    def commit_upload(self, request):
+        """Schließt einen Upload ab - gleiche Felder wie beim normalen Upload, statt Datei die upload_id"""
+        try:
+            upload = uploads.get_upload(request.data.get('upload_id'), self.get_serializer_class().Meta.model)
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                uploads.commit_serializer(upload, serializer, self.perform_create)
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 class SeedPurchaseImageViewSet(BaseProductImageViewSet):
     serializer_class = SeedPurchaseImageSerializer
@@ -1,6 +1,21 @@
+import os
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TrackandtraceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'trackandtrace'
+
+    def ready(self):
+        """Registriert die Signale für den Sorten-Verfügbarkeitsindex und startet den Medien-Worker"""
+        from django.db.models.signals import post_migrate
+        from . import signals  # noqa: F401
+        from .strain_index import ensure_index_built
+        post_migrate.connect(ensure_index_built, sender=self)
+
+        # Offene Thumbnails/Renditions nur im Webserver-Prozess nachziehen
+        if os.environ.get('RUN_MAIN', None) == 'true' and getattr(settings, 'MEDIA_PROCESSING_WORKER', True):
+            from .media import start_worker
+            start_worker()
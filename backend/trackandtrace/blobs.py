@@ -0,0 +1,301 @@
+# backend/trackandtrace/blobs.py
+"""
+Inhaltsadressierter Medienspeicher (SHA-256) mit Referenzzählung.
+
+- ContentAddressedStorage legt Bilder und Videos aller Medien-Modelle unter
+  media-blobs/<aa>/<bb>/<sha256>.<ext> ab. Gleicher Inhalt (z.B. dasselbe
+  Dokumentationsfoto für Ernte, Trocknung und Labor) liegt nur einmal auf der
+  Platte.
+- MediaBlob zählt die Referenzen über content_hash aller Medien-Modelle.
+  Renditions werden einmal je Blob erzeugt und auf alle Medien mit diesem
+  Inhalt übertragen.
+- Wird die letzte Referenz gelöscht, entfernt collect() Datei, Renditions und
+  Blob (nach dem Commit, damit ein Rollback nichts löscht).
+
+Ältere Dateien unter trackandtrace/images/... bleiben gültig; der Worker
+berechnet ihren Hash und legt Duplikate auf die Datei des Blobs zusammen.
+
+Das Modul importiert keine Modelle direkt (wawi.models nutzt media_storage).
+"""
+import hashlib
+import os
+import re
+import tempfile
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import media
+
+BLOB_DIR = 'media-blobs'
+RENDITION_DIR = f'{BLOB_DIR}/renditions'
+
+# Prozess-umask für die Dateirechte neuer Blobs (os.umask lässt sich nur setzend lesen)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+_BLOB_NAME = re.compile(rf'^{BLOB_DIR}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})(\.[\w]+)?$')
+
+
+def blob_name(digest, extension=''):
+    return f"{BLOB_DIR}/{digest[:2]}/{digest[2:4]}/{digest}{extension.lower()}"
+
+
+def rendition_name(digest, name, extension):
+    return f"{RENDITION_DIR}/{digest[:2]}/{digest}_{name}.{extension}"
+
+
+def digest_from_name(name):
+    """SHA-256 aus einem Blob-Pfad (None für herkömmliche Pfade)."""
+    match = _BLOB_NAME.match(name or '')
+    return match.group(1) if match else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Dateisystem-Speicher, der Dateien unter ihrem SHA-256 ablegt (gleicher Inhalt nur einmal)."""
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        target = blob_name(digest.hexdigest(), PurePosixPath(name).suffix)
+        if self.exists(target):
+            return target
+
+        # In eine temporäre Datei schreiben und atomar umbenennen: gleichzeitige
+        # Uploads desselben Inhalts überschreiben sich mit identischen Bytes, und
+        # ein abgebrochener Upload hinterlässt keinen halben Blob
+        full_path = self.path(target)
+        directory = os.path.dirname(full_path)
+        if self.directory_permissions_mode is not None:
+            os.makedirs(directory, self.directory_permissions_mode, exist_ok=True)
+        else:
+            os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                for chunk in content.chunks():
+                    handle.write(chunk if isinstance(chunk, bytes) else chunk.encode())
+            # mkstemp legt 0600 an - wie FileSystemStorage die Rechte aus umask/Setting
+            os.chmod(temp_path, self.file_permissions_mode if self.file_permissions_mode is not None
+                     else 0o666 & ~_UMASK)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return target
+
+    def get_available_name(self, name, max_length=None):
+        # Blob-Pfade sind eindeutig - vorhandene Datei hat denselben Inhalt
+        if digest_from_name(name):
+            return name
+        return super().get_available_name(name, max_length)
+
+
+_storage = None
+
+
+def media_storage():
+    """Speicher der Bild-/Videofelder (Callable, damit Migrationen keine Instanz serialisieren)."""
+    global _storage
+    if _storage is None:
+        _storage = ContentAddressedStorage()
+    return _storage
+
+
+def adopt_file(name, digest):
+    """
+    Übernimmt eine bereits geschriebene Datei (z.B. Teilstück-Upload) in den
+    Blob-Speicher. Gibt den Blob-Pfad zurück; existiert der Inhalt schon, wird
+    die Datei gelöscht.
+    """
+    target = blob_name(digest, PurePosixPath(name).suffix)
+    if name == target:
+        return target
+    if default_storage.exists(target):
+        default_storage.delete(name)
+        return target
+    try:
+        source, destination = default_storage.path(name), default_storage.path(target)
+    except NotImplementedError:
+        with default_storage.open(name) as handle:
+            default_storage.save(target, handle)
+        default_storage.delete(name)
+        return target
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    os.replace(source, destination)
+    return target
+
+
+# --- Referenzen --------------------------------------------------------------
+
+def _blob_model():
+    return apps.get_model('trackandtrace', 'MediaBlob')
+
+
+def acquire(digest, file_name, is_video=False):
+    """Neue Referenz auf einen Inhalt (legt den Blob beim ersten Mal an)."""
+    MediaBlob = _blob_model()
+    if not MediaBlob.objects.filter(pk=digest).exists():
+        try:
+            size = default_storage.size(file_name)
+        except OSError:
+            size = 0
+        MediaBlob.objects.get_or_create(
+            sha256=digest, defaults={'file_name': file_name, 'is_video': is_video, 'size': size}
+        )
+    MediaBlob.objects.filter(pk=digest).update(ref_count=F('ref_count') + 1)
+
+
+def release(digest):
+    """Referenz freigeben; die letzte Referenz löscht den Blob (nach dem Commit)."""
+    def _release():
+        _blob_model().objects.filter(pk=digest, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+        collect(digest)
+    transaction.on_commit(_release)
+
+
+def references(digest):
+    return sum(model.objects.filter(content_hash=digest).count() for model in media.media_models())
+
+
+def collect(digest):
+    """Garbage Collection eines Blobs ohne Referenzen. Gibt True zurück, wenn gelöscht."""
+    MediaBlob = _blob_model()
+    blob = MediaBlob.objects.filter(pk=digest, ref_count=0).first()
+    if blob is None:
+        return False
+    actual = references(digest)
+    if actual:
+        # Zähler war abgewichen (z.B. Löschung per Raw-SQL) - korrigieren statt löschen
+        MediaBlob.objects.filter(pk=digest).update(ref_count=actual)
+        return False
+    if not media.file_in_use(blob.file_name):
+        default_storage.delete(blob.file_name)
+    media.delete_files(blob.renditions)
+    blob.delete()
+    return True
+
+
+def recount():
+    """
+    Zählt alle Referenzen neu, legt fehlende Blobs an und entfernt Blobs ohne
+    Referenz. Gibt (Blobs gesamt, korrigiert, gelöscht) zurück.
+    """
+    MediaBlob = _blob_model()
+    counts, files = {}, {}
+    for model in media.media_models():
+        for field_name in model.MEDIA_FIELDS:
+            rows = model.objects.exclude(content_hash='').exclude(**{field_name: ''}).exclude(
+                **{f'{field_name}__isnull': True}
+            ).values('content_hash').annotate(total=Count('pk'), name=Min(field_name)).order_by()
+            for row in rows:
+                counts[row['content_hash']] = counts.get(row['content_hash'], 0) + row['total']
+                files.setdefault(row['content_hash'], (row['name'], field_name == 'video'))
+
+    corrected = 0
+    for digest, total in counts.items():
+        name, is_video = files[digest]
+        blob, created = MediaBlob.objects.get_or_create(
+            sha256=digest, defaults={'file_name': name, 'is_video': is_video, 'ref_count': total}
+        )
+        if created or blob.ref_count != total:
+            MediaBlob.objects.filter(pk=digest).update(ref_count=total)
+            corrected += 1
+
+    MediaBlob.objects.exclude(pk__in=list(counts)).update(ref_count=0)
+    orphaned = list(MediaBlob.objects.filter(ref_count=0).values_list('pk', flat=True))
+    removed = sum(collect(digest) for digest in orphaned)
+    return MediaBlob.objects.count(), corrected, removed
+
+
+# --- Renditions je Blob -----------------------------------------------------
+
+def _adopt_blob_file(model, instance, blob):
+    """Altes Duplikat (eigene Kopie) auf die Datei des Blobs umstellen und Kopie löschen."""
+    own_name = instance.media_name()
+    if own_name == blob.file_name or not default_storage.exists(blob.file_name):
+        return
+    field_name = instance.media_file().field.name
+    model.objects.filter(pk=instance.pk).update(**{field_name: blob.file_name})
+    setattr(instance, field_name, blob.file_name)
+    instance._loaded_media_name = blob.file_name
+    if not media.file_in_use(own_name):
+        default_storage.delete(own_name)
+
+
+def _propagate(digest, **fields):
+    """Überträgt Status und Renditions des Blobs auf alle Medien mit diesem Inhalt."""
+    renditions = fields.get('renditions')
+    for model in media.media_models():
+        extra = model.rendition_fields(renditions) if renditions is not None else {}
+        model.objects.filter(content_hash=digest).update(**fields, **extra)
+
+
+def process_row(model, instance):
+    """
+    Stellt sicher, dass der Blob des Mediums Renditions hat, und überträgt sie.
+    Gibt READY/FAILED zurück, oder None, wenn ein anderer Worker den Blob gerade
+    verarbeitet (dessen Ergebnis gilt dann auch für dieses Medium).
+    """
+    MediaBlob = _blob_model()
+    digest = instance.content_hash
+    if not digest:
+        # Bisheriger Speicherort: Hash nachträglich berechnen
+        digest = media.file_sha256(instance.media_file())
+        model.objects.filter(pk=instance.pk).update(content_hash=digest)
+        instance.content_hash = digest
+        acquire(digest, instance.media_name(), instance.is_video())
+    elif not MediaBlob.objects.filter(pk=digest).exists():
+        acquire(digest, instance.media_name(), instance.is_video())
+    blob = MediaBlob.objects.get(pk=digest)
+    _adopt_blob_file(model, instance, blob)
+
+    # Renditions aus der Zeit vor dem Blob-Speicher gehören nur diesem Medium
+    media.delete_files({
+        name: path for name, path in (instance.renditions or {}).items() if not path.startswith(RENDITION_DIR)
+    })
+
+    if blob.processing_status != media.READY:
+        claimed = MediaBlob.objects.filter(
+            pk=digest, processing_status__in=(media.PENDING, media.FAILED)
+        ).update(processing_status=media.PROCESSING)
+        if not claimed:
+            model.objects.filter(pk=instance.pk).update(processing_status=media.PENDING)
+            blob.refresh_from_db()
+            if blob.processing_status != media.READY:
+                return None
+        else:
+            now = timezone.now()
+            try:
+                renditions = media.render_file(instance.media_file(), instance.is_video(), digest)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                MediaBlob.objects.filter(pk=digest).update(
+                    processing_status=media.FAILED, processing_error=error, processed_at=now
+                )
+                _propagate(digest, processing_status=media.FAILED, processing_error=error, processed_at=now)
+                raise
+            MediaBlob.objects.filter(pk=digest).update(
+                processing_status=media.READY, processing_error='', renditions=renditions, processed_at=now
+            )
+            media.delete_files(blob.renditions, keep=renditions)
+            blob.renditions, blob.processed_at = renditions, now
+
+    _propagate(
+        digest, processing_status=media.READY, processing_error='', renditions=blob.renditions,
+        processed_at=blob.processed_at or timezone.now()
+    )
+    return media.READY
+
+
+def reset(digests):
+    """Blobs zur Neuberechnung der Renditions zurücksetzen."""
+    _blob_model().objects.filter(pk__in=[d for d in digests if d]).exclude(
+        processing_status=media.PROCESSING
+    ).update(processing_status=media.PENDING)
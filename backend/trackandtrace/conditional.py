@@ -0,0 +1,158 @@
+# backend/trackandtrace/conditional.py
+"""
+Bedingte GET-Anfragen (ETag / Last-Modified) für lesende Endpunkte.
+
+Jede Modellgruppe hat einen Versionszähler in der Datenbank (options.versions),
+der bei jeder Änderung (nach dem Commit) steigt:
+
+- LIFECYCLE: über stats.invalidate_counts (Signale der Lebenszyklus-Modelle
+  und Massen-Updates, die die Tab-Zähler ohnehin verwerfen)
+- STRAIN_CARDS: bei jeder Neuberechnung des Sorten-Index (strain_index.py)
+  sowie bei Änderungen an Mitgliedern (Altersklasse für den THC-Filter)
+- STRAINS: Sorten und Bestände der WaWi
+
+@conditional_get(*groups) leitet aus den Versionen, dem Endpunkt und den
+Query-Parametern ein ETag ab. Passt If-None-Match (bzw. If-Modified-Since),
+antwortet der Endpunkt mit 304 - nach einer einzigen Query auf die Versionen.
+Da die Zähler in der Datenbank liegen, sehen alle Prozesse (Worker,
+Management-Commands) dieselben Versionen. Treffer und Fehlschläge werden je
+Endpunkt im Django-Cache gezählt (GET /conditional-metrics/, je Prozess).
+"""
+import functools
+import hashlib
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from options import versions as versions_db
+
+LIFECYCLE = 'lifecycle'
+STRAIN_CARDS = 'strain_cards'
+STRAINS = 'strains'
+
+# Modelle, deren Signale (post_save/post_delete) die Gruppe hochzählen
+MODEL_GROUPS = {
+    'members.Member': (STRAIN_CARDS,),
+    'wawi.CannabisStrain': (STRAINS,),
+    'wawi.StrainInventory': (STRAINS,),
+}
+
+METRICS_TIMEOUT = None
+
+HIT = 'hits'
+MISS = 'misses'
+
+# Alle dekorierten Endpunkte (für die Metriken)
+ENDPOINTS = set()
+
+
+def _version_name(group):
+    return f"conditional:{group}"
+
+
+def _metric_key(endpoint, outcome):
+    return f"conditional:metrics:{endpoint}:{outcome}"
+
+
+def bump(*groups):
+    """Neue Version der Gruppen (alle ausgelieferten ETags werden ungültig)."""
+    versions_db.bump(*[_version_name(group) for group in groups])
+
+
+def bump_on_commit(*groups):
+    transaction.on_commit(functools.partial(bump, *groups))
+
+
+def versions(groups):
+    """{Gruppe: (Version, Änderungszeitpunkt als Unix-Zeit)} in einer Query."""
+    state = versions_db.current([_version_name(group) for group in groups])
+    result = {}
+    for group in groups:
+        version, updated_at = state[_version_name(group)]
+        result[group] = (version, int(updated_at.timestamp()))
+    return result
+
+
+def make_etag(endpoint, state, request):
+    params = sorted(
+        (key, value) for key, values in request.query_params.lists() for value in values
+    )
+    raw = repr((endpoint, sorted(state.items()), params, request.META.get('HTTP_ACCEPT', '')))
+    return f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+
+
+def record(endpoint, outcome):
+    key = _metric_key(endpoint, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, METRICS_TIMEOUT):
+            cache.incr(key)
+
+
+def metrics():
+    """{Endpunkt: {'hits', 'misses', 'hit_rate'}} für alle bekannten Endpunkte."""
+    values = cache.get_many([
+        _metric_key(endpoint, outcome) for endpoint in ENDPOINTS for outcome in (HIT, MISS)
+    ])
+    result = {}
+    for endpoint in sorted(ENDPOINTS):
+        hits = values.get(_metric_key(endpoint, HIT), 0)
+        misses = values.get(_metric_key(endpoint, MISS), 0)
+        total = hits + misses
+        result[endpoint] = {
+            HIT: hits,
+            MISS: misses,
+            'hit_rate': round(hits / total, 3) if total else None,
+        }
+    return result
+
+
+def reset_metrics():
+    cache.delete_many([
+        _metric_key(endpoint, outcome) for endpoint in ENDPOINTS for outcome in (HIT, MISS)
+    ])
+
+
+def _set_headers(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    # Browser soll jedes Mal nachfragen - mit If-None-Match
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def conditional_get(*groups):
+    """
+    Decorator für ViewSet-Methoden (list, Actions): ETag und Last-Modified aus
+    den Versionen der Gruppen, 304 bei unverändertem Stand.
+    """
+    def decorator(method):
+        endpoint = method.__qualname__
+        ENDPOINTS.add(endpoint)
+
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return method(self, request, *args, **kwargs)
+
+            # Versionen vor dem Berechnen lesen - eine parallele Änderung führt
+            # so höchstens zu einem unnötigen Neuberechnen, nie zu einem alten Stand
+            state = versions(groups)
+            etag = make_etag(endpoint, state, request)
+            last_modified = max(modified for _, modified in state.values())
+
+            not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if not_modified is not None:
+                record(endpoint, HIT)
+                return _set_headers(not_modified, etag, last_modified)
+
+            record(endpoint, MISS)
+            response = method(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                _set_headers(response, etag, last_modified)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,168 @@
+# backend/trackandtrace/consumption_ledger.py
+"""
+Pflege des Verbrauchsjournals (MemberConsumptionDay).
+
+Statt bei jeder Limitprüfung Sum('packaging_units__weight') über alle Ausgaben
+eines Mitglieds zu bilden, wird pro Mitglied und Tag eine vorsummierte Zeile
+gehalten. Die Signale in signals.py rechnen die betroffenen Tage neu, sobald eine
+Ausgabe angelegt, geändert oder storniert wird - innerhalb derselben Transaktion.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import MemberConsumptionDay, ProductDistribution
+
+
+def ledger_key(distribution):
+    """(Mitglied, Kalendertag) einer Ausgabe - oder None ohne Empfänger."""
+    if not distribution.recipient_id or not distribution.distribution_date:
+        return None
+    return (distribution.recipient_id, timezone.localdate(distribution.distribution_date))
+
+
+def _history_aggregate(queryset):
+    """Gruppiert Ausgaben nach Mitglied und Tag (Rohdaten für Journal und Prüfung)."""
+    return queryset.filter(
+        recipient__isnull=False
+    ).annotate(
+        day=TruncDate('distribution_date')
+    ).values(
+        'recipient_id', 'day'
+    ).annotate(
+        weight=Sum('packaging_units__weight'),
+        count=Count('id', distinct=True)
+    ).order_by()
+
+
+def refresh_days(keys):
+    """Rechnet die Journalzeilen der angegebenen (Mitglied, Tag)-Paare aus den Ausgaben neu."""
+    keys = {key for key in keys if key}
+    if not keys:
+        return
+    with transaction.atomic():
+        for member_id, day in keys:
+            totals = ProductDistribution.objects.filter(
+                recipient_id=member_id,
+                distribution_date__date=day
+            ).aggregate(
+                weight=Sum('packaging_units__weight'),
+                count=Count('id', distinct=True)
+            )
+            if not totals['count']:
+                MemberConsumptionDay.objects.filter(member_id=member_id, day=day).delete()
+                continue
+            MemberConsumptionDay.objects.update_or_create(
+                member_id=member_id,
+                day=day,
+                defaults={
+                    'total_weight': totals['weight'] or Decimal('0'),
+                    'distribution_count': totals['count']
+                }
+            )
+
+
+def rebuild_ledger(member_ids=None):
+    """Baut das Journal aus allen bisherigen Ausgaben neu auf (Management-Command)."""
+    distributions = ProductDistribution.objects.all()
+    ledger = MemberConsumptionDay.objects.all()
+    if member_ids:
+        distributions = distributions.filter(recipient_id__in=member_ids)
+        ledger = ledger.filter(member_id__in=member_ids)
+
+    rows = [
+        MemberConsumptionDay(
+            member_id=row['recipient_id'],
+            day=row['day'],
+            total_weight=row['weight'] or Decimal('0'),
+            distribution_count=row['count']
+        )
+        for row in _history_aggregate(distributions)
+    ]
+    with transaction.atomic():
+        ledger.delete()
+        MemberConsumptionDay.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def find_differences(member_ids=None):
+    """
+    Vergleicht das Journal mit dem Rohaggregat über alle Ausgaben.
+    Liefert je abweichendem (Mitglied, Tag) ein Dict mit Journal- und Sollwerten.
+    """
+    distributions = ProductDistribution.objects.all()
+    ledger = MemberConsumptionDay.objects.all()
+    if member_ids:
+        distributions = distributions.filter(recipient_id__in=member_ids)
+        ledger = ledger.filter(member_id__in=member_ids)
+
+    expected = {
+        (row['recipient_id'], row['day']): (row['weight'] or Decimal('0'), row['count'])
+        for row in _history_aggregate(distributions)
+    }
+    stored = {
+        (row['member_id'], row['day']): (row['total_weight'], row['distribution_count'])
+        for row in ledger.values('member_id', 'day', 'total_weight', 'distribution_count')
+    }
+
+    differences = []
+    for key in sorted(set(expected) | set(stored), key=lambda k: (str(k[0]), k[1])):
+        if expected.get(key) != stored.get(key):
+            differences.append({
+                'member_id': key[0],
+                'day': key[1],
+                'stored': stored.get(key),
+                'expected': expected.get(key),
+            })
+    return differences
+
+
+def consumption_totals(member_id, today=None):
+    """Tages- und Monatsverbrauch in Gramm aus dem Journal (eine Query über max. 31 Zeilen)."""
+    today = today or timezone.localdate()
+    totals = MemberConsumptionDay.objects.filter(
+        member_id=member_id,
+        day__gte=today.replace(day=1),
+        day__lte=today
+    ).aggregate(
+        daily=Sum('total_weight', filter=Q(day=today)),
+        monthly=Sum('total_weight')
+    )
+    return float(totals['daily'] or 0), float(totals['monthly'] or 0)
+
+
+def member_history(member_id, days=30, today=None):
+    """Verbrauch der letzten Tage (nur Tage mit Ausgaben), neueste zuerst."""
+    today = today or timezone.localdate()
+    rows = MemberConsumptionDay.objects.filter(
+        member_id=member_id,
+        day__gt=today - timedelta(days=days),
+        day__lte=today
+    ).values('day', 'total_weight', 'distribution_count')
+    return [
+        {
+            'date': row['day'].isoformat(),
+            'weight': float(row['total_weight']),
+            'distribution_count': row['distribution_count']
+        }
+        for row in rows
+    ]
+
+
+def member_totals(member_id, since=None):
+    """Anzahl und Gewicht aller (bzw. seit einem Tag) empfangenen Ausgaben."""
+    ledger = MemberConsumptionDay.objects.filter(member_id=member_id)
+    totals = ledger.aggregate(
+        total_count=Sum('distribution_count'),
+        total_weight=Sum('total_weight'),
+        recent_count=Sum('distribution_count', filter=Q(day__gte=since)) if since else Sum('distribution_count'),
+    )
+    return {
+        'total_count': totals['total_count'] or 0,
+        'total_weight': float(totals['total_weight'] or 0),
+        'recent_count': totals['recent_count'] or 0,
+    }
@@ -0,0 +1,180 @@
+# backend/trackandtrace/conversions.py
+"""
+Massen-Konvertierungen im Lebenszyklus: Samen zu Mutter- bzw. Blühpflanzen,
+Mutterpflanzen zu Stecklingen, Stecklinge zu Blühpflanzen und Verpackungen zu
+Einheiten.
+
+Die Chargennummern aller Kind-Zeilen werden mit einer einzigen Reservierung
+vergeben (options.sequences), die Zeilen per bulk_create angelegt und
+verbrauchte Quellen mit einem UPDATE markiert - jeweils in einer Transaktion.
+Die Anzahl der Queries hängt damit nicht mehr von der Chargengröße ab.
+
+bulk_create ruft weder save() noch post_save auf; was dort sonst passiert
+(Herkunftsdaten und Preis der Einheiten, Sorten-Index), erledigen die
+Funktionen hier selbst.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from options.sequences import reserve_batch_numbers
+
+from . import strain_index
+from .lineage import copy_lineage
+from .models import (
+    BloomingCuttingBatch, BloomingCuttingPlant, Cutting, CuttingBatch,
+    FloweringPlant, FloweringPlantBatch, MotherPlant, MotherPlantBatch,
+    PackagingUnit, SeedPurchase
+)
+
+# Zeilen je INSERT (SQLite begrenzt die Anzahl der Parameter pro Statement)
+BULK_BATCH_SIZE = 200
+
+
+class ConversionError(Exception):
+    """Konvertierung nicht möglich - die Meldung geht unverändert an die API."""
+
+
+def bulk_create_children(model, numbers, **fields):
+    """Legt je reservierter Chargennummer eine Zeile mit den gemeinsamen Feldern an."""
+    return model.objects.bulk_create(
+        [model(batch_number=number, **fields) for number in numbers],
+        batch_size=BULK_BATCH_SIZE
+    )
+
+
+def parse_quantity(value):
+    """Anzahl aus Request-Daten als ganze Zahl (ConversionError statt ValueError)."""
+    try:
+        quantity = int(value)
+    except (TypeError, ValueError):
+        raise ConversionError("quantity muss eine ganze Zahl sein")
+    _check_quantity(quantity)
+    return quantity
+
+
+def _check_quantity(quantity):
+    # reserve_batch_numbers lehnt count < 1 mit ValueError ab
+    if quantity < 1:
+        raise ConversionError("quantity muss mindestens 1 sein")
+
+
+def _batch_kwargs(quantity, notes, member_id=None, room_id=None, **source):
+    kwargs = {**source, 'quantity': quantity, 'notes': notes}
+    if member_id:
+        kwargs['member_id'] = member_id
+    if room_id:
+        kwargs['room_id'] = room_id
+    return kwargs
+
+
+# --- Samen -----------------------------------------------------------------
+
+@transaction.atomic
+def _convert_seed(seed, batch_model, plant_model, quantity, notes='', member_id=None, room_id=None):
+    _check_quantity(quantity)
+    # Sperre verhindert, dass parallele Konvertierungen denselben Bestand verbrauchen
+    seed = SeedPurchase.objects.select_for_update().get(pk=seed.pk)
+    if quantity > seed.remaining_quantity:
+        raise ConversionError("Nicht genügend Samen verfügbar")
+
+    batch = batch_model.objects.create(
+        **_batch_kwargs(quantity, notes, member_id, room_id, seed_purchase=seed)
+    )
+    numbers = reserve_batch_numbers(plant_model, plant_model.BATCH_NUMBER_PREFIX, quantity)
+    bulk_create_children(plant_model, numbers, batch=batch, notes=notes)
+
+    seed.remaining_quantity -= quantity
+    seed.save(update_fields=['remaining_quantity', 'updated_at'])
+    return batch
+
+
+def seed_to_mother_plants(seed, quantity, notes='', member_id=None, room_id=None):
+    """Samen zu einer Mutterpflanzen-Charge mit quantity Einzelpflanzen."""
+    return _convert_seed(seed, MotherPlantBatch, MotherPlant, quantity, notes, member_id, room_id)
+
+
+def seed_to_flowering_plants(seed, quantity, notes='', member_id=None, room_id=None):
+    """Samen zu einer Blühpflanzen-Charge mit quantity Einzelpflanzen."""
+    return _convert_seed(seed, FloweringPlantBatch, FloweringPlant, quantity, notes, member_id, room_id)
+
+
+# --- Stecklinge ------------------------------------------------------------
+
+@transaction.atomic
+def create_cuttings(mother_batch, quantity, notes='', member_id=None, room_id=None):
+    """Stecklings-Charge mit quantity Stecklingen aus einer Mutterpflanzen-Charge."""
+    _check_quantity(quantity)
+    batch = CuttingBatch.objects.create(
+        **_batch_kwargs(quantity, notes, member_id, room_id, mother_batch=mother_batch)
+    )
+    numbers = reserve_batch_numbers(Cutting, Cutting.BATCH_NUMBER_PREFIX, quantity)
+    bulk_create_children(Cutting, numbers, batch=batch, notes=notes)
+    return batch
+
+
+@transaction.atomic
+def cuttings_to_blooming(cutting_batch, cuttings, quantity, notes='', member_id=None, room_id=None):
+    """
+    Blühpflanzen-Charge aus quantity Stecklingen. cuttings ist das Queryset der
+    auswählbaren Stecklinge; die ersten quantity werden gesperrt und gemeinsam als
+    vernichtet bzw. konvertiert markiert.
+    """
+    _check_quantity(quantity)
+    consumed = list(cuttings.filter(is_destroyed=False).select_for_update()[:quantity])
+    if len(consumed) < quantity:
+        raise ConversionError(f"Nicht genügend aktive Stecklinge verfügbar (verfügbar: {len(consumed)})")
+
+    batch = BloomingCuttingBatch.objects.create(
+        **_batch_kwargs(quantity, notes, member_id, room_id, cutting_batch=cutting_batch)
+    )
+    numbers = reserve_batch_numbers(BloomingCuttingPlant, BloomingCuttingPlant.BATCH_NUMBER_PREFIX, quantity)
+    bulk_create_children(BloomingCuttingPlant, numbers, batch=batch, notes=notes)
+
+    # Alle verbrauchten Stecklinge erhalten dieselben Werte - ein UPDATE statt bulk_update
+    conversion_time = timezone.now()
+    Cutting.objects.filter(pk__in=[cutting.pk for cutting in consumed]).update(
+        is_destroyed=True,
+        destroy_reason=f"Zu Blühpflanze konvertiert (Charge: {batch.batch_number})",
+        destroyed_at=conversion_time,
+        destroyed_by_id=member_id,
+        converted_to=batch.id,  # Speichern der Ziel-Batch-ID
+        converted_at=conversion_time,
+        converted_by_id=member_id,
+        updated_at=conversion_time
+    )
+    return batch
+
+
+# --- Verpackung ------------------------------------------------------------
+
+@transaction.atomic
+def create_packaging_units(packaging_batch, count=None):
+    """
+    Legt die Verpackungseinheiten eines Batches an (Standard: unit_count Stück)
+    - mit Herkunftsdaten und Preis wie in PackagingUnit.save.
+    """
+    count = packaging_batch.unit_count if count is None else count
+    if count <= 0:
+        return []
+
+    unit_price = None
+    if packaging_batch.price_per_gram and packaging_batch.unit_weight:
+        unit_price = float(packaging_batch.price_per_gram) * float(packaging_batch.unit_weight)
+
+    units = []
+    for number in PackagingUnit.reserve_batch_numbers(packaging_batch, count):
+        unit = PackagingUnit(
+            batch=packaging_batch,
+            batch_number=number,
+            weight=packaging_batch.unit_weight,
+            unit_price=unit_price,
+            notes=f"Automatisch erstellt aus Batch {packaging_batch.batch_number}"
+        )
+        if packaging_batch.has_lineage:
+            copy_lineage(packaging_batch, unit)
+        units.append(unit)
+    PackagingUnit.objects.bulk_create(units, batch_size=BULK_BATCH_SIZE)
+
+    # Ersetzt den post_save-Receiver der Einheiten (einmal für den ganzen Batch)
+    strain_index.schedule_refresh([packaging_batch.id])
+    return units
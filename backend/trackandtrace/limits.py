@@ -0,0 +1,187 @@
+# backend/trackandtrace/limits.py
+"""
+Gemeinsame Prüfung der Abgabelimits nach Altersklasse.
+
+Wird von ProductDistributionViewSet.create, validate_distribution_limits und
+member_consumption_summary verwendet. Alle ausgewählten Einheiten werden mit einer
+einzigen id__in-Query geladen, Tages- und Monatsverbrauch kommen aus dem
+Verbrauchsjournal - die Anzahl der Queries ist unabhängig von der Anzahl der
+Einheiten und der bisherigen Ausgaben.
+"""
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
+from .consumption_ledger import consumption_totals
+from .models import PackagingUnit
+
+
+class DistributionLimitEngine:
+    """Ermittelt Limits, bisherigen Verbrauch und das Prüfergebnis für ein Mitglied."""
+
+    DAILY_LIMIT = 25.0          # Beide Altersklassen haben 25g/Tag
+    MONTHLY_LIMIT = 50.0
+    MONTHLY_LIMIT_U21 = 30.0
+    MAX_THC_U21 = 10.0          # Max. 10% THC für Mitglieder unter 21 Jahren
+
+    def __init__(self, member, today=None):
+        self.member = member
+        self.today = today or timezone.localdate()
+        self.month_start = self.today.replace(day=1)
+        self.age_class = getattr(member, 'age_class', None) or "21+"
+        self.is_u21 = self.age_class == "18+"
+        self.daily_limit = self.DAILY_LIMIT
+        self.monthly_limit = self.MONTHLY_LIMIT_U21 if self.is_u21 else self.MONTHLY_LIMIT
+        self.max_thc_percentage = self.MAX_THC_U21 if self.is_u21 else None
+        self._consumption = None
+
+    @property
+    def limits(self):
+        return {
+            'daily_limit': self.daily_limit,
+            'monthly_limit': self.monthly_limit,
+            'max_thc_percentage': self.max_thc_percentage
+        }
+
+    def consumption(self):
+        """Tages- und Monatsverbrauch in Gramm aus dem Verbrauchsjournal (gecacht)."""
+        if self._consumption is None:
+            self._consumption = consumption_totals(self.member.id, today=self.today)
+        return self._consumption
+
+    def load_units(self, unit_ids, lock=False):
+        """
+        Lädt alle ausgewählten Einheiten mit einer Query (unbekannte IDs werden übersprungen).
+        Mit lock=True werden die Zeilen bis zum Ende der Transaktion gesperrt.
+        """
+        unit_ids = [str(unit_id) for unit_id in unit_ids if unit_id]
+        if not unit_ids:
+            return []
+        try:
+            # Feste Sperr-Reihenfolge vermeidet Deadlocks zwischen parallelen Ausgaben
+            queryset = PackagingUnit.objects.filter(id__in=unit_ids).order_by('id')
+            if lock:
+                queryset = queryset.select_for_update()
+            units = {str(unit.id): unit for unit in queryset}
+        except (ValidationError, ValueError):
+            # Ungültige UUIDs verhalten sich wie nicht gefundene Einheiten
+            return []
+        return [units[unit_id] for unit_id in dict.fromkeys(unit_ids) if unit_id in units]
+
+    def evaluate(self, unit_ids=None, units=None):
+        """Prüft die geplante Ausgabe und liefert ein LimitVerdict."""
+        if units is None:
+            units = self.load_units(unit_ids or [])
+        daily_consumed, monthly_consumed = self.consumption()
+        return LimitVerdict(self, units, daily_consumed, monthly_consumed)
+
+
+class LimitVerdict:
+    """Strukturiertes Ergebnis einer Limitprüfung."""
+
+    def __init__(self, engine, units, daily_consumed, monthly_consumed):
+        self.engine = engine
+        self.units = units
+        self.daily_consumed = daily_consumed
+        self.monthly_consumed = monthly_consumed
+        self.selected_weight = sum(float(unit.weight) for unit in units)
+        self.total_price = sum(float(unit.unit_price) for unit in units if unit.unit_price)
+        self.thc_violations = []
+        if engine.is_u21:
+            for unit in units:
+                thc_content = unit.lineage_thc_content
+                if thc_content and float(thc_content) > engine.max_thc_percentage:
+                    self.thc_violations.append({
+                        'unit_id': str(unit.id),
+                        'unit_number': unit.batch_number,
+                        'thc_content': float(thc_content),
+                        'strain': unit.lineage_strain_name
+                    })
+
+    @property
+    def new_daily_total(self):
+        return self.daily_consumed + self.selected_weight
+
+    @property
+    def new_monthly_total(self):
+        return self.monthly_consumed + self.selected_weight
+
+    @property
+    def exceeds_daily_limit(self):
+        return self.new_daily_total > self.engine.daily_limit
+
+    @property
+    def exceeds_monthly_limit(self):
+        return self.new_monthly_total > self.engine.monthly_limit
+
+    @property
+    def is_valid(self):
+        return not (self.exceeds_daily_limit or self.exceeds_monthly_limit or self.thc_violations)
+
+    @property
+    def errors(self):
+        """Fehlermeldungen für die Ausgabe-Maske."""
+        errors = []
+        if self.exceeds_daily_limit:
+            remaining = self.engine.daily_limit - self.daily_consumed
+            errors.append(f"Tageslimit überschritten! Noch verfügbar: {remaining:.2f}g")
+        if self.exceeds_monthly_limit:
+            remaining = self.engine.monthly_limit - self.monthly_consumed
+            errors.append(f"Monatslimit überschritten! Noch verfügbar: {remaining:.2f}g")
+        if self.thc_violations:
+            errors.append("THC-Limit überschritten! Max. 10% THC für Mitglieder unter 21 Jahren.")
+        return errors
+
+    @property
+    def violations(self):
+        return {
+            'exceeds_daily_limit': self.exceeds_daily_limit,
+            'exceeds_monthly_limit': self.exceeds_monthly_limit,
+            'thc_violations': self.thc_violations
+        }
+
+    @property
+    def remaining(self):
+        return {
+            'daily_remaining': self.engine.daily_limit - self.new_daily_total,
+            'monthly_remaining': self.engine.monthly_limit - self.new_monthly_total
+        }
+
+    def consumption_summary(self):
+        """Verbrauch inkl. Restmengen und Auslastung in Prozent (member_consumption_summary)."""
+        daily_limit = self.engine.daily_limit
+        monthly_limit = self.engine.monthly_limit
+        return {
+            'daily': {
+                'consumed': self.daily_consumed,
+                'remaining': daily_limit - self.daily_consumed,
+                'percentage': (self.daily_consumed / daily_limit * 100) if daily_limit > 0 else 0
+            },
+            'monthly': {
+                'consumed': self.monthly_consumed,
+                'remaining': monthly_limit - self.monthly_consumed,
+                'percentage': (self.monthly_consumed / monthly_limit * 100) if monthly_limit > 0 else 0
+            }
+        }
+
+    def as_dict(self):
+        """Vollständiges Prüfergebnis im Format von validate_distribution_limits."""
+        member = self.engine.member
+        return {
+            'recipient': {
+                'id': str(member.id),
+                'name': f"{member.first_name} {member.last_name}",
+                'age_class': self.engine.age_class,
+                'age': getattr(member, 'age', None)
+            },
+            'limits': self.engine.limits,
+            'consumption': {
+                'daily_consumed': self.daily_consumed,
+                'monthly_consumed': self.monthly_consumed,
+                'selected_weight': self.selected_weight,
+                'new_daily_total': self.new_daily_total,
+                'new_monthly_total': self.new_monthly_total
+            },
+            'remaining': self.remaining,
+            'violations': self.violations,
+            'is_valid': self.is_valid
+        }
@@ -0,0 +1,233 @@
+# backend/trackandtrace/lineage.py
+"""
+Stempeln der Herkunftsdaten (Sorte, Ernte, THC, Produkttyp) auf Verpackungen.
+
+Die Kette Verpackung → Laborkontrolle → Verarbeitung → Trocknung → Ernte →
+Blühpflanzen/Stecklinge → Samen wird nur einmal beim Anlegen der Verpackung
+aufgelöst. PackagingBatch und PackagingUnit tragen das Ergebnis in den
+lineage_*-Feldern, damit Filter einfache Single-Table-Lookups bleiben.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .models import LabTestingBatch, PackagingBatch, PackagingUnit
+
+UNKNOWN_STRAIN = "Unbekannte Sorte"
+
+# Gespeicherte Herkunftsfelder (Attributnamen, identisch auf Batch und Unit)
+LINEAGE_FIELDS = (
+    'lineage_strain_id',
+    'lineage_strain_name',
+    'lineage_harvest_batch_id',
+    'lineage_cannabis_batch_id',
+    'lineage_thc_content',
+    'lineage_product_type',
+)
+
+# select_related-Kette von LabTestingBatch bis zur Sorte
+LAB_LINEAGE_RELATED = (
+    'processing_batch',
+    'processing_batch__drying_batch',
+    'processing_batch__drying_batch__harvest_batch',
+    'processing_batch__drying_batch__harvest_batch__flowering_batch__seed_purchase__strain',
+    'processing_batch__drying_batch__harvest_batch__blooming_cutting_batch__cutting_batch__mother_batch__seed_purchase__strain',
+)
+
+# select_related-Kette von PackagingBatch bis zur Sorte
+PACKAGING_LINEAGE_RELATED = ('lab_testing_batch',) + tuple(
+    f'lab_testing_batch__{related}' for related in LAB_LINEAGE_RELATED
+)
+
+
+def _seed_purchase_for_harvest(harvest_batch):
+    """Findet den Samen-Einkauf einer Ernte (Blühpflanzen oder Stecklinge)."""
+    if harvest_batch.flowering_batch_id:
+        return harvest_batch.flowering_batch.seed_purchase
+    blooming_batch = harvest_batch.blooming_cutting_batch
+    if blooming_batch and blooming_batch.cutting_batch and blooming_batch.cutting_batch.mother_batch:
+        return blooming_batch.cutting_batch.mother_batch.seed_purchase
+    return None
+
+
+def resolve_lineage(lab_batch):
+    """
+    Löst die Herkunftsdaten einer Laborkontrolle auf.
+    Gibt ein Dict mit den Attributen aus LINEAGE_FIELDS zurück.
+    """
+    processing_batch = lab_batch.processing_batch if lab_batch else None
+    drying_batch = processing_batch.drying_batch if processing_batch else None
+    harvest_batch = drying_batch.harvest_batch if drying_batch else None
+    seed_purchase = _seed_purchase_for_harvest(harvest_batch) if harvest_batch else None
+    strain = seed_purchase.strain if seed_purchase else None
+
+    # Wie bisher in der StrainCard-API: Sortenname aus dem Stamm nur über Blühpflanzen,
+    # sonst der im Samen-Einkauf hinterlegte Name
+    strain_name = None
+    if strain and harvest_batch.flowering_batch_id:
+        strain_name = strain.name
+    if not strain_name and seed_purchase:
+        strain_name = seed_purchase.strain_name
+    if not strain_name or strain_name == "Unbekannt":
+        strain_name = UNKNOWN_STRAIN
+
+    if harvest_batch:
+        cannabis_batch_id = f"harvest_{harvest_batch.id}"
+    elif processing_batch:
+        cannabis_batch_id = f"processing_{processing_batch.id}"
+    else:
+        cannabis_batch_id = ''
+
+    return {
+        'lineage_strain_id': strain.id if strain else None,
+        'lineage_strain_name': strain_name,
+        'lineage_harvest_batch_id': harvest_batch.id if harvest_batch else None,
+        'lineage_cannabis_batch_id': cannabis_batch_id,
+        'lineage_thc_content': lab_batch.thc_content if lab_batch else None,
+        'lineage_product_type': processing_batch.product_type if processing_batch else '',
+    }
+
+
+def resolve_packaging_lineage(packaging_batch):
+    """Herkunftsdaten eines Verpackungs-Batches (ohne Laborkontrolle: die Verpackung selbst)."""
+    lineage = resolve_lineage(packaging_batch.lab_testing_batch)
+    if not lineage['lineage_cannabis_batch_id']:
+        lineage['lineage_cannabis_batch_id'] = f"packaging_{packaging_batch.id}"
+    return lineage
+
+
+def get_lineage(instance):
+    """Liest die gestempelten Herkunftsdaten eines Batches oder einer Unit aus."""
+    return {field: getattr(instance, field) for field in LINEAGE_FIELDS}
+
+
+def copy_lineage(source, target):
+    """Überträgt die Herkunftsdaten (z.B. vom Verpackungs-Batch auf eine Einheit)."""
+    for field in LINEAGE_FIELDS:
+        setattr(target, field, getattr(source, field))
+
+
+def stamp_packaging_batch(packaging_batch, lineage=None):
+    """
+    Setzt die Herkunftsfelder eines Verpackungs-Batches (ohne zu speichern).
+    convert_to_packaging übergibt die einmal aufgelöste Lineage für alle Zeilen.
+    """
+    if lineage is None:
+        lineage = resolve_lineage(packaging_batch.lab_testing_batch)
+    for field, value in lineage.items():
+        setattr(packaging_batch, field, value)
+    if not packaging_batch.lineage_cannabis_batch_id:
+        packaging_batch.lineage_cannabis_batch_id = f"packaging_{packaging_batch.id}"
+
+
+def _write_lineage(batch_id, lineage):
+    """Schreibt die Herkunftsdaten auf einen Batch und alle seine Einheiten (2 Queries)."""
+    PackagingBatch.objects.filter(id=batch_id).update(**lineage)
+    PackagingUnit.objects.filter(batch_id=batch_id).update(**lineage)
+
+
+def _refresh_strain_index(batch_ids):
+    """update() löst keine Signale aus - Sorten-Index daher explizit nachziehen."""
+    from .strain_index import schedule_refresh
+    schedule_refresh(batch_ids)
+
+
+def propagate_lab_testing(lab_batch):
+    """
+    Überträgt geänderte Laborwerte (z.B. THC-Gehalt) auf alle daraus entstandenen
+    Verpackungen und Einheiten.
+    """
+    batch_ids = list(PackagingBatch.objects.filter(lab_testing_batch=lab_batch).values_list('id', flat=True))
+    if not batch_ids:
+        return 0
+    lab_batch = LabTestingBatch.objects.select_related(*LAB_LINEAGE_RELATED).get(pk=lab_batch.pk)
+    lineage = resolve_lineage(lab_batch)
+    with transaction.atomic():
+        for batch_id in batch_ids:
+            batch_lineage = dict(lineage)
+            if not batch_lineage['lineage_cannabis_batch_id']:
+                batch_lineage['lineage_cannabis_batch_id'] = f"packaging_{batch_id}"
+            _write_lineage(batch_id, batch_lineage)
+    return len(batch_ids)
+
+
+def backfill(only_missing=True, chunk_size=500):
+    """
+    Stempelt die Herkunftsdaten für bestehende Verpackungen nach
+    (Management-Command backfill_packaging_lineage). Gibt die Anzahl der
+    aktualisierten Verpackungs-Batches zurück.
+    """
+    batches = PackagingBatch.objects.order_by('created_at', 'id')
+    if only_missing:
+        # Batches ohne Stempel oder mit mindestens einer ungestempelten Einheit
+        missing_units = PackagingUnit.objects.filter(lineage_cannabis_batch_id='').values('batch_id')
+        batches = batches.filter(Q(lineage_cannabis_batch_id='') | Q(id__in=missing_units))
+    batch_ids = list(batches.values_list('id', flat=True))
+
+    updated = 0
+    for start in range(0, len(batch_ids), chunk_size):
+        chunk = PackagingBatch.objects.filter(
+            id__in=batch_ids[start:start + chunk_size]
+        ).select_related(*PACKAGING_LINEAGE_RELATED)
+        with transaction.atomic():
+            for batch in chunk:
+                _write_lineage(batch.id, resolve_packaging_lineage(batch))
+                updated += 1
+    _refresh_strain_index(batch_ids)
+    return updated
+
+
+def find_inconsistencies(chunk_size=500):
+    """
+    Vergleicht die gestempelten Herkunftsdaten mit der tatsächlichen Kette
+    (Management-Command check_packaging_lineage). Liefert je Abweichung ein Dict
+    mit Modell, ID, Chargennummer, Feld sowie gespeichertem und erwartetem Wert.
+    """
+    batch_ids = list(PackagingBatch.objects.order_by('created_at', 'id').values_list('id', flat=True))
+    for start in range(0, len(batch_ids), chunk_size):
+        chunk_ids = batch_ids[start:start + chunk_size]
+        expected_by_batch = {}
+        for batch in PackagingBatch.objects.filter(id__in=chunk_ids).select_related(*PACKAGING_LINEAGE_RELATED):
+            expected = resolve_packaging_lineage(batch)
+            expected_by_batch[batch.id] = expected
+            for field, value in expected.items():
+                stored = getattr(batch, field)
+                if stored != value:
+                    yield {
+                        'model': 'PackagingBatch',
+                        'id': batch.id,
+                        'batch_id': batch.id,
+                        'batch_number': batch.batch_number,
+                        'field': field,
+                        'stored': stored,
+                        'expected': value,
+                    }
+
+        units = PackagingUnit.objects.filter(batch_id__in=chunk_ids).values(
+            'id', 'batch_id', 'batch_number', *LINEAGE_FIELDS
+        )
+        for unit in units.iterator():
+            expected = expected_by_batch[unit['batch_id']]
+            for field, value in expected.items():
+                if unit[field] != value:
+                    yield {
+                        'model': 'PackagingUnit',
+                        'id': unit['id'],
+                        'batch_id': unit['batch_id'],
+                        'batch_number': unit['batch_number'],
+                        'field': field,
+                        'stored': unit[field],
+                        'expected': value,
+                    }
+
+
+def repair(batch_ids):
+    """Stempelt die angegebenen Verpackungs-Batches samt Einheiten neu."""
+    batch_ids = set(batch_ids)
+    batches = PackagingBatch.objects.filter(id__in=batch_ids).select_related(*PACKAGING_LINEAGE_RELATED)
+    repaired = 0
+    with transaction.atomic():
+        for batch in batches:
+            _write_lineage(batch.id, resolve_packaging_lineage(batch))
+            repaired += 1
+    _refresh_strain_index(batch_ids)
+    return repaired
@@ -0,0 +1,425 @@
+# backend/trackandtrace/lineage_graph.py
+"""
+Herkunfts-Graph für Track & Trace: vollständige Rückverfolgung (Richtung Samen)
+und Vorwärtsverfolgung (Richtung Einheiten und Ausgaben) für jede Charge, jede
+Verpackungseinheit und jede Ausgabe.
+
+Alle Verknüpfungen der Lebenszyklus-Tabellen werden als Kanten-Sicht
+(Eltern-Typ/ID → Kind-Typ/ID) in einer rekursiven CTE zusammengeführt. Eine
+einzige Query liefert damit alle erreichbaren Knoten bis zur gewünschten Tiefe;
+danach wird je vorkommendem Typ einmal nachgeladen. Die Anzahl der Queries
+hängt also nicht von der Tiefe oder Breite der Kette ab (höchstens 1 + Anzahl
+der Knotentypen).
+
+Die Typ-Schlüssel entsprechen den Schritt-Typen der Produkthistorie im Frontend.
+"""
+from django.db import connection
+
+from .models import (
+    BloomingCuttingBatch, CuttingBatch, DryingBatch, FloweringPlantBatch, HarvestBatch,
+    LabTestingBatch, MotherPlantBatch, PackagingBatch, PackagingUnit, ProcessingBatch,
+    ProductDistribution, SeedPurchase
+)
+
+# Tiefe der längsten Kette Samen → Ausgabe liegt bei 10 Schritten
+DEFAULT_DEPTH = 12
+MAX_DEPTH = 30
+
+# Schutz vor riesigen Antworten (z.B. vorwärts ab einem Samen mit allen Einheiten)
+MAX_NODES = 5000
+
+UP = 'up'
+DOWN = 'down'
+DIRECTIONS = (UP, DOWN)
+
+# Mitglieder und Raum, die in den Knotendaten ausgegeben werden
+_MEMBER_ROOM = ('member', 'room')
+
+# Knotentypen: Modell, Titel und select_related für die Knotendaten
+NODE_TYPES = {
+    'seed_purchase': {'model': SeedPurchase, 'title': '🌱 Sameneinkauf', 'related': _MEMBER_ROOM},
+    'mother_plant': {'model': MotherPlantBatch, 'title': '🌿 Mutterpflanzen', 'related': _MEMBER_ROOM},
+    'cutting': {'model': CuttingBatch, 'title': '✂️ Stecklinge', 'related': _MEMBER_ROOM},
+    'blooming_cutting': {
+        'model': BloomingCuttingBatch, 'title': '🌺 Blühpflanzen (aus Stecklingen)', 'related': _MEMBER_ROOM
+    },
+    'flowering_plant': {'model': FloweringPlantBatch, 'title': '🌸 Blühpflanzen (direkt)', 'related': _MEMBER_ROOM},
+    'harvest': {'model': HarvestBatch, 'title': '🌾 Ernte', 'related': _MEMBER_ROOM},
+    'drying': {'model': DryingBatch, 'title': '🍂 Trocknung', 'related': _MEMBER_ROOM},
+    'processing': {'model': ProcessingBatch, 'title': '🏭 Verarbeitung', 'related': _MEMBER_ROOM},
+    'lab_testing': {'model': LabTestingBatch, 'title': '🔬 Laborkontrolle', 'related': _MEMBER_ROOM},
+    'packaging': {'model': PackagingBatch, 'title': '📦 Verpackung', 'related': _MEMBER_ROOM},
+    'packaging_unit': {'model': PackagingUnit, 'title': '🏷️ Verpackungseinheit', 'related': ()},
+    'distribution': {
+        'model': ProductDistribution, 'title': '🤝 Ausgabe', 'related': ('distributor', 'recipient')
+    },
+}
+
+# Kanten (Eltern-Typ, Kind-Typ, Fremdschlüssel des Kindes auf den Elternteil)
+EDGES = (
+    ('seed_purchase', 'seed_purchase', 'original_seed'),
+    ('seed_purchase', 'mother_plant', 'seed_purchase'),
+    ('seed_purchase', 'flowering_plant', 'seed_purchase'),
+    ('mother_plant', 'cutting', 'mother_batch'),
+    ('cutting', 'blooming_cutting', 'cutting_batch'),
+    ('flowering_plant', 'harvest', 'flowering_batch'),
+    ('blooming_cutting', 'harvest', 'blooming_cutting_batch'),
+    ('harvest', 'drying', 'harvest_batch'),
+    ('drying', 'processing', 'drying_batch'),
+    ('processing', 'lab_testing', 'processing_batch'),
+    ('lab_testing', 'packaging', 'lab_testing_batch'),
+    ('packaging', 'packaging_unit', 'batch'),
+)
+
+# Einheiten und Ausgaben hängen unterhalb der Verpackung
+UNIT_TYPES = ('packaging_unit', 'distribution')
+
+
+class LineageError(Exception):
+    """Ungültige Anfrage an den Herkunfts-Graph - die Meldung geht an die API."""
+
+
+def node_key(node_type, node_id):
+    return f"{node_type}:{node_id}"
+
+
+def _edge_selects(include_units):
+    """SELECTs der Kanten-Sicht (parent_type, parent_id, child_type, child_id) samt Parametern."""
+    qn = connection.ops.quote_name
+    selects, params = [], []
+    for parent_type, child_type, field_name in EDGES:
+        if not include_units and child_type in UNIT_TYPES:
+            continue
+        model = NODE_TYPES[child_type]['model']
+        column = qn(model._meta.get_field(field_name).column)
+        selects.append(
+            f"SELECT %s, {column}, %s, {qn(model._meta.pk.column)} "
+            f"FROM {qn(model._meta.db_table)} WHERE {column} IS NOT NULL"
+        )
+        params += [parent_type, child_type]
+
+    if include_units:
+        # Ausgaben: M2M-Zwischentabelle Einheit ↔ Ausgabe
+        through = ProductDistribution.packaging_units.through
+        unit_column = qn(through._meta.get_field('packagingunit').column)
+        distribution_column = qn(through._meta.get_field('productdistribution').column)
+        selects.append(
+            f"SELECT %s, {unit_column}, %s, {distribution_column} FROM {qn(through._meta.db_table)}"
+        )
+        params += ['packaging_unit', 'distribution']
+    return " UNION ALL ".join(selects), params
+
+
+def _traverse(node_type, node_id, up_depth, down_depth, include_units):
+    """
+    Eine Query: alle Vorfahren bis up_depth und Nachfahren bis down_depth.
+    Zeilen: (Richtung, Typ, ID, Tiefe, Typ und ID des Knotens, über den er erreicht
+    wurde - beim Startknoten er selbst, damit die Spaltentypen ohne NULL feststehen).
+    """
+    edges_sql, params = _edge_selects(include_units)
+    start_id = NODE_TYPES[node_type]['model']._meta.pk.get_db_prep_value(node_id, connection)
+    sql = f"""
+        WITH RECURSIVE lineage_edges(parent_type, parent_id, child_type, child_id) AS (
+            {edges_sql}
+        ),
+        ancestors(node_type, node_id, depth, via_type, via_id) AS (
+            SELECT %s, %s, 0, %s, %s
+            UNION
+            SELECT e.parent_type, e.parent_id, a.depth + 1, e.child_type, e.child_id
+            FROM lineage_edges e JOIN ancestors a ON e.child_type = a.node_type AND e.child_id = a.node_id
+            WHERE a.depth < %s
+        ),
+        descendants(node_type, node_id, depth, via_type, via_id) AS (
+            SELECT %s, %s, 0, %s, %s
+            UNION
+            SELECT e.child_type, e.child_id, d.depth + 1, e.parent_type, e.parent_id
+            FROM lineage_edges e JOIN descendants d ON e.parent_type = d.node_type AND e.parent_id = d.node_id
+            WHERE d.depth < %s
+        )
+        SELECT %s, node_type, node_id, depth, via_type, via_id FROM ancestors
+        UNION ALL
+        SELECT %s, node_type, node_id, depth, via_type, via_id FROM descendants
+        LIMIT %s
+    """
+    params += [
+        node_type, start_id, node_type, start_id, up_depth,
+        node_type, start_id, node_type, start_id, down_depth,
+        UP, DOWN, MAX_NODES * 2,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def _to_pk(node_type, value):
+    return NODE_TYPES[node_type]['model']._meta.pk.to_python(value)
+
+
+def _load_objects(keys):
+    """Lädt die Objekte je Typ mit einer Query: {(typ, id): objekt}."""
+    ids_by_type = {}
+    for node_type, node_id in keys:
+        ids_by_type.setdefault(node_type, set()).add(node_id)
+    objects = {}
+    for node_type, ids in ids_by_type.items():
+        config = NODE_TYPES[node_type]
+        queryset = config['model'].objects.select_related(*config['related'])
+        for pk, obj in queryset.in_bulk(list(ids)).items():
+            objects[(node_type, pk)] = obj
+    return objects
+
+
+def descendant_ids(node_type, node_id, target_type):
+    """IDs aller Nachfahren eines Typs (inkl. des Startknotens selbst) - eine Query."""
+    if node_type not in NODE_TYPES:
+        raise LineageError(f"Unbekannter Typ '{node_type}' (erlaubt: {', '.join(NODE_TYPES)})")
+    rows = _traverse(node_type, node_id, up_depth=0, down_depth=MAX_DEPTH,
+                     include_units=target_type in UNIT_TYPES)
+    return {
+        _to_pk(row_type, row_id)
+        for row_direction, row_type, row_id, *_ in rows
+        if row_direction == DOWN and row_type == target_type
+    }
+
+
+def build_lineage(node_type, node_id, depth=DEFAULT_DEPTH, direction=None, include_units=True):
+    """
+    Herkunfts-Graph ab einem Knoten.
+
+    direction: None (beide Richtungen), UP (nur Herkunft) oder DOWN (nur Verbleib).
+    Gibt {'root', 'nodes', 'edges', 'truncated'} zurück; nodes sind die geladenen
+    Objekte mit Typ und Ebene (negativ = Vorfahr, positiv = Nachfahr). None, wenn
+    der Startknoten nicht existiert.
+    """
+    if node_type not in NODE_TYPES:
+        raise LineageError(f"Unbekannter Typ '{node_type}' (erlaubt: {', '.join(NODE_TYPES)})")
+    if direction not in (None,) + DIRECTIONS:
+        raise LineageError(f"Unbekannte Richtung '{direction}' (erlaubt: {', '.join(DIRECTIONS)})")
+    if not 0 <= depth <= MAX_DEPTH:
+        raise LineageError(f"Tiefe muss zwischen 0 und {MAX_DEPTH} liegen")
+    if not include_units and node_type in UNIT_TYPES:
+        include_units = True
+
+    rows = _traverse(
+        node_type, node_id,
+        up_depth=0 if direction == DOWN else depth,
+        down_depth=0 if direction == UP else depth,
+        include_units=include_units,
+    )
+    truncated = len(rows) >= MAX_NODES * 2
+
+    levels = {}
+    edges = set()
+    for row_direction, row_type, row_id, row_depth, via_type, via_id in rows:
+        key = (row_type, _to_pk(row_type, row_id))
+        level = -row_depth if row_direction == UP else row_depth
+        if key not in levels or abs(level) < abs(levels[key]):
+            levels[key] = level
+        if row_depth:
+            via = (via_type, _to_pk(via_type, via_id))
+            edges.add((key, via) if row_direction == UP else (via, key))
+
+    objects = _load_objects(levels)
+    root = (node_type, _to_pk(node_type, node_id))
+    if root not in objects:
+        return None
+
+    nodes = [
+        {'type': key[0], 'id': key[1], 'level': level, 'object': objects[key]}
+        for key, level in levels.items() if key in objects
+    ]
+    nodes.sort(key=lambda node: (node['level'], node_date(node['object']) or ''))
+    return {
+        'root': root,
+        'nodes': nodes,
+        'edges': sorted(
+            (parent, child) for parent, child in edges if parent in objects and child in objects
+        ),
+        'truncated': truncated,
+    }
+
+
+# --- Darstellung -------------------------------------------------------------
+
+def _member(obj, field='member'):
+    member = getattr(obj, field)
+    return str(member) if member else 'Unbekannt'
+
+
+def _room(obj):
+    return obj.room.name if obj.room else 'Nicht angegeben'
+
+
+def _describe_seed_purchase(seed):
+    return {
+        'strain_name': seed.strain_name,
+        'quantity': seed.quantity,
+        'member': _member(seed),
+        'room': _room(seed),
+        'thc_range': f"{seed.thc_percentage_min or 'k.A.'} - {seed.thc_percentage_max or 'k.A.'}%",
+        'cbd_range': f"{seed.cbd_percentage_min or 'k.A.'} - {seed.cbd_percentage_max or 'k.A.'}%"
+    }
+
+
+def _describe_plant_batch(batch):
+    return {
+        'quantity': batch.quantity,
+        'member': _member(batch),
+        'room': _room(batch)
+    }
+
+
+def _describe_harvest(harvest):
+    return {
+        'weight': f"{harvest.weight}g",
+        'member': _member(harvest),
+        'room': _room(harvest),
+        'status': harvest.status
+    }
+
+
+def _describe_drying(drying):
+    return {
+        'initial_weight': f"{drying.initial_weight}g",
+        'final_weight': f"{drying.final_weight}g",
+        'weight_loss': f"{drying.weight_loss}g ({drying.weight_loss_percentage:.1f}%)",
+        'member': _member(drying),
+        'room': _room(drying)
+    }
+
+
+def _describe_processing(processing):
+    return {
+        'product_type': processing.get_product_type_display(),
+        'input_weight': f"{processing.input_weight}g",
+        'output_weight': f"{processing.output_weight}g",
+        'yield': f"{processing.yield_percentage:.1f}%",
+        'member': _member(processing),
+        'room': _room(processing)
+    }
+
+
+def _describe_lab_testing(lab_testing):
+    return {
+        'status': lab_testing.get_status_display(),
+        'thc_content': f"{lab_testing.thc_content}%" if lab_testing.thc_content else 'k.A.',
+        'cbd_content': f"{lab_testing.cbd_content}%" if lab_testing.cbd_content else 'k.A.',
+        'sample_weight': f"{lab_testing.sample_weight}g",
+        'member': _member(lab_testing),
+        'room': _room(lab_testing)
+    }
+
+
+def _describe_packaging(packaging):
+    return {
+        'total_weight': f"{packaging.total_weight}g",
+        'unit_count': packaging.unit_count,
+        'unit_weight': f"{packaging.unit_weight}g pro Einheit",
+        'member': _member(packaging),
+        'room': _room(packaging)
+    }
+
+
+def _describe_packaging_unit(unit):
+    return {
+        'weight': f"{unit.weight}g",
+        'status': 'destroyed' if unit.is_destroyed else 'active'
+    }
+
+
+def _describe_distribution(distribution):
+    return {
+        'distributor': _member(distribution, 'distributor'),
+        'recipient': _member(distribution, 'recipient'),
+        'total_price': f"{distribution.total_price}€" if distribution.total_price is not None else 'k.A.'
+    }
+
+
+DESCRIBERS = {
+    'seed_purchase': _describe_seed_purchase,
+    'mother_plant': _describe_plant_batch,
+    'cutting': _describe_plant_batch,
+    'blooming_cutting': _describe_plant_batch,
+    'flowering_plant': _describe_plant_batch,
+    'harvest': _describe_harvest,
+    'drying': _describe_drying,
+    'processing': _describe_processing,
+    'lab_testing': _describe_lab_testing,
+    'packaging': _describe_packaging,
+    'packaging_unit': _describe_packaging_unit,
+    'distribution': _describe_distribution,
+}
+
+
+def node_title(node_type, obj):
+    if node_type == 'processing':
+        return f"🏭 Verarbeitung zu {obj.get_product_type_display()}"
+    return NODE_TYPES[node_type]['title']
+
+
+def node_date(obj):
+    date = getattr(obj, 'created_at', None) or getattr(obj, 'distribution_date', None)
+    return date.isoformat() if date else None
+
+
+def serialize_node(node):
+    obj = node['object']
+    return {
+        'key': node_key(node['type'], node['id']),
+        'type': node['type'],
+        'id': str(node['id']),
+        'level': node['level'],
+        'title': node_title(node['type'], obj),
+        'batch_number': obj.batch_number,
+        'date': node_date(obj),
+        'data': DESCRIBERS[node['type']](obj),
+    }
+
+
+def serialize_lineage(graph):
+    """JSON-fähige Darstellung eines build_lineage-Ergebnisses."""
+    return {
+        'root': node_key(*graph['root']),
+        'nodes': [serialize_node(node) for node in graph['nodes']],
+        'edges': [
+            {'from': node_key(*parent), 'to': node_key(*child)} for parent, child in graph['edges']
+        ],
+        'truncated': graph['truncated'],
+    }
+
+
+def timeline(graph):
+    """
+    Zeitleiste der Produkthistorie: Vorfahren von der Quelle abwärts, danach der
+    Startknoten und seine Nachfahren in Tiefensuche (Geschwister nach Anlagedatum).
+    """
+    nodes = {(node['type'], node['id']): node for node in graph['nodes']}
+    children = {}
+    for parent, child in graph['edges']:
+        if nodes[child]['level'] > 0 and nodes[parent]['level'] >= 0:
+            children.setdefault(parent, []).append(child)
+
+    ordered = [node for node in graph['nodes'] if node['level'] < 0]
+    stack = [graph['root']]
+    seen = set()
+    while stack:
+        key = stack.pop()
+        if key in seen:
+            continue
+        seen.add(key)
+        ordered.append(nodes[key])
+        successors = sorted(children.get(key, ()), key=lambda child: node_date(nodes[child]['object']) or '')
+        stack.extend(reversed(successors))
+
+    steps = []
+    for node in ordered:
+        step = serialize_node(node)
+        steps.append({
+            'step': len(steps) + 1,
+            'type': step['type'],
+            'title': step['title'],
+            'batch_number': step['batch_number'],
+            'date': step['date'],
+            'data': step['data'],
+        })
+    return steps
@@ -0,0 +1,163 @@
+# backend/trackandtrace/listing.py
+"""
+Keyset-Pagination und schlanke Darstellung für die Lebenszyklus-Listen.
+
+- ?cursor= schaltet von Seitennummern auf Keyset-Pagination über
+  (created_at, id) um: jede Seite ist ein Bereichs-Scan über den Index
+  <charge>_created_id_idx, ohne OFFSET und ohne COUNT(*). Die erste Seite
+  wird mit leerem ?cursor= abgerufen, die Antwort enthält next/next_cursor
+  (None auf der letzten Seite). Ohne cursor bleibt alles wie bisher.
+- ?fields=a,b,c gibt nur die genannten Felder aus, ?view=slim die
+  Listenspalten des Serializers (SLIM_FIELDS). Nicht benötigte Prefetches
+  (Bilder, Sorte) entfallen, image_count kommt dann als Subquery.
+"""
+import base64
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .annotations import with_image_count
+
+CURSOR_PARAM = 'cursor'
+FIELDS_PARAM = 'fields'
+VIEW_PARAM = 'view'
+SLIM_VIEW = 'slim'
+
+# Felder, die immer ausgegeben werden (Schlüssel der Zeile im Frontend)
+ALWAYS_FIELDS = ('id',)
+
+
+def encode_cursor(created_at, pk):
+    raw = f"{created_at.isoformat()}|{pk}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(created_at, pk) aus dem Cursor; ValueError bei ungültigem Wert."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, pk = raw.split('|', 1)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError(cursor)
+    created_at = parse_datetime(created_at)
+    if created_at is None:
+        raise ValueError(cursor)
+    return created_at, pk
+
+
+class KeysetPaginationMixin:
+    """
+    Ergänzt eine PageNumberPagination um Keyset-Pagination (absteigend nach
+    created_at, id), sobald ?cursor= in der Anfrage steht.
+    """
+    cursor_query_param = CURSOR_PARAM
+
+    def uses_cursor(self, request):
+        return self.cursor_query_param in request.query_params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.uses_cursor(request)
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by('-created_at', '-pk')
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            try:
+                created_at, pk = decode_cursor(cursor)
+                pk = queryset.model._meta.pk.to_python(pk)
+            except (ValueError, ValidationError):
+                raise NotFound("Ungültiger Cursor")
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk))
+
+        # Eine Zeile mehr laden - zeigt an, ob es eine weitere Seite gibt
+        rows = list(queryset[:page_size + 1])
+        page = rows[:page_size]
+        self.next_cursor = encode_cursor(page[-1].created_at, page[-1].pk) if len(rows) > page_size else None
+        return page
+
+    def get_cursor_link(self):
+        if self.next_cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_cursor_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
+
+
+def requested_fields(request, slim_fields=()):
+    """Feldauswahl der Anfrage (?fields= bzw. ?view=slim) oder None für alle Felder."""
+    if request is None or request.method != 'GET':
+        return None
+    fields = request.query_params.get(FIELDS_PARAM)
+    if fields:
+        names = [name.strip() for name in fields.split(',') if name.strip()]
+        return list(ALWAYS_FIELDS) + [name for name in names if name not in ALWAYS_FIELDS]
+    if request.query_params.get(VIEW_PARAM) == SLIM_VIEW and slim_fields:
+        return list(slim_fields)
+    return None
+
+
+class SlimFieldsMixin:
+    """
+    Serializer-Mixin: beschränkt die Ausgabe auf ?fields= bzw. SLIM_FIELDS.
+    Greift nur für den obersten Serializer der Anfrage (nicht für verschachtelte).
+
+    PREFETCHED_FIELDS nennt die Felder, die einen Prefetch des ViewSets brauchen.
+    """
+    SLIM_FIELDS = ()
+    PREFETCHED_FIELDS = ('images',)
+
+    @classmethod
+    def selected_fields(cls, request):
+        return requested_fields(request, cls.SLIM_FIELDS)
+
+    def _is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_top_level():
+            return fields
+        selected = self.selected_fields(self.context.get('request'))
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
+
+class SlimListMixin:
+    """
+    ViewSet-Mixin: passt das Listen-Queryset an die Feldauswahl an (Prefetches
+    nur, wenn die Felder sie brauchen; image_count als Subquery).
+    """
+
+    def slim_queryset(self, queryset):
+        serializer_class = self.get_serializer_class()
+        selected = serializer_class.selected_fields(self.request)
+        if selected is None:
+            return queryset
+        if not set(selected) & set(serializer_class.PREFETCHED_FIELDS):
+            queryset = queryset.prefetch_related(None)
+            if 'image_count' in selected:
+                queryset = with_image_count(queryset)
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        return super().paginate_queryset(self.slim_queryset(queryset))
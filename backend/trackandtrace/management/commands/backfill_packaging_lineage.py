@@ -0,0 +1,30 @@
+# backend/trackandtrace/management/commands/backfill_packaging_lineage.py
+from django.core.management.base import BaseCommand
+
+from trackandtrace.lineage import backfill
+
+
+class Command(BaseCommand):
+    help = "Stempelt Sorte, Ernte, THC und Produkttyp auf bestehende Verpackungen und Einheiten"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Alle Verpackungen neu stempeln (Standard: nur fehlende)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Anzahl Verpackungs-Batches pro Transaktion'
+        )
+
+    def handle(self, *args, **options):
+        only_missing = not options['all']
+        self.stdout.write(
+            "🔄 Stempele Herkunftsdaten "
+            + ("für ungestempelte Verpackungen..." if only_missing else "für alle Verpackungen...")
+        )
+        updated = backfill(only_missing=only_missing, chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {updated} Verpackungs-Batches aktualisiert"))
@@ -0,0 +1,154 @@
+# backend/trackandtrace/management/commands/benchmark_bulk_conversions.py
+"""
+Vergleicht Queries und Laufzeit der Lebenszyklus-Konvertierungen bei wachsender
+Chargengröße: einzelne save()-Aufrufe je Pflanze/Einheit (bisheriges Vorgehen)
+gegen die Massen-Konvertierung aus trackandtrace.conversions. Bei der
+Massen-Konvertierung muss die Anzahl der Queries über alle Größen (nahezu)
+konstant bleiben. Testdaten werden am Ende wieder entfernt.
+"""
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from trackandtrace.conversions import (
+    create_cuttings, cuttings_to_blooming, seed_to_mother_plants
+)
+from trackandtrace.models import (
+    BloomingCuttingBatch, BloomingCuttingPlant, Cutting, CuttingBatch, DryingBatch,
+    FloweringPlantBatch, HarvestBatch, LabTestingBatch, MotherPlant, MotherPlantBatch,
+    PackagingBatch, PackagingUnit, ProcessingBatch, SeedPurchase
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark der Massen-Konvertierungen (Queries und Laufzeit je Chargengröße)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,50,200', help='Kommagetrennte Chargengrößen')
+        parser.add_argument('--keep', action='store_true', help='Testdaten nach dem Lauf nicht löschen')
+        parser.add_argument('--force', action='store_true', help='Auch mit DEBUG=False ausführen')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Benchmark legt Testdaten an - mit DEBUG=False nur mit --force ausführen")
+        try:
+            sizes = sorted({int(value) for value in options['sizes'].split(',') if value.strip()})
+        except ValueError:
+            raise CommandError("--sizes erwartet kommagetrennte Zahlen, z.B. 10,50,200")
+        if not sizes or sizes[0] <= 0:
+            raise CommandError("--sizes muss positive Zahlen enthalten")
+
+        tag = uuid.uuid4().hex[:8]
+        seed = SeedPurchase.objects.create(
+            strain_name=f"Benchmark {tag}",
+            quantity=sum(sizes) * 4,
+            remaining_quantity=sum(sizes) * 4
+        )
+        lab_batch = self._lab_batch(seed)
+        bulk_counts = {}
+        try:
+            for size in sizes:
+                self.stdout.write(f"📦 Chargengröße {size}")
+                for name, single, bulk in self._scenarios(seed, lab_batch, size):
+                    single_queries, single_ms = self._measure(single)
+                    bulk_queries, bulk_ms = self._measure(bulk)
+                    bulk_counts.setdefault(name, []).append(bulk_queries)
+                    self.stdout.write(
+                        f"   {name:<28} einzeln {single_queries:>5} Queries {single_ms:>8.1f}ms   "
+                        f"bulk {bulk_queries:>4} Queries {bulk_ms:>7.1f}ms"
+                    )
+        finally:
+            if not options['keep']:
+                seed.delete()
+                self.stdout.write("🧹 Testdaten entfernt")
+
+        growing = {
+            name: counts for name, counts in bulk_counts.items()
+            if counts[-1] - counts[0] > len(sizes) * 2
+        }
+        if growing:
+            raise CommandError(f"❌ Queries der Massen-Konvertierung wachsen mit der Chargengröße: {growing}")
+        self.stdout.write(self.style.SUCCESS("✅ Massen-Konvertierung mit konstanter Anzahl Queries"))
+
+    def _measure(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = (time.perf_counter() - started) * 1000
+        return len(queries.captured_queries), elapsed
+
+    def _lab_batch(self, seed):
+        flowering = FloweringPlantBatch.objects.create(seed_purchase=seed, quantity=1)
+        harvest = HarvestBatch.objects.create(flowering_batch=flowering, weight=Decimal('5000'))
+        drying = DryingBatch.objects.create(harvest_batch=harvest, initial_weight=5000, final_weight=4000)
+        processing = ProcessingBatch.objects.create(
+            drying_batch=drying, product_type='marijuana', input_weight=4000, output_weight=4000
+        )
+        return LabTestingBatch.objects.create(
+            processing_batch=processing, input_weight=4000, sample_weight=1, status='passed'
+        )
+
+    def _scenarios(self, seed, lab_batch, size):
+        mother_batch = seed_to_mother_plants(seed, 1, notes="Benchmark")
+        source_cuttings = create_cuttings(mother_batch, size * 2, notes="Benchmark")
+
+        @transaction.atomic
+        def seed_single():
+            # Bisheriges Vorgehen: Batch, dann eine Pflanze nach der anderen
+            batch = MotherPlantBatch.objects.create(seed_purchase=seed, quantity=size, notes="Benchmark")
+            for _ in range(size):
+                MotherPlant.objects.create(batch=batch, notes="Benchmark")
+            seed.remaining_quantity -= size
+            seed.save()
+
+        @transaction.atomic
+        def cuttings_single():
+            batch = CuttingBatch.objects.create(mother_batch=mother_batch, quantity=size, notes="Benchmark")
+            for _ in range(size):
+                Cutting.objects.create(batch=batch, notes="Benchmark")
+
+        @transaction.atomic
+        def blooming_single():
+            batch = BloomingCuttingBatch.objects.create(
+                cutting_batch=source_cuttings, quantity=size, notes="Benchmark"
+            )
+            for _ in range(size):
+                BloomingCuttingPlant.objects.create(batch=batch, notes="Benchmark")
+            now = timezone.now()
+            for cutting in source_cuttings.cuttings.filter(is_destroyed=False)[:size]:
+                cutting.is_destroyed = True
+                cutting.destroy_reason = f"Zu Blühpflanze konvertiert (Charge: {batch.batch_number})"
+                cutting.destroyed_at = now
+                cutting.converted_to = batch.id
+                cutting.converted_at = now
+                cutting.save()
+
+        @transaction.atomic
+        def units_single():
+            batch = PackagingBatch.objects.create(
+                lab_testing_batch=lab_batch, total_weight=size * 5, unit_count=0, unit_weight=5
+            )
+            for _ in range(size):
+                PackagingUnit.objects.create(batch=batch, weight=5)
+
+        def units_bulk():
+            # PackagingBatch.save legt die Einheiten selbst an (conversions.create_packaging_units)
+            PackagingBatch.objects.create(
+                lab_testing_batch=lab_batch, total_weight=size * 5, unit_count=size, unit_weight=5
+            )
+
+        return [
+            ("Samen → Mutterpflanzen", seed_single,
+             lambda: seed_to_mother_plants(seed, size, notes="Benchmark")),
+            ("Mutterpflanzen → Stecklinge", cuttings_single,
+             lambda: create_cuttings(mother_batch, size, notes="Benchmark")),
+            ("Stecklinge → Blühpflanzen", blooming_single,
+             lambda: cuttings_to_blooming(source_cuttings, source_cuttings.cuttings.all(), size, notes="Benchmark")),
+            ("Verpackung → Einheiten", units_single, units_bulk),
+        ]
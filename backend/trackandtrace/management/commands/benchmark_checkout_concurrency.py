@@ -0,0 +1,218 @@
+# backend/trackandtrace/management/commands/benchmark_checkout_concurrency.py
+"""
+Stresstest für die Produktausgabe: mehrere parallele "Ausgabestellen" buchen
+gleichzeitig zufällige Einheiten aus einem gemeinsamen Bestand auf eine kleine
+Gruppe von Mitgliedern. Anschließend wird geprüft, dass keine Einheit doppelt
+ausgegeben, kein Tageslimit überschritten und jeder Kontostand exakt
+fortgeschrieben wurde. Läuft gegen die konfigurierte (dateibasierte) Datenbank
+und entfernt die angelegten Testdaten am Ende wieder.
+"""
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count, Sum
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+
+from members.models import Member
+from trackandtrace.consumption_ledger import find_differences
+from trackandtrace.limits import DistributionLimitEngine
+from trackandtrace.models import (
+    DryingBatch, FloweringPlantBatch, HarvestBatch, LabTestingBatch, PackagingBatch,
+    PackagingUnit, ProcessingBatch, ProductDistribution, SeedPurchase,
+)
+
+CHECKOUT_URL = '/api/trackandtrace/distributions/'
+
+
+class Command(BaseCommand):
+    help = "Paralleler Stresstest der Produktausgabe (keine Doppelausgabe, Durchsatz)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Parallele Ausgabestellen')
+        parser.add_argument('--checkouts', type=int, default=25, help='Ausgabeversuche pro Ausgabestelle')
+        parser.add_argument('--units', type=int, default=200, help='Verpackungseinheiten im Testbestand')
+        parser.add_argument('--members', type=int, default=4, help='Anzahl Test-Mitglieder')
+        parser.add_argument('--max-units', type=int, default=3, help='Max. Einheiten pro Ausgabe')
+        parser.add_argument('--seed', type=int, default=None, help='Zufallsstartwert')
+        parser.add_argument('--keep', action='store_true', help='Testdaten nach dem Lauf nicht löschen')
+        parser.add_argument('--force', action='store_true', help='Auch mit DEBUG=False ausführen')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Stresstest legt Testdaten an - mit DEBUG=False nur mit --force ausführen")
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError("Der Stresstest benötigt eine dateibasierte Datenbank")
+
+        rng = random.Random(options['seed'])
+        tag = uuid.uuid4().hex[:8]
+        self.stdout.write(f"🧪 Lege Testbestand an ({options['units']} Einheiten, {options['members']} Mitglieder)...")
+        seed_purchase, unit_ids, members, distributor = self._create_fixture(tag, options)
+        balances_before = {member.id: member.kontostand for member in members}
+
+        try:
+            # APIClient sendet Host "testserver" - in den ALLOWED_HOSTS des Projekts nicht enthalten
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                results = self._run(unit_ids, members, distributor, rng, options)
+            ok = self._verify(unit_ids, members, balances_before, results)
+        finally:
+            if not options['keep']:
+                self._cleanup(seed_purchase, members, distributor)
+
+        if not ok:
+            raise CommandError("❌ Konsistenzprüfung fehlgeschlagen")
+
+    # --- Testdaten -------------------------------------------------------
+
+    def _create_fixture(self, tag, options):
+        seed_purchase = SeedPurchase.objects.create(
+            strain_name=f"Benchmark {tag}", quantity=10, remaining_quantity=10
+        )
+        flowering = FloweringPlantBatch.objects.create(seed_purchase=seed_purchase, quantity=1)
+        harvest = HarvestBatch.objects.create(flowering_batch=flowering, weight=Decimal('1000'))
+        drying = DryingBatch.objects.create(harvest_batch=harvest, initial_weight=1000, final_weight=800)
+        processing = ProcessingBatch.objects.create(
+            drying_batch=drying, product_type='marijuana', input_weight=800, output_weight=800
+        )
+        lab = LabTestingBatch.objects.create(
+            processing_batch=processing, input_weight=800, sample_weight=1,
+            status='passed', thc_content=Decimal('8.0')
+        )
+        packaging = PackagingBatch.objects.create(
+            lab_testing_batch=lab, total_weight=options['units'], unit_count=options['units'],
+            unit_weight=Decimal('1.00'), price_per_gram=Decimal('10.00')
+        )
+        unit_ids = [str(unit_id) for unit_id in packaging.units.values_list('id', flat=True)]
+
+        members = [
+            Member.objects.create(
+                first_name=f"Benchmark{index}", last_name=tag, email=f"benchmark-{tag}-{index}@verein.local",
+                birthdate=date(1980, 1, 1), kontostand=Decimal('1000.00')
+            )
+            for index in range(options['members'])
+        ]
+        distributor = Member.objects.create(
+            first_name="Ausgabe", last_name=tag, email=f"benchmark-{tag}-staff@verein.local",
+            birthdate=date(1980, 1, 1)
+        )
+        return seed_purchase, unit_ids, members, distributor
+
+    def _cleanup(self, seed_purchase, members, distributor):
+        member_ids = [member.id for member in members] + [distributor.id]
+        ProductDistribution.objects.filter(recipient_id__in=member_ids).delete()
+        seed_purchase.delete()  # Kaskadiert bis zu den Verpackungseinheiten
+        Member.objects.filter(id__in=member_ids).delete()
+        self.stdout.write("🧹 Testdaten entfernt")
+
+    # --- Lauf ------------------------------------------------------------
+
+    def _run(self, unit_ids, members, distributor, rng, options):
+        plans = [
+            [
+                (rng.choice(members).id, rng.sample(unit_ids, rng.randint(1, options['max_units'])))
+                for _ in range(options['checkouts'])
+            ]
+            for _ in range(options['threads'])
+        ]
+        results = Counter()
+        latencies = []
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(options['threads'])
+
+        def worker(plan):
+            client = APIClient()
+            client.force_authenticate(User(username='benchmark'))
+            try:
+                start_barrier.wait()
+                for member_id, selection in plan:
+                    started = time.perf_counter()
+                    response = client.post(CHECKOUT_URL, {
+                        'recipient_id': member_id,
+                        'distributor_id': distributor.id,
+                        'packaging_unit_ids': selection,
+                    }, format='json')
+                    elapsed = time.perf_counter() - started
+                    with lock:
+                        results[response.status_code] += 1
+                        latencies.append(elapsed)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(plan,)) for plan in plans]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duration = time.perf_counter() - started
+
+        attempts = sum(results.values())
+        latencies.sort()
+        self.stdout.write(f"⏱️  {attempts} Ausgabeversuche in {duration:.2f}s mit {options['threads']} Threads")
+        self.stdout.write(f"   Durchsatz: {attempts / duration:.1f} Versuche/s, {results[201] / duration:.1f} Ausgaben/s")
+        if latencies:
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+            self.stdout.write(f"   Latenz: p50 {p50:.1f}ms, p95 {p95:.1f}ms")
+        self.stdout.write(
+            f"   Ergebnisse: {results[201]} erfolgreich, {results[409]} Konflikte (bereits ausgegeben), "
+            f"{results[400]} abgelehnt (Limit/Validierung), "
+            f"{attempts - results[201] - results[409] - results[400]} sonstige Fehler"
+        )
+        return results
+
+    # --- Prüfung ---------------------------------------------------------
+
+    def _verify(self, unit_ids, members, balances_before, results):
+        ok = True
+        member_ids = [member.id for member in members]
+
+        # Keine Einheit darf in mehr als einer Ausgabe stecken
+        double_spent = PackagingUnit.objects.filter(id__in=unit_ids).annotate(
+            distribution_count=Count('distributions')
+        ).filter(distribution_count__gt=1).count()
+        ok &= self._check(double_spent == 0, f"Doppelt ausgegebene Einheiten: {double_spent}")
+
+        # Ohne erfolgreiche Ausgaben ist die Prüfung auf doppelte Ausgaben wertlos
+        ok &= self._check(results[201] > 0, f"Erfolgreiche Ausgaben: {results[201]}")
+        unexpected = {code: count for code, count in results.items() if code not in (201, 400, 409)}
+        ok &= self._check(not unexpected, f"Sonstige Fehler: {unexpected or 0}")
+
+        distributions = ProductDistribution.objects.filter(recipient_id__in=member_ids)
+        ok &= self._check(
+            distributions.count() == results[201],
+            f"Gespeicherte Ausgaben ({distributions.count()}) = erfolgreiche Antworten ({results[201]})"
+        )
+
+        for member in Member.objects.filter(id__in=member_ids):
+            received = distributions.filter(recipient_id=member.id)
+            weight = received.aggregate(total=Sum('packaging_units__weight'))['total'] or Decimal('0')
+            charged = received.aggregate(total=Sum('total_price'))['total'] or Decimal('0')
+            ok &= self._check(
+                float(weight) <= DistributionLimitEngine.DAILY_LIMIT,
+                f"{member.first_name}: {weight}g ≤ Tageslimit {DistributionLimitEngine.DAILY_LIMIT}g"
+            )
+            ok &= self._check(
+                member.kontostand == balances_before[member.id] - charged,
+                f"{member.first_name}: Kontostand {member.kontostand} = {balances_before[member.id]} - {charged}"
+            )
+
+        differences = find_differences(member_ids=member_ids)
+        ok &= self._check(not differences, f"Verbrauchsjournal konsistent ({len(differences)} Abweichungen)")
+        return ok
+
+    def _check(self, condition, message):
+        if condition:
+            self.stdout.write(self.style.SUCCESS(f"  ✅ {message}"))
+        else:
+            self.stdout.write(self.style.ERROR(f"  ❌ {message}"))
+        return condition
@@ -0,0 +1,134 @@
+# backend/trackandtrace/management/commands/check_list_queries.py
+"""
+Regressionsprüfung für die Chargen-Listen: legt je Lebenszyklus-Stufe
+genügend Chargen an, ruft die Listen mit kleiner und großer Seitengröße ab und
+prüft, dass die Anzahl der Queries pro Seite unter MAX_QUERIES_PER_PAGE liegt
+und nicht mit der Anzahl der Zeilen wächst (kein N+1 in den Serializern).
+Testdaten werden am Ende wieder entfernt.
+"""
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from trackandtrace import api_views
+from trackandtrace.conversions import (
+    create_cuttings, cuttings_to_blooming, seed_to_flowering_plants, seed_to_mother_plants
+)
+from trackandtrace.models import (
+    DryingBatch, HarvestBatch, LabTestingBatch, MotherPlantRating, PackagingBatch,
+    ProcessingBatch, SeedPurchase
+)
+from wawi.models import CannabisStrain, StrainPriceTier
+
+# Obergrenze je Listen-Seite (Seite, Gesamtzahl, Joins und Prefetches)
+MAX_QUERIES_PER_PAGE = 20
+
+LIST_VIEWSETS = (
+    api_views.SeedPurchaseViewSet,
+    api_views.MotherPlantBatchViewSet,
+    api_views.MotherPlantViewSet,
+    api_views.FloweringPlantBatchViewSet,
+    api_views.CuttingBatchViewSet,
+    api_views.BloomingCuttingBatchViewSet,
+    api_views.HarvestBatchViewSet,
+    api_views.DryingBatchViewSet,
+    api_views.ProcessingBatchViewSet,
+    api_views.LabTestingBatchViewSet,
+    api_views.PackagingBatchViewSet,
+)
+
+
+class Command(BaseCommand):
+    help = "Prüft die Anzahl der Queries je Seite der Track & Trace Chargen-Listen"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=25, help='Zeilen je Seite (große Seite)')
+        parser.add_argument('--max-queries', type=int, default=MAX_QUERIES_PER_PAGE,
+                            help='Erlaubte Queries je Seite')
+        parser.add_argument('--keep', action='store_true', help='Testdaten nach dem Lauf nicht löschen')
+        parser.add_argument('--force', action='store_true', help='Auch mit DEBUG=False ausführen')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Prüfung legt Testdaten an - mit DEBUG=False nur mit --force ausführen")
+        rows = options['rows']
+        if rows < 2:
+            raise CommandError("--rows muss mindestens 2 sein")
+
+        tag = uuid.uuid4().hex[:8]
+        user = get_user_model().objects.create(username=f"query-check-{tag}")
+        seeds = []
+        failures = []
+        try:
+            for index in range(rows):
+                seeds.append(self._lifecycle(f"Query-Check {tag} {index}"))
+
+            factory = APIRequestFactory()
+            # APIRequestFactory sendet Host "testserver" - in den ALLOWED_HOSTS des Projekts nicht enthalten
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for viewset in LIST_VIEWSETS:
+                    small = self._measure(factory, user, viewset, 1)
+                    large = self._measure(factory, user, viewset, rows)
+                    self.stdout.write(
+                        f"   {viewset.__name__:<30} 1 Zeile {small:>3} Queries   {rows} Zeilen {large:>3} Queries"
+                    )
+                    if large > small or large > options['max_queries']:
+                        failures.append(f"{viewset.__name__} ({small} → {large})")
+        finally:
+            if not options['keep']:
+                SeedPurchase.objects.filter(pk__in=[seed.pk for seed in seeds]).delete()
+                CannabisStrain.objects.filter(pk__in=[seed.strain_id for seed in seeds]).delete()
+                user.delete()
+                self.stdout.write("🧹 Testdaten entfernt")
+
+        if failures:
+            raise CommandError(f"❌ Queries je Seite wachsen mit den Zeilen oder überschreiten die Grenze: {failures}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Alle Listen mit konstanter Anzahl Queries (höchstens {options['max_queries']} je Seite)"
+        ))
+
+    def _measure(self, factory, user, viewset, page_size):
+        request = factory.get('/', {'page': 1, 'page_size': page_size})
+        force_authenticate(request, user=user)
+        view = viewset.as_view({'get': 'list'})
+        with CaptureQueriesContext(connection) as queries:
+            response = view(request)
+            response.render()
+        if response.status_code != 200:
+            raise CommandError(f"{viewset.__name__}: HTTP {response.status_code}")
+        return len(queries.captured_queries)
+
+    def _lifecycle(self, name):
+        """Eine vollständige Kette von Sorte und Samen bis zur Verpackung inkl. Bewertung."""
+        strain = CannabisStrain.objects.create(name=name, breeder="Query-Check")
+        for quantity, price in ((1, 8), (5, 35)):
+            StrainPriceTier.objects.create(strain=strain, quantity=quantity, total_price=price, is_default=quantity == 1)
+        seed = SeedPurchase.objects.create(strain=strain, strain_name=name, quantity=10, remaining_quantity=10)
+        mother_batch = seed_to_mother_plants(seed, 2)
+        for plant in mother_batch.plants.all():
+            MotherPlantRating.objects.create(
+                mother_plant=plant, overall_health=8, growth_structure=7, regeneration_ability=6,
+                regrowth_speed='normal', regrowth_speed_rating=7, cuttings_harvested=4, cutting_quality=8
+            )
+        cutting_batch = create_cuttings(mother_batch, 3)
+        cuttings_to_blooming(cutting_batch, cutting_batch.cuttings.all(), 1)
+        flowering_batch = seed_to_flowering_plants(seed, 2)
+
+        harvest = HarvestBatch.objects.create(flowering_batch=flowering_batch, weight=Decimal('500'))
+        drying = DryingBatch.objects.create(harvest_batch=harvest, initial_weight=500, final_weight=200)
+        processing = ProcessingBatch.objects.create(
+            drying_batch=drying, product_type='marijuana', input_weight=200, output_weight=150
+        )
+        lab_testing = LabTestingBatch.objects.create(
+            processing_batch=processing, input_weight=150, sample_weight=1, status='passed'
+        )
+        PackagingBatch.objects.create(
+            lab_testing_batch=lab_testing, total_weight=10, unit_count=2, unit_weight=5
+        )
+        return seed
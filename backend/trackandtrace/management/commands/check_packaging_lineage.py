@@ -0,0 +1,53 @@
+# backend/trackandtrace/management/commands/check_packaging_lineage.py
+from django.core.management.base import BaseCommand, CommandError
+
+from trackandtrace.lineage import find_inconsistencies, repair
+
+
+class Command(BaseCommand):
+    help = "Prüft die gestempelten Herkunftsdaten der Verpackungen gegen die tatsächliche Kette"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Abweichende Verpackungs-Batches samt Einheiten neu stempeln'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Maximal ausgegebene Abweichungen'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔍 Prüfe Herkunftsdaten der Verpackungen...")
+        issues = 0
+        affected_batches = set()
+        for issue in find_inconsistencies():
+            issues += 1
+            affected_batches.add(issue['batch_id'])
+            if issues <= options['limit']:
+                self.stdout.write(
+                    f"  ❌ {issue['model']} {issue['batch_number'] or issue['id']}: "
+                    f"{issue['field']} = {issue['stored']!r}, erwartet {issue['expected']!r}"
+                )
+
+        if not issues:
+            self.stdout.write(self.style.SUCCESS("✅ Alle Herkunftsdaten sind konsistent"))
+            return
+
+        if issues > options['limit']:
+            self.stdout.write(f"  ... und {issues - options['limit']} weitere Abweichungen")
+
+        if options['fix']:
+            repaired = repair(affected_batches)
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {issues} Abweichungen in {repaired} Verpackungs-Batches korrigiert"
+            ))
+            return
+
+        raise CommandError(
+            f"{issues} Abweichungen in {len(affected_batches)} Verpackungs-Batches gefunden "
+            f"(mit --fix korrigieren)"
+        )
@@ -0,0 +1,111 @@
+# backend/trackandtrace/management/commands/check_product_history.py
+"""
+Prüft die Track & Trace Historie (StrainCardViewSet.product_history): legt eine
+vollständige Kette von Samen bis zur Verpackung an und ruft die Historie für
+jeden Chargen-Typ auf - auch für Typen mit Unterstrich (seed_purchase_…,
+lab_testing_…). Jede Anfrage muss die Kette bis zum Sameneinkauf liefern.
+Testdaten werden am Ende wieder entfernt.
+"""
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from trackandtrace import api_views, lineage_graph
+from trackandtrace.conversions import (
+    create_cuttings, cuttings_to_blooming, seed_to_flowering_plants, seed_to_mother_plants
+)
+from trackandtrace.models import (
+    DryingBatch, HarvestBatch, LabTestingBatch, PackagingBatch, ProcessingBatch, SeedPurchase
+)
+from wawi.models import CannabisStrain
+
+
+class Command(BaseCommand):
+    help = "Prüft die Track & Trace Historie für alle Chargen-Typen"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep', action='store_true', help='Testdaten nach dem Lauf nicht löschen')
+        parser.add_argument('--force', action='store_true', help='Auch mit DEBUG=False ausführen')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Prüfung legt Testdaten an - mit DEBUG=False nur mit --force ausführen")
+
+        name = f"History-Check {uuid.uuid4().hex[:8]}"
+        user = get_user_model().objects.create(username=name.replace(' ', '-').lower())
+        batches = {}
+        failures = []
+        try:
+            batches = self._lifecycle(name)
+            factory = APIRequestFactory()
+            view = api_views.StrainCardViewSet.as_view({'get': 'product_history'})
+            # APIRequestFactory sendet Host "testserver" - in den ALLOWED_HOSTS des Projekts nicht enthalten
+            with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+                for batch_type, batch in batches.items():
+                    response = self._history(factory, view, user, f"{batch_type}_{batch.pk}")
+                    ok = response.status_code == 200 and response.data.get('strain_name') == name
+                    detail = (f"{response.data.get('total_steps')} Schritte" if response.status_code == 200
+                              else response.data.get('error'))
+                    self.stdout.write(f"   {'✅' if ok else '❌'} {batch_type:<18} HTTP {response.status_code} ({detail})")
+                    if not ok:
+                        failures.append(f"{batch_type}: HTTP {response.status_code} {detail}")
+
+                response = self._history(factory, view, user, f"packaging_unit_{uuid.uuid4()}")
+                self.stdout.write(f"   {'✅' if response.status_code == 400 else '❌'} packaging_unit     "
+                                  f"HTTP {response.status_code} (Einheiten sind keine Chargen)")
+                if response.status_code != 400:
+                    failures.append(f"packaging_unit: HTTP {response.status_code}, erwartet 400")
+        finally:
+            if not options['keep']:
+                seed = batches.get('seed_purchase')
+                if seed:
+                    SeedPurchase.objects.filter(pk=seed.pk).delete()
+                    CannabisStrain.objects.filter(pk=seed.strain_id).delete()
+                user.delete()
+                self.stdout.write("🧹 Testdaten entfernt")
+
+        if failures:
+            raise CommandError(f"❌ Historie nicht für alle Chargen-Typen abrufbar: {failures}")
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Historie für alle {len(batches)} Chargen-Typen bis zum Sameneinkauf"
+        ))
+
+    def _history(self, factory, view, user, cannabis_batch_id):
+        request = factory.get('/', {'cannabis_batch_id': cannabis_batch_id})
+        force_authenticate(request, user=user)
+        return view(request)
+
+    def _lifecycle(self, name):
+        """Eine Charge je Knotentyp des Herkunfts-Graphs (ohne Einheiten und Ausgaben)."""
+        strain = CannabisStrain.objects.create(name=name, breeder="History-Check")
+        seed = SeedPurchase.objects.create(strain=strain, strain_name=name, quantity=10, remaining_quantity=10)
+        mother_batch = seed_to_mother_plants(seed, 1)
+        cutting_batch = create_cuttings(mother_batch, 2)
+        blooming_batch = cuttings_to_blooming(cutting_batch, cutting_batch.cuttings.all(), 1)
+        flowering_batch = seed_to_flowering_plants(seed, 1)
+
+        harvest = HarvestBatch.objects.create(flowering_batch=flowering_batch, weight=Decimal('500'))
+        drying = DryingBatch.objects.create(harvest_batch=harvest, initial_weight=500, final_weight=200)
+        processing = ProcessingBatch.objects.create(
+            drying_batch=drying, product_type='marijuana', input_weight=200, output_weight=150
+        )
+        lab_testing = LabTestingBatch.objects.create(
+            processing_batch=processing, input_weight=150, sample_weight=1, status='passed'
+        )
+        packaging = PackagingBatch.objects.create(
+            lab_testing_batch=lab_testing, total_weight=10, unit_count=2, unit_weight=5
+        )
+        batches = {
+            'seed_purchase': seed, 'mother_plant': mother_batch, 'cutting': cutting_batch,
+            'blooming_cutting': blooming_batch, 'flowering_plant': flowering_batch, 'harvest': harvest,
+            'drying': drying, 'processing': processing, 'lab_testing': lab_testing, 'packaging': packaging,
+        }
+        missing = set(lineage_graph.NODE_TYPES) - set(lineage_graph.UNIT_TYPES) - set(batches)
+        if missing:
+            raise CommandError(f"Keine Testcharge für {sorted(missing)}")
+        return batches
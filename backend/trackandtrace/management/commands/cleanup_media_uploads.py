@@ -0,0 +1,20 @@
+# backend/trackandtrace/management/commands/cleanup_media_uploads.py
+from django.core.management.base import BaseCommand
+
+from trackandtrace.uploads import cleanup_stale
+
+
+class Command(BaseCommand):
+    help = "Entfernt abgebrochene oder liegengebliebene Teilstück-Uploads inkl. halb geschriebener Dateien"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Sitzungen ohne Aktivität seit so vielen Stunden entfernen'
+        )
+
+    def handle(self, *args, **options):
+        removed = cleanup_stale(hours=options['hours'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {removed} verwaiste Uploads entfernt"))
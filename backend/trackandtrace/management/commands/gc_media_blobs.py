@@ -0,0 +1,14 @@
+# backend/trackandtrace/management/commands/gc_media_blobs.py
+from django.core.management.base import BaseCommand
+
+from trackandtrace.blobs import recount
+
+
+class Command(BaseCommand):
+    help = "Zählt die Referenzen aller Medien-Blobs neu und löscht Blobs ohne Referenz (Datei & Renditions)"
+
+    def handle(self, *args, **options):
+        total, corrected, removed = recount()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {total} Blobs, {corrected} Zähler korrigiert/angelegt, {removed} verwaiste Blobs gelöscht"
+        ))
@@ -0,0 +1,21 @@
+# backend/trackandtrace/management/commands/rebuild_consumption_ledger.py
+from django.core.management.base import BaseCommand
+
+from trackandtrace.consumption_ledger import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = "Baut das Verbrauchsjournal (Menge pro Mitglied und Tag) aus allen Ausgaben neu auf"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--member',
+            action='append',
+            dest='members',
+            help='Nur dieses Mitglied neu aufbauen (mehrfach angebbar)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Baue Verbrauchsjournal neu auf...")
+        rows = rebuild_ledger(member_ids=options['members'])
+        self.stdout.write(self.style.SUCCESS(f"✅ {rows} Journalzeilen erstellt"))
@@ -0,0 +1,17 @@
+# backend/trackandtrace/management/commands/rebuild_strain_index.py
+from django.core.management.base import BaseCommand
+
+from trackandtrace.models import StrainAvailabilityIndex
+from trackandtrace.strain_index import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Baut den Sorten-Verfügbarkeitsindex für die StrainCards komplett neu auf"
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔄 Baue Sorten-Verfügbarkeitsindex neu auf...")
+        rows = rebuild_index()
+        strains = StrainAvailabilityIndex.objects.values('strain_name').distinct().count()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {rows} Indexzeilen für {strains} Sorten erstellt"
+        ))
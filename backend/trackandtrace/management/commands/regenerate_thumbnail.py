@@ -0,0 +1,71 @@
+# backend/trackandtrace/management/commands/regenerate_thumbnail.py
+import time
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+
+from trackandtrace import media
+
+
+class Command(BaseCommand):
+    help = "Erzeugt Thumbnails und Renditions (thumb, medium, webp, Video-Standbild) parallel neu"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Auch bereits verarbeitete Medien neu berechnen (z.B. nach neuen Rendition-Größen)'
+        )
+        parser.add_argument(
+            '--failed',
+            action='store_true',
+            help='Fehlgeschlagene Medien erneut versuchen'
+        )
+        parser.add_argument(
+            '--model',
+            action='append',
+            default=[],
+            help='Nur dieses Modell (z.B. trackandtrace.HarvestBatchImage oder wawi.StrainImage), mehrfach möglich'
+        )
+        parser.add_argument('--workers', type=int, default=4, help='Parallele Worker-Threads')
+        parser.add_argument('--status', action='store_true', help='Nur den Verarbeitungsstatus ausgeben')
+
+    def handle(self, *args, **options):
+        if options['status']:
+            for label, counts in media.media_status().items():
+                summary = ', '.join(f"{name}: {count}" for name, count in sorted(counts.items())) or 'keine Medien'
+                self.stdout.write(f"  {label}: {summary}")
+            return
+
+        models_ = None
+        if options['model']:
+            try:
+                models_ = [apps.get_model(label) for label in options['model']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(f"Unbekanntes Modell: {e}")
+            unsupported = [m._meta.label for m in models_ if not issubclass(m, media.MediaProcessingFields)]
+            if unsupported:
+                raise CommandError(f"Keine Medien-Modelle: {', '.join(unsupported)}")
+
+        jobs = media.pending_jobs(
+            include_failed=options['failed'] or options['all'],
+            include_ready=options['all'],
+            models_=models_
+        )
+        if not jobs:
+            self.stdout.write("✅ Keine Medien zu verarbeiten")
+            return
+
+        self.stdout.write(f"🖼️ Verarbeite {len(jobs)} Medien mit {options['workers']} Workern...")
+        started = time.perf_counter()
+        results = media.run_jobs(jobs, workers=max(1, options['workers']), reset=options['all'])
+        elapsed = time.perf_counter() - started
+
+        message = (
+            f"{results[media.READY]} fertig, {results[media.FAILED]} fehlgeschlagen, "
+            f"{results['skipped']} übersprungen ({elapsed:.1f}s)"
+        )
+        if results[media.FAILED]:
+            self.stdout.write(self.style.WARNING(f"⚠️ {message}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✅ {message}"))
@@ -0,0 +1,45 @@
+# backend/trackandtrace/management/commands/verify_consumption_ledger.py
+from django.core.management.base import BaseCommand, CommandError
+
+from trackandtrace.consumption_ledger import find_differences, refresh_days
+
+
+class Command(BaseCommand):
+    help = "Vergleicht das Verbrauchsjournal mit der Summe über alle Ausgaben"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--member',
+            action='append',
+            dest='members',
+            help='Nur dieses Mitglied prüfen (mehrfach angebbar)'
+        )
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Abweichende Tage aus den Ausgaben neu berechnen'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("🔍 Prüfe Verbrauchsjournal...")
+        differences = find_differences(member_ids=options['members'])
+
+        if not differences:
+            self.stdout.write(self.style.SUCCESS("✅ Verbrauchsjournal stimmt mit den Ausgaben überein"))
+            return
+
+        for diff in differences:
+            stored = diff['stored'] or (0, 0)
+            expected = diff['expected'] or (0, 0)
+            self.stdout.write(
+                f"  ❌ Mitglied {diff['member_id']} am {diff['day']}: "
+                f"Journal {stored[0]}g / {stored[1]} Ausgaben, "
+                f"Ausgaben {expected[0]}g / {expected[1]} Ausgaben"
+            )
+
+        if options['fix']:
+            refresh_days((diff['member_id'], diff['day']) for diff in differences)
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(differences)} Tage korrigiert"))
+            return
+
+        raise CommandError(f"{len(differences)} abweichende Tage gefunden (mit --fix korrigieren)")
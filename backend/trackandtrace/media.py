@@ -0,0 +1,504 @@
+# backend/trackandtrace/media.py
+"""
+Hintergrund-Verarbeitung für hochgeladene Bilder und Videos (Track & Trace
+Medien und wawi-Sortenbilder).
+
+Der Upload speichert nur noch die Originaldatei und setzt processing_status auf
+"pending". Nach dem Commit übernimmt ein Thread-Pool im selben Prozess die
+Ableitungen:
+
+- Bilder: mehrere Renditions (thumb, medium, webp), JPEGs im Draft-Modus
+  dekodiert (der Decoder skaliert beim Lesen bereits um 1/2 bis 1/8)
+- Videos: Standbild (poster) per ffmpeg, daraus dieselben Renditions
+
+Bis alles fertig ist, liefert get_display_url() einen Platzhalter. Beim Start
+und über den Management-Command regenerate_thumbnail werden liegengebliebene
+oder fehlgeschlagene Medien nachgezogen.
+
+Renditions werden je Inhalt (SHA-256, siehe trackandtrace.blobs) einmal
+erzeugt und auf alle Medien mit demselben Inhalt übertragen.
+
+Das Modul importiert keine Modelle der Apps, damit wawi.models die
+Basisklasse MediaProcessingFields ohne zirkuläre Importe verwenden kann.
+"""
+import hashlib
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import PurePosixPath
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, models, transaction
+from django.templatetags.static import static
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import blobs
+
+PENDING = 'pending'
+PROCESSING = 'processing'
+READY = 'ready'
+FAILED = 'failed'
+
+PROCESSING_STATUS_CHOICES = [
+    (PENDING, 'Ausstehend'),
+    (PROCESSING, 'In Bearbeitung'),
+    (READY, 'Fertig'),
+    (FAILED, 'Fehlgeschlagen'),
+]
+
+# Renditions je Medium (größte zuerst - kleinere werden aus der größeren abgeleitet)
+RENDITIONS = (
+    ('medium', (1024, 1024), 'JPEG', {'quality': 85, 'optimize': True}),
+    ('webp', (1024, 1024), 'WEBP', {'quality': 80, 'method': 4}),
+    ('thumb', (150, 150), 'JPEG', {'quality': 85}),
+)
+RENDITION_EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+# Zeitpunkt des Standbilds im Video (Sekunden) und Abbruch nach ... Sekunden
+POSTER_OFFSET_SECONDS = 1
+POSTER_TIMEOUT_SECONDS = 60
+
+MEDIA_WORKERS = getattr(settings, 'MEDIA_PROCESSING_WORKERS', 2)
+# False: direkt nach dem Commit im selben Thread verarbeiten (z.B. für Skripte)
+MEDIA_ASYNC = getattr(settings, 'MEDIA_PROCESSING_ASYNC', True)
+PLACEHOLDER_PATH = getattr(settings, 'MEDIA_PLACEHOLDER', 'trackandtrace/media-processing.svg')
+
+
+class MediaProcessingError(Exception):
+    """Ableitung nicht möglich (z.B. defekte Datei) - wird am Medium gespeichert."""
+
+
+class MediaProcessingFields(models.Model):
+    """
+    Abstrakte Basis für Medien mit Hintergrund-Verarbeitung.
+
+    Unterklassen setzen MEDIA_FIELDS (Dateifelder in Prüfreihenfolge, Speicher
+    blobs.media_storage). Renditions gehören zum Blob des Inhalts (content_hash)
+    und werden auf alle Medien mit demselben Inhalt übertragen.
+    """
+    MEDIA_FIELDS = ('image',)
+    PROCESSING_FIELDS = ('processing_status', 'processing_error', 'processed_at', 'renditions', 'content_hash')
+
+    processing_status = models.CharField(
+        max_length=20,
+        choices=PROCESSING_STATUS_CHOICES,
+        default=PENDING,
+        db_index=True,
+        editable=False,
+        help_text="Status der Vorschaubild-/Rendition-Erzeugung"
+    )
+    processing_error = models.TextField(blank=True, editable=False)
+    renditions = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Speicherpfade der abgeleiteten Dateien je Rendition"
+    )
+    processed_at = models.DateTimeField(null=True, blank=True, editable=False)
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        editable=False,
+        help_text="SHA-256 der Originaldatei (Deduplizierung)"
+    )
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_media_name = instance.media_name()
+        instance._loaded_content_hash = instance.__dict__.get('content_hash')
+        return instance
+
+    def media_file(self):
+        """Erstes belegtes Dateifeld aus MEDIA_FIELDS (oder None)."""
+        for field_name in self.MEDIA_FIELDS:
+            # Zurückgestellte Felder (only/defer) nicht nachladen
+            if field_name in self.__dict__ and getattr(self, field_name):
+                return getattr(self, field_name)
+        return None
+
+    def media_name(self):
+        field_file = self.media_file()
+        return field_file.name if field_file else None
+
+    def is_video(self):
+        field_file = self.media_file()
+        return bool(field_file) and field_file.field.name == 'video'
+
+    def reset_renditions(self):
+        """Hook für Unterklassen mit eigenen Vorschaufeldern (z.B. thumbnail)."""
+        self.renditions = {}
+
+    @classmethod
+    def rendition_fields(cls, renditions):
+        """Zusätzliche Felder aus den Renditions (z.B. thumbnail) für update()."""
+        return {}
+
+    def save(self, *args, **kwargs):
+        # Neues oder ausgetauschtes Medium: Ableitungen neu einplanen
+        media_changed = self.media_name() and (
+            self._state.adding or self.media_name() != getattr(self, '_loaded_media_name', None)
+        )
+        if media_changed:
+            self.processing_status = PENDING
+            self.processing_error = ''
+            self.processed_at = None
+            if not self._state.adding and self.content_hash == getattr(self, '_loaded_content_hash', None):
+                # Neue Datei ohne bekannten Hash - berechnet der Worker
+                self.content_hash = ''
+            self.reset_renditions()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], *self.PROCESSING_FIELDS}
+        super().save(*args, **kwargs)
+        self._loaded_media_name = self.media_name()
+        if media_changed:
+            # Blob-Speicher: der Hash steckt im Dateinamen
+            digest = blobs.digest_from_name(self.media_name())
+            if digest and digest != self.content_hash:
+                self.content_hash = digest
+                type(self).objects.filter(pk=self.pk).update(content_hash=digest)
+        self._update_blob_reference()
+        if media_changed:
+            schedule(self)
+
+    def _update_blob_reference(self):
+        loaded_hash = getattr(self, '_loaded_content_hash', None)
+        if self.content_hash == loaded_hash:
+            return
+        if self.content_hash:
+            blobs.acquire(self.content_hash, self.media_name(), self.is_video())
+        if loaded_hash:
+            blobs.release(loaded_hash)
+        self._loaded_content_hash = self.content_hash
+
+    def rendition_url(self, name):
+        path = (self.renditions or {}).get(name)
+        return default_storage_url(path) if path else None
+
+    def rendition_urls(self):
+        return {name: default_storage_url(path) for name, path in (self.renditions or {}).items()}
+
+    @property
+    def media_processing(self):
+        """Ableitungen stehen noch aus (bei "failed" wird das Original angezeigt)."""
+        return self.processing_status in (PENDING, PROCESSING)
+
+    def placeholder_url(self):
+        return static(PLACEHOLDER_PATH)
+
+    def get_display_url(self):
+        """Vorschaubild, solange die Verarbeitung läuft ein Platzhalter."""
+        if self.media_processing:
+            return self.placeholder_url()
+        thumb_url = self.rendition_url('thumb')
+        if thumb_url:
+            return thumb_url
+        field_file = self.media_file()
+        return field_file.url if field_file else None
+
+    def release_media(self):
+        """Nach dem Löschen: Blob-Referenz freigeben (bzw. eigene Alt-Renditions löschen)."""
+        if self.content_hash:
+            blobs.release(self.content_hash)
+        else:
+            transaction.on_commit(lambda: delete_files(self.renditions))
+
+
+def default_storage_url(path):
+    from django.core.files.storage import default_storage
+    return default_storage.url(path)
+
+
+def file_sha256(field_file, block_size=1024 * 1024):
+    """SHA-256 einer gespeicherten Datei (blockweise gelesen)."""
+    digest = hashlib.sha256()
+    with field_file.open('rb') as handle:
+        for block in iter(lambda: handle.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_in_use(name, exclude=None):
+    """Verweist (nach Deduplizierung) noch ein anderes Medium auf diese Datei?"""
+    for model in media_models():
+        for field_name in model.MEDIA_FIELDS:
+            queryset = model.objects.filter(**{field_name: name})
+            if exclude is not None and isinstance(exclude, model):
+                queryset = queryset.exclude(pk=exclude.pk)
+            if queryset.exists():
+                return True
+    return False
+
+
+def delete_files(renditions, keep=None):
+    """Löscht die Dateien der Renditions (außer den in keep weiterverwendeten)."""
+    from django.core.files.storage import default_storage
+    kept = set((keep or {}).values())
+    for path in (renditions or {}).values():
+        if path and path not in kept:
+            default_storage.delete(path)
+
+
+# --- Ableitungen -------------------------------------------------------------
+
+def _flatten(img):
+    """RGBA/LA/P auf weißen Hintergrund legen (JPEG kennt keine Transparenz)."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1] if img.mode in ('RGBA', 'LA') else None)
+        return background
+    if img.mode != 'RGB':
+        return img.convert('RGB')
+    return img
+
+
+def load_image(source):
+    """
+    Öffnet ein Bild für die Renditions. JPEGs werden im Draft-Modus dekodiert:
+    der Decoder liefert direkt eine auf etwa die größte Rendition verkleinerte
+    Fassung, statt das volle Kamerabild zu entpacken.
+    """
+    img = Image.open(source)
+    largest = max(size for _, size, _, _ in RENDITIONS)
+    if img.format == 'JPEG':
+        img.draft('RGB', largest)
+    img = ImageOps.exif_transpose(img)
+    return _flatten(img)
+
+
+def render(img):
+    """Erzeugt alle Renditions als {name: (bytes, erweiterung)}."""
+    results = {}
+    current = img
+    for name, size, image_format, options in RENDITIONS:
+        if current.width > size[0] or current.height > size[1]:
+            current = current.copy()
+            current.thumbnail(size, Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        current.save(buffer, format=image_format, **options)
+        results[name] = (buffer.getvalue(), RENDITION_EXTENSIONS[image_format])
+    return results
+
+
+def _local_copy(field_file):
+    """Lokaler Pfad für ffmpeg (Speicher ohne path() wird in eine Temp-Datei kopiert)."""
+    try:
+        return field_file.path, None
+    except NotImplementedError:
+        handle = tempfile.NamedTemporaryFile(suffix=PurePosixPath(field_file.name).suffix, delete=False)
+        with handle, field_file.open('rb') as source:
+            shutil.copyfileobj(source, handle, length=1024 * 1024)
+        return handle.name, handle.name
+
+
+def extract_poster(field_file):
+    """Standbild eines Videos als PNG-Bytes (None, wenn ffmpeg nicht installiert ist)."""
+    ffmpeg = shutil.which(getattr(settings, 'FFMPEG_BINARY', 'ffmpeg'))
+    if not ffmpeg:
+        return None
+    path, temporary = _local_copy(field_file)
+    try:
+        for offset in (POSTER_OFFSET_SECONDS, 0):
+            result = subprocess.run(
+                [ffmpeg, '-v', 'error', '-ss', str(offset), '-i', path,
+                 '-frames:v', '1', '-f', 'image2', '-c:v', 'png', 'pipe:1'],
+                capture_output=True, timeout=POSTER_TIMEOUT_SECONDS
+            )
+            if result.returncode == 0 and result.stdout:
+                return result.stdout
+        raise MediaProcessingError(
+            f"ffmpeg konnte kein Standbild erzeugen: {result.stderr.decode(errors='replace')[-300:]}"
+        )
+    finally:
+        if temporary:
+            os.unlink(temporary)
+
+
+def render_file(field_file, is_video, digest):
+    """
+    Erzeugt alle Ableitungen einer Datei und speichert sie unter dem Hash des
+    Inhalts. Gibt das Dict der Renditions zurück (leer bei Videos ohne ffmpeg).
+    """
+    from django.core.files.storage import default_storage
+
+    if not field_file:
+        raise MediaProcessingError("Kein Bild oder Video vorhanden")
+
+    if is_video:
+        poster = extract_poster(field_file)
+        if poster is None:
+            return {}
+        sources = {'poster': (poster, 'png')}
+        img = load_image(io.BytesIO(poster))
+    else:
+        sources = {}
+        with field_file.open('rb') as handle:
+            try:
+                img = load_image(handle)
+                img.load()
+            except (OSError, Image.DecompressionBombError) as e:
+                raise MediaProcessingError(f"Bild kann nicht gelesen werden: {e}")
+
+    sources.update(render(img))
+    stored = {}
+    for name, (content, extension) in sources.items():
+        stored[name] = default_storage.save(blobs.rendition_name(digest, name, extension), ContentFile(content))
+    return stored
+
+
+def _finish(model, pk, **fields):
+    model.objects.filter(pk=pk).update(**fields)
+
+
+def process(model, pk):
+    """
+    Verarbeitet ein Medium, sofern es noch aussteht (exklusiv über den Status).
+    Gibt den neuen Status zurück oder None, wenn ein anderer Worker es übernommen hat.
+    """
+    claimed = model.objects.filter(pk=pk, processing_status__in=(PENDING, FAILED)).update(
+        processing_status=PROCESSING
+    )
+    if not claimed:
+        return None
+    instance = model.objects.get(pk=pk)
+    try:
+        # Renditions einmal je Inhalt (Blob), übertragen auf alle Medien mit diesem Inhalt
+        return blobs.process_row(model, instance)
+    except Exception as e:
+        _finish(model, pk, processing_status=FAILED, processing_error=f"{type(e).__name__}: {e}",
+                processed_at=timezone.now())
+        print(f"❌ Medium {model._meta.label} {pk} konnte nicht verarbeitet werden: {e}")
+        return FAILED
+
+
+def _run(label, pk):
+    close_old_connections()
+    try:
+        return process(apps.get_model(label), pk)
+    finally:
+        close_old_connections()
+
+
+# --- Warteschlange -----------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _pool():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MEDIA_WORKERS, thread_name_prefix='media')
+        return _executor
+
+
+def submit(label, pk):
+    if MEDIA_ASYNC:
+        return _pool().submit(_run, label, pk)
+    return _run(label, pk)
+
+
+def schedule(instance):
+    """Plant die Verarbeitung nach dem Commit der laufenden Transaktion ein."""
+    label, pk = instance._meta.label, instance.pk
+    transaction.on_commit(lambda: submit(label, pk))
+
+
+def reset(instance):
+    """Setzt Medium und Blob zurück auf "pending" (läuft die Verarbeitung gerade, bleibt es dabei)."""
+    type(instance).objects.filter(pk=instance.pk).exclude(processing_status=PROCESSING).update(
+        processing_status=PENDING, processing_error=''
+    )
+    blobs.reset([instance.content_hash])
+
+
+def requeue(instance):
+    """Renditions neu erzeugen (im Hintergrund)."""
+    reset(instance)
+    schedule(instance)
+
+
+def media_models():
+    """Alle konkreten Modelle mit Hintergrund-Verarbeitung."""
+    return [model for model in apps.get_models() if issubclass(model, MediaProcessingFields)]
+
+
+def pending_jobs(include_failed=False, include_ready=False, models_=None):
+    """(label, pk) aller Medien, die (erneut) verarbeitet werden sollen."""
+    statuses = [PENDING]
+    if include_failed:
+        statuses.append(FAILED)
+    jobs = []
+    for model in models_ or media_models():
+        queryset = model.objects.all() if include_ready else model.objects.filter(processing_status__in=statuses)
+        jobs += [(model._meta.label, pk) for pk in queryset.values_list('pk', flat=True)]
+    return jobs
+
+
+def media_status():
+    """Anzahl Medien je Modell und Status."""
+    status = {}
+    for model in media_models():
+        rows = model.objects.values_list('processing_status').annotate(total=models.Count('pk')).order_by()
+        status[model._meta.label] = dict(rows)
+    return status
+
+
+def run_jobs(jobs, workers=MEDIA_WORKERS, reset=False):
+    """
+    Verarbeitet die Jobs parallel und wartet auf das Ergebnis (Management-Command).
+    reset=True setzt fertige Medien vorher zurück auf "pending" (Neuberechnung).
+    Gibt die Anzahl je Ergebnis zurück (ready/failed/skipped).
+    """
+    if reset:
+        by_model = {}
+        for label, pk in jobs:
+            by_model.setdefault(label, []).append(pk)
+        for label, pks in by_model.items():
+            rows = apps.get_model(label).objects.filter(pk__in=pks).exclude(processing_status=PROCESSING)
+            blobs.reset(set(rows.values_list('content_hash', flat=True)))
+            rows.update(processing_status=PENDING)
+    results = {READY: 0, FAILED: 0, 'skipped': 0}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='media-bulk') as pool:
+        for outcome in pool.map(lambda job: _run(*job), jobs):
+            results[outcome or 'skipped'] += 1
+    return results
+
+
+def resume_pending():
+    """Liegengebliebene Medien (Absturz während der Verarbeitung) nachziehen."""
+    for model in media_models():
+        model.objects.filter(processing_status=PROCESSING).update(processing_status=PENDING)
+    jobs = pending_jobs()
+    for label, pk in jobs:
+        submit(label, pk)
+    return len(jobs)
+
+
+def _resume_in_background():
+    close_old_connections()
+    try:
+        resumed = resume_pending()
+        if resumed:
+            print(f"🖼️ {resumed} Medien zur Verarbeitung eingeplant")
+    finally:
+        close_old_connections()
+
+
+def start_worker():
+    """Beim Start des Webservers: Pool anlegen und offene Medien einplanen (ohne DB-Zugriff in ready())."""
+    _pool().submit(_resume_in_background)
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackandtrace', '0042_motherplant_is_premium_mother_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StrainAvailabilityIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('strain_name', models.CharField(max_length=200)),
+                ('product_type', models.CharField(blank=True, choices=[('marijuana', 'Marihuana'), ('hashish', 'Haschisch')], max_length=20)),
+                ('cannabis_batch_id', models.CharField(blank=True, max_length=100)),
+                ('thc_content', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('weight', models.DecimalField(decimal_places=2, max_digits=6)),
+                ('unit_count', models.PositiveIntegerField(default=0)),
+                ('units', models.JSONField(default=list)),
+                ('newest_unit_at', models.DateTimeField(blank=True, null=True)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('packaging_batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='strain_availability', to='trackandtrace.packagingbatch')),
+            ],
+            options={
+                'verbose_name': 'Sorten-Verfügbarkeitsindex',
+                'verbose_name_plural': 'Sorten-Verfügbarkeitsindex',
+                'indexes': [models.Index(fields=['strain_name', 'product_type'], name='strain_index_name_type_idx'), models.Index(fields=['weight'], name='strain_index_weight_idx'), models.Index(fields=['thc_content'], name='strain_index_thc_idx')],
+                'constraints': [models.UniqueConstraint(fields=('packaging_batch', 'weight'), name='strain_index_batch_weight_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,148 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def stamp_existing_packagings(apps, schema_editor):
+    """Stempelt die Herkunftsdaten für bereits vorhandene Verpackungen und Einheiten."""
+    PackagingBatch = apps.get_model('trackandtrace', 'PackagingBatch')
+    PackagingUnit = apps.get_model('trackandtrace', 'PackagingUnit')
+
+    processing = 'lab_testing_batch__processing_batch__'
+    harvest = processing + 'drying_batch__harvest_batch__'
+    flowering_seed = harvest + 'flowering_batch__seed_purchase__'
+    mother_seed = harvest + 'blooming_cutting_batch__cutting_batch__mother_batch__seed_purchase__'
+
+    rows = PackagingBatch.objects.values(
+        'id',
+        'lab_testing_batch__thc_content',
+        processing + 'id',
+        processing + 'product_type',
+        processing + 'drying_batch__harvest_batch_id',
+        harvest + 'flowering_batch_id',
+        flowering_seed + 'strain_id',
+        flowering_seed + 'strain__name',
+        flowering_seed + 'strain_name',
+        mother_seed + 'strain_id',
+        mother_seed + 'strain_name',
+    )
+    for row in rows.iterator():
+        harvest_batch_id = row[processing + 'drying_batch__harvest_batch_id']
+        processing_batch_id = row[processing + 'id']
+        if row[harvest + 'flowering_batch_id']:
+            strain_id = row[flowering_seed + 'strain_id']
+            strain_name = row[flowering_seed + 'strain__name'] or row[flowering_seed + 'strain_name']
+        else:
+            strain_id = row[mother_seed + 'strain_id']
+            strain_name = row[mother_seed + 'strain_name']
+        if not strain_name or strain_name == 'Unbekannt':
+            strain_name = 'Unbekannte Sorte'
+
+        if harvest_batch_id:
+            cannabis_batch_id = f"harvest_{harvest_batch_id}"
+        elif processing_batch_id:
+            cannabis_batch_id = f"processing_{processing_batch_id}"
+        else:
+            cannabis_batch_id = f"packaging_{row['id']}"
+
+        lineage = {
+            'lineage_strain_id': strain_id,
+            'lineage_strain_name': strain_name,
+            'lineage_harvest_batch_id': harvest_batch_id,
+            'lineage_cannabis_batch_id': cannabis_batch_id,
+            'lineage_thc_content': row['lab_testing_batch__thc_content'],
+            'lineage_product_type': row[processing + 'product_type'] or '',
+        }
+        PackagingBatch.objects.filter(id=row['id']).update(**lineage)
+        PackagingUnit.objects.filter(batch_id=row['id']).update(**lineage)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0012_remove_member_unifi_user_id'),
+        ('rooms', '0006_room_protect_sensors'),
+        ('trackandtrace', '0043_strainavailabilityindex'),
+        ('wawi', '0006_delete_strainpurchasehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='packagingbatch',
+            name='lineage_cannabis_batch_id',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='packagingbatch',
+            name='lineage_harvest_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='trackandtrace.harvestbatch'),
+        ),
+        migrations.AddField(
+            model_name='packagingbatch',
+            name='lineage_product_type',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='packagingbatch',
+            name='lineage_strain',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wawi.cannabisstrain'),
+        ),
+        migrations.AddField(
+            model_name='packagingbatch',
+            name='lineage_strain_name',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='packagingbatch',
+            name='lineage_thc_content',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='packagingunit',
+            name='lineage_cannabis_batch_id',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='packagingunit',
+            name='lineage_harvest_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='trackandtrace.harvestbatch'),
+        ),
+        migrations.AddField(
+            model_name='packagingunit',
+            name='lineage_product_type',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='packagingunit',
+            name='lineage_strain',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='wawi.cannabisstrain'),
+        ),
+        migrations.AddField(
+            model_name='packagingunit',
+            name='lineage_strain_name',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='packagingunit',
+            name='lineage_thc_content',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='packagingbatch',
+            index=models.Index(fields=['lineage_strain_name'], name='packaging_batch_strain_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagingunit',
+            index=models.Index(fields=['lineage_strain_name', 'weight'], name='packaging_unit_strain_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagingunit',
+            index=models.Index(fields=['lineage_thc_content'], name='packaging_unit_thc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagingunit',
+            index=models.Index(fields=['lineage_product_type'], name='packaging_unit_type_idx'),
+        ),
+        migrations.RunPython(stamp_existing_packagings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.9 on 2026-10-18 10:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_ledger(apps, schema_editor):
+    """Befüllt das Verbrauchsjournal aus den bisherigen Ausgaben."""
+    from django.db.models import Count, Sum
+    from django.db.models.functions import TruncDate
+
+    ProductDistribution = apps.get_model('trackandtrace', 'ProductDistribution')
+    MemberConsumptionDay = apps.get_model('trackandtrace', 'MemberConsumptionDay')
+
+    rows = ProductDistribution.objects.filter(
+        recipient__isnull=False
+    ).annotate(
+        day=TruncDate('distribution_date')
+    ).values('recipient_id', 'day').annotate(
+        weight=Sum('packaging_units__weight'),
+        count=Count('id', distinct=True)
+    ).order_by()
+    MemberConsumptionDay.objects.bulk_create([
+        MemberConsumptionDay(
+            member_id=row['recipient_id'],
+            day=row['day'],
+            total_weight=row['weight'] or 0,
+            distribution_count=row['count']
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0012_remove_member_unifi_user_id'),
+        ('trackandtrace', '0044_packaging_lineage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberConsumptionDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('total_weight', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('distribution_count', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='consumption_days', to='members.member')),
+            ],
+            options={
+                'verbose_name': 'Verbrauchsjournal',
+                'verbose_name_plural': 'Verbrauchsjournal',
+                'ordering': ['-day'],
+                'constraints': [models.UniqueConstraint(fields=('member', 'day'), name='consumption_day_member_uniq')],
+            },
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
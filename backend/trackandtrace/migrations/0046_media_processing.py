@@ -0,0 +1,226 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+IMAGE_MODELS = (
+    'SeedPurchaseImage', 'MotherPlantBatchImage', 'CuttingBatchImage', 'BloomingCuttingBatchImage',
+    'FloweringPlantBatchImage', 'HarvestBatchImage', 'DryingBatchImage', 'ProcessingBatchImage',
+    'LabTestingBatchImage', 'PackagingBatchImage',
+)
+
+
+def mark_existing_ready(apps, schema_editor):
+    """Bestehende Medien haben ihr Thumbnail bereits (bisher synchron beim Upload erzeugt)."""
+    for model_name in IMAGE_MODELS:
+        apps.get_model('trackandtrace', model_name).objects.update(processing_status='ready')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackandtrace', '0045_memberconsumptionday'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bloomingcuttingbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='bloomingcuttingbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='bloomingcuttingbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='bloomingcuttingbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='cuttingbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='cuttingbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cuttingbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='cuttingbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='dryingbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='dryingbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='dryingbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='dryingbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='floweringplantbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='floweringplantbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='floweringplantbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='floweringplantbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='harvestbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='harvestbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='harvestbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='harvestbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='labtestingbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='labtestingbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='labtestingbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='labtestingbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='motherplantbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='motherplantbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='motherplantbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='motherplantbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='packagingbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='packagingbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='packagingbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='packagingbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='processingbatchimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='processingbatchimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='processingbatchimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='processingbatchimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.AddField(
+            model_name='seedpurchaseimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='seedpurchaseimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='seedpurchaseimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='seedpurchaseimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+        migrations.RunPython(mark_existing_ready, migrations.RunPython.noop),
+    ]
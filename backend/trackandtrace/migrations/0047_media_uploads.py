@@ -0,0 +1,87 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:30
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackandtrace', '0046_media_processing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('target', models.CharField(help_text='Ziel-Modell (app_label.Model)', max_length=100)),
+                ('media_field', models.CharField(default='image', max_length=20)),
+                ('filename', models.CharField(help_text='Ursprünglicher Dateiname', max_length=255)),
+                ('file_name', models.CharField(help_text='Speicherpfad der entstehenden Datei', max_length=255)),
+                ('total_size', models.BigIntegerField()),
+                ('received_size', models.BigIntegerField(default=0)),
+                ('checksum', models.CharField(blank=True, help_text='Vom Client erwarteter SHA-256', max_length=64)),
+                ('content_hash', models.CharField(blank=True, max_length=64)),
+                ('status', models.CharField(choices=[('open', 'Offen'), ('receiving', 'Empfängt Teilstück'), ('committed', 'Abgeschlossen'), ('aborted', 'Abgebrochen'), ('failed', 'Prüfsumme fehlerhaft')], db_index=True, default='open', max_length=20)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Medien-Upload',
+                'verbose_name_plural': 'Medien-Uploads',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='bloomingcuttingbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='cuttingbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='dryingbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='floweringplantbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='harvestbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='labtestingbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='motherplantbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='packagingbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='processingbatchimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='seedpurchaseimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+    ]
@@ -0,0 +1,163 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:35
+
+import django.core.validators
+import trackandtrace.blobs
+from django.db import migrations, models
+
+MEDIA_MODELS = (
+    ('trackandtrace', 'SeedPurchaseImage'), ('trackandtrace', 'MotherPlantBatchImage'),
+    ('trackandtrace', 'CuttingBatchImage'), ('trackandtrace', 'BloomingCuttingBatchImage'),
+    ('trackandtrace', 'FloweringPlantBatchImage'), ('trackandtrace', 'HarvestBatchImage'),
+    ('trackandtrace', 'DryingBatchImage'), ('trackandtrace', 'ProcessingBatchImage'),
+    ('trackandtrace', 'LabTestingBatchImage'), ('trackandtrace', 'PackagingBatchImage'),
+    ('wawi', 'StrainImage'),
+)
+
+
+def create_blobs(apps, schema_editor):
+    """Blobs für Medien, deren Hash bereits bekannt ist (Referenzen gezählt)."""
+    MediaBlob = apps.get_model('trackandtrace', 'MediaBlob')
+    blobs = {}
+    for app_label, model_name in MEDIA_MODELS:
+        model = apps.get_model(app_label, model_name)
+        has_video = any(field.name == 'video' for field in model._meta.fields)
+        rows = model.objects.exclude(content_hash='').values_list(
+            'content_hash', 'image', 'video' if has_video else 'image'
+        )
+        for content_hash, image, video in rows:
+            blob = blobs.setdefault(content_hash, MediaBlob(
+                sha256=content_hash, file_name=image or video, is_video=not image, ref_count=0
+            ))
+            blob.ref_count += 1
+    MediaBlob.objects.bulk_create(blobs.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trackandtrace', '0047_media_uploads'),
+        ('wawi', '0008_media_uploads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MediaBlob',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('file_name', models.CharField(help_text='Speicherpfad der Originaldatei', max_length=255)),
+                ('size', models.BigIntegerField(default=0)),
+                ('is_video', models.BooleanField(default=False)),
+                ('ref_count', models.PositiveIntegerField(default=0, help_text='Anzahl der Medien mit diesem Inhalt')),
+                ('renditions', models.JSONField(blank=True, default=dict)),
+                ('processing_status', models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', max_length=20)),
+                ('processing_error', models.TextField(blank=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Medien-Blob',
+                'verbose_name_plural': 'Medien-Blobs',
+            },
+        ),
+        migrations.AlterField(
+            model_name='bloomingcuttingbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='bloomingcuttingbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='cuttingbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='cuttingbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='dryingbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='dryingbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='floweringplantbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='floweringplantbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='harvestbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='harvestbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='labtestingbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='labtestingbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='motherplantbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='motherplantbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='packagingbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='packagingbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='processingbatchimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='processingbatchimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.AlterField(
+            model_name='seedpurchaseimage',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Bild-Datei (JPEG, PNG, etc.)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/images/%Y/%m/%d/'),
+        ),
+        migrations.AlterField(
+            model_name='seedpurchaseimage',
+            name='video',
+            field=models.FileField(blank=True, help_text='Video-Datei (max. 100MB)', null=True, storage=trackandtrace.blobs.media_storage, upload_to='trackandtrace/videos/%Y/%m/%d/', validators=[django.core.validators.FileExtensionValidator(allowed_extensions=['mp4', 'mov', 'avi', 'webm', 'mkv'])]),
+        ),
+        migrations.RunPython(create_blobs, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0013_member_sync_outbox'),
+        ('rooms', '0006_room_protect_sensors'),
+        ('trackandtrace', '0048_media_blobs'),
+        ('wawi', '0009_media_blobs'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='packagingbatch',
+            name='packaging_batch_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='bloomingcuttingbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='blooming_batch_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cuttingbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='cutting_batch_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dryingbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='drying_batch_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='floweringplantbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='flowering_batch_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='harvestbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='harvest_batch_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='labtestingbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='lab_testing_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='motherplantbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='mother_batch_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='packagingbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='packaging_batch_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processingbatch',
+            index=models.Index(fields=['-created_at', '-id'], name='processing_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seedpurchase',
+            index=models.Index(fields=['-created_at', '-id'], name='seed_purchase_created_id_idx'),
+        ),
+    ]
@@ -1,12 +1,12 @@
-import uuid, io
+import uuid
 from django.db import models
 from django.utils import timezone
 from members.models import Member
 from rooms.models import Room
 from wawi.models import CannabisStrain
+from options.sequences import next_batch_number, reserve_batch_numbers
 from django.core.files.storage import default_storage
 from django.core.validators import FileExtensionValidator, ValidationError, MinValueValidator, MaxValueValidator
-from PIL import Image
 
 class SeedPurchase(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -40,19 +40,19 @@ class SeedPurchase(models.Model):
     flowering_time_min = models.IntegerField(null=True, blank=True)
     flowering_time_max = models.IntegerField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='seed_purchase_created_id_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Samen, die heute erstellt wurden
-            count = SeedPurchase.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"charge:seed:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(SeedPurchase, "charge:seed")
 
         if self.strain and not self.id:  # Nur bei Neuanlage
             self.strain_name = self.strain.name
@@ -82,23 +82,26 @@ class MotherPlantBatch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='mother_batch_created_id_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Mutterpflanzen-Batches, die heute erstellt wurden
-            count = MotherPlantBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"mother-plant:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(MotherPlantBatch, "mother-plant")
         
         super().save(*args, **kwargs)
 
 class MotherPlant(models.Model):
+    # Präfix der Chargennummer (auch für die Blockreservierung beim Massenanlegen)
+    BATCH_NUMBER_PREFIX = "mother-plant"
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     batch = models.ForeignKey(MotherPlantBatch, related_name='plants', on_delete=models.CASCADE)
     batch_number = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -128,10 +131,18 @@ class MotherPlant(models.Model):
     )
     
     # Properties für aggregierte Werte
+    def _prefetched_ratings(self):
+        """Bewertungen aus prefetch_related('ratings'), sonst None"""
+        return getattr(self, '_prefetched_objects_cache', {}).get('ratings')
+    
     @property
     def average_rating(self):
         """Durchschnittliche Gesamtbewertung"""
-        ratings = self.ratings.all()
+        ratings = self._prefetched_ratings()
+        if ratings is None:
+            return self.ratings.aggregate(
+                average=models.Avg(MotherPlantRating.overall_score_expression())
+            )['average']
         if not ratings:
             return None
         return sum(r.overall_score for r in ratings) / len(ratings)
@@ -139,7 +150,10 @@ class MotherPlant(models.Model):
     @property
     def total_cuttings_produced(self):
         """Gesamtzahl produzierter Stecklinge"""
-        return sum(rating.cuttings_harvested for rating in self.ratings.all())
+        ratings = self._prefetched_ratings()
+        if ratings is None:
+            return self.ratings.aggregate(total=models.Sum('cuttings_harvested'))['total'] or 0
+        return sum(rating.cuttings_harvested for rating in ratings)
     
     @property
     def last_rating(self):
@@ -154,16 +168,7 @@ class MotherPlant(models.Model):
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Mutterpflanzen, die heute erstellt wurden
-            count = MotherPlant.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"mother-plant:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(MotherPlant, self.BATCH_NUMBER_PREFIX)
         
         super().save(*args, **kwargs)
 
@@ -234,20 +239,31 @@ class MotherPlantRating(models.Model):
         help_text="Verknüpfung zum zugehörigen Stecklingsschnitt"
     )
     
+    # Teilnoten des Gesamt-Performance-Scores
+    SCORE_FIELDS = (
+        'overall_health',
+        'growth_structure',
+        'regeneration_ability',
+        'regrowth_speed_rating',
+        'cutting_quality',
+    )
+    
     class Meta:
         ordering = ['-created_at']
         
     @property
     def overall_score(self):
         """Berechnet den Gesamt-Performance-Score"""
-        scores = [
-            self.overall_health,
-            self.growth_structure,
-            self.regeneration_ability,
-            self.regrowth_speed_rating,
-            self.cutting_quality
-        ]
+        scores = [getattr(self, field) for field in self.SCORE_FIELDS]
         return sum(scores) / len(scores)
+    
+    @classmethod
+    def overall_score_expression(cls, prefix=''):
+        """overall_score als Datenbank-Ausdruck (für Avg in Annotationen und Aggregaten)"""
+        total = sum((models.F(prefix + field) for field in cls.SCORE_FIELDS[1:]),
+                    models.F(prefix + cls.SCORE_FIELDS[0]))
+        return models.ExpressionWrapper(total / float(len(cls.SCORE_FIELDS)),
+                                        output_field=models.FloatField())
 
 class FloweringPlantBatch(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -266,23 +282,26 @@ class FloweringPlantBatch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='flowering_batch_created_id_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Blühpflanzen-Batches, die heute erstellt wurden
-            count = FloweringPlantBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"blooming-plant:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(FloweringPlantBatch, "blooming-plant")
         
         super().save(*args, **kwargs)
 
 class FloweringPlant(models.Model):
+    # Präfix der Chargennummer (auch für die Blockreservierung beim Massenanlegen)
+    BATCH_NUMBER_PREFIX = "blooming-plant"
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     batch = models.ForeignKey(FloweringPlantBatch, related_name='plants', on_delete=models.CASCADE)
     batch_number = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -302,16 +321,7 @@ class FloweringPlant(models.Model):
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Blühpflanzen, die heute erstellt wurden
-            count = FloweringPlant.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"blooming-plant:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(FloweringPlant, self.BATCH_NUMBER_PREFIX)
         
         super().save(*args, **kwargs)
 
@@ -332,23 +342,26 @@ class CuttingBatch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='cutting_batch_created_id_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Stecklinge-Batches, die heute erstellt wurden
-            count = CuttingBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"cutting:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(CuttingBatch, "cutting")
         
         super().save(*args, **kwargs)
 
 class Cutting(models.Model):
+    # Präfix der Chargennummer (auch für die Blockreservierung beim Massenanlegen)
+    BATCH_NUMBER_PREFIX = "cutting"
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     batch = models.ForeignKey(CuttingBatch, related_name='cuttings', on_delete=models.CASCADE)
     batch_number = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -373,16 +386,7 @@ class Cutting(models.Model):
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Stecklinge, die heute erstellt wurden
-            count = Cutting.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"cutting:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(Cutting, self.BATCH_NUMBER_PREFIX)
         
         super().save(*args, **kwargs)
 
@@ -403,23 +407,26 @@ class BloomingCuttingBatch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='blooming_batch_created_id_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Blühpflanzen-Batches, die heute erstellt wurden
-            count = BloomingCuttingBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"charge:blooming-cutting:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(BloomingCuttingBatch, "charge:blooming-cutting")
         
         super().save(*args, **kwargs)
 
 class BloomingCuttingPlant(models.Model):
+    # Präfix der Chargennummer (auch für die Blockreservierung beim Massenanlegen)
+    BATCH_NUMBER_PREFIX = "blooming-cutting"
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     batch = models.ForeignKey(BloomingCuttingBatch, related_name='plants', on_delete=models.CASCADE)
     batch_number = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -439,16 +446,7 @@ class BloomingCuttingPlant(models.Model):
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Blühpflanzen, die heute erstellt wurden
-            count = BloomingCuttingPlant.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"blooming-cutting:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(BloomingCuttingPlant, self.BATCH_NUMBER_PREFIX)
         
         super().save(*args, **kwargs)
 
@@ -487,19 +485,19 @@ class HarvestBatch(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='harvest_batch_created_id_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Ernten, die heute erstellt wurden
-            count = HarvestBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"charge:harvest:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(HarvestBatch, "charge:harvest")
         
         super().save(*args, **kwargs)
     
@@ -538,24 +536,7 @@ class HarvestBatch(models.Model):
     def generate_batch_number(self):
         """Generiert eine eindeutige Batch-Nummer für Ernten"""
         prefix = "harvest"  # WICHTIG: Muss "harvest" sein!
-        
-        # Aktuelles Datum
-        now = timezone.now()
-        date_part = now.strftime("%d:%m:%Y")
-        
-        # Zähler für den Tag
-        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Zähle Batches vom gleichen Tag
-        count = HarvestBatch.objects.filter(
-            created_at__range=(start_of_day, end_of_day)
-        ).count()
-        
-        # Batch-Nummer mit führenden Nullen
-        batch_number = f"{prefix}:{date_part}:{count + 1:04d}"
-        
-        return batch_number
+        return next_batch_number(HarvestBatch, prefix)
     
     def save(self, *args, **kwargs):
         if not self.batch_number:
@@ -594,19 +575,19 @@ class DryingBatch(models.Model):
     processing_batch = models.ForeignKey('ProcessingBatch', on_delete=models.SET_NULL, 
                                         related_name='source_drying', null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='drying_batch_created_id_idx'
+            ),
+        ]
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Trocknungen, die heute erstellt wurden
-            count = DryingBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"charge:drying:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(DryingBatch, "charge:drying")
         
         # Berechne Gewichtsverlust-Prozentsatz (kann später für Statistiken genutzt werden)
         if not hasattr(self, 'weight_loss_percentage') and self.initial_weight and self.final_weight:
@@ -641,24 +622,7 @@ class DryingBatch(models.Model):
     def generate_batch_number(self):
         """Generiert eine eindeutige Batch-Nummer für Trocknungen"""
         prefix = "drying"  # WICHTIG: Muss "drying" sein!
-        
-        # Aktuelles Datum
-        now = timezone.now()
-        date_part = now.strftime("%d:%m:%Y")
-        
-        # Zähler für den Tag
-        start_of_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-        
-        # Zähle Batches vom gleichen Tag
-        count = DryingBatch.objects.filter(
-            created_at__range=(start_of_day, end_of_day)
-        ).count()
-        
-        # Batch-Nummer mit führenden Nullen
-        batch_number = f"{prefix}:{date_part}:{count + 1:04d}"
-        
-        return batch_number
+        return next_batch_number(DryingBatch, prefix)
     
     def save(self, *args, **kwargs):
         if not self.batch_number:
@@ -708,28 +672,25 @@ class ProcessingBatch(models.Model):
         indexes = [
             # Index für Produkttyp-Filter
             models.Index(
-                fields=['product_type'], 
+                fields=['product_type'],
                 name='processing_batch_type_idx'
             ),
+
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='processing_created_id_idx'
+            ),
         ]
     
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
             # Erstelle ein Präfix basierend auf dem Produkttyp
             prefix = "marijuana" if self.product_type == "marijuana" else "hashish"
             
-            # Zähle Verarbeitungs-Batches dieses Typs, die heute erstellt wurden
-            count = ProcessingBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day,
-                product_type=self.product_type
-            ).count() + 1
-            
             # Generiere Batch-Nummer mit Produkttyp im Prefix
-            self.batch_number = f"charge:{prefix}:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(ProcessingBatch, f"charge:{prefix}")
         
         # Berechne Ausbeute-Prozentsatz
         if not hasattr(self, 'yield_percentage') and self.input_weight and self.output_weight:
@@ -825,29 +786,27 @@ class LabTestingBatch(models.Model):
             
             # Index für Processing-Batch Relations
             models.Index(
-                fields=['processing_batch'], 
+                fields=['processing_batch'],
                 name='lab_testing_processing_idx'
+            ),
+
+            # Keyset-Pagination der Liste (created_at, id)
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='lab_testing_created_id_idx'
             )
         ]
     
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
             # Erstelle ein Präfix basierend auf dem Produkttyp der Quelle
             prefix = "labtesting"
             if self.processing_batch:
                 prefix = f"labtesting-{self.processing_batch.product_type}"
             
-            # Zähle Laborkontroll-Batches, die heute erstellt wurden
-            count = LabTestingBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
             # Generiere Batch-Nummer mit Präfix
-            self.batch_number = f"charge:{prefix}:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(LabTestingBatch, f"charge:{prefix}")
         
         super().save(*args, **kwargs)
     
@@ -879,7 +838,31 @@ class LabTestingBatch(models.Model):
             return self.processing_batch.product_type_display
         return "Unbekannt"
 
-class PackagingBatch(models.Model):
+class PackagingLineageFields(models.Model):
+    """
+    Denormalisierte Herkunftsdaten für Verpackungen und Verpackungseinheiten.
+    Werden beim Anlegen aus der Kette Laborkontrolle → Verarbeitung → Trocknung →
+    Ernte → Samen gestempelt (siehe lineage.py), damit Filter nach Sorte, THC und
+    Produkttyp ohne 8-fache Joins auskommen.
+    """
+    lineage_strain = models.ForeignKey(CannabisStrain, on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='+')
+    lineage_strain_name = models.CharField(max_length=200, blank=True, default='')
+    lineage_harvest_batch = models.ForeignKey('HarvestBatch', on_delete=models.SET_NULL, null=True, blank=True,
+                                              related_name='+')
+    lineage_cannabis_batch_id = models.CharField(max_length=100, blank=True, default='')  # z.B. harvest_<uuid>
+    lineage_thc_content = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    lineage_product_type = models.CharField(max_length=20, blank=True, default='')
+
+    class Meta:
+        abstract = True
+
+    @property
+    def has_lineage(self):
+        """Gibt zurück, ob die Herkunftsdaten bereits gestempelt wurden."""
+        return bool(self.lineage_cannabis_batch_id)
+
+class PackagingBatch(PackagingLineageFields):
     """Modell für die Verpackung von freigegeben Produkten nach der Laborkontrolle"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     batch_number = models.CharField(max_length=50, unique=True, blank=True, null=True)
@@ -946,10 +929,16 @@ class PackagingBatch(models.Model):
                 name='packaging_batch_number_idx'
             ),
             
-            # Index für Erstellungsdatum
+            # Erstellungsdatum und Keyset-Pagination der Liste (created_at, id)
             models.Index(
-                fields=['-created_at'], 
-                name='packaging_batch_created_idx'
+                fields=['-created_at', '-id'],
+                name='packaging_batch_created_id_idx'
+            ),
+            
+            # Index für Sortenfilter über die gestempelten Herkunftsdaten
+            models.Index(
+                fields=['lineage_strain_name'], 
+                name='packaging_batch_strain_idx'
             )
         ]
     
@@ -958,18 +947,16 @@ class PackagingBatch(models.Model):
         creating = self.pk is None
         
         if not self.batch_number:
-            today = timezone.now()
             prefix = "packaging"
             if self.lab_testing_batch and self.lab_testing_batch.processing_batch:
                 prefix = f"packaging-{self.lab_testing_batch.processing_batch.product_type}"
             
-            count = PackagingBatch.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            self.batch_number = f"charge:{prefix}:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(PackagingBatch, f"charge:{prefix}")
+        
+        # Herkunftsdaten stempeln, falls nicht bereits vom Aufrufer übergeben
+        if not self.has_lineage and self.lab_testing_batch_id:
+            from .lineage import stamp_packaging_batch
+            stamp_packaging_batch(self)
         
         # 🆕 AUTOMATISCHE PREISBERECHNUNG:
         if self.price_per_gram and self.total_weight:
@@ -987,12 +974,9 @@ class PackagingBatch(models.Model):
             units_count = self.units.count()
             if units_count == 0:
                 print(f"DEBUG: ERSTELLE UNITS - Anzahl: {self.unit_count}")
-                for _ in range(self.unit_count):
-                    PackagingUnit.objects.create(
-                        batch=self,
-                        weight=self.unit_weight,
-                        notes=f"Automatisch erstellt aus Batch {self.batch_number}"
-                    )
+                # Alle Einheiten mit einer Nummernreservierung und einem bulk_create
+                from .conversions import create_packaging_units
+                create_packaging_units(self)
     
     @property
     def source_strain(self):
@@ -1030,7 +1014,7 @@ class PackagingBatch(models.Model):
         return None
     
 
-class PackagingUnit(models.Model):
+class PackagingUnit(PackagingLineageFields):
     """Modell für individuelle Verpackungseinheiten innerhalb eines Verpackungs-Batches"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     batch = models.ForeignKey(PackagingBatch, related_name='units', on_delete=models.CASCADE)
@@ -1089,31 +1073,51 @@ class PackagingUnit(models.Model):
             models.Index(
                 fields=['-created_at'], 
                 name='packaging_unit_created_idx'
+            ),
+            
+            # Indizes für die gestempelten Herkunftsdaten (Sorte, THC, Produkttyp)
+            models.Index(
+                fields=['lineage_strain_name', 'weight'], 
+                name='packaging_unit_strain_idx'
+            ),
+            models.Index(
+                fields=['lineage_thc_content'], 
+                name='packaging_unit_thc_idx'
+            ),
+            models.Index(
+                fields=['lineage_product_type'], 
+                name='packaging_unit_type_idx'
             )
         ]
         
         # 🔧 KORRIGIERTES ORDERING - nur direkte Fields
         ordering = ['-created_at', 'batch_number']
     
+    @staticmethod
+    def batch_number_prefix(batch):
+        """Präfix der Einheitennummer anhand des Produkttyps des Verpackungs-Batches."""
+        product_type_prefix = "pack"
+        if batch.lineage_product_type:
+            product_type_prefix = f"pack-{batch.lineage_product_type}"
+        elif batch.lab_testing_batch and batch.lab_testing_batch.processing_batch:
+            product_type = batch.lab_testing_batch.processing_batch.product_type
+            product_type_prefix = f"pack-{product_type}"
+        return f"unit:{product_type_prefix}"
+    
+    @classmethod
+    def reserve_batch_numbers(cls, batch, count):
+        """Reserviert count Einheitennummern für einen Verpackungs-Batch in einem Schritt."""
+        return reserve_batch_numbers(cls, cls.batch_number_prefix(batch), count)
+    
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Verpackungseinheiten, die heute erstellt wurden
-            count = PackagingUnit.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Produkttyp aus dem übergeordneten Batch ermitteln
-            product_type_prefix = "pack"
-            if self.batch.lab_testing_batch and self.batch.lab_testing_batch.processing_batch:
-                product_type = self.batch.lab_testing_batch.processing_batch.product_type
-                product_type_prefix = f"pack-{product_type}"
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"unit:{product_type_prefix}:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = self.reserve_batch_numbers(self.batch, 1)[0]
+        
+        # Herkunftsdaten vom Verpackungs-Batch übernehmen
+        if not self.has_lineage and self.batch.has_lineage:
+            from .lineage import copy_lineage
+            copy_lineage(self.batch, self)
         
         # 🆕 PREISBERECHNUNG AUS DEM BATCH, FALLS NICHT GESETZT:
         if not self.unit_price and self.batch and self.batch.price_per_gram and self.weight:
@@ -1175,14 +1179,7 @@ class ProductDistribution(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.batch_number:
-            today = timezone.now()
-            count = ProductDistribution.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            self.batch_number = f"distro:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(ProductDistribution, "distro")
         
         super().save(*args, **kwargs)
     
@@ -1228,20 +1225,115 @@ class ProductDistribution(models.Model):
         verbose_name = "Cannabis-Ausgabe"
         verbose_name_plural = "Cannabis-Ausgaben"
 
-import io
-from PIL import Image
+class StrainAvailabilityIndex(models.Model):
+    """
+    Materialisierter Verfügbarkeitsindex für die StrainCards.
+    Eine Zeile pro Verpackungs-Batch und Gewicht mit allen noch verfügbaren
+    (nicht vernichteten, nicht ausgegebenen) Einheiten. Wird über die Signale in
+    trackandtrace/signals.py inkrementell gepflegt (siehe strain_index.py).
+    """
+    packaging_batch = models.ForeignKey(PackagingBatch, on_delete=models.CASCADE,
+                                        related_name='strain_availability')
+
+    # Abgeleitete Lineage-Informationen
+    strain_name = models.CharField(max_length=200)
+    product_type = models.CharField(max_length=20, choices=PRODUCT_TYPE_CHOICES, blank=True)
+    cannabis_batch_id = models.CharField(max_length=100, blank=True)
+    thc_content = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+
+    # Bestand dieses Gewichts innerhalb des Batches
+    weight = models.DecimalField(max_digits=6, decimal_places=2)
+    unit_count = models.PositiveIntegerField(default=0)
+    # Kompakte Liste der Einheiten: [{"id", "batch_number", "unit_price"}], neueste zuerst
+    units = models.JSONField(default=list)
+    newest_unit_at = models.DateTimeField(null=True, blank=True)
+
+    # Preisspanne der verfügbaren Einheiten
+    min_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Sorten-Verfügbarkeitsindex"
+        verbose_name_plural = "Sorten-Verfügbarkeitsindex"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['packaging_batch', 'weight'],
+                name='strain_index_batch_weight_uniq'
+            ),
+        ]
+        indexes = [
+            # Index für Gruppierung und Pagination nach Sorte
+            models.Index(
+                fields=['strain_name', 'product_type'],
+                name='strain_index_name_type_idx'
+            ),
+
+            # Index für Gewichts-Filter
+            models.Index(
+                fields=['weight'],
+                name='strain_index_weight_idx'
+            ),
+
+            # Index für THC-Filter (U21-Regel)
+            models.Index(
+                fields=['thc_content'],
+                name='strain_index_thc_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.strain_name} {self.weight}g ({self.unit_count}x)"
+
+
+class MemberConsumptionDay(models.Model):
+    """
+    Verbrauchsjournal: ausgegebene Menge pro Mitglied und Kalendertag.
+    Wird beim Anlegen, Ändern und Stornieren von Ausgaben in derselben Transaktion
+    nachgeführt (siehe consumption_ledger.py), damit Tages-, Monats- und
+    30-Tage-Auswertungen nur wenige vorsummierte Zeilen lesen.
+    """
+    member = models.ForeignKey(Member, on_delete=models.CASCADE, related_name='consumption_days')
+    day = models.DateField()
+    total_weight = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # Gramm
+    distribution_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Verbrauchsjournal"
+        verbose_name_plural = "Verbrauchsjournal"
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['member', 'day'],
+                name='consumption_day_member_uniq'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.member} {self.day}: {self.total_weight}g"
+
 from django.db import models
 from django.core.exceptions import ValidationError
 from django.core.validators import FileExtensionValidator
 from members.models import Member  # Anpassen je nach deiner App-Struktur
+from . import media
+from .blobs import media_storage
+from .media import MediaProcessingFields
 
 
-class BaseProductImage(models.Model):
+class BaseProductImage(MediaProcessingFields):
     """Abstrakte Basisklasse für Produktbilder UND Videos im Track & Trace System"""
     
+    # Thumbnail & Renditions über trackandtrace.media (Hintergrund-Worker)
+    MEDIA_FIELDS = ('image', 'video')
+    PROCESSING_FIELDS = MediaProcessingFields.PROCESSING_FIELDS + ('thumbnail',)
+    
     # Bild-Feld (jetzt optional, da entweder Bild ODER Video)
     image = models.ImageField(
         upload_to='trackandtrace/images/%Y/%m/%d/',
+        storage=media_storage,
         blank=True,
         null=True,
         help_text="Bild-Datei (JPEG, PNG, etc.)"
@@ -1258,6 +1350,7 @@ class BaseProductImage(models.Model):
     # NEU: Video-Feld
     video = models.FileField(
         upload_to='trackandtrace/videos/%Y/%m/%d/',
+        storage=media_storage,
         blank=True,
         null=True,
         validators=[
@@ -1313,39 +1406,22 @@ class BaseProductImage(models.Model):
         if not self.image and not self.video:
             raise ValidationError("Es muss entweder ein Bild oder ein Video hochgeladen werden.")
     
+    def reset_renditions(self):
+        super().reset_renditions()
+        self.thumbnail = None
+
+    @classmethod
+    def rendition_fields(cls, renditions):
+        """Thumbnail-Feld aus der thumb-Rendition (auch Standbild bei Videos)"""
+        return {'thumbnail': renditions.get('thumb')}
+
     def make_thumbnail(self):
-        """Erstellt automatisch ein Thumbnail (150x150px) - nur für Bilder"""
-        if not self.image:
+        """Erstellt Thumbnail und Renditions sofort (ohne Hintergrund-Worker)"""
+        if not self.pk or not (self.image or self.video):
             return None
-            
-        img = Image.open(self.image)
-        
-        # Konvertiere RGBA zu RGB falls nötig
-        if img.mode in ('RGBA', 'LA', 'P'):
-            # Erstelle einen weißen Hintergrund
-            background = Image.new('RGB', img.size, (255, 255, 255))
-            # Konvertiere zu RGB
-            if img.mode == 'P':
-                img = img.convert('RGBA')
-            background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-            img = background
-        
-        # Thumbnail erstellen
-        img.thumbnail((150, 150), Image.Resampling.LANCZOS)
-        
-        thumb_io = io.BytesIO()
-        img.save(thumb_io, format='JPEG', quality=85)
-        thumb_io.seek(0)
-        
-        # Generiere Dateinamen für Thumbnail
-        thumb_filename = f"thumb_{self.image.name.split('/')[-1]}"
-        # Ändere Dateiendung zu .jpg falls nötig
-        if not thumb_filename.lower().endswith(('.jpg', '.jpeg')):
-            thumb_filename = thumb_filename.rsplit('.', 1)[0] + '.jpg'
-        
-        # Speichere Thumbnail
-        self.thumbnail.save(thumb_filename, thumb_io, save=False)
-        
+        media.reset(self)
+        media.process(type(self), self.pk)
+        self.refresh_from_db(fields=[*self.PROCESSING_FIELDS, *self.MEDIA_FIELDS])
         return self.thumbnail
     
     def save(self, *args, **kwargs):
@@ -1355,14 +1431,8 @@ class BaseProductImage(models.Model):
         else:
             self.media_type = 'image'
         
-        # Speichere zuerst das Objekt
+        # Thumbnail & Renditions erzeugt der Medien-Worker nach dem Commit
         super().save(*args, **kwargs)
-        
-        # Generiere Thumbnail nur für Bilder und nur wenn noch keins existiert
-        if self.image and self.media_type == 'image' and not self.thumbnail:
-            self.make_thumbnail()
-            # Speichere nochmal um das Thumbnail zu persistieren
-            super().save(update_fields=['thumbnail'])
     
     def get_media_url(self):
         """Hilfsmethode um die URL des Mediums zu bekommen (Bild oder Video)"""
@@ -1374,9 +1444,19 @@ class BaseProductImage(models.Model):
     
     def get_display_url(self):
         """Gibt die URL für die Anzeige zurück (Thumbnail für Bilder, Video-URL für Videos)"""
-        if self.media_type == 'image' and self.thumbnail:
+        if self.media_type == 'video':
+            return self.get_media_url()
+        if self.media_processing:
+            return self.placeholder_url()
+        if self.thumbnail:
             return self.thumbnail.url
         return self.get_media_url()
+
+    def get_poster_url(self):
+        """Standbild eines Videos (nur wenn ffmpeg verfügbar war)"""
+        if self.media_type == 'video' and self.thumbnail:
+            return self.thumbnail.url
+        return None
     
     def __str__(self):
         media_str = "Video" if self.media_type == 'video' else "Bild"
@@ -1629,3 +1709,75 @@ class PackagingBatchImage(BaseProductImage):
         ordering = ['-uploaded_at']
 
 
+
+
+class MediaUpload(models.Model):
+    """
+    Upload-Sitzung für große Bilder/Videos in Teilstücken (fortsetzbar).
+
+    Die Teilstücke landen direkt in der endgültigen Datei unter dem upload_to-Pfad
+    des Ziel-Modells; beim Abschluss werden Größe und SHA-256 geprüft und das
+    Medium über die jeweilige Upload-Action angelegt (siehe trackandtrace.uploads).
+    """
+    STATUS_CHOICES = [
+        ('open', 'Offen'),
+        ('receiving', 'Empfängt Teilstück'),
+        ('committed', 'Abgeschlossen'),
+        ('aborted', 'Abgebrochen'),
+        ('failed', 'Prüfsumme fehlerhaft'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField(max_length=100, help_text="Ziel-Modell (app_label.Model)")
+    media_field = models.CharField(max_length=20, default='image')
+    filename = models.CharField(max_length=255, help_text="Ursprünglicher Dateiname")
+    file_name = models.CharField(max_length=255, help_text="Speicherpfad der entstehenden Datei")
+    total_size = models.BigIntegerField()
+    received_size = models.BigIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True, help_text="Vom Client erwarteter SHA-256")
+    content_hash = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open', db_index=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Medien-Upload'
+        verbose_name_plural = 'Medien-Uploads'
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.received_size}/{self.total_size} Bytes, {self.status})"
+
+
+class MediaBlob(models.Model):
+    """
+    Inhaltsadressierte Mediendatei (Schlüssel: SHA-256).
+
+    Alle Bild-Modelle (Track & Trace und wawi-Sortenbilder) verweisen über
+    content_hash auf einen Blob. Renditions werden einmal je Blob erzeugt;
+    verschwindet die letzte Referenz, löscht die Garbage Collection Datei und
+    Ableitungen (siehe trackandtrace.blobs).
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file_name = models.CharField(max_length=255, help_text="Speicherpfad der Originaldatei")
+    size = models.BigIntegerField(default=0)
+    is_video = models.BooleanField(default=False)
+    ref_count = models.PositiveIntegerField(default=0, help_text="Anzahl der Medien mit diesem Inhalt")
+    renditions = models.JSONField(default=dict, blank=True)
+    processing_status = models.CharField(
+        max_length=20,
+        choices=media.PROCESSING_STATUS_CHOICES,
+        default=media.PENDING,
+        db_index=True
+    )
+    processing_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Medien-Blob'
+        verbose_name_plural = 'Medien-Blobs'
+
+    def __str__(self):
+        return f"{self.sha256[:12]}… ({self.ref_count} Referenzen)"
@@ -0,0 +1,195 @@
+# backend/trackandtrace/recall.py
+"""
+Rückruf-Analyse: alle Verpackungen, Einheiten, Ausgaben und betroffenen
+Mitglieder unterhalb einer Charge (z.B. Samen-Einkauf, Ernte oder
+Laborkontrolle bei Schimmel- oder Laborbefund).
+
+Die betroffenen Verpackungs-Batches liefert der Herkunfts-Graph mit einer
+rekursiven Query (lineage_graph.descendant_ids). Alles Weitere läuft über
+wenige aggregierte Queries je Bericht; die Einheiten-Liste wird per
+iterator() gestreamt, damit auch Zehntausende Einheiten nicht komplett im
+Speicher landen.
+"""
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from . import lineage_graph, strain_index
+from .models import PackagingUnit
+from .stats import invalidate_counts
+
+# Zeilen je Datenbank-Fetch beim Streamen der Einheiten
+STREAM_CHUNK_SIZE = 2000
+
+# Spalten des Berichts (CSV-Kopfzeile und Schlüssel im JSON)
+REPORT_COLUMNS = (
+    'unit_batch_number',
+    'packaging_batch_number',
+    'strain_name',
+    'product_type',
+    'weight',
+    'status',
+    'distribution_batch_number',
+    'distribution_date',
+    'recipient_id',
+    'recipient_name',
+)
+
+_UNIT_VALUES = (
+    'batch_number', 'batch__batch_number', 'lineage_strain_name', 'lineage_product_type', 'weight',
+    'is_destroyed', 'distributions__batch_number', 'distributions__distribution_date',
+    'distributions__recipient_id', 'distributions__recipient__first_name',
+    'distributions__recipient__last_name',
+)
+
+
+class RecallError(Exception):
+    """Rückruf nicht möglich - die Meldung geht unverändert an die API."""
+
+
+def _member_name(first_name, last_name):
+    return " ".join(part for part in (first_name, last_name) if part) or 'Unbekannt'
+
+
+class Recall:
+    """Betroffene Bestände unterhalb einer Charge (source_type/source_id wie im Herkunfts-Graph)."""
+
+    def __init__(self, source_type, source_id):
+        if source_type not in lineage_graph.NODE_TYPES or source_type in lineage_graph.UNIT_TYPES:
+            raise RecallError(f"Rückruf ist nur für Chargen möglich, nicht für '{source_type}'")
+        model = lineage_graph.NODE_TYPES[source_type]['model']
+        self.source = model.objects.filter(pk=source_id).first()
+        if self.source is None:
+            raise model.DoesNotExist(f"{source_type} mit ID {source_id} nicht gefunden")
+        self.source_type = source_type
+        self.packaging_batch_ids = sorted(
+            lineage_graph.descendant_ids(source_type, self.source.pk, 'packaging')
+        )
+
+    @property
+    def units(self):
+        return PackagingUnit.objects.filter(batch_id__in=self.packaging_batch_ids)
+
+    def summary(self):
+        """Kennzahlen und betroffene Mitglieder (zwei aggregierte Queries)."""
+        distributed = Q(distributions__isnull=False)
+        totals = self.units.aggregate(
+            unit_count=Count('id', distinct=True),
+            total_weight=Sum('weight'),
+            destroyed_count=Count('id', filter=Q(is_destroyed=True), distinct=True),
+            distributed_count=Count('id', filter=distributed, distinct=True),
+            distributed_weight=Sum('weight', filter=distributed),
+        )
+        members = [
+            {
+                'member_id': str(row['distributions__recipient_id']),
+                'name': _member_name(row['distributions__recipient__first_name'],
+                                     row['distributions__recipient__last_name']),
+                'unit_count': row['unit_count'],
+                'total_weight': float(row['total_weight'] or 0),
+                'last_distribution': row['last_distribution'],
+            }
+            for row in self.units.filter(distributions__recipient__isnull=False).values(
+                'distributions__recipient_id', 'distributions__recipient__first_name',
+                'distributions__recipient__last_name'
+            ).annotate(
+                unit_count=Count('id'),
+                total_weight=Sum('weight'),
+                last_distribution=Max('distributions__distribution_date'),
+            ).order_by('distributions__recipient__last_name', 'distributions__recipient__first_name')
+        ]
+        return {
+            'source_type': self.source_type,
+            'source_id': str(self.source.pk),
+            'source_batch_number': self.source.batch_number,
+            'packaging_batch_count': len(self.packaging_batch_ids),
+            'unit_count': totals['unit_count'],
+            'active_count': totals['unit_count'] - totals['destroyed_count'],
+            'destroyed_count': totals['destroyed_count'],
+            'distributed_count': totals['distributed_count'],
+            'total_weight': float(totals['total_weight'] or 0),
+            'distributed_weight': float(totals['distributed_weight'] or 0),
+            'affected_member_count': len(members),
+            'affected_members': members,
+        }
+
+    def rows(self):
+        """Eine Zeile je Einheit und Ausgabe (gestreamt, in Berichts-Spalten)."""
+        units = self.units.order_by('batch__batch_number', 'batch_number').values_list(*_UNIT_VALUES)
+        for (number, batch_number, strain_name, product_type, weight, is_destroyed, distribution_number,
+             distribution_date, recipient_id, first_name, last_name) in units.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            if distribution_number:
+                unit_status = 'distributed'
+            else:
+                unit_status = 'destroyed' if is_destroyed else 'active'
+            yield {
+                'unit_batch_number': number,
+                'packaging_batch_number': batch_number,
+                'strain_name': strain_name,
+                'product_type': product_type,
+                'weight': float(weight),
+                'status': unit_status,
+                'distribution_batch_number': distribution_number or '',
+                'distribution_date': distribution_date.isoformat() if distribution_date else '',
+                'recipient_id': str(recipient_id) if recipient_id else '',
+                'recipient_name': _member_name(first_name, last_name) if recipient_id else '',
+            }
+
+    def stream_csv(self):
+        """CSV-Bericht zeilenweise (für StreamingHttpResponse)."""
+        buffer = _LineBuffer()
+        writer = csv.DictWriter(buffer, fieldnames=REPORT_COLUMNS, delimiter=';')
+        writer.writeheader()
+        yield buffer.pop()
+        for row in self.rows():
+            writer.writerow(row)
+            yield buffer.pop()
+
+    def stream_json(self):
+        """JSON-Bericht (Zusammenfassung plus alle Einheiten) in Stücken."""
+        summary = json.dumps(self.summary(), cls=DjangoJSONEncoder)
+        yield summary[:-1] + ', "units": ['
+        for index, row in enumerate(self.rows()):
+            yield ("," if index else "") + json.dumps(row, cls=DjangoJSONEncoder)
+        yield "]}"
+
+    def destroy_units(self, reason, destroyed_by_id=None):
+        """
+        Markiert alle noch vorrätigen Einheiten (nicht vernichtet, nicht ausgegeben)
+        in einer Transaktion als vernichtet. Ausgegebene Einheiten bleiben
+        unverändert - die Empfänger stehen im Bericht.
+        """
+        if not reason:
+            raise RecallError("Ein Vernichtungsgrund ist erforderlich")
+        now = timezone.now()
+        with transaction.atomic():
+            # Ein UPDATE für alle Einheiten; update() löst keine Signale aus
+            destroyed = self.units.filter(is_destroyed=False, distributions__isnull=True).update(
+                is_destroyed=True,
+                destroy_reason=f"Rückruf {self.source.batch_number}: {reason}",
+                destroyed_at=now,
+                destroyed_by_id=destroyed_by_id,
+                updated_at=now,
+            )
+            strain_index.schedule_refresh(self.packaging_batch_ids)
+            transaction.on_commit(invalidate_counts)
+        return destroyed
+
+
+class _LineBuffer:
+    """Minimaler Schreib-Puffer für csv.writer beim Streamen."""
+
+    def __init__(self):
+        self._parts = []
+
+    def write(self, value):
+        self._parts.append(value)
+
+    def pop(self):
+        value = "".join(self._parts)
+        self._parts = []
+        return value
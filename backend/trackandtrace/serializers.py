@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 from .models import (
     SeedPurchase, MotherPlantBatch, MotherPlant, 
@@ -13,6 +14,8 @@ from members.models import Member
 from rooms.models import Room
 from wawi.models import CannabisStrain
 from wawi.serializers import CannabisStrainSerializer
+from .annotations import annotated
+from .listing import SlimFieldsMixin
 
 class MemberSerializer(serializers.ModelSerializer):
     display_name = serializers.SerializerMethodField()
@@ -35,15 +38,24 @@ class BaseProductImageSerializer(serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     thumbnail_url = serializers.SerializerMethodField()
     video_url = serializers.SerializerMethodField()
+    display_url = serializers.SerializerMethodField()
+    rendition_urls = serializers.SerializerMethodField()
     
     class Meta:
         fields = [
             'id', 'image', 'image_url', 'video', 'video_url',  # NEU: video Felder
             'thumbnail', 'thumbnail_url', 'media_type',  # NEU: media_type
+            'processing_status', 'display_url', 'rendition_urls',  # Hintergrund-Verarbeitung
             'title', 'description', 'image_type', 
             'uploaded_by', 'uploaded_by_name', 'uploaded_at'
         ]
 
+    def _absolute_url(self, url):
+        request = self.context.get('request')
+        if url and request:
+            return request.build_absolute_uri(url)
+        return None
+
     def get_video_url(self, obj):
         if obj.video:
             request = self.context.get('request')
@@ -70,8 +82,17 @@ class BaseProductImageSerializer(serializers.ModelSerializer):
             request = self.context.get('request')
             if request:
                 return request.build_absolute_uri(obj.thumbnail.url)
+        elif obj.image and obj.media_processing:
+            # Thumbnail wird noch im Hintergrund erzeugt
+            return self._absolute_url(obj.placeholder_url())
         return None
 
+    def get_display_url(self, obj):
+        return self._absolute_url(obj.get_display_url())
+
+    def get_rendition_urls(self, obj):
+        return {name: self._absolute_url(url) for name, url in obj.rendition_urls().items()}
+
 class SeedPurchaseImageSerializer(BaseProductImageSerializer):
     uploaded_by = serializers.PrimaryKeyRelatedField(
         queryset=Member.objects.all(),
@@ -123,6 +144,7 @@ class CuttingBatchImageSerializer(BaseProductImageSerializer):
         model = CuttingBatchImage
         fields = [
             'id', 'image', 'image_url', 'thumbnail', 'thumbnail_url',
+            'processing_status', 'display_url', 'rendition_urls',
             'title', 'description', 'image_type', 
             'uploaded_by', 'uploaded_by_name', 'uploaded_at'
         ]
@@ -140,6 +162,7 @@ class BloomingCuttingBatchImageSerializer(BaseProductImageSerializer):
         model = BloomingCuttingBatchImage
         fields = [
             'id', 'image', 'image_url', 'thumbnail', 'thumbnail_url',
+            'processing_status', 'display_url', 'rendition_urls',
             'title', 'description', 'image_type', 
             'uploaded_by', 'uploaded_by_name', 'uploaded_at',
             'blooming_cutting_batch'
@@ -325,7 +348,14 @@ class PackagingBatchImageSerializer(BaseProductImageSerializer):
         ]
 
         
-class SeedPurchaseSerializer(serializers.ModelSerializer):
+class SeedPurchaseSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    # Listenspalten für ?view=slim (ohne verschachtelte Sorte und Bilder)
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'strain_name', 'quantity', 'remaining_quantity', 'is_destroyed',
+        'created_at', 'member', 'room', 'mother_plant_count', 'flowering_plant_count', 'image_count'
+    )
+    PREFETCHED_FIELDS = ('images', 'strain')
+
     # Alte Mitglieder-Zuweisung (optional noch im Einsatz)
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -385,13 +415,17 @@ class SeedPurchaseSerializer(serializers.ModelSerializer):
         ]
 
     def get_mother_plant_count(self, obj):
-        return sum(batch.plants.filter(is_destroyed=False).count() for batch in obj.mother_batches.all())
+        return annotated(obj, 'mother_plant_count', lambda: sum(
+            batch.plants.filter(is_destroyed=False).count() for batch in obj.mother_batches.all()
+        ))
 
     def get_flowering_plant_count(self, obj):
-        return sum(batch.plants.filter(is_destroyed=False).count() for batch in obj.flowering_batches.all())
+        return annotated(obj, 'flowering_plant_count', lambda: sum(
+            batch.plants.filter(is_destroyed=False).count() for batch in obj.flowering_batches.all()
+        ))
     
     def get_image_count(self, obj):
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
     
 
 class MotherPlantRatingSerializer(serializers.ModelSerializer):
@@ -467,7 +501,12 @@ class MotherPlantSerializer(serializers.ModelSerializer):
         return round(avg, 1) if avg else None
 
 
-class MotherPlantBatchSerializer(serializers.ModelSerializer):
+class MotherPlantBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'quantity', 'created_at', 'member', 'room', 'seed_strain',
+        'seed_batch_number', 'active_plants_count', 'destroyed_plants_count', 'converted_to_cuttings_count', 'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -523,38 +562,43 @@ class MotherPlantBatchSerializer(serializers.ModelSerializer):
         return obj.seed_purchase.batch_number if obj.seed_purchase else None
     
     def get_active_plants_count(self, obj):
-        return obj.plants.filter(is_destroyed=False).count()
+        return annotated(obj, 'active_plants_count', lambda: obj.plants.filter(is_destroyed=False).count())
     
     def get_destroyed_plants_count(self, obj):
-        return obj.plants.filter(is_destroyed=True).count()
+        return annotated(obj, 'destroyed_plants_count', lambda: obj.plants.filter(is_destroyed=True).count())
     
     def get_converted_to_cuttings_count(self, obj):
         """Berechnet die Anzahl der aus diesem Batch erstellten Stecklinge."""
-        count = 0
-        cutting_batches = CuttingBatch.objects.filter(mother_batch=obj)
-        for batch in cutting_batches:
-            count += batch.quantity
-        return count
+        def count():
+            return sum(batch.quantity for batch in CuttingBatch.objects.filter(mother_batch=obj))
+        return annotated(obj, 'converted_to_cuttings_count', count)
 
     def get_image_count(self, obj):
         """Zählt die verknüpften Bilder"""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
     
     def get_premium_plants_count(self, obj):
-        return obj.plants.filter(is_premium_mother=True, is_destroyed=False).count()
+        return annotated(obj, 'premium_plants_count',
+                         lambda: obj.plants.filter(is_premium_mother=True, is_destroyed=False).count())
     
     def get_average_batch_rating(self, obj):
         """Durchschnittliche Bewertung aller Pflanzen im Batch"""
-        ratings = []
-        for plant in obj.plants.filter(is_destroyed=False):
-            if plant.average_rating:
-                ratings.append(plant.average_rating)
-        return round(sum(ratings) / len(ratings), 1) if ratings else None
+        def average():
+            ratings = []
+            for plant in obj.plants.filter(is_destroyed=False).prefetch_related('ratings'):
+                if plant.average_rating:
+                    ratings.append(plant.average_rating)
+            return sum(ratings) / len(ratings) if ratings else None
+        rating = annotated(obj, 'average_batch_rating', average)
+        return round(rating, 1) if rating else None
 
     def get_first_plant_id(self, obj):
         """Gibt die ID der ersten aktiven Pflanze zurück"""
-        first_plant = obj.plants.filter(is_destroyed=False).first()
-        return str(first_plant.id) if first_plant else None
+        def first_plant_id():
+            first_plant = obj.plants.filter(is_destroyed=False).first()
+            return first_plant.id if first_plant else None
+        plant_id = annotated(obj, 'first_plant_id', first_plant_id)
+        return str(plant_id) if plant_id else None
     
     def get_rating_count(self, obj):
         """Zählt alle Bewertungen aller Pflanzen in diesem Batch"""
@@ -583,7 +627,12 @@ class FloweringPlantSerializer(serializers.ModelSerializer):
             'destroyed_at', 'created_at', 'destroyed_by', 'destroyed_by_id'
         ]
 
-class FloweringPlantBatchSerializer(serializers.ModelSerializer):
+class FloweringPlantBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'quantity', 'created_at', 'member', 'room', 'seed_strain',
+        'seed_batch_number', 'active_plants_count', 'destroyed_plants_count', 'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -630,14 +679,14 @@ class FloweringPlantBatchSerializer(serializers.ModelSerializer):
         return obj.seed_purchase.batch_number if obj.seed_purchase else None
     
     def get_active_plants_count(self, obj):
-        return obj.plants.filter(is_destroyed=False).count()
+        return annotated(obj, 'active_plants_count', lambda: obj.plants.filter(is_destroyed=False).count())
     
     def get_destroyed_plants_count(self, obj):
-        return obj.plants.filter(is_destroyed=True).count()
+        return annotated(obj, 'destroyed_plants_count', lambda: obj.plants.filter(is_destroyed=True).count())
     
     def get_image_count(self, obj):
         """Gibt die Anzahl der Bilder für diesen Batch zurück."""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
 
 class CuttingSerializer(serializers.ModelSerializer):
     # Serializer für das Mitglied, das vernichtet hat
@@ -696,7 +745,12 @@ class CuttingSerializer(serializers.ModelSerializer):
                     pass
         return None
 
-class CuttingBatchSerializer(serializers.ModelSerializer):
+class CuttingBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'quantity', 'created_at', 'member', 'room', 'mother_strain',
+        'mother_batch_number', 'active_cuttings_count', 'destroyed_cuttings_count', 'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -754,10 +808,10 @@ class CuttingBatchSerializer(serializers.ModelSerializer):
         return obj.mother_batch.seed_purchase.strain_name if obj.mother_batch and obj.mother_batch.seed_purchase else None
     
     def get_active_cuttings_count(self, obj):
-        return obj.cuttings.filter(is_destroyed=False).count()
+        return annotated(obj, 'active_cuttings_count', lambda: obj.cuttings.filter(is_destroyed=False).count())
     
     def get_destroyed_cuttings_count(self, obj):
-        return obj.cuttings.filter(is_destroyed=True).count()
+        return annotated(obj, 'destroyed_cuttings_count', lambda: obj.cuttings.filter(is_destroyed=True).count())
     
     def get_mother_plant_id(self, obj):
         """Gibt die ID der Mutterpflanze zurück, wenn in den Notes gespeichert."""
@@ -785,7 +839,7 @@ class CuttingBatchSerializer(serializers.ModelSerializer):
     
     def get_image_count(self, obj):  # NEU - Diese Methode fehlte!
         """Gibt die Anzahl der Bilder für diesen Batch zurück."""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
     
 class BloomingCuttingPlantSerializer(serializers.ModelSerializer):
     # Serializer für das Mitglied, das vernichtet hat
@@ -805,7 +859,12 @@ class BloomingCuttingPlantSerializer(serializers.ModelSerializer):
             'destroyed_at', 'created_at', 'destroyed_by', 'destroyed_by_id'
         ]
 
-class BloomingCuttingBatchSerializer(serializers.ModelSerializer):
+class BloomingCuttingBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'quantity', 'created_at', 'member', 'room', 'cutting_strain',
+        'cutting_batch_number', 'active_plants_count', 'destroyed_plants_count', 'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -855,15 +914,20 @@ class BloomingCuttingBatchSerializer(serializers.ModelSerializer):
         return obj.cutting_batch.batch_number if obj.cutting_batch else None
     
     def get_active_plants_count(self, obj):
-        return obj.plants.filter(is_destroyed=False).count()
+        return annotated(obj, 'active_plants_count', lambda: obj.plants.filter(is_destroyed=False).count())
     
     def get_destroyed_plants_count(self, obj):
-        return obj.plants.filter(is_destroyed=True).count()
+        return annotated(obj, 'destroyed_plants_count', lambda: obj.plants.filter(is_destroyed=True).count())
     
     def get_image_count(self, obj):
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
     
-class HarvestBatchSerializer(serializers.ModelSerializer):
+class HarvestBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'weight', 'source_strain', 'source_batch_number', 'source_type',
+        'member', 'room', 'is_destroyed', 'created_at', 'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -935,9 +999,14 @@ class HarvestBatchSerializer(serializers.ModelSerializer):
     
     def get_image_count(self, obj):
         """Gibt die Anzahl der Bilder für diesen Batch zurück."""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
     
-class DryingBatchSerializer(serializers.ModelSerializer):
+class DryingBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'initial_weight', 'final_weight', 'weight_loss_percentage', 'source_strain',
+        'harvest_batch_number', 'member', 'room', 'is_destroyed', 'created_at', 'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -989,7 +1058,7 @@ class DryingBatchSerializer(serializers.ModelSerializer):
     
     def get_image_count(self, obj):
         """Gibt die Anzahl der Bilder UND Videos zurück."""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
     
     def get_source_strain(self, obj):
         return obj.source_strain
@@ -1003,7 +1072,13 @@ class DryingBatchSerializer(serializers.ModelSerializer):
     def get_weight_loss_percentage(self, obj):
         return obj.weight_loss_percentage
     
-class ProcessingBatchSerializer(serializers.ModelSerializer):
+class ProcessingBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'product_type', 'product_type_display', 'input_weight', 'output_weight',
+        'yield_percentage', 'source_strain', 'drying_batch_number', 'member', 'room', 'is_destroyed', 'created_at',
+        'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -1071,9 +1146,15 @@ class ProcessingBatchSerializer(serializers.ModelSerializer):
     
     def get_image_count(self, obj):
         """Gibt die Anzahl der Bilder UND Videos zurück."""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
     
-class LabTestingBatchSerializer(serializers.ModelSerializer):
+class LabTestingBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'processing_batch_number', 'status', 'thc_content', 'cbd_content',
+        'remaining_weight', 'source_strain', 'product_type_display', 'member', 'room', 'is_destroyed',
+        'converted_to_packaging', 'created_at', 'image_count'
+    )
+
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -1146,9 +1227,15 @@ class LabTestingBatchSerializer(serializers.ModelSerializer):
     
     def get_image_count(self, obj):
         """Gibt die Anzahl der Bilder UND Videos zurück."""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
+
+class PackagingBatchSerializer(SlimFieldsMixin, serializers.ModelSerializer):
+    SLIM_FIELDS = (
+        'id', 'batch_number', 'lab_testing_batch_number', 'total_weight', 'unit_count', 'unit_weight',
+        'unit_price', 'source_strain', 'product_type_display', 'thc_content', 'member', 'room', 'is_destroyed',
+        'created_at', 'image_count'
+    )
 
-class PackagingBatchSerializer(serializers.ModelSerializer):
     # Serializers für Mitglieder und Räume
     member = MemberSerializer(read_only=True)
     member_id = serializers.PrimaryKeyRelatedField(
@@ -1251,7 +1338,7 @@ class PackagingBatchSerializer(serializers.ModelSerializer):
     
     def get_image_count(self, obj):
         """Gibt die Anzahl der Bilder UND Videos zurück."""
-        return obj.images.count()
+        return annotated(obj, 'image_count', obj.images.count)
 
 class PackagingUnitSerializer(serializers.ModelSerializer):
     # Serializer für das Mitglied, das vernichtet hat
@@ -1342,14 +1429,40 @@ class PackagingUnitSerializer(serializers.ModelSerializer):
         
         return batch_data
 
+class BulkPrimaryKeyRelatedField(serializers.ManyRelatedField):
+    """
+    Wie PrimaryKeyRelatedField(many=True), lädt aber alle IDs mit einer einzigen
+    id__in-Query statt einer Query pro ID.
+    """
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        
+        pks = [str(pk) for pk in data]
+        try:
+            objects = {
+                str(obj.pk): obj
+                for obj in self.child_relation.get_queryset().filter(pk__in=pks)
+            }
+        except (TypeError, ValueError, DjangoValidationError):
+            self.child_relation.fail('incorrect_type', data_type=type(data[0]).__name__)
+        
+        for pk in pks:
+            if pk not in objects:
+                self.child_relation.fail('does_not_exist', pk_value=pk)
+        return [objects[pk] for pk in dict.fromkeys(pks)]
+
 class ProductDistributionSerializer(serializers.ModelSerializer):
     # Einfache Darstellung der Verpackungseinheiten mit erweiterten Batch-Daten
     packaging_units = PackagingUnitSerializer(many=True, read_only=True)
-    packaging_unit_ids = serializers.PrimaryKeyRelatedField(
-        queryset=PackagingUnit.objects.filter(is_destroyed=False),
+    packaging_unit_ids = BulkPrimaryKeyRelatedField(
+        child_relation=serializers.PrimaryKeyRelatedField(
+            queryset=PackagingUnit.objects.filter(is_destroyed=False)
+        ),
         source='packaging_units',
-        write_only=True,
-        many=True
+        write_only=True
     )
     
     # Serializers für Distributor und Empfänger
@@ -0,0 +1,173 @@
+# backend/trackandtrace/signals.py
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import conditional, consumption_ledger, lineage, media, stats, strain_index
+from .models import LabTestingBatch, PackagingBatch, PackagingUnit, ProductDistribution
+
+
+# --- Herkunftsdaten (muss vor dem Sorten-Index registriert sein) -----------
+
+@receiver(post_save, sender=LabTestingBatch)
+def lab_testing_batch_lineage(sender, instance, created, **kwargs):
+    # Geänderte Laborwerte auf bereits verpackte Einheiten übertragen
+    if not created:
+        lineage.propagate_lab_testing(instance)
+
+
+# --- Sorten-Verfügbarkeitsindex -------------------------------------------
+
+@receiver(post_save, sender=PackagingUnit)
+@receiver(post_delete, sender=PackagingUnit)
+def packaging_unit_changed(sender, instance, **kwargs):
+    strain_index.schedule_refresh([instance.batch_id])
+
+
+@receiver(post_save, sender=PackagingBatch)
+def packaging_batch_changed(sender, instance, created, **kwargs):
+    # Neue Batches werden über die Einheiten indiziert
+    if not created:
+        strain_index.schedule_refresh([instance.id])
+
+
+@receiver(post_save, sender=LabTestingBatch)
+def lab_testing_batch_changed(sender, instance, created, **kwargs):
+    # THC-Werte fließen in den Index ein
+    if not created:
+        strain_index.schedule_refresh(
+            instance.packaging_batches.values_list('id', flat=True)
+        )
+
+
+@receiver(m2m_changed, sender=ProductDistribution.packaging_units.through)
+def distribution_units_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Betroffene Batches vor dem Leeren der Relation merken
+        if reverse:
+            instance._strain_index_batch_ids = [instance.batch_id]
+        else:
+            instance._strain_index_batch_ids = list(
+                instance.packaging_units.values_list('batch_id', flat=True)
+            )
+        return
+
+    if action == 'post_clear':
+        strain_index.schedule_refresh(getattr(instance, '_strain_index_batch_ids', []))
+        return
+
+    if action not in ('post_add', 'post_remove'):
+        return
+
+    if reverse:
+        strain_index.schedule_refresh([instance.batch_id])
+    elif pk_set:
+        strain_index.schedule_refresh(
+            PackagingUnit.objects.filter(pk__in=pk_set).values_list('batch_id', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=ProductDistribution)
+def distribution_deleting(sender, instance, **kwargs):
+    instance._strain_index_batch_ids = list(
+        instance.packaging_units.values_list('batch_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=ProductDistribution)
+def distribution_deleted(sender, instance, **kwargs):
+    strain_index.schedule_refresh(getattr(instance, '_strain_index_batch_ids', []))
+
+
+# --- Verbrauchsjournal ----------------------------------------------------
+
+@receiver(pre_save, sender=ProductDistribution)
+def distribution_ledger_saving(sender, instance, **kwargs):
+    # Bei Änderung von Empfänger oder Datum auch den alten Tag neu berechnen
+    if instance._state.adding:
+        return
+    previous = ProductDistribution.objects.filter(pk=instance.pk).values(
+        'recipient_id', 'distribution_date'
+    ).first()
+    if previous and previous['recipient_id'] and previous['distribution_date']:
+        instance._ledger_previous_key = (
+            previous['recipient_id'],
+            timezone.localdate(previous['distribution_date'])
+        )
+
+
+@receiver(post_save, sender=ProductDistribution)
+def distribution_ledger_saved(sender, instance, created, **kwargs):
+    # Neue Ausgaben haben noch keine Einheiten - die folgen über m2m_changed
+    if created:
+        return
+    consumption_ledger.refresh_days([
+        getattr(instance, '_ledger_previous_key', None),
+        consumption_ledger.ledger_key(instance),
+    ])
+
+
+@receiver(m2m_changed, sender=ProductDistribution.packaging_units.through)
+def distribution_units_ledger(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            consumption_ledger.refresh_days([consumption_ledger.ledger_key(instance)])
+        return
+
+    # Von der Einheit aus: betroffene Ausgaben ermitteln
+    if action == 'pre_clear':
+        instance._ledger_distribution_ids = list(
+            instance.distributions.values_list('id', flat=True)
+        )
+        return
+    if action == 'post_clear':
+        distribution_ids = getattr(instance, '_ledger_distribution_ids', [])
+    elif action in ('post_add', 'post_remove'):
+        distribution_ids = pk_set or []
+    else:
+        return
+    consumption_ledger.refresh_days(
+        consumption_ledger.ledger_key(distribution)
+        for distribution in ProductDistribution.objects.filter(id__in=distribution_ids)
+    )
+
+
+@receiver(post_delete, sender=ProductDistribution)
+def distribution_ledger_deleted(sender, instance, **kwargs):
+    consumption_ledger.refresh_days([consumption_ledger.ledger_key(instance)])
+
+
+# --- Tab-Zähler der Lebenszyklus-Seiten ------------------------------------
+
+def lifecycle_data_changed(sender, **kwargs):
+    # Erst nach dem Commit, sonst könnte ein paralleler Request den alten Stand neu cachen
+    transaction.on_commit(stats.invalidate_counts)
+
+
+for counted_model in stats.COUNTED_MODELS:
+    post_save.connect(lifecycle_data_changed, sender=counted_model, dispatch_uid=f'counts_saved_{counted_model.__name__}')
+    post_delete.connect(lifecycle_data_changed, sender=counted_model, dispatch_uid=f'counts_deleted_{counted_model.__name__}')
+
+
+# --- ETags der lesenden Endpunkte (conditional.py) --------------------------
+
+def conditional_data_changed(sender, **kwargs):
+    conditional.bump_on_commit(*conditional.MODEL_GROUPS[sender._meta.label])
+
+
+for model_label in conditional.MODEL_GROUPS:
+    versioned_model = apps.get_model(model_label)
+    post_save.connect(conditional_data_changed, sender=versioned_model, dispatch_uid=f'conditional_saved_{model_label}')
+    post_delete.connect(conditional_data_changed, sender=versioned_model, dispatch_uid=f'conditional_deleted_{model_label}')
+
+
+# --- Medien-Blobs (Referenzzählung & Garbage Collection) --------------------
+
+def media_deleted(sender, instance, **kwargs):
+    instance.release_media()
+
+
+for media_model in media.media_models():
+    post_delete.connect(media_deleted, sender=media_model, dispatch_uid=f'media_deleted_{media_model._meta.label}')
@@ -0,0 +1,336 @@
+# backend/trackandtrace/stats.py
+"""
+Tab-Zähler der Lebenszyklus-Seiten (aktiv, vernichtet, geerntet, ... samt Gewichten).
+
+Alle Zähler einer Stufe kommen aus einer einzigen Aggregat-Query mit bedingten
+Count/Sum-Ausdrücken (filter=Q(...)) statt aus je einer count()- bzw.
+aggregate()-Query pro Zähler. Listen liefern die Zähler nur noch auf Anfrage
+(?with_counts=1); Listen-Zähler und counts-Actions werden je Filterkombination
+kurz im Django-Cache gehalten.
+
+Änderungen an den Lebenszyklus-Modellen erhöhen die Cache-Version (signals.py).
+Massen-Updates ohne Signale (QuerySet.update) rufen invalidate_counts selbst
+auf; alles Übrige verfällt spätestens nach COUNTS_CACHE_TIMEOUT. Die Version
+liegt in der Datenbank (options.versions), damit eine Änderung in einem Prozess
+auch die Zähler im Cache der anderen Prozesse verfallen lässt.
+"""
+import hashlib
+from decimal import Decimal
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import Case, Count, F, IntegerField, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+
+from options import versions
+
+from . import conditional
+from .models import (
+    BloomingCuttingBatch, BloomingCuttingPlant, Cutting, CuttingBatch, DryingBatch,
+    FloweringPlant, FloweringPlantBatch, HarvestBatch, LabTestingBatch, MotherPlant,
+    MotherPlantBatch, PackagingBatch, ProcessingBatch, SeedPurchase
+)
+
+COUNTS_CACHE_TIMEOUT = 30
+CACHE_VERSION_KEY = 'trackandtrace:counts:version'
+
+# Modelle, deren Änderung die gecachten Zähler ungültig macht
+COUNTED_MODELS = (
+    SeedPurchase, MotherPlantBatch, MotherPlant, FloweringPlantBatch, FloweringPlant,
+    CuttingBatch, Cutting, BloomingCuttingBatch, BloomingCuttingPlant, HarvestBatch,
+    DryingBatch, ProcessingBatch, LabTestingBatch, PackagingBatch
+)
+
+# Query-Parameter, die nur Seite bzw. Darstellung betreffen, nicht die Zähler
+PAGE_PARAMS = ('page', 'page_size', 'with_counts', 'cursor', 'fields', 'view')
+
+HARVESTED_REASON = "Zur Ernte konvertiert"
+BLOOMING_REASON = "Zu Blühpflanze konvertiert"
+
+# Tabs der Einzelpflanzen bzw. Stecklinge als Bedingung auf das Kind-Modell
+MOTHER_PLANT_TABS = {
+    'active': Q(is_destroyed=False),
+    'destroyed': Q(is_destroyed=True),
+}
+PLANT_TABS = {
+    'active': Q(is_destroyed=False),
+    # Vernichtet, aber nicht zur Ernte überführt (auch ohne Grund)
+    'destroyed': Q(is_destroyed=True) & ~Q(destroy_reason__icontains=HARVESTED_REASON),
+    'harvested': Q(is_destroyed=True, destroy_reason__icontains=HARVESTED_REASON),
+}
+CUTTING_TABS = {
+    'active': Q(is_destroyed=False),
+    'destroyed': Q(is_destroyed=True),
+    'converted': Q(is_destroyed=True, destroy_reason__icontains=BLOOMING_REASON),
+}
+
+
+def _cache_version():
+    return versions.version(CACHE_VERSION_KEY)
+
+
+def invalidate_counts():
+    """Lässt alle gecachten Tab-Zähler (und die ETags der counts-Actions) verfallen."""
+    versions.bump(CACHE_VERSION_KEY)
+    conditional.bump(conditional.LIFECYCLE)
+
+
+def count_if(*conditions, **lookups):
+    return Count('pk', filter=Q(*conditions, **lookups))
+
+
+def sum_if(field, *conditions, **lookups):
+    return Sum(field, filter=Q(*conditions, **lookups))
+
+
+def aggregate_counts(queryset, **aggregates):
+    """
+    Wertet alle Zähler mit einer Query aus. Leere Summen werden zu 0,
+    Dezimalsummen (Gewichte) zu float wie bisher in den counts-Actions.
+    """
+    result = queryset.order_by().aggregate(**aggregates)
+    return {
+        name: float(value) if isinstance(value, Decimal) else (value or 0)
+        for name, value in result.items()
+    }
+
+
+def child_tabs(children, tabs):
+    """
+    Anzahl der Kind-Zeilen (Pflanzen, Stecklinge) und der betroffenen Chargen je
+    Tab mit einer Query. Liefert {tab: (chargen, kinder)}.
+    """
+    aggregates = {}
+    for name, condition in tabs.items():
+        aggregates[f'{name}_batches'] = Count('batch', distinct=True, filter=condition)
+        aggregates[f'{name}_children'] = Count('pk', filter=condition)
+    counts = aggregate_counts(children, **aggregates)
+    return {name: (counts[f'{name}_batches'], counts[f'{name}_children']) for name in tabs}
+
+
+def children_of(child_model, batches):
+    """Kind-Zeilen der Chargen im (ggf. per distinct() gefilterten) Queryset."""
+    return child_model.objects.filter(batch__in=batches.order_by().values('pk'))
+
+
+def list_tab_counts(child_model, batches, tabs):
+    """Listen-Zähler {tab}_count über die Kind-Zeilen der gefilterten Chargen."""
+    return {
+        f'{name}_count': children
+        for name, (_, children) in child_tabs(children_of(child_model, batches), tabs).items()
+    }
+
+
+# --- Zähler je Stufe ----------------------------------------------------------
+
+def seed_list_counts(seeds):
+    has_mother = Q(is_destroyed=False, mother_batches__isnull=False)
+    has_flowering = Q(is_destroyed=False, flowering_batches__isnull=False)
+    return aggregate_counts(
+        # Distinct, da die Joins auf die Chargen Samen vervielfachen
+        SeedPurchase.objects.filter(pk__in=seeds.order_by().values('pk')),
+        active_count=Count('pk', distinct=True, filter=Q(is_destroyed=False)),
+        destroyed_count=Count('pk', distinct=True, filter=Q(is_destroyed=True)),
+        active_seed_count=Count('pk', distinct=True, filter=Q(is_destroyed=False, remaining_quantity__gt=0)),
+        mother_converted_count=Count('pk', distinct=True, filter=has_mother),
+        flowering_converted_count=Count('pk', distinct=True, filter=has_flowering),
+    )
+
+
+def _converted_quantity(batch_model):
+    # Summe der zu Pflanzen konvertierten Samen je Samen als Subquery
+    totals = batch_model.objects.filter(seed_purchase=OuterRef('pk')).order_by().values(
+        'seed_purchase'
+    ).annotate(total=Sum('quantity')).values('total')
+    return Coalesce(Subquery(totals, output_field=IntegerField()), 0)
+
+
+def seed_counts():
+    seeds = SeedPurchase.objects.annotate(
+        converted_quantity=_converted_quantity(MotherPlantBatch) + _converted_quantity(FloweringPlantBatch)
+    )
+    # Teilvernichtung: ganze Menge; vollständige Vernichtung: ohne die konvertierten Samen
+    partial = Q(original_seed__isnull=False) & ~Q(original_seed=F('pk'))
+    destroyed_quantity = Case(
+        When(partial, then=F('quantity')),
+        default=F('quantity') - F('converted_quantity'),
+        output_field=IntegerField()
+    )
+    counts = aggregate_counts(
+        seeds,
+        active_seed_count=count_if(is_destroyed=False, remaining_quantity__gt=0),
+        total_active_seeds_quantity=sum_if('remaining_quantity', is_destroyed=False),
+        destroyed_count=count_if(is_destroyed=True),
+        total_destroyed_seeds_quantity=Sum(destroyed_quantity, filter=Q(is_destroyed=True)),
+    )
+    for prefix, batch_model in (('mother', MotherPlantBatch), ('flowering', FloweringPlantBatch)):
+        # Chargen einschließlich solcher ohne Pflanzen, Pflanzen nur aktive
+        batches = aggregate_counts(
+            batch_model.objects.all(),
+            batch_count=Count('pk', distinct=True),
+            plant_count=Count('plants', filter=Q(plants__is_destroyed=False)),
+        )
+        counts[f'{prefix}_batch_count'] = batches['batch_count']
+        counts[f'{prefix}_plant_count'] = batches['plant_count']
+    return counts
+
+
+def mother_counts():
+    tabs = child_tabs(MotherPlant.objects.all(), MOTHER_PLANT_TABS)
+    cuttings = aggregate_counts(
+        CuttingBatch.objects.filter(mother_batch__isnull=False),
+        batch_count=Count('pk', distinct=True),
+        cutting_count=Count('cuttings', filter=Q(cuttings__is_destroyed=False)),
+    )
+    return {
+        'active_batches_count': tabs['active'][0],
+        'active_plants_count': tabs['active'][1],
+        'destroyed_batches_count': tabs['destroyed'][0],
+        'destroyed_plants_count': tabs['destroyed'][1],
+        'cutting_batch_count': cuttings['batch_count'],
+        'cutting_count': cuttings['cutting_count'],
+    }
+
+
+def plant_counts(plant_model):
+    """Aktive, vernichtete und geerntete Blühpflanzen (aus Samen oder Stecklingen)."""
+    counts = {}
+    for name, (batches, plants) in child_tabs(plant_model.objects.all(), PLANT_TABS).items():
+        counts[f'{name}_batches_count'] = batches
+        counts[f'{name}_plants_count'] = plants
+    return counts
+
+
+def cutting_counts():
+    counts = {}
+    for name, (batches, cuttings) in child_tabs(Cutting.objects.all(), CUTTING_TABS).items():
+        counts[f'{name}_batches_count'] = batches
+        counts[f'{name}_count'] = cuttings
+    return counts
+
+
+def harvest_counts(harvests):
+    active = Q(is_destroyed=False, converted_to_drying=False)
+    return aggregate_counts(
+        harvests,
+        active_count=count_if(active),
+        dried_count=count_if(converted_to_drying=True),
+        destroyed_count=count_if(is_destroyed=True),
+        total_active_weight=sum_if('weight', active),
+        total_dried_weight=sum_if('weight', converted_to_drying=True),
+        total_destroyed_weight=sum_if('weight', is_destroyed=True),
+    )
+
+
+def drying_counts(dryings):
+    return aggregate_counts(
+        dryings,
+        active_count=count_if(is_destroyed=False),
+        destroyed_count=count_if(is_destroyed=True),
+        total_active_initial_weight=sum_if('initial_weight', is_destroyed=False),
+        total_active_final_weight=sum_if('final_weight', is_destroyed=False),
+        total_destroyed_initial_weight=sum_if('initial_weight', is_destroyed=True),
+        total_destroyed_final_weight=sum_if('final_weight', is_destroyed=True),
+    )
+
+
+def processing_counts(processings):
+    return aggregate_counts(
+        processings,
+        active_count=count_if(is_destroyed=False),
+        destroyed_count=count_if(is_destroyed=True),
+        total_active_input_weight=sum_if('input_weight', is_destroyed=False),
+        total_active_output_weight=sum_if('output_weight', is_destroyed=False),
+        total_destroyed_input_weight=sum_if('input_weight', is_destroyed=True),
+        total_destroyed_output_weight=sum_if('output_weight', is_destroyed=True),
+        marijuana_count=count_if(is_destroyed=False, product_type='marijuana'),
+        hashish_count=count_if(is_destroyed=False, product_type='hashish'),
+        marijuana_weight=sum_if('output_weight', is_destroyed=False, product_type='marijuana'),
+        hashish_weight=sum_if('output_weight', is_destroyed=False, product_type='hashish'),
+    )
+
+
+def lab_testing_counts(lab_tests):
+    product_type = 'processing_batch__product_type'
+    counts = {}
+    for state in ('pending', 'passed', 'failed'):
+        counts[f'{state}_count'] = count_if(is_destroyed=False, status=state)
+        counts[f'total_{state}_weight'] = sum_if('input_weight', is_destroyed=False, status=state)
+    return aggregate_counts(
+        lab_tests,
+        **counts,
+        destroyed_count=count_if(is_destroyed=True),
+        total_destroyed_weight=sum_if('input_weight', is_destroyed=True),
+        marijuana_count=count_if(is_destroyed=False, **{product_type: 'marijuana'}),
+        hashish_count=count_if(is_destroyed=False, **{product_type: 'hashish'}),
+        marijuana_weight=sum_if('input_weight', is_destroyed=False, **{product_type: 'marijuana'}),
+        hashish_weight=sum_if('input_weight', is_destroyed=False, **{product_type: 'hashish'}),
+    )
+
+
+def packaging_counts(packagings):
+    product_type = 'lab_testing_batch__processing_batch__product_type'
+    counts = {}
+    for product in ('marijuana', 'hashish'):
+        condition = Q(is_destroyed=False, **{product_type: product})
+        counts[f'{product}_count'] = count_if(condition)
+        counts[f'{product}_weight'] = sum_if('total_weight', condition)
+        counts[f'{product}_units'] = sum_if('unit_count', condition)
+    return aggregate_counts(
+        packagings,
+        active_count=count_if(is_destroyed=False),
+        destroyed_count=count_if(is_destroyed=True),
+        total_active_weight=sum_if('total_weight', is_destroyed=False),
+        total_active_units=sum_if('unit_count', is_destroyed=False),
+        total_destroyed_weight=sum_if('total_weight', is_destroyed=True),
+        total_destroyed_units=sum_if('unit_count', is_destroyed=True),
+        **counts,
+    )
+
+
+# --- ViewSet-Mixin ----------------------------------------------------------
+
+class LifecycleCountsMixin:
+    """
+    Tab-Zähler für die Lebenszyklus-ViewSets.
+
+    list() hängt die Zähler nur bei ?with_counts=1 als "counts" an die Antwort;
+    die Unterklasse berechnet sie in get_list_counts(queryset) für das gefilterte
+    Queryset. cached_counts() hält Zähler je ViewSet und Filterkombination kurz
+    im Cache (auch für die counts-Actions).
+    """
+
+    def wants_counts(self):
+        return self.request.query_params.get('with_counts', '').lower() in ('1', 'true', 'yes')
+
+    def get_list_counts(self, queryset):
+        raise NotImplementedError
+
+    def cached_counts(self, name, compute, params=None):
+        """
+        Zähler aus dem Cache oder per compute() neu berechnet. Standardmäßig gehören
+        alle Filter-Parameter der Anfrage zum Schlüssel; Zähler ohne Filter
+        übergeben params=().
+        """
+        if params is None:
+            params = sorted(
+                (key, value)
+                for key, values in self.request.query_params.lists()
+                if key not in PAGE_PARAMS
+                for value in values
+            )
+        digest = hashlib.md5(urlencode(list(params)).encode()).hexdigest()
+        key = f"trackandtrace:counts:{_cache_version()}:{type(self).__name__}:{name}:{digest}"
+        counts = cache.get(key)
+        if counts is None:
+            counts = compute()
+            cache.set(key, counts, COUNTS_CACHE_TIMEOUT)
+        return counts
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self.wants_counts() and isinstance(response.data, dict):
+            response.data['counts'] = self.cached_counts(
+                'list', lambda: self.get_list_counts(self.filter_queryset(self.get_queryset()))
+            )
+        return response
@@ -0,0 +1,164 @@
+# backend/trackandtrace/strain_index.py
+"""
+Pflege des materialisierten Sorten-Verfügbarkeitsindex (StrainAvailabilityIndex).
+
+Statt bei jedem StrainCard-Request alle verfügbaren PackagingUnits über die
+komplette Lineage-Kette zu laden und in Python zu gruppieren, wird pro
+Verpackungs-Batch und Gewicht eine vorberechnete Zeile gehalten. Sorte, THC und
+Produkttyp stammen aus den gestempelten Herkunftsfeldern des Batches. Änderungen an
+Einheiten, Verpackungen, Laborwerten und Ausgaben stoßen über die Signale in
+signals.py ein Neuberechnen der betroffenen Verpackungs-Batches an.
+"""
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db import transaction
+
+from . import conditional
+from .lineage import UNKNOWN_STRAIN, resolve_packaging_lineage, stamp_packaging_batch
+from .models import PackagingBatch, PackagingUnit, StrainAvailabilityIndex
+
+_state = threading.local()
+
+
+def _build_rows(packaging_batch, units):
+    """Gruppiert die verfügbaren Einheiten eines Batches nach Gewicht zu Indexzeilen."""
+    if not packaging_batch.has_lineage:
+        # Noch nicht gestempelte Altbestände (vor backfill_packaging_lineage)
+        stamp_packaging_batch(packaging_batch, resolve_packaging_lineage(packaging_batch))
+    lineage = {
+        'strain_name': packaging_batch.lineage_strain_name or UNKNOWN_STRAIN,
+        'product_type': packaging_batch.lineage_product_type,
+        'cannabis_batch_id': packaging_batch.lineage_cannabis_batch_id,
+        'thc_content': packaging_batch.lineage_thc_content,
+    }
+
+    groups = OrderedDict()
+    for unit in units:
+        weight = unit['weight'] or Decimal('0')
+        groups.setdefault(weight, []).append(unit)
+
+    rows = []
+    for weight, weight_units in groups.items():
+        prices = [u['unit_price'] for u in weight_units if u['unit_price']]
+        rows.append(StrainAvailabilityIndex(
+            packaging_batch=packaging_batch,
+            weight=weight,
+            unit_count=len(weight_units),
+            units=[
+                {
+                    'id': str(u['id']),
+                    'batch_number': u['batch_number'],
+                    'unit_price': float(u['unit_price']) if u['unit_price'] else None,
+                }
+                for u in weight_units
+            ],
+            newest_unit_at=weight_units[0]['created_at'],
+            min_price=min(prices) if prices else None,
+            max_price=max(prices) if prices else None,
+            **lineage
+        ))
+    return rows
+
+
+def refresh_packaging_batches(batch_ids):
+    """
+    Berechnet die Indexzeilen der angegebenen Verpackungs-Batches neu.
+    Kostet unabhängig von der Anzahl der Batches eine konstante Anzahl Queries.
+    """
+    batch_ids = {batch_id for batch_id in batch_ids if batch_id}
+    if not batch_ids:
+        return 0
+
+    # Sorte, THC und Produkttyp sind auf dem Batch gestempelt (siehe lineage.py)
+    batches = PackagingBatch.objects.filter(id__in=batch_ids)
+
+    units_by_batch = {}
+    available_units = PackagingUnit.objects.filter(
+        batch_id__in=batch_ids,
+        is_destroyed=False
+    ).exclude(
+        distributions__isnull=False
+    ).order_by(
+        '-created_at', 'batch_number'
+    ).values('id', 'batch_id', 'batch_number', 'weight', 'unit_price', 'created_at')
+    for unit in available_units:
+        units_by_batch.setdefault(unit['batch_id'], []).append(unit)
+
+    rows = []
+    for batch in batches:
+        rows.extend(_build_rows(batch, units_by_batch.get(batch.id, [])))
+
+    with transaction.atomic():
+        StrainAvailabilityIndex.objects.filter(packaging_batch_id__in=batch_ids).delete()
+        StrainAvailabilityIndex.objects.bulk_create(rows)
+    # Sortenkarten und Filter-Optionen lesen nur den Index (ETags, conditional.py)
+    conditional.bump_on_commit(conditional.STRAIN_CARDS)
+    return len(rows)
+
+
+def rebuild_index(chunk_size=500):
+    """Baut den kompletten Index neu auf (Management-Command rebuild_strain_index)."""
+    batch_ids = list(PackagingBatch.objects.values_list('id', flat=True))
+    with transaction.atomic():
+        StrainAvailabilityIndex.objects.all().delete()
+        conditional.bump_on_commit(conditional.STRAIN_CARDS)
+        total = 0
+        for start in range(0, len(batch_ids), chunk_size):
+            total += refresh_packaging_batches(batch_ids[start:start + chunk_size])
+    return total
+
+
+def ensure_index_built(**kwargs):
+    """
+    post_migrate-Hook: Befüllt den Index einmalig, wenn er leer ist, aber bereits
+    verfügbare Einheiten existieren (z.B. direkt nach Einführung des Index).
+    """
+    if StrainAvailabilityIndex.objects.exists():
+        return
+    if not PackagingUnit.objects.filter(is_destroyed=False).exists():
+        return
+    rebuild_index()
+
+
+def _pending():
+    if not hasattr(_state, 'pending'):
+        _state.pending = set()
+        _state.depth = 0
+    return _state.pending
+
+
+def _flush():
+    pending = _pending()
+    if not pending:
+        return
+    batch_ids = set(pending)
+    pending.clear()
+    refresh_packaging_batches(batch_ids)
+
+
+def schedule_refresh(batch_ids):
+    """
+    Merkt Verpackungs-Batches zur Neuberechnung vor. Die Berechnung erfolgt nach
+    dem Commit der laufenden Transaktion (bzw. sofort im Autocommit-Modus) und
+    wird innerhalb von deferred_refresh() gebündelt.
+    """
+    pending = _pending()
+    pending.update(batch_id for batch_id in batch_ids if batch_id)
+    if _state.depth == 0:
+        transaction.on_commit(_flush)
+
+
+@contextmanager
+def deferred_refresh():
+    """Bündelt alle Index-Aktualisierungen eines Blocks zu einer einzigen Neuberechnung."""
+    _pending()
+    _state.depth += 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+        if _state.depth == 0:
+            transaction.on_commit(_flush)
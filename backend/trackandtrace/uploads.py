@@ -0,0 +1,275 @@
+# backend/trackandtrace/uploads.py
+"""
+Fortsetzbarer Upload großer Bilder und Videos in Teilstücken.
+
+Ablauf (gemeinsam für alle Track & Trace Medien und wawi-Sortenbilder):
+
+1. POST .../uploads/ am jeweiligen ViewSet: legt eine MediaUpload-Sitzung an und
+   reserviert den endgültigen Speicherpfad (upload_to des Ziel-Modells)
+2. PUT /uploads/<id>/?offset=N: schreibt ein Teilstück direkt an die Stelle in
+   der Datei (optional mit X-Chunk-SHA256); GET liefert den Stand zum Fortsetzen
+3. POST .../uploads/commit/ mit upload_id und den üblichen Feldern: prüft Größe
+   und SHA-256, legt das Medium an und verschiebt die Datei in den
+   inhaltsadressierten Blob-Speicher (bei identischem Inhalt wird die
+   hochgeladene Kopie gelöscht, siehe trackandtrace.blobs)
+
+Der Request-Body wird blockweise vom Socket gelesen - der Speicherbedarf hängt
+nur von READ_BLOCK_SIZE ab, nicht von der Dateigröße. Der Webserver-Parser
+(MultiPartParser) und DATA_UPLOAD_MAX_MEMORY_SIZE greifen hier nicht.
+"""
+import hashlib
+import os
+from datetime import timedelta
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from django.utils import timezone
+
+from . import blobs, media
+from .models import MediaBlob, MediaUpload
+
+MAX_UPLOAD_SIZE = getattr(settings, 'MEDIA_UPLOAD_MAX_SIZE', 100 * 1024 * 1024)
+# Empfohlene und maximal angenommene Größe eines Teilstücks
+CHUNK_SIZE = getattr(settings, 'MEDIA_UPLOAD_CHUNK_SIZE', 4 * 1024 * 1024)
+MAX_CHUNK_SIZE = getattr(settings, 'MEDIA_UPLOAD_MAX_CHUNK_SIZE', 16 * 1024 * 1024)
+READ_BLOCK_SIZE = 256 * 1024
+# Nach ... Sekunden gilt ein abgebrochenes Teilstück als verwaist (neuer Versuch erlaubt)
+STALE_CHUNK_SECONDS = 120
+
+VIDEO_EXTENSIONS = {'mp4', 'mov', 'avi', 'webm', 'mkv'}
+
+OPEN = 'open'
+RECEIVING = 'receiving'
+COMMITTED = 'committed'
+ABORTED = 'aborted'
+FAILED = 'failed'
+
+
+class UploadError(Exception):
+    """Fehler im Upload-Ablauf - Meldung und HTTP-Status gehen an die API."""
+
+    def __init__(self, message, status_code=400, upload=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.upload = upload
+
+
+def _media_field(model, filename):
+    extension = PurePosixPath(filename).suffix.lower().lstrip('.')
+    if extension in VIDEO_EXTENSIONS:
+        if 'video' not in model.MEDIA_FIELDS:
+            raise UploadError(f"Videos sind für {model._meta.verbose_name} nicht erlaubt")
+        return 'video'
+    from PIL import Image
+    if f'.{extension}' not in Image.registered_extensions():
+        raise UploadError(f"Dateityp '.{extension}' wird nicht unterstützt")
+    return 'image'
+
+
+def local_path(upload):
+    """Dateisystem-Pfad der entstehenden Datei (Teilstücke brauchen wahlfreien Schreibzugriff)."""
+    try:
+        return default_storage.path(upload.file_name)
+    except NotImplementedError:
+        raise UploadError("Teilstück-Uploads benötigen einen lokalen Medienspeicher", 501)
+
+
+def start(model, filename, total_size, checksum=''):
+    """Legt die Sitzung an und reserviert den endgültigen Speicherpfad."""
+    if not issubclass(model, media.MediaProcessingFields):
+        raise UploadError(f"{model._meta.label} unterstützt keine Medien-Uploads")
+    filename = os.path.basename(filename or '')
+    if not filename:
+        raise UploadError("filename ist erforderlich")
+    try:
+        total_size = int(total_size)
+    except (TypeError, ValueError):
+        raise UploadError("size muss eine Zahl sein")
+    if total_size <= 0 or total_size > MAX_UPLOAD_SIZE:
+        raise UploadError(f"Dateigröße muss zwischen 1 Byte und {MAX_UPLOAD_SIZE // (1024 * 1024)} MB liegen")
+    checksum = (checksum or '').lower()
+    if checksum and len(checksum) != 64:
+        raise UploadError("checksum muss ein SHA-256 (hex) sein")
+
+    media_field = _media_field(model, filename)
+    field = model._meta.get_field(media_field)
+    # Leere Datei anlegen - reserviert den Namen unter upload_to des Ziel-Feldes
+    file_name = default_storage.save(field.generate_filename(None, filename), ContentFile(b''))
+    return MediaUpload.objects.create(
+        target=model._meta.label,
+        media_field=media_field,
+        filename=filename,
+        file_name=file_name,
+        total_size=total_size,
+        checksum=checksum,
+    )
+
+
+def get_upload(upload_id, model=None):
+    if not upload_id:
+        raise UploadError("upload_id ist erforderlich")
+    try:
+        upload = MediaUpload.objects.filter(pk=upload_id).first()
+    except ValidationError:
+        raise UploadError(f"Ungültige upload_id: {upload_id}")
+    if upload is None:
+        raise UploadError(f"Upload {upload_id} nicht gefunden", 404)
+    if model is not None and upload.target != model._meta.label:
+        raise UploadError(f"Upload {upload_id} gehört zu {upload.target}")
+    return upload
+
+
+def describe(upload):
+    """Stand der Sitzung (zum Fortsetzen nach Verbindungsabbruch)."""
+    return {
+        'upload_id': str(upload.id),
+        'filename': upload.filename,
+        'media_field': upload.media_field,
+        'status': upload.status,
+        'offset': upload.received_size,
+        'size': upload.total_size,
+        'chunk_size': CHUNK_SIZE,
+        'complete': upload.received_size >= upload.total_size,
+        'error': upload.error,
+    }
+
+
+def _claim(upload):
+    """Exklusiver Schreibzugriff für ein Teilstück (parallele Retries des Clients)."""
+    stale = timezone.now() - timedelta(seconds=STALE_CHUNK_SECONDS)
+    return MediaUpload.objects.filter(
+        Q(status=OPEN) | Q(status=RECEIVING, updated_at__lt=stale), pk=upload.pk
+    ).update(status=RECEIVING, updated_at=timezone.now()) == 1
+
+
+def write_chunk(upload, offset, stream, length, chunk_checksum=''):
+    """
+    Schreibt ein Teilstück ab offset. Ein bereits empfangenes Stück darf erneut
+    gesendet werden (Antwort ging verloren), Lücken sind nicht erlaubt.
+    """
+    try:
+        offset, length = int(offset), int(length)
+    except (TypeError, ValueError):
+        raise UploadError("offset und Content-Length sind erforderlich", upload=upload)
+    if upload.status not in (OPEN, RECEIVING):
+        raise UploadError(f"Upload ist nicht mehr offen ({upload.status})", 409, upload)
+    if offset < 0 or offset > upload.received_size:
+        raise UploadError(f"Erwarteter Offset: {upload.received_size}", 409, upload)
+    if length <= 0 or length > MAX_CHUNK_SIZE:
+        raise UploadError(f"Teilstück muss zwischen 1 Byte und {MAX_CHUNK_SIZE} Bytes groß sein", 413, upload)
+    if offset + length > upload.total_size:
+        raise UploadError("Teilstück reicht über die angekündigte Dateigröße hinaus", 416, upload)
+    if not _claim(upload):
+        raise UploadError("Für diesen Upload wird gerade ein Teilstück geschrieben", 409, upload)
+
+    path = local_path(upload)
+    digest = hashlib.sha256()
+    written = 0
+    try:
+        with open(path, 'r+b') as handle:
+            handle.seek(offset)
+            while written < length:
+                block = stream.read(min(READ_BLOCK_SIZE, length - written))
+                if not block:
+                    break
+                handle.write(block)
+                digest.update(block)
+                written += len(block)
+            valid = written == length and (not chunk_checksum or digest.hexdigest() == chunk_checksum.lower())
+            if not valid:
+                # Unvollständiges oder beschädigtes Stück verwerfen
+                handle.truncate(offset)
+    except OSError as e:
+        MediaUpload.objects.filter(pk=upload.pk).update(status=OPEN)
+        raise UploadError(f"Teilstück konnte nicht gespeichert werden: {e}", 500, upload)
+
+    received = max(upload.received_size, offset + written) if valid else offset
+    MediaUpload.objects.filter(pk=upload.pk).update(status=OPEN, received_size=received, updated_at=timezone.now())
+    upload.status, upload.received_size = OPEN, received
+    if written != length:
+        raise UploadError(f"Verbindung abgebrochen - {written} von {length} Bytes empfangen", 400, upload)
+    if not valid:
+        raise UploadError("Prüfsumme des Teilstücks stimmt nicht", 400, upload)
+    return upload
+
+
+def finish(upload):
+    """
+    Prüft Vollständigkeit und SHA-256 der Datei. Gibt (Blob-Pfad, Hash) zurück;
+    verschoben wird die Datei erst in mark_committed.
+    """
+    if upload.received_size != upload.total_size:
+        raise UploadError(
+            f"Upload unvollständig: {upload.received_size} von {upload.total_size} Bytes", 409, upload
+        )
+    content_hash = media.file_sha256(default_storage.open(upload.file_name))
+    if upload.checksum and upload.checksum != content_hash:
+        default_storage.delete(upload.file_name)
+        MediaUpload.objects.filter(pk=upload.pk).update(
+            status=FAILED, content_hash=content_hash, error="SHA-256 der Datei stimmt nicht mit checksum überein"
+        )
+        raise UploadError("Prüfsumme der Datei stimmt nicht - bitte erneut hochladen", 400, upload)
+
+    upload.content_hash = content_hash
+    return blobs.blob_name(content_hash, PurePosixPath(upload.filename).suffix), content_hash
+
+
+def mark_committed(upload, file_name):
+    """
+    Sitzung abschließen: Datei in den Blob-Speicher übernehmen (umbenennen; ist
+    der Inhalt schon vorhanden, wird die hochgeladene Kopie gelöscht).
+    """
+    blobs.adopt_file(upload.file_name, upload.content_hash)
+    MediaBlob.objects.filter(pk=upload.content_hash, size=0).update(size=upload.total_size)
+    MediaUpload.objects.filter(pk=upload.pk).update(
+        status=COMMITTED, file_name=file_name, content_hash=upload.content_hash, error=''
+    )
+
+
+def commit_serializer(upload, serializer, save):
+    """
+    Legt das Medium über den Serializer des ViewSets an. save(serializer) ist
+    dessen perform_create bzw. das eigene Speichern (Chargen-Zuordnung usw.).
+    """
+    if upload.status != OPEN:
+        raise UploadError(f"Upload ist nicht offen ({upload.status})", 409, upload)
+    if not _claim(upload):
+        raise UploadError("Upload wird gerade abgeschlossen", 409, upload)
+    try:
+        file_name, content_hash = finish(upload)
+        serializer.validated_data[upload.media_field] = file_name
+        serializer.validated_data['content_hash'] = content_hash
+        instance = save(serializer)
+    except Exception:
+        # Sitzung bleibt offen - der Client kann den Abschluss wiederholen
+        MediaUpload.objects.filter(pk=upload.pk, status=RECEIVING).update(status=OPEN)
+        raise
+    mark_committed(upload, file_name)
+    return instance if instance is not None else serializer.instance
+
+
+def abort(upload):
+    if upload.status == COMMITTED:
+        raise UploadError("Upload ist bereits abgeschlossen", 409, upload)
+    if upload.status != FAILED:
+        default_storage.delete(upload.file_name)
+    MediaUpload.objects.filter(pk=upload.pk).update(status=ABORTED)
+
+
+def cleanup_stale(hours=24):
+    """Verwaiste Sitzungen entfernen (inkl. halb geschriebener Dateien)."""
+    cutoff = timezone.now() - timedelta(hours=hours)
+    stale = MediaUpload.objects.filter(updated_at__lt=cutoff).exclude(status=COMMITTED)
+    removed = 0
+    for upload in stale.iterator():
+        if upload.status in (OPEN, RECEIVING) and not media.file_in_use(upload.file_name):
+            default_storage.delete(upload.file_name)
+        removed += 1
+    stale.delete()
+    MediaUpload.objects.filter(status=COMMITTED, updated_at__lt=cutoff).delete()
+    return removed
+
@@ -2,14 +2,17 @@
 from rest_framework import viewsets, status, pagination
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
+from rest_framework.reverse import reverse
 from rest_framework.permissions import IsAuthenticated
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.db.models import Q, Sum, Count
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from trackandtrace.models import SeedPurchase, MotherPlantBatch, FloweringPlantBatch
+from trackandtrace import uploads
+from trackandtrace.conditional import STRAINS, conditional_get
 import os
 import uuid
 import json
@@ -231,38 +234,78 @@ class CannabisStrainViewSet(viewsets.ModelViewSet):
         serializer = StrainImageSerializer(data=request.data)
         
         if serializer.is_valid():
-            # If marked as primary, unmark other images
-            is_primary = request.data.get('is_primary') == 'true'
-            if is_primary:
-                StrainImage.objects.filter(strain=strain, is_primary=True).update(is_primary=False)
-                serializer.validated_data['is_primary'] = True
-            
-            # Save the image
-            image = serializer.save(strain=strain)
-            
-            # Bild-Upload in Historie erfassen, falls member_id vorhanden
-            member_id = request.data.get('member_id')
-            if member_id:
-                # Bilddetails für den Verlauf speichern
-                image_data = {
-                    'operation': 'upload',
-                    'image_id': str(image.id),
-                    'filename': os.path.basename(image.image.name),
-                    'is_primary': is_primary,
-                    'caption': image.caption
-                }
-                
-                StrainHistory.objects.create(
-                    strain=strain,
-                    member_id=member_id,
-                    action='image_uploaded',
-                    image_data=image_data  # Speichere die Bilddaten im JSONField
-                )
-            
+            self._save_uploaded_image(strain, serializer)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    def _save_uploaded_image(self, strain, serializer):
+        """Speichert ein hochgeladenes Bild (Hauptbild-Wechsel und Historie)"""
+        request = self.request
+        
+        # If marked as primary, unmark other images
+        is_primary = str(request.data.get('is_primary')).lower() == 'true'
+        if is_primary:
+            StrainImage.objects.filter(strain=strain, is_primary=True).update(is_primary=False)
+            serializer.validated_data['is_primary'] = True
+        
+        # Save the image
+        image = serializer.save(strain=strain)
+        
+        # Bild-Upload in Historie erfassen, falls member_id vorhanden
+        member_id = request.data.get('member_id')
+        if member_id:
+            # Bilddetails für den Verlauf speichern
+            image_data = {
+                'operation': 'upload',
+                'image_id': str(image.id),
+                'filename': os.path.basename(image.image.name),
+                'is_primary': is_primary,
+                'caption': image.caption
+            }
+            
+            StrainHistory.objects.create(
+                strain=strain,
+                member_id=member_id,
+                action='image_uploaded',
+                image_data=image_data  # Speichere die Bilddaten im JSONField
+            )
+        return image
+    
+    @action(detail=True, methods=['post'], url_path='uploads', parser_classes=[JSONParser, FormParser])
+    def start_upload(self, request, pk=None):
+        """Startet einen Bild-Upload in Teilstücken (Input: filename, size, checksum optional)"""
+        self.get_object()
+        try:
+            upload = uploads.start(
+                StrainImage, request.data.get('filename'), request.data.get('size'), request.data.get('checksum', '')
+            )
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response({
+            **uploads.describe(upload),
+            'upload_url': reverse('media_upload', args=[upload.id], request=request)
+        }, status=status.HTTP_201_CREATED)
+    
+    @action(detail=True, methods=['post'], url_path='uploads/commit', parser_classes=[JSONParser, FormParser])
+    def commit_upload(self, request, pk=None):
+        """Schließt einen Teilstück-Upload ab (upload_id, is_primary, caption, member_id)"""
+        strain = self.get_object()
+        try:
+            upload = uploads.get_upload(request.data.get('upload_id'), StrainImage)
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        
+        # Datei kommt aus dem Upload, nicht aus dem Request
+        serializer = StrainImageSerializer(data=request.data, partial=True)
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                uploads.commit_serializer(upload, serializer, lambda s: self._save_uploaded_image(strain, s))
+        except uploads.UploadError as e:
+            return Response({'error': str(e)}, status=e.status_code)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    
     @action(detail=False, methods=['post'], parser_classes=[MultiPartParser, FormParser])
     def upload_temp_image(self, request):
         """
@@ -421,6 +464,7 @@ class CannabisStrainViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['get'])
+    @conditional_get(STRAINS)
     def terpenes(self, request):
         """Get list of all terpenes used in strains"""
         all_terpenes = set()
@@ -437,6 +481,7 @@ class CannabisStrainViewSet(viewsets.ModelViewSet):
         return Response(sorted(list(all_terpenes)))
     
     @action(detail=False, methods=['get'])
+    @conditional_get(STRAINS)
     def flavors(self, request):
         """Get list of all flavors used in strains"""
         all_flavors = set()
@@ -453,6 +498,7 @@ class CannabisStrainViewSet(viewsets.ModelViewSet):
         return Response(sorted(list(all_flavors)))
     
     @action(detail=False, methods=['get'])
+    @conditional_get(STRAINS)
     def effects(self, request):
         """Get list of all effects used in strains"""
         all_effects = set()
@@ -469,6 +515,7 @@ class CannabisStrainViewSet(viewsets.ModelViewSet):
         return Response(sorted(list(all_effects)))
     
     @action(detail=False, methods=['get'])
+    @conditional_get(STRAINS)
     def stats(self, request):
         """Get stats about strains"""
         active_count = CannabisStrain.objects.filter(is_active=True).count()
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wawi', '0006_delete_strainpurchasehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strainimage',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='strainimage',
+            name='processing_error',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='strainimage',
+            name='processing_status',
+            field=models.CharField(choices=[('pending', 'Ausstehend'), ('processing', 'In Bearbeitung'), ('ready', 'Fertig'), ('failed', 'Fehlgeschlagen')], db_index=True, default='pending', editable=False, help_text='Status der Vorschaubild-/Rendition-Erzeugung', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='strainimage',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Speicherpfade der abgeleiteten Dateien je Rendition'),
+        ),
+    ]
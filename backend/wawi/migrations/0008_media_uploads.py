@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wawi', '0007_media_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='strainimage',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, editable=False, help_text='SHA-256 der Originaldatei (Deduplizierung)', max_length=64),
+        ),
+    ]
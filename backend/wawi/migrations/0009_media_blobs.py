@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-18 11:35
+
+import trackandtrace.blobs
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('wawi', '0008_media_uploads'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='strainimage',
+            name='image',
+            field=models.ImageField(storage=trackandtrace.blobs.media_storage, upload_to='strain_images/%Y/%m/', verbose_name='Bild'),
+        ),
+    ]
@@ -1,12 +1,14 @@
 # wawi/models.py
 import uuid, os
 from django.db import models
-from django.utils import timezone
 from django.core.files.storage import default_storage
 from django.db.models import JSONField  # Import für Django 3.1+
 # Alternative für PostgreSQL:
 # from django.contrib.postgres.fields import JSONField
 from members.models import Member
+from options.sequences import next_batch_number
+from trackandtrace.blobs import media_storage
+from trackandtrace.media import MediaProcessingFields, file_in_use
 
 class CannabisStrain(models.Model):
     # Primärschlüssel
@@ -311,16 +313,7 @@ class CannabisStrain(models.Model):
     def save(self, *args, **kwargs):
         # Generiere Batch-Nummer falls nicht vorhanden
         if not self.batch_number:
-            today = timezone.now()
-            # Zähle Strains, die heute erstellt wurden
-            count = CannabisStrain.objects.filter(
-                created_at__year=today.year,
-                created_at__month=today.month,
-                created_at__day=today.day
-            ).count() + 1
-            
-            # Generiere Batch-Nummer
-            self.batch_number = f"strain:{today.strftime('%d:%m:%Y')}:{count:04d}"
+            self.batch_number = next_batch_number(CannabisStrain, "strain")
         
         super().save(*args, **kwargs)
     
@@ -338,7 +331,8 @@ class CannabisStrain(models.Model):
     @property
     def default_price_display(self):
         """Gibt den Standardpreis für die Anzeige zurück"""
-        default_tier = self.price_tiers.filter(is_default=True).first()
+        # Über .all() statt filter(), damit prefetch_related('price_tiers') greift
+        default_tier = next((tier for tier in self.price_tiers.all() if tier.is_default), None)
         if default_tier:
             return f"{default_tier.quantity}× {default_tier.total_price}€"
         return "Kein Preis definiert"
@@ -384,8 +378,9 @@ class CannabisStrain(models.Model):
         return f"{min_price:.0f}-{max_price:.0f}€"
 
 
-class StrainImage(models.Model):
+class StrainImage(MediaProcessingFields):
     """Modell für Bilder von Cannabis-Sorten"""
+    # Vorschaubilder über trackandtrace.media (Hintergrund-Worker)
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     strain = models.ForeignKey(
         CannabisStrain,
@@ -394,6 +389,7 @@ class StrainImage(models.Model):
     )
     image = models.ImageField(
         upload_to='strain_images/%Y/%m/',
+        storage=media_storage,
         verbose_name="Bild"
     )
     is_primary = models.BooleanField(
@@ -423,8 +419,8 @@ class StrainImage(models.Model):
         # Lösche den Datensatz
         super().delete(*args, **kwargs)
         
-        # Lösche die Datei, wenn sie existiert
-        if image_path and os.path.exists(image_path):
+        # Lösche die Datei, wenn sie existiert (und kein dedupliziertes Medium mehr darauf verweist)
+        if image_path and os.path.exists(image_path) and not file_in_use(self.image.name):
             os.remove(image_path)
     
     class Meta:
@@ -544,7 +540,8 @@ class StrainPriceTier(models.Model):
     @property
     def discount_percentage(self):
         """Berechnet den Rabatt im Vergleich zur kleinsten Packung"""
-        smallest_tier = self.strain.price_tiers.order_by('quantity').first()
+        # Staffeln sind nach quantity sortiert (Meta.ordering) - nutzt einen Prefetch der Sorte
+        smallest_tier = next(iter(self.strain.price_tiers.all()), None)
         if smallest_tier and smallest_tier != self:
             smallest_unit_price = smallest_tier.unit_price
             if smallest_unit_price > 0:
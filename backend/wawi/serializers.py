@@ -12,11 +12,28 @@ from members.models import Member
 from members.serializers import MemberSerializer
 
 class StrainImageSerializer(serializers.ModelSerializer):
+    display_url = serializers.SerializerMethodField()
+    rendition_urls = serializers.SerializerMethodField()
+
     class Meta:
         model = StrainImage
-        fields = ['id', 'image', 'is_primary', 'caption', 'created_at']
+        fields = [
+            'id', 'image', 'is_primary', 'caption', 'created_at',
+            'processing_status', 'display_url', 'rendition_urls'
+        ]
         read_only_fields = ['id', 'created_at']
 
+    def _absolute_url(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if url and request else url
+
+    def get_display_url(self, obj):
+        # Platzhalter, bis die Vorschaubilder im Hintergrund erzeugt sind
+        return self._absolute_url(obj.get_display_url())
+
+    def get_rendition_urls(self, obj):
+        return {name: self._absolute_url(url) for name, url in obj.rendition_urls().items()}
+
 
 class StrainInventorySerializer(serializers.ModelSerializer):
     class Meta:
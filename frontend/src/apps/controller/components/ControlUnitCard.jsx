@@ -315,6 +315,24 @@ const SimaticButton = styled(Box)(({ theme }) => ({
   }
 }))
 
+// Befehle laufen im Backend über eine Warteschlange - Ergebnis per Polling abwarten
+const COMMAND_POLL_INTERVAL = 500
+const COMMAND_POLL_TIMEOUT = 30000
+
+const waitForCommand = async (commandId) => {
+  const deadline = Date.now() + COMMAND_POLL_TIMEOUT
+  let command = null
+  while (Date.now() < deadline) {
+    const response = await api.get(`/controller/commands/${commandId}/status/`)
+    command = response.data
+    if (command.done) {
+      break
+    }
+    await new Promise(resolve => setTimeout(resolve, COMMAND_POLL_INTERVAL))
+  }
+  return command
+}
+
 export default function ControlUnitCard({ unit, onStatusChange }) {
   const navigate = useNavigate()
   const [sending, setSending] = useState(false)
@@ -405,23 +423,28 @@ export default function ControlUnitCard({ unit, onStatusChange }) {
       })
       
       if (response.data.success) {
-        // LED-Status aus Response setzen
-        setLedStatus(response.data.led_status)
+        const command = await waitForCommand(response.data.command_id)
         
-        // Unit-Daten aktualisieren wenn vorhanden
-        if (response.data.unit) {
-          setCurrentUnit(response.data.unit)
-          // Auch den LED-Status aus den aktualisierten Unit-Daten setzen
-          if (response.data.unit.current_status?.led_status !== undefined) {
-            setLedStatus(response.data.unit.current_status.led_status)
-          }
+        if (command?.status === 'failed') {
+          throw new Error(command.error_message || 'SPS hat den Befehl nicht akzeptiert')
         }
         
-        setNotification({
-          open: true,
-          message: `LED ${response.data.led_status ? 'eingeschaltet' : 'ausgeschaltet'}`,
-          severity: 'success'
-        })
+        if (command?.status === 'confirmed') {
+          // LED-Status erst nach Bestätigung der SPS setzen
+          setLedStatus(response.data.led_status)
+          setNotification({
+            open: true,
+            message: `LED ${response.data.led_status ? 'eingeschaltet' : 'ausgeschaltet'}`,
+            severity: 'success'
+          })
+        } else if (command?.status !== 'superseded') {
+          // Noch in der Warteschlange (z.B. SPS nicht erreichbar, Wiederholung geplant)
+          setNotification({
+            open: true,
+            message: 'Befehl eingereiht - SPS hat noch nicht geantwortet',
+            severity: 'info'
+          })
+        }
         
         // Parent-Komponente informieren
         onStatusChange?.()
@@ -455,10 +478,18 @@ export default function ControlUnitCard({ unit, onStatusChange }) {
       const response = await api.post(`/controller/units/${currentUnit.id}/save_to_plc/`)
       
       if (response.data.success) {
+        const command = await waitForCommand(response.data.command_id)
+        
+        if (command?.status === 'failed') {
+          throw new Error(command.error_message || 'Speichern fehlgeschlagen')
+        }
+        
         setNotification({
           open: true,
-          message: 'Konfiguration erfolgreich gespeichert',
-          severity: 'success'
+          message: command?.status === 'confirmed'
+            ? 'Konfiguration erfolgreich gespeichert'
+            : 'Konfiguration eingereiht - SPS hat noch nicht geantwortet',
+          severity: command?.status === 'confirmed' ? 'success' : 'info'
         })
         onStatusChange?.()
       } else {
@@ -512,7 +543,7 @@ export default function ControlUnitCard({ unit, onStatusChange }) {
       
       setNotification({
         open: true,
-        message: 'Befehl an SPS gesendet',
+        message: 'Befehl für die SPS eingereiht',
         severity: 'success'
       })
       onStatusChange?.()
@@ -236,7 +236,7 @@ export default function MotherPlantPage() {
   const loadMotherBatches = async (page = 1) => {
     setLoading(true)
     try {
-      let url = `/trackandtrace/motherbatches/?page=${page}&page_size=${pageSize}`;
+      let url = `/trackandtrace/motherbatches/?page=${page}&page_size=${pageSize}&with_counts=1`;
       
       if (yearFilter) url += `&year=${yearFilter}`;
       if (monthFilter) url += `&month=${monthFilter}`;